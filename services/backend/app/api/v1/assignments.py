@@ -7,12 +7,14 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
-from app.api.deps import get_db, get_current_driver, get_model_loader
+from app.api.deps import get_db, get_current_driver, get_current_admin, get_model_loader
 from app.schemas.assignment import (
     AssignmentResponse,
     DifficultyPredictionRequest,
     DifficultyPredictionResponse,
-    SHAPExplanationResponse
+    SHAPExplanationResponse,
+    ReoptimizeRequest,
+    ReoptimizeResponse
 )
 from app.services.assignment_service import AssignmentService
 from app.ml.model_loader import ModelLoader
@@ -47,6 +49,51 @@ async def get_current_assignments(
     return [AssignmentResponse.from_orm(a) for a in assignments]
 
 
+@router.post("/reoptimize", response_model=ReoptimizeResponse)
+async def reoptimize_assignments(
+    request: ReoptimizeRequest,
+    db: AsyncSession = Depends(get_db),
+    model_loader: ModelLoader = Depends(get_model_loader),
+    admin = Depends(get_current_admin)
+):
+    """
+    **INNOVATION 4: Mid-day re-optimization** (admin only)
+    
+    Insert late packages and those of drivers who dropped out into a small
+    neighborhood of drivers, then even it out with a few exchanges; all
+    other assignments stay as they are
+    
+    Args:
+        request: New packages and removed drivers
+        db: Database session
+        model_loader: ML model loader
+        admin: Current admin user
+    
+    Returns:
+        ReoptimizeResponse: Neighborhood size, moved packages and solver status
+    """
+    assignment_service = AssignmentService(db)
+    
+    try:
+        summary = await assignment_service.reoptimize_assignments(
+            model_loader=model_loader,
+            new_package_ids=request.new_package_ids,
+            removed_driver_ids=request.removed_driver_ids,
+            neighborhood_size=request.neighborhood_size
+        )
+        
+        logger.info(f"Assignments re-optimized by admin {admin.id}: {summary}")
+        
+        return ReoptimizeResponse(**summary)
+    
+    except Exception as e:
+        logger.error(f"Re-optimization failed: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Re-optimization failed"
+        )
+
+
 @router.post("/predict-difficulty", response_model=DifficultyPredictionResponse)
 async def predict_difficulty(
     request: DifficultyPredictionRequest,
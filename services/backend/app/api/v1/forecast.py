@@ -48,22 +48,13 @@ async def get_volume_forecast(
     forecast_service = ForecastService(db, redis)
     
     try:
-        # Check cache first
-        cached_forecast = await forecast_service.get_cached_forecast(days)
-        if cached_forecast:
-            logger.info(f"Returning cached forecast for {days} days")
-            return cached_forecast
-        
-        # Generate new forecast
-        forecast = await forecast_service.generate_volume_forecast(
+        # Cached (stale-while-revalidate); misses are computed once for all callers
+        forecast = await forecast_service.get_volume_forecast(
             days=days,
             model_loader=model_loader
         )
         
-        # Cache for 24 hours
-        await forecast_service.cache_forecast(forecast, days)
-        
-        logger.info(f"Volume forecast generated for {days} days")
+        logger.debug(f"Volume forecast served for {days} days")
         
         return forecast
     
@@ -3,7 +3,7 @@ Swap Marketplace Endpoints
 Peer-to-peer package swapping
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
@@ -11,9 +11,11 @@ from app.api.deps import get_db, get_current_driver
 from app.schemas.swap import (
     SwapProposalRequest,
     SwapResponse,
-    SwapAcceptRequest
+    SwapAcceptRequest,
+    SwapCandidateResponse
 )
 from app.services.swap_service import SwapService
+from app.workers.swap_candidates import refresh_stale_swap_candidates
 from app.utils.helpers import setup_logger
 
 logger = setup_logger(__name__)
@@ -45,6 +47,67 @@ async def get_available_swaps(
     return [SwapResponse.from_orm(s) for s in swaps]
 
 
+@router.get("/candidates", response_model=List[SwapCandidateResponse])
+async def get_top_swap_candidates(
+    db: AsyncSession = Depends(get_db),
+    current_driver = Depends(get_current_driver)
+):
+    """
+    Get the best swap opportunities across the current driver's packages
+    
+    Lists are precomputed after assignment and after swaps, so this is
+    always a cache read; a list that is missing or stale is refreshed in
+    the background and may be empty or outdated until then.
+    
+    Args:
+        db: Database session
+        current_driver: Current authenticated driver
+    
+    Returns:
+        List[SwapCandidateResponse]: Swap opportunities ranked by score
+    """
+    swap_service = SwapService(db)
+    
+    return await swap_service.get_top_swaps(
+        driver_id=current_driver.id
+    )
+
+
+@router.get("/candidates/{package_id}", response_model=List[SwapCandidateResponse])
+async def get_swap_candidates(
+    package_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_driver = Depends(get_current_driver)
+):
+    """
+    Find compatible swap partners for one of the current driver's packages
+    
+    Args:
+        package_id: Package the driver would give away
+        db: Database session
+        current_driver: Current authenticated driver
+    
+    Returns:
+        List[SwapCandidateResponse]: Swap opportunities ranked by score
+    
+    Raises:
+        HTTPException: If the package is not assigned to the driver
+    """
+    swap_service = SwapService(db)
+    
+    try:
+        return await swap_service.find_compatible_swaps(
+            driver_id=current_driver.id,
+            package_id=package_id
+        )
+    
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
 @router.post("/propose", response_model=SwapResponse, status_code=status.HTTP_201_CREATED)
 async def propose_swap(
     request: SwapProposalRequest,
@@ -89,6 +152,7 @@ async def propose_swap(
 @router.post("/{swap_id}/accept", response_model=SwapResponse)
 async def accept_swap(
     swap_id: int,
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
     current_driver = Depends(get_current_driver)
 ):
@@ -97,6 +161,7 @@ async def accept_swap(
     
     Args:
         swap_id: Swap proposal ID
+        background_tasks: Refreshes the swapped drivers' candidate lists
         db: Database session
         current_driver: Current authenticated driver
     
@@ -115,6 +180,7 @@ async def accept_swap(
         )
         
         logger.info(f"Swap {swap_id} accepted by driver {current_driver.id}")
+        background_tasks.add_task(refresh_stale_swap_candidates)
         
         return SwapResponse.from_orm(swap)
     
@@ -32,6 +32,7 @@ class Settings(BaseSettings):
     DB_POOL_SIZE: int = Field(default=5, env="DB_POOL_SIZE")
     DB_MAX_OVERFLOW: int = Field(default=10, env="DB_MAX_OVERFLOW")
     DB_POOL_TIMEOUT: int = Field(default=30, env="DB_POOL_TIMEOUT")
+    DB_BULK_CHUNK_SIZE: int = Field(default=5000, env="DB_BULK_CHUNK_SIZE")  # rows per bulk INSERT/UPDATE
     
     # ============================================
     # REDIS (Cache & Sessions)
@@ -70,6 +71,18 @@ class Settings(BaseSettings):
     # FIREBASE (Push Notifications)
     # ============================================
     FIREBASE_SERVICE_ACCOUNT_KEY: Optional[str] = Field(default=None, env="FIREBASE_SERVICE_ACCOUNT_KEY")
+    NOTIFICATION_TRANSPORT: str = Field(default="fcm", env="NOTIFICATION_TRANSPORT")  # fcm, local
+    NOTIFICATION_BATCH_SIZE: int = Field(default=500, env="NOTIFICATION_BATCH_SIZE")  # FCM maximum
+    NOTIFICATION_MAX_CONCURRENT_BATCHES: int = Field(default=4, env="NOTIFICATION_MAX_CONCURRENT_BATCHES")
+    NOTIFICATION_MAX_RETRIES: int = Field(default=3, env="NOTIFICATION_MAX_RETRIES")
+    NOTIFICATION_RETRY_BACKOFF_SECONDS: float = Field(default=0.5, env="NOTIFICATION_RETRY_BACKOFF_SECONDS")
+    NOTIFICATION_OUTBOX: str = Field(default="redis", env="NOTIFICATION_OUTBOX")  # redis, local
+    NOTIFICATION_OUTBOX_STREAM: str = Field(default="notifications:outbox", env="NOTIFICATION_OUTBOX_STREAM")
+    NOTIFICATION_OUTBOX_WORKERS: int = Field(default=2, env="NOTIFICATION_OUTBOX_WORKERS")
+    NOTIFICATION_OUTBOX_CLAIM_IDLE_SECONDS: int = Field(default=60, env="NOTIFICATION_OUTBOX_CLAIM_IDLE_SECONDS")
+    NOTIFICATION_RATE_LIMIT_PER_SECOND: float = Field(default=500.0, env="NOTIFICATION_RATE_LIMIT_PER_SECOND")  # 0 = unlimited
+    NOTIFICATION_DEDUP_SECONDS: int = Field(default=900, env="NOTIFICATION_DEDUP_SECONDS")  # Per driver and alert type
+    NOTIFICATION_ENQUEUE_CHUNK_SIZE: int = Field(default=500, env="NOTIFICATION_ENQUEUE_CHUNK_SIZE")  # Outbox writes per Redis round trip
     
     # ============================================
     # GOOGLE MAPS
@@ -88,9 +101,19 @@ class Settings(BaseSettings):
     ML_MODELS_PATH: str = Field(default="../../ml/models", env="ML_MODELS_PATH")
     XGBOOST_MODEL_PATH: str = Field(default="xgboost_model.pkl")
     LSTM_MODEL_PATH: str = Field(default="lstm_model.h5")
+    LSTM_WEIGHTS_PATH: str = Field(default="lstm_model.npz")  # scripts/export_lstm_weights.py
+    LSTM_RUNTIME: str = Field(default="auto", env="LSTM_RUNTIME")  # auto (npz if present), numpy or keras
     HEALTH_MODEL_PATH: str = Field(default="random_forest_health.pkl")
     SHAP_EXPLAINER_PATH: str = Field(default="shap_explainer.pkl")
     SCALER_PATH: str = Field(default="scaler.pkl")
+    XGBOOST_CHUNK_ROWS: int = Field(default=262144, env="XGBOOST_CHUNK_ROWS")  # feature rows per inference block
+    XGBOOST_MEMMAP_THRESHOLD_MB: int = Field(default=1024, env="XGBOOST_MEMMAP_THRESHOLD_MB")
+    XGBOOST_SCORING_WORKERS: Optional[int] = Field(default=None, env="XGBOOST_SCORING_WORKERS")  # None = CPU count, 0 = in a thread
+    XGBOOST_THREADS_PER_WORKER: Optional[int] = Field(default=None, env="XGBOOST_THREADS_PER_WORKER")  # None = cores / workers
+    XGBOOST_MEMMAP_DIR: Optional[str] = Field(default=None, env="XGBOOST_MEMMAP_DIR")  # None = system temp dir
+    DIFFICULTY_CACHE_ENABLED: bool = Field(default=True, env="DIFFICULTY_CACHE_ENABLED")
+    DIFFICULTY_CACHE_TTL_SECONDS: int = Field(default=7 * 24 * 3600, env="DIFFICULTY_CACHE_TTL_SECONDS")  # refreshed on read and write
+    DIFFICULTY_CACHE_CHUNK_SIZE: int = Field(default=50000, env="DIFFICULTY_CACHE_CHUNK_SIZE")  # fields per pipeline round trip
     
     # ============================================
     # RATE LIMITING
@@ -106,6 +129,8 @@ class Settings(BaseSettings):
     ENABLE_BACKGROUND_JOBS: bool = Field(default=True, env="ENABLE_BACKGROUND_JOBS")
     ASSIGNMENT_GENERATION_TIME: str = Field(default="06:00", env="ASSIGNMENT_GENERATION_TIME")
     ASSIGNMENT_GENERATION_SCHEDULE: str = Field(default="0 6 * * *", env="ASSIGNMENT_GENERATION_SCHEDULE")
+    PIPELINE_CHECKPOINT_DIR: str = Field(default="./data/pipeline_runs", env="PIPELINE_CHECKPOINT_DIR")
+    ASSIGNMENT_SHARD_CONCURRENCY: int = Field(default=4, env="ASSIGNMENT_SHARD_CONCURRENCY")  # Hubs solved at once
     FORECAST_UPDATE_TIME: str = Field(default="00:00", env="FORECAST_UPDATE_TIME")
     FORECAST_UPDATE_SCHEDULE: str = Field(default="0 0 * * *", env="FORECAST_UPDATE_SCHEDULE")
     LEARNING_EXPORT_SCHEDULE: str = Field(default="0 23 * * *", env="LEARNING_EXPORT_SCHEDULE")
@@ -122,6 +147,27 @@ class Settings(BaseSettings):
     FAIRNESS_MIN_PACKAGES_PER_DRIVER: int = Field(default=10, env="FAIRNESS_MIN_PACKAGES_PER_DRIVER")
     FAIRNESS_VARIANCE_THRESHOLD: float = Field(default=10.0, env="FAIRNESS_VARIANCE_THRESHOLD")
     FAIRNESS_TIMEOUT_SECONDS: int = Field(default=300, env="FAIRNESS_TIMEOUT_SECONDS")
+    FAIRNESS_DIFFICULTY_CUTOFF: float = Field(default=100.0, env="FAIRNESS_DIFFICULTY_CUTOFF")
+    FAIRNESS_SOLVER_MODE: str = Field(default="auto", env="FAIRNESS_SOLVER_MODE")  # auto/milp/flow/greedy
+    FAIRNESS_FLOW_MIN_PROBLEM_SIZE: int = Field(default=50000, env="FAIRNESS_FLOW_MIN_PROBLEM_SIZE")  # drivers x packages
+    FAIRNESS_FLOW_REPAIR_SECONDS: float = Field(default=5.0, env="FAIRNESS_FLOW_REPAIR_SECONDS")
+    FAIRNESS_ZONE_COUNT: int = Field(default=1, env="FAIRNESS_ZONE_COUNT")  # 1 = solve the whole city at once
+    FAIRNESS_ZONE_WORKERS: Optional[int] = Field(default=None, env="FAIRNESS_ZONE_WORKERS")  # None = CPU count
+    FAIRNESS_MAX_GINI: float = Field(default=0.1, env="FAIRNESS_MAX_GINI")
+    FAIRNESS_GREEDY_IMPROVE_SECONDS: float = Field(default=0.5, env="FAIRNESS_GREEDY_IMPROVE_SECONDS")
+    FAIRNESS_REOPT_NEIGHBORHOOD_DRIVERS: int = Field(default=8, env="FAIRNESS_REOPT_NEIGHBORHOOD_DRIVERS")
+    FAIRNESS_REOPT_TIMEOUT_SECONDS: float = Field(default=1.0, env="FAIRNESS_REOPT_TIMEOUT_SECONDS")
+    FAIRNESS_REOPT_MAX_EXCHANGES: int = Field(default=10, env="FAIRNESS_REOPT_MAX_EXCHANGES")  # each moves 2 packages
+    
+    # ============================================
+    # FORECASTING (Workload & Earnings)
+    # ============================================
+    FORECAST_HORIZON_DAYS: int = Field(default=30, env="FORECAST_HORIZON_DAYS")  # Materialized once per day
+    PAYMENT_PER_PACKAGE: float = Field(default=40.0, env="PAYMENT_PER_PACKAGE")  # ₹ per delivered package
+    VOLUME_ROLLUP_INTERVAL_SECONDS: int = Field(default=300, env="VOLUME_ROLLUP_INTERVAL_SECONDS")  # Daily volume table
+    FORECAST_CACHE_TTL_SECONDS: int = Field(default=90000, env="FORECAST_CACHE_TTL_SECONDS")  # Fresh; outlives the daily refresh
+    FORECAST_CACHE_STALE_SECONDS: int = Field(default=86400, env="FORECAST_CACHE_STALE_SECONDS")  # Served while revalidating
+    FORECAST_CACHE_LOCK_SECONDS: int = Field(default=120, env="FORECAST_CACHE_LOCK_SECONDS")  # One computation across workers
     
     # ============================================
     # HEALTH MONITORING
@@ -135,6 +181,15 @@ class Settings(BaseSettings):
     SWAP_MAX_PER_DAY: int = Field(default=2, env="SWAP_MAX_PER_DAY")
     SWAP_COOLDOWN_MINUTES: int = Field(default=60, env="SWAP_COOLDOWN_MINUTES")
     SWAP_NOTIFICATION_TIMEOUT_MINUTES: int = Field(default=10, env="SWAP_NOTIFICATION_TIMEOUT_MINUTES")
+    SWAP_SEARCH_RADIUS_KM: float = Field(default=10.0, env="SWAP_SEARCH_RADIUS_KM")  # Around the offered package
+    SWAP_SEARCH_MAX_CANDIDATES: int = Field(default=500, env="SWAP_SEARCH_MAX_CANDIDATES")  # Nearest packages scored
+    SWAP_CANDIDATES_PER_DRIVER: int = Field(default=20, env="SWAP_CANDIDATES_PER_DRIVER")  # Precomputed per driver
+    SWAP_CANDIDATES_REFRESH_SECONDS: int = Field(default=30, env="SWAP_CANDIDATES_REFRESH_SECONDS")  # Stale lists
+    SWAP_CANDIDATES_STORE: str = Field(default="redis", env="SWAP_CANDIDATES_STORE")  # redis, local
+    SWAP_CLEARING_INTERVAL_SECONDS: int = Field(default=300, env="SWAP_CLEARING_INTERVAL_SECONDS")
+    SWAP_CLEARING_MAX_CYCLE_LENGTH: int = Field(default=3, env="SWAP_CLEARING_MAX_CYCLE_LENGTH")  # 2 or 3
+    SWAP_CLEARING_TIMEOUT_SECONDS: float = Field(default=10.0, env="SWAP_CLEARING_TIMEOUT_SECONDS")
+    SWAP_CLEARING_TRADE_BONUS: float = Field(default=0.01, env="SWAP_CLEARING_TRADE_BONUS")  # km per executed intent
     
     # ============================================
     # INSURANCE (Z-Score)
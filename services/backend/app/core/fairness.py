@@ -3,15 +3,40 @@ Fairness Algorithm - Innovation 4
 PuLP-based optimization for fair package assignment
 """
 
+import os
+import re
+import heapq
+import time
+import tempfile
+import threading
 import numpy as np
-from pulp import LpProblem, LpMinimize, LpVariable, lpSum, LpStatus, PULP_CBC_CMD
-from typing import List, Dict, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from pulp import (
+    LpStatus,
+    LpStatusOptimal,
+    LpSolutionIntegerFeasible,
+    PULP_CBC_CMD,
+    value,
+)
+from typing import List, Dict, Optional, Sequence, Tuple
 
 from app.config import settings
+from app.core.fairness_model import (
+    DifficultyInput,
+    as_difficulty_array,
+    build_assignment_model,
+    candidate_pairs,
+    gini_coefficient,
+)
+from app.core.fairness_flow import solve_transportation, repair_difficulty_band, improve_by_exchanges
+from app.core.fairness_zones import partition_zones, balance_across_zones
 from app.utils.helpers import setup_logger
 
 logger = setup_logger(__name__)
 
+# Above this many distinct allowed-driver sets the greedy scans instead of keeping a heap per set
+GREEDY_MAX_HEAP_CLASSES = 64
+
 
 class FairnessOptimizer:
     """
@@ -22,16 +47,23 @@ class FairnessOptimizer:
     """
     
     def __init__(self):
+        self.model = None
         self.problem = None
-        self.variables = {}
+        self.variables = []
+        self.solve_info = {}
     
     def optimize_assignments(
         self,
         drivers: List[int],
         packages: List[int],
-        difficulty_matrix: Dict[Tuple[int, int], float],
+        difficulty_matrix: DifficultyInput,
         max_packages_per_driver: int = None,
-        min_packages_per_driver: int = None
+        min_packages_per_driver: int = None,
+        driver_capacities: Optional[Sequence[float]] = None,
+        package_weights: Optional[Sequence[float]] = None,
+        difficulty_cutoff: Optional[float] = None,
+        mode: Optional[str] = None,
+        time_limit: Optional[float] = None
     ) -> Dict[int, List[int]]:
         """
         **INNOVATION 4: Fair Package Assignment using PuLP**
@@ -42,19 +74,28 @@ class FairnessOptimizer:
             drivers: List of driver IDs
             packages: List of package IDs
             difficulty_matrix: 2D array [drivers x packages] with difficulty scores
+                (a {(driver_id, package_id): score} dict is also accepted)
             max_packages_per_driver: Maximum packages per driver
             min_packages_per_driver: Minimum packages per driver
+            driver_capacities: Vehicle capacity per driver (kg), used for pruning
+            package_weights: Weight per package (kg), used for pruning
+            difficulty_cutoff: Skip pairs above this difficulty
+            mode: "milp", "flow", "greedy" or "auto" (default from settings); "auto"
+                uses the min-cost-flow fast path above FAIRNESS_FLOW_MIN_PROBLEM_SIZE,
+                "greedy" is the sub-second heuristic tier (e.g. for previews)
+            time_limit: Wall-clock budget in seconds, including model build
+                (default FAIRNESS_TIMEOUT_SECONDS)
         
         Returns:
             Dict[driver_id, List[package_ids]]: Optimized assignments
         
         Algorithm:
-        1. Create binary decision variables x[i,j] (driver i gets package j)
+        1. Build sparse model: one binary x[i,j] per candidate (driver, package) pair
         2. Objective: Minimize total weighted difficulty
         3. Constraints:
            - Each package assigned to exactly 1 driver
            - Each driver gets min-max packages (fairness)
-           - Difficulty variance constraint (equity)
+           - Per-driver mean difficulty within tolerance of global mean (equity)
         """
         if max_packages_per_driver is None:
             max_packages_per_driver = settings.FAIRNESS_MAX_PACKAGES_PER_DRIVER
@@ -62,165 +103,848 @@ class FairnessOptimizer:
         if min_packages_per_driver is None:
             min_packages_per_driver = settings.FAIRNESS_MIN_PACKAGES_PER_DRIVER
         
+        if time_limit is None:
+            time_limit = settings.FAIRNESS_TIMEOUT_SECONDS
+        
+        started = time.perf_counter()
         num_drivers = len(drivers)
         num_packages = len(packages)
         
         logger.info(f"Starting fairness optimization: {num_drivers} drivers, {num_packages} packages")
         
-        # Create optimization problem
-        self.problem = LpProblem("Fair_Package_Assignment", LpMinimize)
+        difficulty = as_difficulty_array(drivers, packages, difficulty_matrix)
         
-        # Decision variables: x[i,j] = 1 if driver i gets package j
-        self.variables = {}
-        for i, driver_id in enumerate(drivers):
-            for j, package_id in enumerate(packages):
-                var_name = f"x_{driver_id}_{package_id}"
-                self.variables[(i, j)] = LpVariable(var_name, cat='Binary')
-        
-        # Objective: Minimize total difficulty
-        objective = lpSum([
-            difficulty_matrix.get((drivers[i], packages[j]), 0) * self.variables[(i, j)]
-            for i in range(num_drivers)
-            for j in range(num_packages)
-        ])
-        self.problem += objective
-        
-        # Constraint 1: Each package assigned to exactly one driver
-        for j in range(num_packages):
-            self.problem += (
-                lpSum([self.variables[(i, j)] for i in range(num_drivers)]) == 1,
-                f"package_{packages[j]}_assigned_once"
+        if mode is None:
+            mode = settings.FAIRNESS_SOLVER_MODE
+        
+        if mode == "auto":
+            mode = "flow" if num_drivers * num_packages >= settings.FAIRNESS_FLOW_MIN_PROBLEM_SIZE else "milp"
+        
+        if mode == "greedy":
+            # Heuristic tier needs only the candidate mask, not the full model
+            self.model = None
+            allowed = candidate_pairs(difficulty, difficulty_cutoff, driver_capacities, package_weights)
+            return self._greedy_fallback(
+                drivers, packages, difficulty, min_packages_per_driver, max_packages_per_driver, allowed
             )
         
-        # Constraint 2: Each driver gets between min and max packages
-        avg_packages = num_packages / num_drivers
+        # Build sparse model shared by the exact solver modes
+        self.model = build_assignment_model(
+            difficulty,
+            difficulty_cutoff=difficulty_cutoff,
+            driver_capacities=driver_capacities,
+            package_weights=package_weights
+        )
         
-        for i in range(num_drivers):
-            # Maximum constraint
-            self.problem += (
-                lpSum([self.variables[(i, j)] for j in range(num_packages)]) <= max_packages_per_driver,
-                f"driver_{drivers[i]}_max_packages"
+        if mode == "flow":
+            assignments = self._solve_flow(
+                drivers, packages, difficulty, min_packages_per_driver, max_packages_per_driver
             )
-            
-            # Minimum constraint
-            self.problem += (
-                lpSum([self.variables[(i, j)] for j in range(num_packages)]) >= min_packages_per_driver,
-                f"driver_{drivers[i]}_min_packages"
+        elif mode == "milp":
+            assignments = self._solve_milp(
+                drivers, packages, difficulty, min_packages_per_driver, max_packages_per_driver,
+                time_limit=time_limit - (time.perf_counter() - started)
             )
+        else:
+            raise ValueError(f"Unknown fairness solver mode: {mode}")
         
-        # Constraint 3: Fairness - limit difficulty variance
-        # Calculate average difficulty per driver
-        avg_difficulty_per_driver = []
-        for i in range(num_drivers):
-            total_difficulty = lpSum([
-                difficulty_matrix.get((drivers[i], packages[j]), 0) * self.variables[(i, j)]
-                for j in range(num_packages)
-            ])
-            avg_difficulty_per_driver.append(total_difficulty)
-        
-        # Limit variance from mean (within tolerance)
-        # Calculate average difficulty across all assignments
-        all_difficulties = [
-            difficulty_matrix.get((drivers[i], packages[j]), 0)
-            for i in range(num_drivers)
-            for j in range(num_packages)
-        ]
-        global_avg = sum(all_difficulties) / len(all_difficulties) if all_difficulties else 1.0
-        tolerance = settings.FAIRNESS_VARIANCE_THRESHOLD
-        
-        for i in range(num_drivers):
-            # Upper bound
-            self.problem += (
-                avg_difficulty_per_driver[i] <= global_avg + tolerance,
-                f"driver_{drivers[i]}_difficulty_upper"
-            )
-            
-            # Lower bound
-            self.problem += (
-                avg_difficulty_per_driver[i] >= global_avg - tolerance,
-                f"driver_{drivers[i]}_difficulty_lower"
+        if assignments is None:
+            # Fallback to greedy assignment
+            logger.warning("Optimization failed - using greedy fallback algorithm")
+            return self._greedy_fallback(
+                drivers, packages, difficulty, min_packages_per_driver, max_packages_per_driver
             )
         
+        # Log fairness metrics
+        self._log_fairness_metrics(drivers, packages, assignments, difficulty)
+        
+        return assignments
+    
+    def _solve_milp(
+        self,
+        drivers: List[int],
+        packages: List[int],
+        difficulty: np.ndarray,
+        min_packages: int,
+        max_packages: int,
+        time_limit: Optional[float] = None
+    ) -> Dict[int, List[int]]:
+        """
+        Solve the full MILP (including difficulty band) with CBC
+        
+        The greedy assignment is passed to CBC as a MIP start, and the whole
+        call (MIP start, band repair, model build and CBC) is capped at
+        time_limit seconds: CBC only gets what is left. When its limit is hit,
+        CBC's best feasible incumbent is kept and the optimality gap is
+        reported. When nothing is left for CBC, or CBC stops without an
+        incumbent, the repaired MIP start itself is returned.
+        
+        Returns:
+            Assignments (the repaired MIP start if CBC found no incumbent)
+        """
+        started = time.perf_counter()
+        deadline = None if time_limit is None else started + time_limit
+        
+        # MIP start from the greedy heuristic, nudged into the difficulty band
+        allowed = self._allowed_pairs()
+        greedy_owner = self._greedy_owner(difficulty, min_packages, max_packages, allowed)
+        repair_seconds = min(1.0, settings.FAIRNESS_FLOW_REPAIR_SECONDS)
+        if time_limit is not None:
+            repair_seconds = min(repair_seconds, max(0.0, 0.2 * time_limit))
+        repair = repair_difficulty_band(
+            greedy_owner,
+            difficulty,
+            allowed,
+            band_center=self.model.band_center,
+            band_tolerance=self.model.band_tolerance,
+            time_budget_seconds=repair_seconds
+        )
+        
+        if deadline is not None and time.perf_counter() >= deadline:
+            return self._keep_mip_start(drivers, packages, difficulty, greedy_owner, repair, started)
+        
+        self.problem, self.variables = self.model.to_pulp(
+            drivers,
+            packages,
+            min_packages=min_packages,
+            max_packages=max_packages
+        )
+        start = greedy_owner[self.model.pair_packages] == self.model.pair_drivers
+        for var, selected in zip(self.variables, start.tolist()):
+            var.setInitialValue(1 if selected else 0)
+        
+        cbc_seconds = None if deadline is None else deadline - time.perf_counter()
+        if cbc_seconds is not None and cbc_seconds <= 0:
+            return self._keep_mip_start(drivers, packages, difficulty, greedy_owner, repair, started)
+        
         # Solve the problem
-        logger.info("Solving linear programming problem...")
-        solver = PULP_CBC_CMD(msg=0)  # Suppress solver output
-        self.problem.solve(solver)
+        logger.info(f"Solving linear programming problem (time limit {cbc_seconds}s)...")
+        with tempfile.TemporaryDirectory() as log_dir:
+            log_path = os.path.join(log_dir, "cbc.log")
+            solver = PULP_CBC_CMD(
+                msg=0,  # Solver output goes to the log file only
+                timeLimit=cbc_seconds,
+                warmStart=True,
+                logPath=log_path
+            )
+            self.problem.solve(solver)
+            with open(log_path) as log_file:
+                cbc_log = log_file.read()
         
         # Check solution status
-        status = LpStatus[self.problem.status]
+        if self.problem.status == LpStatusOptimal and self.problem.sol_status == LpSolutionIntegerFeasible:
+            status = "Feasible"  # Time limit reached with an incumbent
+        else:
+            status = LpStatus[self.problem.status]
         logger.info(f"Optimization status: {status}")
         
-        if status != "Optimal":
-            logger.warning(f"Optimization did not find optimal solution: {status}")
-            # Fallback to greedy assignment
-            return self._greedy_fallback(drivers, packages, difficulty_matrix)
+        if status not in ("Optimal", "Feasible"):
+            return self._keep_mip_start(
+                drivers, packages, difficulty, greedy_owner, repair, started,
+                reason=f"CBC stopped without an incumbent ({status})",
+                cbc_status=status
+            )
+        
+        objective = value(self.problem.objective)
+        lower_bound = objective if status == "Optimal" else _parse_cbc_lower_bound(cbc_log)
+        gap = None if lower_bound is None else (objective - lower_bound) / max(abs(objective), 1e-9)
+        
+        self.solve_info = {
+            'solver': 'milp',
+            'status': status,
+            'objective': objective,
+            'lower_bound': lower_bound,
+            'gap': gap,
+            'solve_seconds': time.perf_counter() - started
+        }
+        
+        if status == "Feasible":
+            gap_text = "unknown" if gap is None else f"{gap:.2%}"
+            logger.info(f"Time limit reached - keeping incumbent (objective={objective:.2f}, gap={gap_text})")
         
         # Extract assignments from solution
+        values = np.array([var.varValue or 0.0 for var in self.variables])
+        chosen = np.flatnonzero(values > 0.5)
+        
+        return self._assignments_from_owner(
+            drivers,
+            packages,
+            self.model.pair_drivers[chosen],
+            self.model.pair_packages[chosen]
+        )
+    
+    def _keep_mip_start(
+        self,
+        drivers: List[int],
+        packages: List[int],
+        difficulty: np.ndarray,
+        owner: np.ndarray,
+        repair: Dict,
+        started: float,
+        reason: str = "Time budget spent before CBC could run",
+        cbc_status: Optional[str] = None
+    ) -> Dict[int, List[int]]:
+        """CBC did not (or could not) improve on the MIP start: return the MIP start"""
+        package_idx = np.arange(len(packages))
+        objective = float(difficulty[owner, package_idx].sum())
+        
+        self.solve_info = {
+            'solver': 'milp',
+            'status': 'Feasible' if repair['remaining_violations'] == 0 else 'Band violated',
+            'objective': objective,
+            'lower_bound': None,
+            'gap': None,
+            'band_violations': repair['remaining_violations'],
+            'cbc_status': cbc_status,
+            'solve_seconds': time.perf_counter() - started
+        }
+        
+        logger.warning(
+            f"{reason} - keeping the MIP start "
+            f"(objective={objective:.2f}, {repair['remaining_violations']} drivers out of band)"
+        )
+        
+        return self._assignments_from_owner(drivers, packages, owner, package_idx)
+    
+    def _solve_flow(
+        self,
+        drivers: List[int],
+        packages: List[int],
+        difficulty: np.ndarray,
+        min_packages: int,
+        max_packages: int
+    ) -> Optional[Dict[int, List[int]]]:
+        """
+        Fast path: transportation relaxation, then difficulty-band repair
+        
+        The relaxation drops only the band rows, so its objective is a lower
+        bound on the MILP objective; the reported gap is measured against it.
+        
+        Returns:
+            Assignments, or None if the relaxation is infeasible
+        """
+        started = time.perf_counter()
+        
+        logger.info("Solving transportation relaxation (min-cost flow)...")
+        owner = solve_transportation(self.model, min_packages, max_packages)
+        
+        if owner is None:
+            self.solve_info = {
+                'solver': 'flow',
+                'status': 'Infeasible',
+                'objective': None,
+                'gap': None,
+                'solve_seconds': time.perf_counter() - started
+            }
+            return None
+        
+        package_idx = np.arange(len(packages))
+        lower_bound = float(difficulty[owner, package_idx].sum())
+        
+        allowed = self._allowed_pairs()
+        
+        repair = repair_difficulty_band(
+            owner,
+            difficulty,
+            allowed,
+            band_center=self.model.band_center,
+            band_tolerance=self.model.band_tolerance,
+            time_budget_seconds=settings.FAIRNESS_FLOW_REPAIR_SECONDS
+        )
+        
+        objective = float(difficulty[owner, package_idx].sum())
+        gap = (objective - lower_bound) / max(abs(lower_bound), 1e-9)
+        
+        self.solve_info = {
+            'solver': 'flow',
+            'status': 'Feasible' if repair['remaining_violations'] == 0 else 'Band violated',
+            'objective': objective,
+            'lower_bound': lower_bound,
+            'gap': gap,
+            'repair_exchanges': repair['exchanges'],
+            'band_violations': repair['remaining_violations'],
+            'solve_seconds': time.perf_counter() - started
+        }
+        
+        logger.info(
+            f"Flow solution: objective={objective:.2f}, gap to MILP bound={gap:.2%}, "
+            f"{repair['exchanges']} repair exchanges, {repair['remaining_violations']} drivers out of band"
+        )
+        
+        return self._assignments_from_owner(drivers, packages, owner, package_idx)
+    
+    def _assignments_from_owner(
+        self,
+        drivers: List[int],
+        packages: List[int],
+        driver_indices: np.ndarray,
+        package_indices: np.ndarray
+    ) -> Dict[int, List[int]]:
+        """Convert (driver index, package index) pairs to {driver_id: [package_ids]}"""
         assignments = {driver_id: [] for driver_id in drivers}
         
-        for i, driver_id in enumerate(drivers):
-            for j, package_id in enumerate(packages):
-                if self.variables[(i, j)].varValue == 1:
-                    assignments[driver_id].append(package_id)
+        for i, j in zip(driver_indices.tolist(), package_indices.tolist()):
+            assignments[drivers[i]].append(packages[j])
         
-        # Log fairness metrics
-        self._log_fairness_metrics(drivers, assignments, difficulty_matrix)
+        return assignments
+    
+    def optimize_assignments_by_zone(
+        self,
+        drivers: List[int],
+        packages: List[int],
+        difficulty_matrix: DifficultyInput,
+        driver_locations: Sequence[Tuple[Optional[float], Optional[float]]],
+        package_locations: Sequence[Tuple[float, float]],
+        num_zones: int = None,
+        max_workers: int = None,
+        max_packages_per_driver: int = None,
+        min_packages_per_driver: int = None,
+        driver_capacities: Optional[Sequence[float]] = None,
+        package_weights: Optional[Sequence[float]] = None,
+        mode: Optional[str] = None
+    ) -> Dict[int, List[int]]:
+        """
+        Zone-decomposed assignment solved in parallel across CPU cores
+        
+        Drivers and packages are split into geographic zones, each zone's
+        subproblem is solved in its own process, and a cross-zone balancing
+        pass then enforces the global Gini bound (FAIRNESS_MAX_GINI).
+        
+        Args:
+            drivers: List of driver IDs
+            packages: List of package IDs
+            difficulty_matrix: 2D array [drivers x packages] with difficulty scores
+            driver_locations: (latitude, longitude) per driver, None if unknown
+            package_locations: (latitude, longitude) per package
+            num_zones: Number of zones (default FAIRNESS_ZONE_COUNT)
+            max_workers: Process pool size (default FAIRNESS_ZONE_WORKERS or CPU count);
+                the pool is shared by every solve in the process
+            max_packages_per_driver: Maximum packages per driver
+            min_packages_per_driver: Minimum packages per driver
+            driver_capacities: Vehicle capacity per driver (kg)
+            package_weights: Weight per package (kg)
+            mode: Solver mode for each zone ("milp", "flow" or "auto")
+        
+        Returns:
+            Dict[driver_id, List[package_ids]]: Assignments
+        """
+        if num_zones is None:
+            num_zones = settings.FAIRNESS_ZONE_COUNT
+        
+        if max_workers is None:
+            max_workers = settings.FAIRNESS_ZONE_WORKERS
+        
+        if max_packages_per_driver is None:
+            max_packages_per_driver = settings.FAIRNESS_MAX_PACKAGES_PER_DRIVER
+        
+        if min_packages_per_driver is None:
+            min_packages_per_driver = settings.FAIRNESS_MIN_PACKAGES_PER_DRIVER
+        
+        started = time.perf_counter()
+        difficulty = as_difficulty_array(drivers, packages, difficulty_matrix)
+        
+        driver_coords = np.array(
+            [(np.nan, np.nan) if lat is None or lon is None else (lat, lon) for lat, lon in driver_locations],
+            dtype=np.float64
+        )
+        driver_zone, package_zone = partition_zones(
+            driver_coords,
+            np.asarray(package_locations, dtype=np.float64),
+            num_zones,
+            min_packages=min_packages_per_driver,
+            max_packages=max_packages_per_driver
+        )
+        zone_ids = np.unique(package_zone)
+        
+        logger.info(f"Zone decomposition: {len(zone_ids)} zones for {len(drivers)} drivers, {len(packages)} packages")
+        
+        capacities = None if driver_capacities is None else np.asarray(driver_capacities, dtype=np.float64)
+        weights = None if package_weights is None else np.asarray(package_weights, dtype=np.float64)
+        
+        jobs = []
+        for zone in zone_ids.tolist():
+            zone_drivers = np.flatnonzero(driver_zone == zone)
+            zone_packages = np.flatnonzero(package_zone == zone)
+            jobs.append({
+                'zone': zone,
+                'driver_indices': zone_drivers,
+                'package_indices': zone_packages,
+                'drivers': [drivers[i] for i in zone_drivers],
+                'packages': [packages[j] for j in zone_packages],
+                'difficulty': difficulty[np.ix_(zone_drivers, zone_packages)],
+                'driver_capacities': None if capacities is None else capacities[zone_drivers],
+                'package_weights': None if weights is None else weights[zone_packages],
+                'min_packages': min_packages_per_driver,
+                'max_packages': max_packages_per_driver,
+                'mode': mode
+            })
+        
+        if len(jobs) == 1 or max_workers == 1:
+            results = [_solve_zone(job) for job in jobs]
+        else:
+            results = list(get_zone_executor(max_workers).map(_solve_zone, jobs))
+        
+        # Merge zone results into a global package -> driver index vector
+        driver_index = {driver_id: i for i, driver_id in enumerate(drivers)}
+        package_index = {package_id: j for j, package_id in enumerate(packages)}
+        owner = np.empty(len(packages), dtype=np.int64)
+        for result in results:
+            for driver_id, assigned in result['assignments'].items():
+                for package_id in assigned:
+                    owner[package_index[package_id]] = driver_index[driver_id]
+        
+        allowed = None
+        if capacities is not None and weights is not None:
+            allowed = weights[np.newaxis, :] <= capacities[:, np.newaxis]
+            allowed[:, ~allowed.any(axis=0)] = True
+        
+        balancing = balance_across_zones(
+            owner,
+            difficulty,
+            allowed,
+            max_gini=settings.FAIRNESS_MAX_GINI,
+            time_budget_seconds=settings.FAIRNESS_FLOW_REPAIR_SECONDS
+        )
+        
+        package_idx = np.arange(len(packages))
+        self.solve_info = {
+            'solver': 'zones',
+            'status': 'Feasible' if balancing['gini_after'] <= settings.FAIRNESS_MAX_GINI else 'Gini bound violated',
+            'objective': float(difficulty[owner, package_idx].sum()),
+            'gini': balancing['gini_after'],
+            'balancing': balancing,
+            'zones': [
+                {key: result[key] for key in ('zone', 'drivers', 'packages', 'solver', 'status', 'seconds')}
+                for result in results
+            ],
+            'solve_seconds': time.perf_counter() - started
+        }
+        
+        for zone_info in self.solve_info['zones']:
+            logger.info(
+                f"  Zone {zone_info['zone']}: {zone_info['drivers']} drivers, {zone_info['packages']} packages, "
+                f"{zone_info['solver']} {zone_info['status']} in {zone_info['seconds']:.2f}s"
+            )
+        logger.info(
+            f"Cross-zone balancing: {balancing['exchanges']} exchanges, "
+            f"Gini {balancing['gini_before']:.4f} -> {balancing['gini_after']:.4f}"
+        )
+        
+        assignments = self._assignments_from_owner(drivers, packages, owner, package_idx)
+        self._log_fairness_metrics(drivers, packages, assignments, difficulty)
         
         return assignments
     
+    def select_reoptimization_neighborhood(
+        self,
+        current_assignments: Dict[int, List[int]],
+        package_difficulty: Dict[int, float],
+        active_drivers: List[int],
+        new_packages: Sequence[int] = (),
+        removed_drivers: Sequence[int] = (),
+        neighborhood_size: int = None,
+        max_packages_per_driver: int = None
+    ) -> Tuple[List[int], List[int]]:
+        """
+        Pick the drivers and packages to repair after a mid-day change
+        
+        Packages that are new or belonged to a removed driver are "freed".
+        They go to the least loaded active drivers (by current total
+        difficulty), whose own packages may then be exchanged among them.
+        The neighborhood grows until it has room for every freed package.
+        
+        Args:
+            current_assignments: {driver_id: [package_ids]} currently in effect
+            package_difficulty: Predicted difficulty per assigned package
+            active_drivers: Drivers still available
+            new_packages: Packages that arrived since the last solve
+            removed_drivers: Drivers that dropped out
+            neighborhood_size: Minimum number of drivers in the neighborhood
+            max_packages_per_driver: Maximum packages per driver
+        
+        Returns:
+            Tuple of (neighborhood driver IDs, neighborhood package IDs)
+        """
+        if neighborhood_size is None:
+            neighborhood_size = settings.FAIRNESS_REOPT_NEIGHBORHOOD_DRIVERS
+        
+        if max_packages_per_driver is None:
+            max_packages_per_driver = settings.FAIRNESS_MAX_PACKAGES_PER_DRIVER
+        
+        removed = set(removed_drivers)
+        freed = list(new_packages)
+        for driver_id in removed:
+            freed.extend(current_assignments.get(driver_id, []))
+        
+        candidates = [driver_id for driver_id in active_drivers if driver_id not in removed]
+        loads = {
+            driver_id: sum(package_difficulty.get(p, 0.0) for p in current_assignments.get(driver_id, []))
+            for driver_id in candidates
+        }
+        candidates.sort(key=lambda driver_id: loads[driver_id])
+        
+        neighborhood = []
+        room = 0
+        for driver_id in candidates:
+            if len(neighborhood) >= neighborhood_size and room >= len(freed):
+                break
+            neighborhood.append(driver_id)
+            room += max_packages_per_driver - len(current_assignments.get(driver_id, []))
+        
+        if room < len(freed):
+            logger.warning(f"Neighborhood has room for {room} of {len(freed)} freed packages")
+        
+        neighborhood_packages = list(freed)
+        for driver_id in neighborhood:
+            neighborhood_packages.extend(current_assignments.get(driver_id, []))
+        
+        return neighborhood, neighborhood_packages
+    
+    def reoptimize_assignments(
+        self,
+        current_assignments: Dict[int, List[int]],
+        neighborhood_drivers: List[int],
+        neighborhood_packages: List[int],
+        difficulty_matrix: DifficultyInput,
+        removed_drivers: Sequence[int] = (),
+        time_limit: Optional[float] = None,
+        max_exchanges: Optional[int] = None,
+        max_packages_per_driver: int = None,
+        min_packages_per_driver: int = None,
+        driver_capacities: Optional[Sequence[float]] = None,
+        package_weights: Optional[Sequence[float]] = None,
+        difficulty_cutoff: Optional[float] = None
+    ) -> Dict[int, List[int]]:
+        """
+        Incremental repair of a neighborhood (insert freed packages, then exchange)
+        
+        This is not a re-solve. Only the neighborhood (see
+        select_reoptimization_neighborhood) is touched, and inside it
+        packages stay with their current driver: freed packages are inserted
+        where they add the least to an under-filled (then the least loaded)
+        driver, and a time-boxed pass of at most max_exchanges swaps
+        (improve_by_exchanges) evens the neighborhood out. At most
+        len(freed) + 2 * max_exchanges packages change hands; every other
+        driver keeps their current packages unchanged.
+        
+        Args:
+            current_assignments: {driver_id: [package_ids]} currently in effect
+            neighborhood_drivers: Drivers that receive freed packages and may exchange packages
+            neighborhood_packages: Freed packages plus the neighborhood drivers' current ones
+            difficulty_matrix: Difficulty [neighborhood drivers x neighborhood packages]
+            removed_drivers: Drivers that dropped out (their packages are freed)
+            time_limit: Wall-clock budget (default FAIRNESS_REOPT_TIMEOUT_SECONDS)
+            max_exchanges: Exchange cap (default FAIRNESS_REOPT_MAX_EXCHANGES)
+            max_packages_per_driver: Maximum packages per driver
+            min_packages_per_driver: Minimum packages per driver
+            driver_capacities: Vehicle capacity per driver (kg), used for pruning
+            package_weights: Weight per package (kg), used for pruning
+            difficulty_cutoff: Skip pairs above this difficulty
+        
+        Returns:
+            Dict[driver_id, List[package_ids]]: Full assignments after the change
+        """
+        if time_limit is None:
+            time_limit = settings.FAIRNESS_REOPT_TIMEOUT_SECONDS
+        
+        if max_exchanges is None:
+            max_exchanges = settings.FAIRNESS_REOPT_MAX_EXCHANGES
+        
+        if max_packages_per_driver is None:
+            max_packages_per_driver = settings.FAIRNESS_MAX_PACKAGES_PER_DRIVER
+        
+        if min_packages_per_driver is None:
+            min_packages_per_driver = settings.FAIRNESS_MIN_PACKAGES_PER_DRIVER
+        
+        started = time.perf_counter()
+        
+        fixed = set(neighborhood_drivers) | set(removed_drivers)
+        assignments = {
+            driver_id: list(package_ids)
+            for driver_id, package_ids in current_assignments.items()
+            if driver_id not in fixed
+        }
+        
+        previous_owner = {
+            package_id: driver_id
+            for driver_id, package_ids in current_assignments.items()
+            for package_id in package_ids
+        }
+        
+        exchanges = 0
+        if neighborhood_drivers and neighborhood_packages:
+            difficulty = as_difficulty_array(neighborhood_drivers, neighborhood_packages, difficulty_matrix)
+            allowed = candidate_pairs(difficulty, difficulty_cutoff, driver_capacities, package_weights)
+            
+            # Pin every package that already has a driver in the neighborhood
+            driver_index = {driver_id: i for i, driver_id in enumerate(neighborhood_drivers)}
+            owner = np.array(
+                [driver_index.get(previous_owner.get(package_id), -1) for package_id in neighborhood_packages],
+                dtype=np.int64
+            )
+            
+            self._insert_freed(owner, difficulty, allowed, min_packages_per_driver, max_packages_per_driver)
+            
+            if max_exchanges > 0:
+                exchanges = improve_by_exchanges(
+                    owner,
+                    difficulty,
+                    allowed,
+                    max_gini=0.0,
+                    time_budget_seconds=max(0.0, time_limit - (time.perf_counter() - started)),
+                    max_exchanges=max_exchanges
+                )['exchanges']
+            
+            package_idx = np.arange(len(neighborhood_packages))
+            resolved = self._assignments_from_owner(neighborhood_drivers, neighborhood_packages, owner, package_idx)
+            objective = float(difficulty[owner, package_idx].sum())
+        else:
+            resolved = {driver_id: [] for driver_id in neighborhood_drivers}
+            objective = 0.0
+        
+        assignments.update(resolved)
+        
+        moved = sum(
+            1
+            for driver_id, package_ids in resolved.items()
+            for package_id in package_ids
+            if previous_owner.get(package_id) != driver_id
+        )
+        
+        self.solve_info = {
+            'solver': 'reopt',
+            'status': 'Feasible',
+            'objective': objective,
+            'exchanges': exchanges,
+            'neighborhood_drivers': len(neighborhood_drivers),
+            'neighborhood_packages': len(neighborhood_packages),
+            'moved_packages': moved,
+            'solve_seconds': time.perf_counter() - started
+        }
+        
+        logger.info(
+            f"Repaired {len(neighborhood_packages)} packages across {len(neighborhood_drivers)} drivers "
+            f"({moved} moved, {exchanges} exchanges) in {self.solve_info['solve_seconds']:.3f}s"
+        )
+        
+        return assignments
+    
+    def _insert_freed(
+        self,
+        owner: np.ndarray,
+        difficulty: np.ndarray,
+        allowed: np.ndarray,
+        min_packages: int,
+        max_packages: int
+    ):
+        """
+        Give every unowned package (owner -1) a driver, in place
+        
+        Hardest-to-place packages go first. Each goes to the allowed driver
+        with room whose total stays lowest, preferring drivers still under
+        min_packages; the maximum is relaxed only when no allowed driver has room.
+        """
+        num_drivers, num_packages = difficulty.shape
+        pinned = owner >= 0
+        counts = np.bincount(owner[pinned], minlength=num_drivers)
+        totals = np.bincount(
+            owner[pinned], weights=difficulty[owner[pinned], np.flatnonzero(pinned)], minlength=num_drivers
+        )
+        
+        freed = np.flatnonzero(~pinned)
+        freed = freed[np.argsort(allowed[:, freed].sum(axis=0), kind="stable")]
+        
+        for j in freed.tolist():
+            score = np.where(allowed[:, j], totals + difficulty[:, j], np.inf)
+            open_score = np.where(counts < max_packages, score, np.inf)
+            under_score = np.where(counts < min_packages, open_score, np.inf)
+            
+            if np.isfinite(under_score).any():
+                i = int(np.argmin(under_score))
+            elif np.isfinite(open_score).any():
+                i = int(np.argmin(open_score))
+            else:
+                i = int(np.argmin(np.where(allowed[:, j], counts, np.iinfo(counts.dtype).max)))
+                logger.warning(f"No neighborhood driver has room for package index {j} - exceeding the maximum")
+            
+            owner[j] = i
+            counts[i] += 1
+            totals[i] += difficulty[i, j]
+    
+    def _allowed_pairs(self) -> np.ndarray:
+        """Boolean [drivers x packages] mask of the current model's candidate pairs"""
+        allowed = np.zeros((self.model.num_drivers, self.model.num_packages), dtype=bool)
+        allowed[self.model.pair_drivers, self.model.pair_packages] = True
+        return allowed
+    
     def _greedy_fallback(
         self,
         drivers: List[int],
         packages: List[int],
-        difficulty_matrix: Dict[Tuple[int, int], float]
+        difficulty: np.ndarray,
+        min_packages: int,
+        max_packages: int,
+        allowed: Optional[np.ndarray] = None
     ) -> Dict[int, List[int]]:
         """
         Greedy fallback algorithm if optimization fails
-        Assigns packages to drivers with lowest current total difficulty
+        
+        Heap-based greedy construction followed by a time-boxed pairwise
+        exchange pass (FAIRNESS_GREEDY_IMPROVE_SECONDS) that narrows the gap
+        between the most and least loaded drivers.
         """
-        logger.warning("Using greedy fallback algorithm")
+        logger.info("Running greedy heuristic")
+        started = time.perf_counter()
         
-        assignments = {driver_id: [] for driver_id in drivers}
-        driver_difficulties = {driver_id: 0.0 for driver_id in drivers}
-        
-        # Sort packages by average difficulty (hardest first)
-        package_avg_difficulties = []
-        for package_id in packages:
-            avg_diff = np.mean([
-                difficulty_matrix.get((driver_id, package_id), 0)
-                for driver_id in drivers
-            ])
-            package_avg_difficulties.append((package_id, avg_diff))
-        package_avg_difficulties.sort(key=lambda x: x[1], reverse=True)
-        
-        # Assign each package to driver with lowest current difficulty
-        for package_id, _ in package_avg_difficulties:
-            # Find driver with minimum current difficulty
-            min_driver = min(drivers, key=lambda d: driver_difficulties[d])
+        if allowed is None and self.model is not None:
+            allowed = self._allowed_pairs()
+        
+        owner = self._greedy_owner(difficulty, min_packages, max_packages, allowed)
+        
+        improvement = improve_by_exchanges(
+            owner,
+            difficulty,
+            allowed,
+            max_gini=0.0,
+            time_budget_seconds=settings.FAIRNESS_GREEDY_IMPROVE_SECONDS
+        )
+        
+        package_idx = np.arange(len(packages))
+        self.solve_info = {
+            'solver': 'greedy',
+            'status': 'Heuristic',
+            'objective': float(difficulty[owner, package_idx].sum()),
+            'gini': improvement['gini_after'],
+            'exchanges': improvement['exchanges'],
+            'solve_seconds': time.perf_counter() - started
+        }
+        
+        logger.info(
+            f"Greedy: {improvement['exchanges']} exchanges, Gini {improvement['gini_before']:.4f} -> "
+            f"{improvement['gini_after']:.4f} in {self.solve_info['solve_seconds']:.3f}s"
+        )
+        
+        return self._assignments_from_owner(drivers, packages, owner, package_idx)
+    
+    def _greedy_owner(
+        self,
+        difficulty: np.ndarray,
+        min_packages: int,
+        max_packages: int,
+        allowed: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Greedy heuristic: driver index per package
+        
+        Packages with the fewest allowed drivers go first, then the hardest
+        (by average difficulty), each to the allowed driver with the lowest
+        current total that still has room. Once the remaining packages are
+        only just enough to give every driver min_packages, only drivers
+        below the minimum are used.
+        
+        Packages sharing the same set of allowed drivers (a capacity class)
+        share a min-heap on driver total. Entries are invalidated lazily: an
+        assignment pushes the driver's new total into the heaps of its
+        classes, and stale, full or no-longer-eligible entries are dropped
+        when they surface, so nothing is popped and pushed back per package.
+        Construction is O(P log D) plus O(log D) per class of the chosen
+        driver. Masks fragmented into many classes (difficulty-cutoff
+        pruning) fall back to a vectorized scan of the allowed drivers.
+        """
+        num_drivers, num_packages = difficulty.shape
+        owner = np.empty(num_packages, dtype=np.int64)
+        totals = np.zeros(num_drivers)
+        counts = np.zeros(num_drivers, dtype=np.int64)
+        
+        # Most constrained packages first, then by average difficulty (hardest first)
+        if allowed is not None:
+            order = np.lexsort((-difficulty.mean(axis=0), allowed.sum(axis=0)))
+        else:
+            order = np.argsort(-difficulty.mean(axis=0), kind="stable")
+        
+        if allowed is None:
+            class_drivers = [np.arange(num_drivers)]
+            package_class = np.zeros(num_packages, dtype=np.int64)
+        else:
+            packed = np.packbits(allowed, axis=0).T
+            _, first, package_class = np.unique(packed, axis=0, return_index=True, return_inverse=True)
+            package_class = package_class.ravel()
+            class_drivers = [np.flatnonzero(allowed[:, j]) for j in first]
+        
+        use_heaps = len(class_drivers) <= GREEDY_MAX_HEAP_CLASSES
+        if use_heaps:
+            heaps = [[(0.0, i) for i in members.tolist()] for members in class_drivers]
+            driver_classes = [[] for _ in range(num_drivers)]
+            for k, members in enumerate(class_drivers):
+                for i in members.tolist():
+                    driver_classes[i].append(k)
+        else:
+            allowed_by_package = np.ascontiguousarray(allowed.T)
+        
+        deficit = num_drivers * min_packages
+        
+        for remaining, j in zip(range(num_packages, 0, -1), order.tolist()):
+            must_fill = remaining <= deficit
+            chosen = None
+            
+            if use_heaps:
+                heap = heaps[package_class[j]]
+                while heap:
+                    total, i = heap[0]
+                    if total != totals[i] or counts[i] >= max_packages or (must_fill and counts[i] >= min_packages):
+                        heapq.heappop(heap)  # Stale, full, or ineligible for the rest of the run
+                        continue
+                    chosen = i
+                    break
+            else:
+                eligible = allowed_by_package[j] & (counts < max_packages)
+                if must_fill:
+                    eligible &= counts < min_packages
+                if eligible.any():
+                    chosen = int(np.argmin(np.where(eligible, totals, np.inf)))
+            
+            if chosen is None:
+                # No eligible driver: relax the minimum, then vehicle capacity, then the maximum
+                open_drivers = counts < max_packages
+                if allowed is not None and (open_drivers & allowed[:, j]).any():
+                    candidates = np.flatnonzero(open_drivers & allowed[:, j])
+                elif open_drivers.any():
+                    candidates = np.flatnonzero(open_drivers)
+                else:
+                    candidates = np.arange(num_drivers)
+                chosen = int(candidates[np.argmin(totals[candidates])])
+            
+            if counts[chosen] < min_packages:
+                deficit -= 1
             
             # Assign package
-            assignments[min_driver].append(package_id)
-            driver_difficulties[min_driver] += difficulty_matrix.get((min_driver, package_id), 0)
+            owner[j] = chosen
+            totals[chosen] += difficulty[chosen, j]
+            counts[chosen] += 1
+            if use_heaps and counts[chosen] < max_packages:
+                for k in driver_classes[chosen]:
+                    heapq.heappush(heaps[k], (totals[chosen], chosen))
         
-        return assignments
+        return owner
     
     def _log_fairness_metrics(
         self,
         drivers: List[int],
+        packages: List[int],
         assignments: Dict[int, List[int]],
-        difficulty_matrix: Dict[Tuple[int, int], float]
+        difficulty: np.ndarray
     ):
         """
         Log fairness metrics for monitoring
         """
         # Calculate per-driver statistics
         package_counts = [len(assignments[d]) for d in drivers]
+        package_index = {package_id: j for j, package_id in enumerate(packages)}
         
         difficulties = []
-        for driver_id in drivers:
-            total_difficulty = sum(
-                difficulty_matrix.get((driver_id, p), 0)
-            )
+        for i, driver_id in enumerate(drivers):
+            columns = [package_index[p] for p in assignments[driver_id]]
+            total_difficulty = float(difficulty[i, columns].sum())
             difficulties.append(total_difficulty)
         
         # Gini coefficient (inequality measure)
@@ -237,8 +961,73 @@ class FairnessOptimizer:
         Calculate Gini coefficient (inequality measure)
         0 = perfect equality, 1 = perfect inequality
         """
-        sorted_values = sorted(values)
-        n = len(sorted_values)
-        cumsum = np.cumsum(sorted_values)
-        
-        return (2 * np.sum((np.arange(1, n + 1)) * sorted_values)) / (n * cumsum[-1]) - (n + 1) / n
+        return gini_coefficient(values)
+
+
+# Zone pools by size, shared by hub shards solving concurrently so the process
+# count stays at FAIRNESS_ZONE_WORKERS instead of growing with the shard count
+_zone_executors: Dict[Optional[int], ProcessPoolExecutor] = {}
+_zone_executors_lock = threading.Lock()
+
+
+def get_zone_executor(max_workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """
+    Shared process pool for zone subproblems
+    
+    Args:
+        max_workers: Pool size (None = CPU count)
+    
+    Returns:
+        ProcessPoolExecutor: The pool of that size, created on first use
+    """
+    with _zone_executors_lock:
+        executor = _zone_executors.get(max_workers)
+        if executor is None:
+            executor = ProcessPoolExecutor(max_workers=max_workers)
+            _zone_executors[max_workers] = executor
+        return executor
+
+
+def shutdown_zone_executors():
+    """Stop the shared zone pools (application shutdown)"""
+    with _zone_executors_lock:
+        for executor in _zone_executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+        _zone_executors.clear()
+
+
+def _solve_zone(job: Dict) -> Dict:
+    """
+    Solve one zone's subproblem (runs inside a worker process)
+    """
+    started = time.perf_counter()
+    optimizer = FairnessOptimizer()
+    
+    assignments = optimizer.optimize_assignments(
+        drivers=job['drivers'],
+        packages=job['packages'],
+        difficulty_matrix=job['difficulty'],
+        max_packages_per_driver=job['max_packages'],
+        min_packages_per_driver=job['min_packages'],
+        driver_capacities=job['driver_capacities'],
+        package_weights=job['package_weights'],
+        mode=job['mode']
+    )
+    
+    return {
+        'zone': job['zone'],
+        'drivers': len(job['drivers']),
+        'packages': len(job['packages']),
+        'solver': optimizer.solve_info.get('solver', 'greedy'),
+        'status': optimizer.solve_info.get('status', 'Unknown'),
+        'assignments': assignments,
+        'seconds': time.perf_counter() - started
+    }
+
+
+def _parse_cbc_lower_bound(cbc_log: str) -> Optional[float]:
+    """
+    Read the best bound from CBC's final report ("Lower bound: ...")
+    """
+    match = re.search(r"Lower bound:\s+(-?[\d.]+(?:[eE][-+]?\d+)?)", cbc_log)
+    return float(match.group(1)) if match else None
@@ -0,0 +1,518 @@
+"""
+Min-Cost-Flow Fast Path
+Transportation relaxation + difficulty-band repair for fair assignment (Innovation 4)
+"""
+
+import time
+import numpy as np
+from scipy import sparse
+from scipy.sparse.csgraph import dijkstra
+from typing import Callable, Dict, Optional
+
+from app.core.fairness_model import SparseAssignmentModel, gini_coefficient
+from app.utils.helpers import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def _balancing_prices(
+    cost: np.ndarray,
+    min_packages: int,
+    max_packages: int,
+    step: float = 0.8,
+    max_rounds: int = 30
+) -> np.ndarray:
+    """
+    Driver prices under which the cheapest-driver assignment is nearly balanced
+
+    Dual ascent: a driver over max raises its price by a fraction of what it
+    would take to shed its excess with every other price fixed, one under
+    min lowers it to attract its shortfall. Any prices are a valid warm start
+    for the shortest-path phases (all reduced costs are >= 0 at the argmin),
+    so rounds stop once one moves fewer than a tenth of the drivers' worth of
+    packages into bounds.
+
+    Args:
+        cost: Difficulty per candidate pair [packages x drivers], inf elsewhere
+
+    Returns:
+        np.ndarray: Price per driver; package j goes to argmin(cost[j] + price)
+    """
+    num_packages, num_drivers = cost.shape
+    price = np.zeros(num_drivers)
+    rows = np.arange(num_packages)
+    previous = None
+
+    for _ in range(max_rounds):
+        reduced = cost + price
+        best = reduced.argmin(axis=1)
+        best_value = reduced[rows, best]
+        load = np.bincount(best, minlength=num_drivers)
+        excess = np.maximum(load - max_packages, 0)
+        shortfall = np.maximum(min_packages - load, 0)
+
+        imbalance = int(excess.sum() + shortfall.sum())
+        if imbalance == 0 or (previous is not None and previous - imbalance < num_drivers / 10):
+            break
+        previous = imbalance
+
+        change = np.zeros(num_drivers)
+
+        over = np.flatnonzero(excess)
+        if len(over):
+            # Margin of each package over its second-best driver; shed the k smallest
+            reduced[rows, best] = np.inf
+            margin = reduced.min(axis=1) - best_value
+            reduced[rows, best] = best_value
+            order = np.lexsort((margin, best))
+            group_start = np.searchsorted(best[order], over)
+            change[over] = margin[order][group_start + excess[over] - 1]
+
+        under = np.flatnonzero(shortfall)
+        if len(under):
+            # Price cut that makes the k-th nearest package prefer this driver
+            gain = reduced[:, under] - best_value[:, None]
+            gain[gain <= 0.0] = np.inf
+            kth = np.minimum(shortfall[under], num_packages) - 1
+            nearest = np.sort(np.partition(gain, kth.max(), axis=0)[:kth.max() + 1], axis=0)
+            change[under] = -nearest[kth, np.arange(len(under))]
+
+        price += step * np.where(np.isfinite(change), change, 0.0)
+
+    return price
+
+
+class _DriverFlow:
+    """
+    Residual graph of a package assignment, condensed to drivers
+
+    Arc a -> b means "driver a hands one package to driver b"; its weight is
+    the cheapest such hand-over, c[j, b] - c[j, a] over the packages j that a
+    holds. Node potentials keep every reduced weight non-negative, so a
+    shortest-path search is one Dijkstra over a dense D x D graph however
+    many packages there are.
+    """
+
+    # Bound on the held-packages x drivers block gathered per row update
+    ROW_BLOCK_ELEMENTS = 4_000_000
+
+    def __init__(self, cost: np.ndarray, owner: np.ndarray, potential: np.ndarray):
+        """
+        Args:
+            cost: Difficulty per candidate pair [packages x drivers], inf elsewhere
+            owner: Driver index per package, reduced-cost optimal under potential
+            potential: Potential per driver
+        """
+        self.num_packages, self.num_drivers = cost.shape
+        # Extra row: padding for ragged held-package lists, never a hand-over
+        self.cost = np.vstack((cost, np.full((1, self.num_drivers), np.inf)))
+        self.owner = owner
+        self.load = np.bincount(owner, minlength=self.num_drivers)
+        self.potential = potential
+        self.weight = np.full((self.num_drivers, self.num_drivers), np.inf)
+        self.via = np.zeros((self.num_drivers, self.num_drivers), dtype=np.int64)
+        self.held = [set() for _ in range(self.num_drivers)]
+        for package, driver in enumerate(owner.tolist()):
+            self.held[driver].add(package)
+        self._update_rows(np.arange(self.num_drivers))
+
+    def _update_rows(self, drivers: np.ndarray):
+        if len(drivers) == 0:
+            return
+
+        width = max(1, int(self.load[drivers].max()))
+        step = max(1, self.ROW_BLOCK_ELEMENTS // (self.num_drivers * width))
+        for chunk_start in range(0, len(drivers), step):
+            chunk = drivers[chunk_start:chunk_start + step]
+            held = np.full((len(chunk), width), self.num_packages, dtype=np.int64)
+            for row, driver in enumerate(chunk.tolist()):
+                held[row, :len(self.held[driver])] = list(self.held[driver])
+
+            own = self.cost[held, chunk[:, None]]
+            own[held == self.num_packages] = 0.0
+            hand_over = self.cost[held] - own[:, :, None]
+            best = hand_over.argmin(axis=1)
+            weight = np.take_along_axis(hand_over, best[:, None, :], axis=1)[:, 0, :]
+            weight[np.arange(len(chunk)), chunk] = np.inf
+            self.weight[chunk] = weight
+            self.via[chunk] = np.take_along_axis(held, best, axis=1)
+
+    def augment(
+        self,
+        sources: np.ndarray,
+        sinks: np.ndarray,
+        source_ok: Callable[[int], bool],
+        sink_ok: Callable[[int], bool],
+        sink_rank: Optional[np.ndarray] = None,
+        required: bool = True,
+        tolerance: float = 1e-9
+    ) -> int:
+        """
+        One phase: a multi-source Dijkstra, then one package moves along every
+        disjoint shortest-path-tree path from a source to a sink
+
+        Args:
+            sources: Drivers that may give a package
+            sinks: Drivers that may take a package
+            source_ok: Whether a driver can still give (loads change mid-phase)
+            sink_ok: Whether a driver can still take
+            sink_rank: Priority per sink, lower served first (default: all equal)
+            required: Move even when the path costs more (False: only cost-reducing moves)
+            tolerance: Smallest cost reduction worth a move
+
+        Returns:
+            int: Number of paths augmented
+        """
+        n = self.num_drivers
+        if len(sources) == 0 or len(sinks) == 0:
+            return 0
+
+        graph = np.full((n + 1, n + 1), np.inf)
+        reduced = self.weight + self.potential[:, None] - self.potential[None, :]
+        graph[:n, :n] = np.maximum(reduced, 0.0)  # Clamps round-off; inf stays inf
+        # Virtual root n -> source a at -potential[a], so distance + potential = real path cost
+        labels = -self.potential[sources]
+        shift = -labels.min()
+        graph[n, sources] = labels + shift
+
+        # Built by hand: zero-weight (tight) arcs must stay explicit edges
+        edges = np.isfinite(graph)
+        indptr = np.concatenate(([0], np.cumsum(edges.sum(axis=1))))
+        distance, predecessor = dijkstra(
+            sparse.csr_matrix((graph[edges], np.nonzero(edges)[1], indptr), shape=graph.shape),
+            indices=n,
+            return_predecessors=True
+        )
+        distance = distance[:n] - shift
+        predecessor = predecessor[:n]
+
+        reachable = np.isfinite(distance)
+        hit = reachable[sinks]
+        if not hit.any():
+            return 0
+
+        candidates = sinks[hit]
+        path_cost = distance[candidates] + self.potential[candidates]
+        rank = sink_rank[hit] if sink_rank is not None else np.zeros(len(candidates))
+        order = np.lexsort((path_cost, rank))
+
+        # Shortest-path tree arcs become tight (zero reduced weight), so the
+        # real cost of a tree path u ~> v is potential[v] - potential[u]
+        self.potential += np.where(reachable, distance, distance[reachable].max())
+        potential = self.potential.tolist()
+
+        # Any tight path keeps every reduced weight >= 0, so a path may start
+        # at any ancestor that can still give, not only at the tree root.
+        # Later paths through a node after an augmented path's start would
+        # reuse its arcs: those nodes, and walks that run into them, are blocked.
+        parent = predecessor.tolist()
+        blocked = [False] * n
+        augmented = 0
+        moved, changed = set(), set()
+        for b in candidates[order].tolist():
+            if not sink_ok(b):
+                continue
+
+            walk = [b]
+            while parent[walk[-1]] != n and not blocked[walk[-1]]:
+                walk.append(parent[walk[-1]])
+
+            # Root-most usable start: the cheapest of the candidate paths
+            start = None
+            for i in range(len(walk) - 1, 0, -1):
+                a = walk[i]
+                if source_ok(a) and (required or potential[b] - potential[a] < -tolerance):
+                    start = i
+                    break
+            if start is None:
+                for v in walk:
+                    blocked[v] = True
+                continue
+
+            path = walk[start::-1]
+            arcs = [(u, v, int(self.via[u, v])) for u, v in zip(path, path[1:])]
+            if any(j in moved for _, _, j in arcs):
+                continue
+
+            for u, v, j in arcs:
+                self.owner[j] = v
+                self.held[u].discard(j)
+                self.held[v].add(j)
+                moved.add(j)
+                changed.update((u, v))
+            for v in path[1:]:
+                blocked[v] = True
+            self.load[path[0]] -= 1
+            self.load[b] += 1
+            augmented += 1
+
+        self._update_rows(np.fromiter(changed, dtype=np.int64, count=len(changed)))
+        return augmented
+
+
+def solve_transportation(
+    model: SparseAssignmentModel,
+    min_packages: int,
+    max_packages: int
+) -> Optional[np.ndarray]:
+    """
+    Solve the fairness model without the difficulty-band rows
+
+    Each package exactly once and each driver within [min, max] packages is a
+    transportation problem: a min-cost flow with one source -> driver arc per
+    driver (lower bound min, capacity max) and unit driver -> package arcs.
+    It is solved with successive shortest paths on the driver graph. Every
+    package starts at its cheapest candidate driver under balancing prices,
+    which leaves all reduced costs non-negative; packages then move along
+    shortest driver-to-driver chains in three phases, each repeated until it
+    has nothing left to do:
+
+    1. drivers over max give packages, preferring drivers under min
+    2. drivers over min give to drivers under min
+    3. exchanges that lower the total difficulty (the optimality check)
+
+    When there are too few packages to give every driver min_packages, the
+    minimum is filled as far as the candidate pairs allow.
+
+    Returns:
+        np.ndarray: Driver index per package, or None if no assignment fits
+    """
+    num_drivers, num_packages = model.num_drivers, model.num_packages
+
+    if num_packages > num_drivers * max_packages:
+        logger.warning(f"{num_packages} packages exceed total capacity of {num_drivers * max_packages}")
+        return None
+
+    if num_packages < num_drivers * min_packages:
+        logger.warning(f"{num_packages} packages cannot give every driver {min_packages} - minimum relaxed")
+
+    cost = np.full((num_packages, num_drivers), np.inf)
+    cost[model.pair_packages, model.pair_drivers] = model.costs
+
+    # Potentials are minus the prices, so every reduced cost starts >= 0
+    price = _balancing_prices(cost, min_packages, max_packages)
+    owner = (cost + price).argmin(axis=1)
+
+    flow = _DriverFlow(cost, owner, -price)
+    load = flow.load
+    spread = float(np.ptp(model.costs)) if model.num_pairs else 0.0
+    tolerance = 1e-9 * max(1.0, spread)
+
+    while True:
+        over = np.flatnonzero(load > max_packages)
+        if len(over):
+            sinks = np.flatnonzero(load < max_packages)
+            moved = flow.augment(
+                over, sinks,
+                source_ok=lambda a: load[a] > max_packages,
+                sink_ok=lambda b: load[b] < max_packages,
+                sink_rank=(load[sinks] >= min_packages).astype(np.int64)
+            )
+            if not moved:
+                logger.warning("Transportation problem infeasible: overloaded drivers have no candidate to hand over to")
+                return None
+            continue
+
+        if flow.augment(
+            np.flatnonzero(load > min_packages), np.flatnonzero(load < min_packages),
+            source_ok=lambda a: load[a] > min_packages,
+            sink_ok=lambda b: load[b] < min_packages
+        ):
+            continue
+
+        # Exchanges that leave the number of unfilled minimum slots unchanged
+        improved = flow.augment(
+            np.flatnonzero(load > min_packages),
+            np.flatnonzero((load >= min_packages) & (load < max_packages)),
+            source_ok=lambda a: load[a] > min_packages,
+            sink_ok=lambda b: min_packages <= load[b] < max_packages,
+            required=False, tolerance=tolerance
+        )
+        improved += flow.augment(
+            np.flatnonzero((load > 0) & (load <= min_packages)),
+            np.flatnonzero(load < min_packages),
+            source_ok=lambda a: 0 < load[a] <= min_packages,
+            sink_ok=lambda b: load[b] < min_packages,
+            required=False, tolerance=tolerance
+        )
+        if not improved:
+            return flow.owner
+
+
+def repair_difficulty_band(
+    owner: np.ndarray,
+    difficulty: np.ndarray,
+    allowed: np.ndarray,
+    band_center: float,
+    band_tolerance: float,
+    time_budget_seconds: float = 5.0,
+    max_iterations: int = 10000
+) -> Dict:
+    """
+    Local search that restores the per-driver mean-difficulty band
+
+    Repeatedly takes the most out-of-band driver and applies the pairwise
+    package exchange with another driver that most reduces total band
+    violation (ties broken by the smaller objective increase). Exchanges keep
+    every driver's package count, so the min/max constraints stay satisfied.
+
+    Args:
+        owner: Driver index per package (modified in place)
+        difficulty: Difficulty matrix [drivers x packages]
+        allowed: Boolean mask of candidate pairs [drivers x packages]
+        band_center: Global mean difficulty
+        band_tolerance: Allowed deviation of each driver's mean
+        time_budget_seconds: Wall-clock limit for the search
+        max_iterations: Maximum number of exchanges
+
+    Returns:
+        Dict: Repair statistics (exchanges, remaining violations)
+    """
+    num_drivers, num_packages = difficulty.shape
+    cost = np.where(allowed, difficulty, np.inf)
+    upper = band_center + band_tolerance
+    lower = band_center - band_tolerance
+
+    packages_idx = np.arange(num_packages)
+    totals = np.bincount(owner, weights=difficulty[owner, packages_idx], minlength=num_drivers)
+    counts = np.bincount(owner, minlength=num_drivers).astype(np.float64)
+
+    def violation(total, count):
+        return np.maximum(0.0, total - upper * count) + np.maximum(0.0, lower * count - total)
+
+    deadline = time.perf_counter() + time_budget_seconds
+    exchanges = 0
+
+    while exchanges < max_iterations and time.perf_counter() < deadline:
+        driver_violation = violation(totals, counts)
+        if not (driver_violation > 1e-9).any():
+            break
+
+        improved = False
+        for a in np.argsort(-driver_violation):
+            if driver_violation[a] <= 1e-9:
+                break
+
+            mine = np.flatnonzero(owner == a)
+            others = np.flatnonzero(owner != a)
+            if len(mine) == 0 or len(others) == 0:
+                continue
+
+            b = owner[others]
+            # Driver a gives package j (rows) and takes package k (cols) from b
+            new_total_a = totals[a] - difficulty[a, mine][:, None] + cost[a, others][None, :]
+            new_total_b = totals[b][None, :] - difficulty[b, others][None, :] + cost[b[None, :], mine[:, None]]
+
+            delta_violation = (
+                violation(new_total_a, counts[a]) + violation(new_total_b, counts[b][None, :])
+                - driver_violation[a] - driver_violation[b][None, :]
+            )
+            delta_cost = (new_total_a - totals[a]) + (new_total_b - totals[b][None, :])
+
+            delta_violation = np.where(np.isfinite(delta_cost), delta_violation, np.inf)
+            if not (delta_violation < -1e-9).any():
+                continue
+
+            score = np.where(delta_violation < -1e-9, delta_violation + 1e-6 * delta_cost, np.inf)
+            r, c = np.unravel_index(np.argmin(score), score.shape)
+            j, k, partner = mine[r], others[c], b[c]
+
+            totals[a] = new_total_a[r, c]
+            totals[partner] = new_total_b[r, c]
+            owner[j], owner[k] = partner, a
+            exchanges += 1
+            improved = True
+            break
+
+        if not improved:
+            break
+
+    remaining = int((violation(totals, counts) > 1e-9).sum())
+
+    return {
+        'exchanges': exchanges,
+        'remaining_violations': remaining
+    }
+
+
+def improve_by_exchanges(
+    owner: np.ndarray,
+    difficulty: np.ndarray,
+    allowed: Optional[np.ndarray],
+    max_gini: float = 0.0,
+    time_budget_seconds: float = 5.0,
+    partners: int = 5,
+    max_exchanges: Optional[int] = None
+) -> Dict:
+    """
+    Pairwise package exchanges that even out per-driver total difficulty
+
+    The most loaded driver exchanges one package with one of the least
+    loaded drivers, picking the exchange that leaves the two totals
+    closest. Package counts are unchanged. Stops when the Gini bound holds,
+    no exchange helps, or the time or exchange budget runs out.
+
+    Args:
+        owner: Driver index per package (modified in place)
+        difficulty: Difficulty matrix [drivers x packages]
+        allowed: Boolean mask of feasible pairs, or None if all are allowed
+        max_gini: Gini bound on per-driver total difficulty (0 = improve while possible)
+        time_budget_seconds: Wall-clock limit
+        partners: Number of least loaded drivers tried per step
+        max_exchanges: Stop after this many exchanges (None = no limit)
+
+    Returns:
+        Dict: Statistics (exchanges, gini before/after)
+    """
+    num_drivers, num_packages = difficulty.shape
+    cost = difficulty if allowed is None else np.where(allowed, difficulty, np.inf)
+
+    totals = np.bincount(owner, weights=difficulty[owner, np.arange(num_packages)], minlength=num_drivers)
+    gini_before = gini_coefficient(totals)
+
+    deadline = time.perf_counter() + time_budget_seconds
+    exchanges = 0
+
+    while gini_coefficient(totals) > max_gini and time.perf_counter() < deadline:
+        if max_exchanges is not None and exchanges >= max_exchanges:
+            break
+
+        order = np.argsort(totals)
+        a = order[-1]
+        mine = np.flatnonzero(owner == a)
+
+        applied = False
+        for b in order[:partners]:
+            theirs = np.flatnonzero(owner == b)
+            if b == a or len(mine) == 0 or len(theirs) == 0:
+                continue
+
+            # Driver a gives package j (rows) and takes package k (cols) from b
+            new_a = totals[a] - difficulty[a, mine][:, np.newaxis] + cost[a, theirs][np.newaxis, :]
+            new_b = totals[b] - difficulty[b, theirs][np.newaxis, :] + cost[b, mine][:, np.newaxis]
+
+            with np.errstate(invalid="ignore"):
+                spread = np.abs(new_a - new_b)
+            spread[~(np.isfinite(new_a) & np.isfinite(new_b))] = np.inf
+            spread[np.maximum(new_a, new_b) >= totals[a] - 1e-9] = np.inf
+            spread[spread >= totals[a] - totals[b] - 1e-9] = np.inf
+
+            if not np.isfinite(spread).any():
+                continue
+
+            r, c = np.unravel_index(np.argmin(spread), spread.shape)
+            j, k = mine[r], theirs[c]
+            totals[a], totals[b] = new_a[r, c], new_b[r, c]
+            owner[j], owner[k] = b, a
+            exchanges += 1
+            applied = True
+            break
+
+        if not applied:
+            break
+
+    return {
+        'exchanges': exchanges,
+        'gini_before': gini_before,
+        'gini_after': gini_coefficient(totals)
+    }
@@ -0,0 +1,290 @@
+"""
+Sparse Assignment Model
+Matrix-form builder for the fairness MILP (Innovation 4)
+"""
+
+import numpy as np
+from scipy import sparse
+from pulp import (
+    LpProblem,
+    LpMinimize,
+    LpVariable,
+    LpAffineExpression,
+    LpConstraint,
+    LpConstraintEQ,
+    LpConstraintLE,
+    LpConstraintGE,
+)
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from app.config import settings
+from app.utils.helpers import setup_logger
+
+logger = setup_logger(__name__)
+
+
+DifficultyInput = Union[np.ndarray, Dict[Tuple[int, int], float]]
+
+
+def as_difficulty_array(
+    drivers: Sequence[int],
+    packages: Sequence[int],
+    difficulty_matrix: DifficultyInput
+) -> np.ndarray:
+    """
+    Normalize a difficulty matrix to a dense [drivers x packages] float array
+
+    Accepts either the ndarray returned by XGBoostService.predict_difficulty_batch
+    or the legacy {(driver_id, package_id): difficulty} mapping.
+    """
+    if isinstance(difficulty_matrix, dict):
+        driver_index = {driver_id: i for i, driver_id in enumerate(drivers)}
+        package_index = {package_id: j for j, package_id in enumerate(packages)}
+        difficulty = np.zeros((len(drivers), len(packages)), dtype=np.float64)
+        for (driver_id, package_id), value in difficulty_matrix.items():
+            i = driver_index.get(driver_id)
+            j = package_index.get(package_id)
+            if i is not None and j is not None:
+                difficulty[i, j] = value
+        return difficulty
+
+    difficulty = np.asarray(difficulty_matrix, dtype=np.float64)
+    if difficulty.shape != (len(drivers), len(packages)):
+        raise ValueError(
+            f"Difficulty matrix shape {difficulty.shape} does not match "
+            f"{len(drivers)} drivers x {len(packages)} packages"
+        )
+    return difficulty
+
+
+def gini_coefficient(values: Sequence[float]) -> float:
+    """
+    Calculate Gini coefficient (inequality measure)
+    0 = perfect equality, 1 = perfect inequality
+    """
+    sorted_values = np.sort(np.asarray(values, dtype=np.float64))
+    n = len(sorted_values)
+    total = sorted_values.sum()
+    if n == 0 or total <= 0:
+        return 0.0
+
+    return float((2 * np.sum(np.arange(1, n + 1) * sorted_values)) / (n * total) - (n + 1) / n)
+
+
+class SparseAssignmentModel:
+    """
+    Fairness MILP in matrix form
+
+    Only candidate (driver, package) pairs become variables. Column k of every
+    constraint matrix is the binary x[pair_drivers[k], pair_packages[k]].
+
+    Rows of the stacked constraint matrix:
+    - num_packages rows: each package assigned exactly once
+    - num_drivers rows: package count per driver within [min, max]
+    - num_drivers rows: mean difficulty per driver <= global mean + tolerance
+    - num_drivers rows: mean difficulty per driver >= global mean - tolerance
+    """
+
+    def __init__(
+        self,
+        pair_drivers: np.ndarray,
+        pair_packages: np.ndarray,
+        costs: np.ndarray,
+        num_drivers: int,
+        num_packages: int,
+        band_center: float,
+        band_tolerance: float
+    ):
+        self.pair_drivers = pair_drivers
+        self.pair_packages = pair_packages
+        self.costs = costs
+        self.num_drivers = num_drivers
+        self.num_packages = num_packages
+        self.band_center = band_center
+        self.band_tolerance = band_tolerance
+
+        num_pairs = len(costs)
+        columns = np.arange(num_pairs)
+        ones = np.ones(num_pairs)
+
+        # Pairs come out of np.nonzero in driver-major order, so the
+        # per-driver matrices are already CSR-sorted
+        self.package_rows = sparse.csr_matrix(
+            (ones, (pair_packages, columns)),
+            shape=(num_packages, num_pairs)
+        )
+        self.driver_rows = sparse.csr_matrix(
+            (ones, (pair_drivers, columns)),
+            shape=(num_drivers, num_pairs)
+        )
+        # sum_j (d_ij - mean - tol) x_ij <= 0  <=>  avg difficulty <= mean + tol
+        self.band_upper_rows = sparse.csr_matrix(
+            (costs - band_center - band_tolerance, (pair_drivers, columns)),
+            shape=(num_drivers, num_pairs)
+        )
+        # sum_j (d_ij - mean + tol) x_ij >= 0  <=>  avg difficulty >= mean - tol
+        self.band_lower_rows = sparse.csr_matrix(
+            (costs - band_center + band_tolerance, (pair_drivers, columns)),
+            shape=(num_drivers, num_pairs)
+        )
+
+    @property
+    def num_pairs(self) -> int:
+        return len(self.costs)
+
+    def constraint_matrix(
+        self,
+        min_packages: int,
+        max_packages: int
+    ) -> Tuple[sparse.csr_matrix, np.ndarray, np.ndarray]:
+        """
+        Stacked constraint matrix with row bounds (lower <= A x <= upper)
+
+        Returns:
+            Tuple of (A in CSR form, lower bounds, upper bounds)
+        """
+        matrix = sparse.vstack(
+            [self.package_rows, self.driver_rows, self.band_upper_rows, self.band_lower_rows],
+            format="csr"
+        )
+        d, p = self.num_drivers, self.num_packages
+        lower = np.concatenate([np.ones(p), np.full(d, min_packages), np.full(d, -np.inf), np.zeros(d)])
+        upper = np.concatenate([np.ones(p), np.full(d, max_packages), np.zeros(d), np.full(d, np.inf)])
+        return matrix, lower, upper
+
+    def to_pulp(
+        self,
+        drivers: Sequence[int],
+        packages: Sequence[int],
+        min_packages: int,
+        max_packages: int,
+        name: str = "Fair_Package_Assignment"
+    ) -> Tuple[LpProblem, List[LpVariable]]:
+        """
+        Emit the model as a PuLP problem
+
+        Each constraint is built straight from a CSR row slice, so no
+        per-pair dictionary lookups or lpSum rebuilds are needed.
+
+        Returns:
+            Tuple of (problem, variables indexed by pair column)
+        """
+        problem = LpProblem(name, LpMinimize)
+
+        variables = [
+            LpVariable(f"x_{drivers[i]}_{packages[j]}", cat='Binary')
+            for i, j in zip(self.pair_drivers.tolist(), self.pair_packages.tolist())
+        ]
+
+        problem += LpAffineExpression(zip(variables, self.costs.tolist()))
+
+        def add_rows(matrix: sparse.csr_matrix, sense: int, rhs: float, labels: Sequence, name_format: str):
+            indptr, indices, data = matrix.indptr, matrix.indices, matrix.data
+            for row, label in enumerate(labels):
+                start, end = indptr[row], indptr[row + 1]
+                terms = zip([variables[k] for k in indices[start:end].tolist()], data[start:end].tolist())
+                problem.addConstraint(
+                    LpConstraint(terms, sense=sense, rhs=rhs),
+                    name=name_format.format(label)
+                )
+
+        add_rows(self.package_rows, LpConstraintEQ, 1, packages, "package_{}_assigned_once")
+        add_rows(self.driver_rows, LpConstraintLE, max_packages, drivers, "driver_{}_max_packages")
+        add_rows(self.driver_rows, LpConstraintGE, min_packages, drivers, "driver_{}_min_packages")
+        add_rows(self.band_upper_rows, LpConstraintLE, 0, drivers, "driver_{}_difficulty_upper")
+        add_rows(self.band_lower_rows, LpConstraintGE, 0, drivers, "driver_{}_difficulty_lower")
+
+        return problem, variables
+
+
+def candidate_pairs(
+    difficulty: np.ndarray,
+    difficulty_cutoff: Optional[float] = None,
+    driver_capacities: Optional[np.ndarray] = None,
+    package_weights: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Boolean [drivers x packages] mask of pairs worth a decision variable
+
+    Pairs are pruned when the difficulty exceeds the cutoff or the package
+    weight exceeds the driver's vehicle capacity. A package left with no
+    candidate driver keeps all of its capacity-feasible pairs so the model
+    never becomes trivially infeasible through pruning alone.
+    """
+    if difficulty_cutoff is None:
+        difficulty_cutoff = settings.FAIRNESS_DIFFICULTY_CUTOFF
+
+    num_drivers = difficulty.shape[0]
+
+    capacity_ok = None
+    if driver_capacities is not None and package_weights is not None:
+        capacities = np.asarray(driver_capacities, dtype=np.float64)
+        weights = np.asarray(package_weights, dtype=np.float64)
+        capacity_ok = weights[np.newaxis, :] <= capacities[:, np.newaxis]
+
+    candidates = difficulty <= difficulty_cutoff
+    if capacity_ok is not None:
+        candidates &= capacity_ok
+
+    orphaned = ~candidates.any(axis=0)
+    if orphaned.any():
+        if capacity_ok is not None:
+            restored = capacity_ok[:, orphaned].copy()
+        else:
+            restored = np.ones((num_drivers, int(orphaned.sum())), dtype=bool)
+        restored[:, ~restored.any(axis=0)] = True
+        candidates[:, orphaned] = restored
+        logger.warning(f"{int(orphaned.sum())} packages had no candidate driver after pruning - restored")
+
+    return candidates
+
+
+def build_assignment_model(
+    difficulty_matrix: np.ndarray,
+    difficulty_cutoff: Optional[float] = None,
+    driver_capacities: Optional[np.ndarray] = None,
+    package_weights: Optional[np.ndarray] = None,
+    tolerance: Optional[float] = None
+) -> SparseAssignmentModel:
+    """
+    Build the sparse fairness model from a [drivers x packages] difficulty matrix
+
+    Only pairs kept by candidate_pairs become variables.
+
+    Args:
+        difficulty_matrix: Difficulty scores [drivers x packages]
+        difficulty_cutoff: Drop pairs above this difficulty (default from settings)
+        driver_capacities: Vehicle capacity per driver (kg), optional
+        package_weights: Weight per package (kg), optional
+        tolerance: Allowed deviation of per-driver mean difficulty (default from settings)
+
+    Returns:
+        SparseAssignmentModel: Model with CSR constraint matrices
+    """
+    if tolerance is None:
+        tolerance = settings.FAIRNESS_VARIANCE_THRESHOLD
+
+    difficulty = np.asarray(difficulty_matrix, dtype=np.float64)
+    num_drivers, num_packages = difficulty.shape
+
+    candidates = candidate_pairs(difficulty, difficulty_cutoff, driver_capacities, package_weights)
+
+    pair_drivers, pair_packages = np.nonzero(candidates)
+    costs = difficulty[pair_drivers, pair_packages]
+
+    band_center = float(difficulty.mean()) if difficulty.size else 0.0
+
+    logger.info(
+        f"Sparse model: {len(costs)}/{difficulty.size} candidate pairs "
+        f"({num_drivers} drivers x {num_packages} packages)"
+    )
+
+    return SparseAssignmentModel(
+        pair_drivers=pair_drivers,
+        pair_packages=pair_packages,
+        costs=costs,
+        num_drivers=num_drivers,
+        num_packages=num_packages,
+        band_center=band_center,
+        band_tolerance=float(tolerance)
+    )
@@ -0,0 +1,169 @@
+"""
+Zone Decomposition
+Geographic partitioning and cross-zone balancing for parallel fair assignment (Innovation 4)
+"""
+
+import numpy as np
+from typing import Dict, Optional, Tuple
+
+from app.core.fairness_flow import improve_by_exchanges
+from app.utils.helpers import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def _planar(coords: np.ndarray, reference_latitude: float) -> np.ndarray:
+    """Equirectangular projection so Euclidean distance approximates ground distance"""
+    projected = np.array(coords, dtype=np.float64, copy=True)
+    projected[:, 1] *= np.cos(np.radians(reference_latitude))
+    return projected
+
+
+def _distances(points: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Pairwise Euclidean distances [points x centroids]"""
+    return np.sqrt(((points[:, np.newaxis, :] - centroids[np.newaxis, :, :]) ** 2).sum(axis=2))
+
+
+def partition_zones(
+    driver_coords: np.ndarray,
+    package_coords: np.ndarray,
+    num_zones: int,
+    min_packages: int,
+    max_packages: int,
+    iterations: int = 25,
+    seed: int = 0
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Split drivers and packages into geographic zones
+
+    1. k-means on package delivery coordinates gives zone centroids
+    2. Drivers are allotted to zones in proportion to package counts,
+       nearest centroid first (drivers without a location fill remaining slots)
+    3. Boundary packages are moved between neighbouring zones until every
+       zone's package count fits its drivers' [min, max] capacity
+
+    Args:
+        driver_coords: (latitude, longitude) per driver, NaN if unknown
+        package_coords: (latitude, longitude) per package
+        num_zones: Requested number of zones
+        min_packages: Minimum packages per driver
+        max_packages: Maximum packages per driver
+
+    Returns:
+        Tuple of (zone per driver, zone per package)
+    """
+    driver_coords = np.asarray(driver_coords, dtype=np.float64).reshape(-1, 2)
+    package_coords = np.asarray(package_coords, dtype=np.float64).reshape(-1, 2)
+    num_drivers, num_packages = len(driver_coords), len(package_coords)
+
+    num_zones = max(1, min(num_zones, num_drivers, num_packages))
+    if num_zones == 1:
+        return np.zeros(num_drivers, dtype=np.int64), np.zeros(num_packages, dtype=np.int64)
+
+    reference_latitude = float(package_coords[:, 0].mean())
+    packages_xy = _planar(package_coords, reference_latitude)
+    drivers_xy = _planar(driver_coords, reference_latitude)
+
+    # 1. k-means over package locations
+    rng = np.random.default_rng(seed)
+    centroids = packages_xy[rng.choice(num_packages, num_zones, replace=False)]
+    for _ in range(iterations):
+        labels = np.argmin(_distances(packages_xy, centroids), axis=1)
+        updated = np.array([
+            packages_xy[labels == z].mean(axis=0) if (labels == z).any() else centroids[z]
+            for z in range(num_zones)
+        ])
+        if np.allclose(updated, centroids):
+            break
+        centroids = updated
+
+    package_distance = _distances(packages_xy, centroids)
+    package_zone = np.argmin(package_distance, axis=1)
+
+    # 2. Driver quotas by largest remainder, at least one driver per zone
+    counts = np.bincount(package_zone, minlength=num_zones)
+    share = counts / num_packages * num_drivers
+    quotas = np.maximum(np.floor(share).astype(np.int64), 1)
+    while quotas.sum() > num_drivers:
+        quotas[np.argmax(np.where(quotas > 1, quotas - share, -np.inf))] -= 1
+    while quotas.sum() < num_drivers:
+        quotas[np.argmax(share - quotas)] += 1
+
+    driver_distance = _distances(drivers_xy, centroids)
+    driver_distance[np.isnan(driver_distance)] = np.inf
+
+    driver_zone = np.full(num_drivers, -1, dtype=np.int64)
+    remaining = quotas.copy()
+    for flat in np.argsort(driver_distance, axis=None, kind="stable"):
+        i, z = divmod(int(flat), num_zones)
+        if driver_zone[i] == -1 and remaining[z] > 0:
+            driver_zone[i] = z
+            remaining[z] -= 1
+
+    # 3. Move boundary packages until every zone is within capacity
+    upper = quotas * max_packages
+    lower = quotas * min_packages
+    for _ in range(num_packages):
+        counts = np.bincount(package_zone, minlength=num_zones)
+        over = counts - upper
+        under = lower - counts
+        if over.max() <= 0 and under.max() <= 0:
+            break
+
+        extra_distance = package_distance - package_distance[np.arange(num_packages), package_zone][:, np.newaxis]
+        if over.max() > 0:
+            source = int(np.argmax(over))
+            candidates = extra_distance[package_zone == source]
+            candidates[:, counts >= upper] = np.inf
+            members = np.flatnonzero(package_zone == source)
+        else:
+            target = int(np.argmax(under))
+            donors = counts > lower
+            members = np.flatnonzero(donors[package_zone])
+            candidates = np.full((len(members), num_zones), np.inf)
+            candidates[:, target] = extra_distance[members, target]
+
+        if len(members) == 0 or not np.isfinite(candidates).any():
+            logger.warning("Zone loads cannot be balanced within driver capacity")
+            break
+
+        row, zone = np.unravel_index(np.argmin(candidates), candidates.shape)
+        package_zone[members[row]] = zone
+
+    return driver_zone, package_zone
+
+
+def balance_across_zones(
+    owner: np.ndarray,
+    difficulty: np.ndarray,
+    allowed: Optional[np.ndarray],
+    max_gini: float,
+    time_budget_seconds: float = 5.0,
+    partners: int = 5
+) -> Dict:
+    """
+    Pairwise exchanges between zones until the global Gini bound holds
+
+    Zones are solved independently, so their drivers can end up at different
+    workload levels; improve_by_exchanges evens them out across zone
+    boundaries (any zone's least loaded drivers are candidate partners).
+
+    Args:
+        owner: Driver index per package (modified in place)
+        difficulty: Difficulty matrix [drivers x packages]
+        allowed: Boolean mask of feasible pairs, or None if all are allowed
+        max_gini: Global Gini bound on per-driver total difficulty
+        time_budget_seconds: Wall-clock limit
+        partners: Number of least loaded drivers tried per step
+
+    Returns:
+        Dict: Balancing statistics (exchanges, gini before/after)
+    """
+    return improve_by_exchanges(
+        owner,
+        difficulty,
+        allowed,
+        max_gini=max_gini,
+        time_budget_seconds=time_budget_seconds,
+        partners=partners
+    )
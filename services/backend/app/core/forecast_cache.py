@@ -0,0 +1,154 @@
+"""
+Forecast Cache
+Stampede-safe Redis cache for LSTM forecasts (Innovation 2)
+"""
+
+import asyncio
+import json
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from redis.exceptions import LockError
+
+from app.utils.helpers import setup_logger
+
+logger = setup_logger(__name__)
+
+WAIT_POLL_SECONDS = 0.05
+
+_inflight: Dict[str, asyncio.Task] = {}
+
+
+def _forget(key: str, task: asyncio.Task):
+    if _inflight.get(key) is task:
+        del _inflight[key]
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Forecast refresh for {key} failed: {task.exception()}")
+
+
+def single_flight(key: str, factory: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+    """
+    Shared in-process computation per key
+
+    The first caller starts factory(); callers arriving while it runs get
+    the same task instead of starting their own.
+    """
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(factory())
+        _inflight[key] = task
+        task.add_done_callback(lambda done: _forget(key, done))
+    return task
+
+
+class ForecastCache:
+    """
+    Forecasts in Redis with stale-while-revalidate
+
+    Entries carry their generation time and live fresh_ttl + stale_ttl
+    seconds. Past fresh_ttl they are still served while one background
+    refresh runs. Concurrent misses share one computation: in-process via
+    single_flight, across API workers via a Redis lock whose losers wait
+    for the winner's entry instead of recomputing.
+    """
+
+    def __init__(self, redis_client, fresh_ttl: int, stale_ttl: int, lock_ttl: int):
+        """
+        Args:
+            redis_client: Async Redis client (None = no caching, still coalesced)
+            fresh_ttl: Seconds an entry is served without refreshing
+            stale_ttl: Further seconds a stale entry is served during a refresh
+            lock_ttl: Lock expiry, and how long to wait for another worker's result
+        """
+        self.redis = redis_client
+        self.fresh_ttl = fresh_ttl
+        self.stale_ttl = stale_ttl
+        self.lock_ttl = lock_ttl
+
+    async def get(self, key: str, loader: Callable[[], Awaitable[List[Dict]]]) -> List[Dict]:
+        """
+        Cached forecast, computing it at most once on a miss
+
+        Args:
+            key: Redis key
+            loader: Computes the forecast; runs detached from the caller, so
+                it must not use request-scoped resources
+
+        Returns:
+            List[Dict]: Forecast (possibly stale while a refresh is running)
+        """
+        entry = await self._read(key)
+
+        if entry is None:
+            forecast = await asyncio.shield(single_flight(key, lambda: self._load(key, loader)))
+            if forecast is None:  # Joined a background refresh that deferred to another worker
+                forecast = await self._load(key, loader)
+            return forecast
+
+        if time.time() - entry['generated_at'] >= self.fresh_ttl:
+            single_flight(key, lambda: self._load(key, loader, wait=False))
+        return entry['forecast']
+
+    async def put(self, key: str, forecast: List[Dict]):
+        """Store a freshly computed forecast"""
+        if not self.redis:
+            return
+
+        await self.redis.set(
+            key,
+            json.dumps({'generated_at': time.time(), 'forecast': forecast}, default=str),
+            ex=self.fresh_ttl + self.stale_ttl
+        )
+
+    async def _read(self, key: str) -> Optional[Dict]:
+        if not self.redis:
+            return None
+
+        cached = await self.redis.get(key)
+        if not cached:
+            return None
+
+        entry = json.loads(cached)
+        if isinstance(entry, list):  # Written before entries carried a timestamp
+            return {'generated_at': 0.0, 'forecast': entry}
+        return entry
+
+    async def _load(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[List[Dict]]],
+        wait: bool = True
+    ) -> Optional[List[Dict]]:
+        """Compute and store under the cross-worker lock (wait=False: skip if another worker holds it)"""
+        if not self.redis:
+            return await loader()
+
+        started = time.time()
+        lock = self.redis.lock(f"{key}:lock", timeout=self.lock_ttl, blocking=False)
+
+        if await lock.acquire():
+            try:
+                forecast = await loader()
+                await self.put(key, forecast)
+                return forecast
+            finally:
+                try:
+                    await lock.release()
+                except LockError:
+                    logger.warning(f"Forecast lock {key} expired before the refresh finished")
+
+        if not wait:
+            return None
+
+        # Another worker is computing: wait for an entry newer than this call
+        deadline = time.monotonic() + self.lock_ttl
+        while time.monotonic() < deadline:
+            await asyncio.sleep(WAIT_POLL_SECONDS)
+            entry = await self._read(key)
+            if entry is not None and entry['generated_at'] >= started:
+                return entry['forecast']
+
+        logger.warning(f"Timed out waiting for {key}; computing locally")
+        forecast = await loader()
+        await self.put(key, forecast)
+        return forecast
@@ -0,0 +1,276 @@
+"""
+Notification Dispatcher
+Batched, retrying push delivery off the event loop
+"""
+
+import time
+import asyncio
+import threading
+from typing import Callable, Dict, List, Optional
+
+try:
+    import firebase_admin
+    from firebase_admin import credentials, exceptions as firebase_exceptions, messaging
+    FIREBASE_AVAILABLE = True
+except ImportError:
+    FIREBASE_AVAILABLE = False
+
+from app.config import settings
+from app.utils.helpers import setup_logger
+
+logger = setup_logger(__name__)
+
+# FCM accepts at most 500 messages per batch request
+FCM_MAX_BATCH_SIZE = 500
+
+
+class DeliveryError:
+    """Why one message was not delivered, and whether resending may help"""
+
+    def __init__(self, reason: str, retryable: bool):
+        self.reason = reason
+        self.retryable = retryable
+
+    def __repr__(self):
+        return f"<DeliveryError(reason='{self.reason}', retryable={self.retryable})>"
+
+
+class FCMTransport:
+    """
+    Firebase Cloud Messaging transport
+
+    The Firebase app is initialized once per process and shared by every
+    dispatcher. send_batch is blocking and is called from a worker thread.
+    """
+
+    max_batch_size = FCM_MAX_BATCH_SIZE
+
+    _app = None
+    _app_lock = threading.Lock()
+
+    @classmethod
+    def is_configured(cls) -> bool:
+        return FIREBASE_AVAILABLE and bool(settings.FIREBASE_SERVICE_ACCOUNT_KEY)
+
+    @classmethod
+    def get_app(cls):
+        """Initialized Firebase app (created on first use)"""
+        with cls._app_lock:
+            if cls._app is None:
+                try:
+                    cls._app = firebase_admin.get_app()
+                except ValueError:
+                    cred = credentials.Certificate(settings.FIREBASE_SERVICE_ACCOUNT_KEY)
+                    cls._app = firebase_admin.initialize_app(cred)
+                    logger.info("Firebase Admin SDK initialized successfully")
+            return cls._app
+
+    def send_batch(self, messages: List[Dict]) -> List[Optional[DeliveryError]]:
+        """
+        Send up to 500 messages in one FCM batch request
+
+        Returns:
+            List: None per delivered message, DeliveryError otherwise
+        """
+        app = self.get_app()
+        fcm_messages = [
+            messaging.Message(
+                notification=messaging.Notification(title=m['title'], body=m['body']),
+                data=m.get('data') or {},
+                token=m['token']
+            )
+            for m in messages
+        ]
+
+        try:
+            response = messaging.send_each(fcm_messages, app=app)
+        except firebase_exceptions.FirebaseError as e:
+            # The whole request failed (network, auth, quota)
+            return [DeliveryError(str(e), retryable=self._is_retryable(e))] * len(messages)
+
+        return [
+            None if r.success else DeliveryError(str(r.exception), retryable=self._is_retryable(r.exception))
+            for r in response.responses
+        ]
+
+    @staticmethod
+    def _is_retryable(error) -> bool:
+        return isinstance(error, (
+            firebase_exceptions.UnavailableError,
+            firebase_exceptions.InternalError,
+            firebase_exceptions.DeadlineExceededError,
+            messaging.QuotaExceededError
+        ))
+
+
+class LocalTransport:
+    """
+    In-process transport for tests and local development
+
+    Delivered messages are appended to `sent`. An optional `fail` callable
+    receives each message and may return a DeliveryError to simulate an
+    FCM failure.
+    """
+
+    def __init__(
+        self,
+        max_batch_size: int = FCM_MAX_BATCH_SIZE,
+        fail: Optional[Callable[[Dict], Optional[DeliveryError]]] = None
+    ):
+        self.max_batch_size = max_batch_size
+        self.fail = fail
+        self.sent: List[Dict] = []
+        self.batches: List[int] = []
+        self._lock = threading.Lock()
+
+    def send_batch(self, messages: List[Dict]) -> List[Optional[DeliveryError]]:
+        results = [self.fail(m) if self.fail else None for m in messages]
+
+        with self._lock:
+            self.batches.append(len(messages))
+            self.sent.extend(m for m, error in zip(messages, results) if error is None)
+
+        return results
+
+
+class NotificationDispatcher:
+    """
+    Bulk push delivery
+
+    Messages ({'token', 'title', 'body', 'data'}) are split into batches of
+    at most NOTIFICATION_BATCH_SIZE (capped at the transport limit). Each
+    batch is sent in a worker thread so the blocking SDK never stalls the
+    event loop, up to NOTIFICATION_MAX_CONCURRENT_BATCHES at a time.
+    Messages that fail with a transient error are resent with exponential
+    backoff; permanent failures (e.g. unregistered tokens) are not.
+    """
+
+    def __init__(
+        self,
+        transport=None,
+        batch_size: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        backoff_seconds: Optional[float] = None,
+        max_concurrent_batches: Optional[int] = None
+    ):
+        self.transport = transport
+        limit = getattr(transport, 'max_batch_size', FCM_MAX_BATCH_SIZE)
+        self.batch_size = max(1, min(batch_size or settings.NOTIFICATION_BATCH_SIZE, limit))
+        self.max_retries = settings.NOTIFICATION_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_seconds = settings.NOTIFICATION_RETRY_BACKOFF_SECONDS if backoff_seconds is None else backoff_seconds
+        self.max_concurrent_batches = max_concurrent_batches or settings.NOTIFICATION_MAX_CONCURRENT_BATCHES
+
+    @property
+    def enabled(self) -> bool:
+        return self.transport is not None
+
+    async def send_many(self, messages: List[Dict]) -> Dict:
+        """
+        Deliver many messages
+
+        Args:
+            messages: Message dicts with token, title, body and optional data
+
+        Returns:
+            Dict: success/failure/retried counts, batches sent and seconds taken
+        """
+        messages = [m for m in messages if m.get('token')]
+        if not messages:
+            return {'success': 0, 'failure': 0, 'retried': 0, 'batches': 0, 'seconds': 0.0}
+
+        if not self.enabled:
+            logger.warning("Push transport not configured - skipping notifications")
+            return {'success': 0, 'failure': len(messages), 'retried': 0, 'batches': 0, 'seconds': 0.0}
+
+        started = time.perf_counter()
+        limit = asyncio.Semaphore(self.max_concurrent_batches)
+        batches = [
+            messages[start:start + self.batch_size]
+            for start in range(0, len(messages), self.batch_size)
+        ]
+
+        async def deliver(batch: List[Dict]) -> Dict:
+            async with limit:
+                return await self._send_with_retry(batch)
+
+        results = await asyncio.gather(*[deliver(batch) for batch in batches])
+
+        stats = {
+            'success': sum(r['success'] for r in results),
+            'failure': sum(r['failure'] for r in results),
+            'retried': sum(r['retried'] for r in results),
+            'batches': sum(r['batches'] for r in results),
+            'seconds': time.perf_counter() - started
+        }
+        logger.info(
+            f"Push fan-out: {stats['success']} sent, {stats['failure']} failed, "
+            f"{stats['retried']} retried in {stats['batches']} batches ({stats['seconds']:.2f}s)"
+        )
+        return stats
+
+    async def _send_with_retry(self, batch: List[Dict]) -> Dict:
+        pending = batch
+        success = retried = batches = 0
+        errors: List[DeliveryError] = []
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                await asyncio.sleep(self.backoff_seconds * 2 ** (attempt - 1))
+                retried += len(pending)
+
+            try:
+                results = await asyncio.to_thread(self.transport.send_batch, pending)
+            except Exception as e:
+                logger.error(f"Push batch failed: {str(e)}")
+                results = [DeliveryError(str(e), retryable=True)] * len(pending)
+            batches += 1
+
+            success += sum(error is None for error in results)
+            errors = [error for error in results if error is not None and not error.retryable]
+            pending = [m for m, error in zip(pending, results) if error is not None and error.retryable]
+
+            if errors:
+                logger.warning(f"{len(errors)} notifications rejected: {errors[0].reason}")
+            if not pending:
+                break
+
+        if pending:
+            logger.error(f"{len(pending)} notifications still failing after {self.max_retries} retries")
+
+        return {
+            'success': success,
+            'failure': len(batch) - success,
+            'retried': retried,
+            'batches': batches
+        }
+
+
+_dispatcher: Optional[NotificationDispatcher] = None
+
+
+def create_transport():
+    """Transport selected by NOTIFICATION_TRANSPORT, or None if push is not configured"""
+    if settings.NOTIFICATION_TRANSPORT == "local":
+        return LocalTransport()
+
+    if FCMTransport.is_configured():
+        return FCMTransport()
+
+    logger.warning("Firebase credentials not configured - notifications disabled")
+    return None
+
+
+def get_dispatcher() -> NotificationDispatcher:
+    """Process-wide dispatcher (one transport / Firebase app per process)"""
+    global _dispatcher
+
+    if _dispatcher is None:
+        _dispatcher = NotificationDispatcher(create_transport())
+
+    return _dispatcher
+
+
+def set_dispatcher(dispatcher: Optional[NotificationDispatcher]):
+    """Replace the process-wide dispatcher (tests, custom transports)"""
+    global _dispatcher
+    _dispatcher = dispatcher
@@ -0,0 +1,424 @@
+"""
+Notification Outbox
+Durable push queue drained by a rate-limited consumer pool
+"""
+
+import os
+import json
+import time
+import socket
+import asyncio
+from collections import deque
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+
+from app.config import settings
+from app.core.notification_dispatcher import NotificationDispatcher, get_dispatcher
+from app.utils.redis import get_redis_client
+from app.utils.helpers import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class OutboxEntry:
+    """One queued message"""
+
+    def __init__(self, entry_id: str, message: Dict, enqueued_at: float):
+        self.entry_id = entry_id
+        self.message = message
+        self.enqueued_at = enqueued_at
+
+
+class OutboxMetrics:
+    """Counters and delivery latency of the outbox (in-process)"""
+
+    def __init__(self, latency_window: int = 1000):
+        self.enqueued = 0
+        self.deduplicated = 0
+        self.sent = 0
+        self.failed = 0
+        self.batches = 0
+        self.latencies: Deque[float] = deque(maxlen=latency_window)
+        self.last_error: Optional[str] = None
+
+    def snapshot(self, depth: Optional[int] = None) -> Dict:
+        latencies = sorted(self.latencies)
+
+        def percentile(q: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000, 1)
+
+        return {
+            'depth': depth,
+            'enqueued': self.enqueued,
+            'deduplicated': self.deduplicated,
+            'sent': self.sent,
+            'failed': self.failed,
+            'batches': self.batches,
+            'latency_ms': {
+                'avg': round(sum(latencies) / len(latencies) * 1000, 1) if latencies else None,
+                'p50': percentile(0.50),
+                'p95': percentile(0.95),
+                'max': percentile(1.0)
+            },
+            'last_error': self.last_error
+        }
+
+
+# Deduplicated enqueue in one atomic step: the dedup key is written only
+# after XADD succeeded, so a failed XADD never swallows the message
+ENQUEUE_DEDUP_SCRIPT = """
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    return 0
+end
+redis.call('XADD', KEYS[1], '*', 'message', ARGV[1], 'enqueued_at', ARGV[2])
+redis.call('SET', KEYS[2], 1, 'EX', ARGV[3])
+return 1
+"""
+
+
+class RedisStreamOutbox:
+    """
+    Outbox on a Redis stream with one consumer group
+
+    Entries are acknowledged and deleted once handled, so XLEN is the queue
+    depth. Entries a crashed consumer read but never acknowledged are
+    reclaimed after NOTIFICATION_OUTBOX_CLAIM_IDLE_SECONDS. A deduplicated
+    enqueue checks the dedup key, XADDs and sets the key (TTL
+    NOTIFICATION_DEDUP_SECONDS) in one Lua script.
+    """
+
+    GROUP = "notification-senders"
+
+    def __init__(self, redis_client, stream: Optional[str] = None):
+        self.redis = redis_client
+        self.stream = stream or settings.NOTIFICATION_OUTBOX_STREAM
+        self.consumer = f"{socket.gethostname()}-{os.getpid()}"
+        self._group_ready = False
+        self._enqueue_dedup = redis_client.register_script(ENQUEUE_DEDUP_SCRIPT)
+
+    async def _ensure_group(self):
+        if self._group_ready:
+            return
+        try:
+            await self.redis.xgroup_create(self.stream, self.GROUP, id="0", mkstream=True)
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._group_ready = True
+
+    async def enqueue(self, message: Dict, dedup_key: Optional[str] = None) -> bool:
+        payload = json.dumps(message)
+        enqueued_at = repr(time.time())
+
+        if dedup_key is not None:
+            added = await self._enqueue_dedup(
+                keys=[self.stream, f"{self.stream}:dedup:{dedup_key}"],
+                args=[payload, enqueued_at, settings.NOTIFICATION_DEDUP_SECONDS]
+            )
+            return bool(added)
+
+        await self.redis.xadd(self.stream, {'message': payload, 'enqueued_at': enqueued_at})
+        return True
+
+    async def enqueue_many(self, items: Sequence[Tuple[Dict, Optional[str]]]) -> List[bool]:
+        """Enqueue (message, dedup_key) pairs, one pipelined round trip per chunk"""
+        chunk_size = max(1, settings.NOTIFICATION_ENQUEUE_CHUNK_SIZE)
+        queued: List[bool] = []
+
+        for start in range(0, len(items), chunk_size):
+            enqueued_at = repr(time.time())
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for message, dedup_key in items[start:start + chunk_size]:
+                    payload = json.dumps(message)
+                    if dedup_key is not None:
+                        await self._enqueue_dedup(
+                            keys=[self.stream, f"{self.stream}:dedup:{dedup_key}"],
+                            args=[payload, enqueued_at, settings.NOTIFICATION_DEDUP_SECONDS],
+                            client=pipe
+                        )
+                    else:
+                        pipe.xadd(self.stream, {'message': payload, 'enqueued_at': enqueued_at})
+                results = await pipe.execute()
+
+            # Script calls return 0/1, XADD returns the entry id
+            queued.extend(bool(result) for result in results)
+
+        return queued
+
+    async def read(self, count: int, block_ms: int) -> List[OutboxEntry]:
+        await self._ensure_group()
+
+        # Entries left pending by a consumer that died
+        claimed = await self.redis.xautoclaim(
+            self.stream, self.GROUP, self.consumer,
+            min_idle_time=settings.NOTIFICATION_OUTBOX_CLAIM_IDLE_SECONDS * 1000,
+            start_id="0-0", count=count
+        )
+        entries = claimed[1] if claimed else []
+
+        if not entries:
+            response = await self.redis.xreadgroup(
+                self.GROUP, self.consumer, {self.stream: ">"}, count=count, block=block_ms
+            )
+            entries = response[0][1] if response else []
+
+        return [
+            OutboxEntry(entry_id, json.loads(fields['message']), float(fields['enqueued_at']))
+            for entry_id, fields in entries
+            if fields
+        ]
+
+    async def ack(self, entry_ids: List[str]):
+        if entry_ids:
+            await self.redis.xack(self.stream, self.GROUP, *entry_ids)
+            await self.redis.xdel(self.stream, *entry_ids)
+
+    async def depth(self) -> int:
+        return await self.redis.xlen(self.stream)
+
+
+class LocalOutbox:
+    """
+    In-process stand-in for RedisStreamOutbox (tests, development, or
+    when Redis is unavailable). Not durable across restarts.
+    """
+
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.dedup_until: Dict[str, float] = {}
+        self._next_id = 0
+
+    async def enqueue(self, message: Dict, dedup_key: Optional[str] = None) -> bool:
+        now = time.time()
+        if dedup_key is not None:
+            if self.dedup_until.get(dedup_key, 0) > now:
+                return False
+            self.dedup_until[dedup_key] = now + settings.NOTIFICATION_DEDUP_SECONDS
+
+        self._next_id += 1
+        self.queue.put_nowait(OutboxEntry(str(self._next_id), message, now))
+        return True
+
+    async def enqueue_many(self, items: Sequence[Tuple[Dict, Optional[str]]]) -> List[bool]:
+        return [await self.enqueue(message, dedup_key) for message, dedup_key in items]
+
+    async def read(self, count: int, block_ms: int) -> List[OutboxEntry]:
+        try:
+            entries = [await asyncio.wait_for(self.queue.get(), timeout=block_ms / 1000)]
+        except asyncio.TimeoutError:
+            return []
+
+        while len(entries) < count and not self.queue.empty():
+            entries.append(self.queue.get_nowait())
+        return entries
+
+    async def ack(self, entry_ids: List[str]):
+        return None
+
+    async def depth(self) -> int:
+        return self.queue.qsize()
+
+
+class RateLimiter:
+    """Token bucket shared by all consumers (rate = burst size)"""
+
+    def __init__(self, rate_per_second: float):
+        self.rate = rate_per_second
+        self.tokens = rate_per_second
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, count: int):
+        if self.rate <= 0:
+            return
+
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= count:
+                    self.tokens -= count
+                    return
+                await asyncio.sleep((count - self.tokens) / self.rate)
+
+
+class OutboxConsumer:
+    """
+    Pool of asyncio workers draining the outbox
+
+    Each worker reads up to NOTIFICATION_BATCH_SIZE entries, waits for the
+    shared rate limiter, hands the batch to the NotificationDispatcher
+    (which batches, retries and runs FCM off the event loop) and
+    acknowledges the entries.
+    """
+
+    def __init__(
+        self,
+        outbox,
+        dispatcher: Optional[NotificationDispatcher] = None,
+        workers: Optional[int] = None,
+        rate_per_second: Optional[float] = None,
+        batch_size: Optional[int] = None,
+        metrics: Optional[OutboxMetrics] = None
+    ):
+        self.outbox = outbox
+        self.dispatcher = dispatcher or get_dispatcher()
+        self.workers = workers or settings.NOTIFICATION_OUTBOX_WORKERS
+        rate = settings.NOTIFICATION_RATE_LIMIT_PER_SECOND if rate_per_second is None else rate_per_second
+        self.limiter = RateLimiter(rate)
+        self.batch_size = batch_size or settings.NOTIFICATION_BATCH_SIZE
+        if rate > 0:
+            self.batch_size = max(1, min(self.batch_size, int(rate)))
+        self.metrics = metrics or OutboxMetrics()
+        self._tasks: List[asyncio.Task] = []
+
+    async def drain_once(self, block_ms: int = 1000) -> int:
+        """
+        Deliver one batch from the outbox
+
+        Returns:
+            int: Number of entries handled
+        """
+        entries = await self.outbox.read(self.batch_size, block_ms)
+        if not entries:
+            return 0
+
+        await self.limiter.acquire(len(entries))
+        stats = await self.dispatcher.send_many([entry.message for entry in entries])
+
+        delivered_at = time.time()
+        self.metrics.sent += stats['success']
+        self.metrics.failed += stats['failure']
+        self.metrics.batches += stats.get('batches', 0)
+        self.metrics.latencies.extend(delivered_at - entry.enqueued_at for entry in entries)
+
+        await self.outbox.ack([entry.entry_id for entry in entries])
+        return len(entries)
+
+    async def _run(self, worker: int):
+        while True:
+            try:
+                await self.drain_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.metrics.last_error = str(e)
+                logger.error(f"Outbox worker {worker} failed: {str(e)}")
+                await asyncio.sleep(1)
+
+    def start(self):
+        """Start the worker tasks"""
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._run(i)) for i in range(self.workers)]
+            logger.info(f"✅ Notification outbox consumer started ({self.workers} workers)")
+
+    async def stop(self):
+        """Cancel the worker tasks (unacknowledged entries stay in the outbox)"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+_outbox = None
+_consumer: Optional[OutboxConsumer] = None
+_metrics = OutboxMetrics()
+
+
+async def get_outbox():
+    """Process-wide outbox (Redis stream, or the local stand-in)"""
+    global _outbox
+
+    if _outbox is None:
+        redis_client = await get_redis_client() if settings.NOTIFICATION_OUTBOX == "redis" else None
+        if redis_client is not None:
+            _outbox = RedisStreamOutbox(redis_client)
+        else:
+            if settings.NOTIFICATION_OUTBOX == "redis":
+                logger.warning("Redis unavailable - notification outbox falls back to in-process queue")
+            _outbox = LocalOutbox()
+
+    return _outbox
+
+
+async def enqueue_notification(message: Dict, driver_id: Optional[int] = None) -> bool:
+    """
+    Queue a push message for the consumer pool
+
+    Messages for the same driver and type (data['type']) within
+    NOTIFICATION_DEDUP_SECONDS are dropped.
+
+    Returns:
+        bool: False if deduplicated
+    """
+    outbox = await get_outbox()
+    queued = await outbox.enqueue(message, _dedup_key(message, driver_id))
+    if queued:
+        _metrics.enqueued += 1
+    else:
+        _metrics.deduplicated += 1
+    return queued
+
+
+async def enqueue_notifications(messages: Sequence[Tuple[Optional[int], Dict]]) -> int:
+    """
+    Queue many push messages in pipelined batches (same deduplication as
+    enqueue_notification)
+
+    Returns:
+        int: Number of messages queued (the rest were deduplicated)
+    """
+    outbox = await get_outbox()
+    results = await outbox.enqueue_many([
+        (message, _dedup_key(message, driver_id)) for driver_id, message in messages
+    ])
+    queued = sum(results)
+    _metrics.enqueued += queued
+    _metrics.deduplicated += len(results) - queued
+    return queued
+
+
+def _dedup_key(message: Dict, driver_id: Optional[int]) -> Optional[str]:
+    """Dedup key per driver and message type (None = never deduplicated)"""
+    if driver_id is None:
+        return None
+    return f"{driver_id}:{(message.get('data') or {}).get('type', 'push')}"
+
+
+async def start_outbox_consumer() -> Optional[OutboxConsumer]:
+    """Start the process-wide consumer pool (application startup)"""
+    global _consumer
+
+    dispatcher = get_dispatcher()
+    if not dispatcher.enabled:
+        logger.warning("Push transport not configured - notification outbox consumer not started")
+        return None
+
+    if _consumer is None:
+        _consumer = OutboxConsumer(await get_outbox(), dispatcher, metrics=_metrics)
+        _consumer.start()
+
+    return _consumer
+
+
+async def stop_outbox_consumer():
+    """Stop the consumer pool (application shutdown)"""
+    global _consumer
+
+    if _consumer is not None:
+        await _consumer.stop()
+        _consumer = None
+
+
+async def get_outbox_metrics() -> Dict:
+    """Queue depth, counters and delivery latency"""
+    depth = None
+    if _outbox is not None:
+        try:
+            depth = await _outbox.depth()
+        except Exception as e:
+            logger.error(f"Failed to read outbox depth: {str(e)}")
+
+    return _metrics.snapshot(depth)
@@ -3,12 +3,10 @@ Push Notification Service
 Firebase Cloud Messaging (FCM) integration
 """
 
-import firebase_admin
-from firebase_admin import credentials, messaging
-from typing import Dict, List, Optional
-import json
+from typing import Dict, List, Optional, Tuple
 
-from app.config import settings
+from app.core.notification_dispatcher import NotificationDispatcher, get_dispatcher
+from app.core.notification_outbox import enqueue_notifications
 from app.utils.helpers import setup_logger
 
 logger = setup_logger(__name__)
@@ -18,28 +16,51 @@ class NotificationService:
     """
     FCM push notification service
     Sends real-time alerts to driver mobile apps
+    
+    Delivery goes through the process-wide NotificationDispatcher, so
+    constructing a service is cheap and Firebase is initialized only once.
+    Background jobs build messages with the *_message helpers and enqueue
+    them on the notification outbox, which the consumer pool delivers
+    without holding up the job.
     """
     
-    def __init__(self):
-        self.initialized = False
-        self._initialize_firebase()
+    def __init__(self, dispatcher: Optional[NotificationDispatcher] = None):
+        self.dispatcher = dispatcher or get_dispatcher()
+    
+    @property
+    def initialized(self) -> bool:
+        return self.dispatcher.enabled
     
-    def _initialize_firebase(self):
+    async def send_many(self, messages: List[Dict]) -> Dict:
         """
-        Initialize Firebase Admin SDK
+        Send many prepared messages in FCM batches
+        
+        Args:
+            messages: Message dicts (token, title, body, data)
+        
+        Returns:
+            Dict: Success/failure statistics
         """
-        try:
-            if settings.FIREBASE_CREDENTIALS_PATH:
-                cred = credentials.Certificate(settings.FIREBASE_CREDENTIALS_PATH)
-                firebase_admin.initialize_app(cred)
-                self.initialized = True
-                logger.info("Firebase Admin SDK initialized successfully")
-            else:
-                logger.warning("Firebase credentials not configured - notifications disabled")
+        return await self.dispatcher.send_many(messages)
+    
+    async def enqueue_many(self, messages: List[Tuple[int, Dict]]) -> Dict:
+        """
+        Queue messages on the notification outbox
+        
+        Args:
+            messages: (driver_id, message) pairs; repeats of the same driver
+                and message type within NOTIFICATION_DEDUP_SECONDS are dropped
+        
+        Returns:
+            Dict: Queued/deduplicated counts
+        """
+        if not self.initialized:
+            logger.warning("Push transport not configured - skipping notifications")
+            return {'queued': 0, 'deduplicated': 0}
         
-        except Exception as e:
-            logger.error(f"Failed to initialize Firebase: {str(e)}")
-            self.initialized = False
+        queued = await enqueue_notifications(messages)
+        
+        return {'queued': queued, 'deduplicated': len(messages) - queued}
     
     async def send_notification(
         self,
@@ -60,27 +81,10 @@ class NotificationService:
         Returns:
             bool: True if sent successfully
         """
-        if not self.initialized:
-            logger.warning("Firebase not initialized - skipping notification")
-            return False
-        
-        try:
-            message = messaging.Message(
-                notification=messaging.Notification(
-                    title=title,
-                    body=body
-                ),
-                data=data or {},
-                token=fcm_token
-            )
-            
-            response = messaging.send(message)
-            logger.info(f"Notification sent successfully: {response}")
-            return True
-        
-        except Exception as e:
-            logger.error(f"Failed to send notification: {str(e)}")
-            return False
+        stats = await self.send_many([
+            {'token': fcm_token, 'title': title, 'body': body, 'data': data or {}}
+        ])
+        return stats['success'] == 1
     
     async def send_batch_notifications(
         self,
@@ -101,32 +105,66 @@ class NotificationService:
         Returns:
             Dict: Success/failure statistics
         """
-        if not self.initialized:
-            logger.warning("Firebase not initialized - skipping batch notifications")
-            return {'success': 0, 'failure': len(tokens)}
-        
-        try:
-            message = messaging.MulticastMessage(
-                notification=messaging.Notification(
-                    title=title,
-                    body=body
-                ),
-                data=data or {},
-                tokens=tokens
-            )
-            
-            response = messaging.send_multicast(message)
-            
-            logger.info(f"Batch notification sent: {response.success_count} success, {response.failure_count} failure")
-            
-            return {
-                'success': response.success_count,
-                'failure': response.failure_count
+        stats = await self.send_many([
+            {'token': token, 'title': title, 'body': body, 'data': data or {}}
+            for token in tokens
+        ])
+        return {'success': stats['success'], 'failure': stats['failure']}
+    
+    @staticmethod
+    def health_alert_message(
+        fcm_token: str,
+        driver_name: str,
+        risk_score: float,
+        break_duration: int
+    ) -> Dict:
+        """Health risk alert message"""
+        return {
+            'token': fcm_token,
+            'title': "⚠️ Health Alert",
+            'body': f"Hi {driver_name}, your health risk is {risk_score:.1f}. Take a {break_duration} min break.",
+            'data': {
+                'type': 'health_alert',
+                'risk_score': str(risk_score),
+                'break_duration': str(break_duration)
             }
-        
-        except Exception as e:
-            logger.error(f"Failed to send batch notifications: {str(e)}")
-            return {'success': 0, 'failure': len(tokens)}
+        }
+    
+    @staticmethod
+    def assignment_message(
+        fcm_token: str,
+        driver_name: str,
+        package_count: int
+    ) -> Dict:
+        """New assignment message"""
+        return {
+            'token': fcm_token,
+            'title': "📦 New Assignments",
+            'body': f"Hi {driver_name}, you have {package_count} new packages to deliver today.",
+            'data': {
+                'type': 'new_assignment',
+                'package_count': str(package_count)
+            }
+        }
+    
+    @staticmethod
+    def swap_completed_message(
+        fcm_token: str,
+        driver_name: str,
+        received_package_id: int,
+        given_package_id: int
+    ) -> Dict:
+        """Swap executed message"""
+        return {
+            'token': fcm_token,
+            'title': "🔄 Swap Completed",
+            'body': f"Hi {driver_name}, your swap went through - package {received_package_id} is now yours.",
+            'data': {
+                'type': 'swap_completed',
+                'received_package_id': str(received_package_id),
+                'given_package_id': str(given_package_id)
+            }
+        }
     
     async def send_health_alert(
         self,
@@ -138,16 +176,10 @@ class NotificationService:
         """
         Send health risk alert notification
         """
-        return await self.send_notification(
-            fcm_token=fcm_token,
-            title="⚠️ Health Alert",
-            body=f"Hi {driver_name}, your health risk is {risk_score:.1f}. Take a {break_duration} min break.",
-            data={
-                'type': 'health_alert',
-                'risk_score': str(risk_score),
-                'break_duration': str(break_duration)
-            }
-        )
+        stats = await self.send_many([
+            self.health_alert_message(fcm_token, driver_name, risk_score, break_duration)
+        ])
+        return stats['success'] == 1
     
     async def send_assignment_notification(
         self,
@@ -158,15 +190,10 @@ class NotificationService:
         """
         Send new assignment notification
         """
-        return await self.send_notification(
-            fcm_token=fcm_token,
-            title="📦 New Assignments",
-            body=f"Hi {driver_name}, you have {package_count} new packages to deliver today.",
-            data={
-                'type': 'new_assignment',
-                'package_count': str(package_count)
-            }
-        )
+        stats = await self.send_many([
+            self.assignment_message(fcm_token, driver_name, package_count)
+        ])
+        return stats['success'] == 1
     
     async def send_swap_notification(
         self,
@@ -0,0 +1,322 @@
+"""
+Swap Candidate Cache
+Precomputed top-N swap opportunities per driver (Swap Marketplace)
+"""
+
+import json
+from collections import defaultdict
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Set
+import numpy as np
+
+from app.config import settings
+from app.core.swap_index import SwapIndex
+from app.core.swap_matching import SwapMatcher
+from app.utils.redis import get_redis_client
+from app.utils.helpers import setup_logger
+
+logger = setup_logger(__name__)
+
+# Candidate keys outlive their assignment day by a day
+CANDIDATES_TTL_SECONDS = 2 * 24 * 3600
+
+# Drivers stored per PUT_SCRIPT call
+PUT_CHUNK_SIZE = 200
+
+
+def compute_driver_candidates(
+    matcher: SwapMatcher,
+    index: SwapIndex,
+    all_drivers: List[Dict],
+    driver_ids: Optional[Iterable[int]] = None,
+    limit: int = 20
+) -> Dict[int, List[Dict]]:
+    """
+    Best swaps across each driver's packages
+
+    Every package a driver holds is offered to SwapMatcher; the merged
+    opportunities are ranked by compatibility score and cut to `limit`.
+
+    Args:
+        matcher: Swap scorer
+        index: Day's swap index (current owners)
+        all_drivers: Active drivers (id, name, current_location)
+        driver_ids: Drivers to compute (None = every driver holding a package)
+        limit: Swaps kept per driver
+
+    Returns:
+        Dict: driver_id -> ranked swap opportunities
+    """
+    order = np.argsort(index.owner, kind='stable')
+    owners, starts = np.unique(index.owner[order], return_index=True)
+    rows_by_driver = dict(zip(owners.tolist(), np.split(order, starts[1:])))
+
+    if driver_ids is None:
+        driver_ids = rows_by_driver.keys()
+
+    candidates = {}
+    for driver_id in driver_ids:
+        swaps = []
+        for row in rows_by_driver.get(driver_id, np.empty(0, dtype=np.int64)).tolist():
+            offered = index.package(row)
+            for swap in matcher.find_compatible_swaps(
+                driver_id=driver_id,
+                offered_package=offered,
+                all_drivers=all_drivers,
+                index=index,
+                limit=limit
+            ):
+                swaps.append({**swap, 'offered_package_id': offered['id']})
+
+        swaps.sort(key=lambda s: s['compatibility_score'], reverse=True)
+        candidates[driver_id] = swaps[:limit]
+
+    return candidates
+
+
+class SwapCandidateCache:
+    """
+    Per-driver swap opportunities for one assignment day, in process memory
+
+    Entries are recomputed in the background; a swap only invalidates the
+    drivers it touched: the two parties plus anyone whose cached list
+    offers one of the moved packages. Each invalidation bumps a version, so
+    a refresh that started before it cannot store an outdated list.
+    Invalidated lists are kept (get_stale) until the refresh replaces them.
+
+    Stand-in for RedisSwapCandidateCache (tests, development, or when
+    Redis is unavailable): every process keeps its own copy and only sees
+    invalidations made by swaps it executed itself.
+    """
+
+    def __init__(self):
+        self.entries: Dict[int, List[Dict]] = {}
+        self.stale_entries: Dict[int, List[Dict]] = {}
+        self.version = 0
+        self._invalidated_at: Dict[int, int] = {}
+        self._listed_by: Dict[int, Set[int]] = defaultdict(set)
+
+    async def get(self, driver_id: int) -> Optional[List[Dict]]:
+        """Cached swaps for a driver (None if never computed or invalidated)"""
+        return self.entries.get(driver_id)
+
+    async def get_stale(self, driver_id: int) -> Optional[List[Dict]]:
+        """Last list of an invalidated driver (None if there is none)"""
+        return self.stale_entries.get(driver_id)
+
+    async def current_version(self) -> int:
+        """Invalidation counter (pass to put as as_of)"""
+        return self.version
+
+    async def put(self, candidates: Dict[int, List[Dict]], as_of: int) -> int:
+        """
+        Store freshly computed lists
+
+        Args:
+            candidates: driver_id -> ranked swaps
+            as_of: Cache version when the computation started
+
+        Returns:
+            int: Number of drivers stored (lists invalidated meanwhile are skipped)
+        """
+        stored = 0
+        for driver_id, swaps in candidates.items():
+            if self._invalidated_at.get(driver_id, 0) > as_of:
+                continue
+            self.entries[driver_id] = swaps
+            self.stale_entries.pop(driver_id, None)
+            self._invalidated_at.pop(driver_id, None)
+            for swap in swaps:
+                self._listed_by[swap['package_id']].add(driver_id)
+            stored += 1
+        return stored
+
+    async def invalidate(self, driver_ids: Iterable[int] = (), package_ids: Iterable[int] = ()) -> Set[int]:
+        """
+        Drop the lists of the given drivers and of drivers listing the packages
+
+        Returns:
+            Set[int]: Drivers whose lists were invalidated
+        """
+        touched = set(driver_ids)
+        for package_id in package_ids:
+            touched.update(self._listed_by.pop(package_id, ()))
+
+        self.version += 1
+        for driver_id in touched:
+            if driver_id in self.entries:
+                self.stale_entries[driver_id] = self.entries.pop(driver_id)
+            self._invalidated_at[driver_id] = self.version
+
+        return touched
+
+    async def stale_drivers(self) -> Set[int]:
+        """Invalidated drivers waiting for a refresh"""
+        return set(self._invalidated_at)
+
+
+# Store lists of drivers not invalidated after as_of, and index which
+# drivers list each package. KEYS: lists, stale, invalidated, listed_by.
+# ARGV: as_of, ttl, then (driver_id, list JSON, listed package ids JSON)
+PUT_SCRIPT = """
+local as_of = tonumber(ARGV[1])
+local stored = 0
+for i = 3, #ARGV, 3 do
+    local driver = ARGV[i]
+    if tonumber(redis.call('HGET', KEYS[3], driver) or '0') <= as_of then
+        redis.call('HSET', KEYS[1], driver, ARGV[i + 1])
+        redis.call('HDEL', KEYS[2], driver)
+        redis.call('HDEL', KEYS[3], driver)
+        for _, package in ipairs(cjson.decode(ARGV[i + 2])) do
+            local field = tostring(package)
+            local listed = redis.call('HGET', KEYS[4], field)
+            listed = listed and cjson.decode(listed) or {}
+            local present = false
+            for _, listing in ipairs(listed) do
+                if tostring(listing) == driver then
+                    present = true
+                end
+            end
+            if not present then
+                table.insert(listed, tonumber(driver))
+                redis.call('HSET', KEYS[4], field, cjson.encode(listed))
+            end
+        end
+        stored = stored + 1
+    end
+end
+for k = 1, 4 do
+    redis.call('EXPIRE', KEYS[k], ARGV[2])
+end
+return stored
+"""
+
+# Bump the version and move the touched drivers' lists to stale.
+# KEYS: lists, stale, invalidated, listed_by, version.
+# ARGV: ttl, driver ids JSON, package ids JSON
+INVALIDATE_SCRIPT = """
+local version = redis.call('INCR', KEYS[5])
+local touched = {}
+for _, driver in ipairs(cjson.decode(ARGV[2])) do
+    touched[tostring(driver)] = true
+end
+for _, package in ipairs(cjson.decode(ARGV[3])) do
+    local field = tostring(package)
+    local listed = redis.call('HGET', KEYS[4], field)
+    if listed then
+        for _, driver in ipairs(cjson.decode(listed)) do
+            touched[tostring(driver)] = true
+        end
+        redis.call('HDEL', KEYS[4], field)
+    end
+end
+local result = {}
+for driver in pairs(touched) do
+    local list = redis.call('HGET', KEYS[1], driver)
+    if list then
+        redis.call('HSET', KEYS[2], driver, list)
+        redis.call('HDEL', KEYS[1], driver)
+    end
+    redis.call('HSET', KEYS[3], driver, version)
+    table.insert(result, tonumber(driver))
+end
+for k = 1, 5 do
+    redis.call('EXPIRE', KEYS[k], ARGV[1])
+end
+return result
+"""
+
+
+class RedisSwapCandidateCache:
+    """
+    SwapCandidateCache on Redis, shared by the precompute job and every
+    API worker
+
+    Per day: hashes of fresh lists, stale lists and invalidation versions
+    keyed by driver, a hash of the drivers listing each package, and the
+    version counter. Storing and invalidating are Lua scripts, so a
+    refresh racing a swap in another process still cannot store a
+    pre-swap list.
+    """
+
+    def __init__(self, redis_client, assignment_date: date):
+        self.redis = redis_client
+        prefix = f"swap_candidates:{assignment_date.isoformat()}"
+        self.lists_key = f"{prefix}:lists"
+        self.stale_key = f"{prefix}:stale"
+        self.invalidated_key = f"{prefix}:invalidated"
+        self.listed_by_key = f"{prefix}:listed_by"
+        self.version_key = f"{prefix}:version"
+        self._put = redis_client.register_script(PUT_SCRIPT)
+        self._invalidate = redis_client.register_script(INVALIDATE_SCRIPT)
+
+    @property
+    def keys(self) -> List[str]:
+        return [self.lists_key, self.stale_key, self.invalidated_key, self.listed_by_key, self.version_key]
+
+    async def get(self, driver_id: int) -> Optional[List[Dict]]:
+        payload = await self.redis.hget(self.lists_key, str(driver_id))
+        return json.loads(payload) if payload is not None else None
+
+    async def get_stale(self, driver_id: int) -> Optional[List[Dict]]:
+        payload = await self.redis.hget(self.stale_key, str(driver_id))
+        return json.loads(payload) if payload is not None else None
+
+    async def current_version(self) -> int:
+        value = await self.redis.get(self.version_key)
+        return int(value) if value is not None else 0
+
+    async def put(self, candidates: Dict[int, List[Dict]], as_of: int) -> int:
+        items = list(candidates.items())
+        stored = 0
+
+        for start in range(0, len(items), PUT_CHUNK_SIZE):
+            args = [as_of, CANDIDATES_TTL_SECONDS]
+            for driver_id, swaps in items[start:start + PUT_CHUNK_SIZE]:
+                args += [driver_id, json.dumps(swaps), json.dumps([swap['package_id'] for swap in swaps])]
+            stored += await self._put(keys=self.keys[:4], args=args)
+
+        return stored
+
+    async def invalidate(self, driver_ids: Iterable[int] = (), package_ids: Iterable[int] = ()) -> Set[int]:
+        touched = await self._invalidate(
+            keys=self.keys,
+            args=[CANDIDATES_TTL_SECONDS, json.dumps(list(driver_ids)), json.dumps(list(package_ids))]
+        )
+        return {int(driver_id) for driver_id in touched}
+
+    async def stale_drivers(self) -> Set[int]:
+        return {int(driver_id) for driver_id in await self.redis.hkeys(self.invalidated_key)}
+
+    async def drop(self):
+        await self.redis.delete(*self.keys)
+
+
+_caches: Dict[date, SwapCandidateCache] = {}
+
+
+async def get_candidate_cache(assignment_date: date):
+    """
+    Candidate cache for an assignment day: on Redis, or in process memory
+    if SWAP_CANDIDATES_STORE is "local" or Redis is unavailable (older
+    in-process days are dropped)
+    """
+    redis_client = await get_redis_client() if settings.SWAP_CANDIDATES_STORE == "redis" else None
+    if redis_client is not None:
+        return RedisSwapCandidateCache(redis_client, assignment_date)
+
+    cache = _caches.get(assignment_date)
+    if cache is None:
+        for day in [day for day in _caches if day < assignment_date]:
+            del _caches[day]
+        cache = _caches[assignment_date] = SwapCandidateCache()
+    return cache
+
+
+async def drop_candidate_cache(assignment_date: date):
+    """Forget every list after assignments were regenerated or reoptimized"""
+    _caches.pop(assignment_date, None)
+
+    redis_client = await get_redis_client() if settings.SWAP_CANDIDATES_STORE == "redis" else None
+    if redis_client is not None:
+        await RedisSwapCandidateCache(redis_client, assignment_date).drop()
@@ -0,0 +1,217 @@
+"""
+Swap Spatial Index
+KD-tree over the day's assigned packages (Swap Marketplace)
+"""
+
+from datetime import date
+from typing import Dict, Optional, Sequence, Tuple
+import numpy as np
+from scipy.spatial import cKDTree
+
+from app.utils.redis import get_redis_client
+from app.utils.helpers import setup_logger
+
+logger = setup_logger(__name__)
+
+EARTH_RADIUS_KM = 6371
+
+# Version counters outlive their assignment day by a day
+VERSION_TTL_SECONDS = 2 * 24 * 3600
+
+
+def unit_vectors(latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    """Points on the unit sphere; chord length is monotonic in great-circle distance"""
+    lat = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lon = np.radians(np.asarray(longitudes, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.column_stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)])
+
+
+def chord_length(distance_km: float) -> float:
+    """Unit-sphere chord for a great-circle distance"""
+    angle = min(np.pi, max(0.0, distance_km) / EARTH_RADIUS_KM)
+    return 2 * np.sin(angle / 2)
+
+
+class SwapIndex:
+    """
+    Spatial index over assigned packages
+
+    Package locations never change during the day, so the KD-tree is built
+    once per assignment day. A swap only changes who owns a package, which
+    is a constant-time update of the owner array.
+
+    Every process keeps its own index. `version` is the shared owner-change
+    counter (see get_swap_index_version) the owners reflect; an index
+    behind the counter missed a swap made elsewhere and is rebuilt.
+    """
+
+    def __init__(self, packages: Sequence[Dict], version: int = 0):
+        """
+        Args:
+            packages: Assigned packages with id, driver_id, latitude,
+                longitude, difficulty_score and address
+            version: Shared owner-change counter the owners reflect
+        """
+        self.version = version
+        self.package_ids = np.array([p['id'] for p in packages], dtype=np.int64)
+        self.owner = np.array([p['driver_id'] for p in packages], dtype=np.int64)
+        self.latitude = np.array([p['latitude'] for p in packages], dtype=np.float64)
+        self.longitude = np.array([p['longitude'] for p in packages], dtype=np.float64)
+        self.difficulty = np.array([p['difficulty_score'] for p in packages], dtype=np.float64)
+        self.addresses = [p.get('address') for p in packages]
+        self.position = {package_id: i for i, package_id in enumerate(self.package_ids.tolist())}
+
+        self.tree = cKDTree(unit_vectors(self.latitude, self.longitude)) if len(packages) else None
+
+    def __len__(self) -> int:
+        return len(self.package_ids)
+
+    def query(
+        self,
+        location: Tuple[float, float],
+        radius_km: float,
+        k: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        Packages within radius_km of a location
+
+        Args:
+            location: (latitude, longitude)
+            radius_km: Search radius
+            k: Keep only the k nearest (None = all within the radius)
+
+        Returns:
+            np.ndarray: Row indices into the index arrays, nearest first if k is set
+        """
+        if self.tree is None:
+            return np.empty(0, dtype=np.int64)
+
+        point = unit_vectors([location[0]], [location[1]])[0]
+        chord = chord_length(radius_km)
+
+        if k is not None and k < len(self):
+            distances, rows = self.tree.query(point, k=k, distance_upper_bound=chord * (1 + 1e-12))
+            return rows[np.isfinite(distances)].astype(np.int64)
+
+        return np.array(sorted(self.tree.query_ball_point(point, chord * (1 + 1e-12))), dtype=np.int64)
+
+    def package(self, row: int) -> Dict:
+        """Package dict for an index row"""
+        return {
+            'id': int(self.package_ids[row]),
+            'driver_id': int(self.owner[row]),
+            'latitude': float(self.latitude[row]),
+            'longitude': float(self.longitude[row]),
+            'difficulty_score': float(self.difficulty[row]),
+            'address': self.addresses[row]
+        }
+
+    def move(self, package_id: int, driver_id: int):
+        """Record a package's new driver"""
+        row = self.position.get(package_id)
+        if row is not None:
+            self.owner[row] = driver_id
+
+    def swap_owners(self, package_a: int, package_b: int):
+        """Exchange the drivers of two packages (a completed swap)"""
+        row_a, row_b = self.position.get(package_a), self.position.get(package_b)
+        if row_a is None or row_b is None:
+            return
+        self.owner[row_a], self.owner[row_b] = self.owner[row_b], self.owner[row_a]
+
+
+class SwapIndexStore:
+    """Indexes of one process, by assignment day"""
+
+    def __init__(self):
+        self.indexes: Dict[date, SwapIndex] = {}
+
+    def get(self, assignment_date: date) -> Optional[SwapIndex]:
+        """Cached index for an assignment day, if built"""
+        return self.indexes.get(assignment_date)
+
+    def set(self, assignment_date: date, packages: Sequence[Dict], version: int = 0) -> SwapIndex:
+        """Build and cache the index for an assignment day (older days are dropped)"""
+        for day in [day for day in self.indexes if day < assignment_date]:
+            del self.indexes[day]
+
+        index = SwapIndex(packages, version)
+        self.indexes[assignment_date] = index
+        logger.info(f"Swap index built for {assignment_date}: {len(index)} packages (version {version})")
+        return index
+
+    def drop(self, assignment_date: date):
+        """Forget the index of an assignment day"""
+        self.indexes.pop(assignment_date, None)
+
+
+_store = SwapIndexStore()
+
+
+def get_swap_index_store() -> SwapIndexStore:
+    """Process-wide index store"""
+    return _store
+
+
+def get_swap_index(assignment_date: date) -> Optional[SwapIndex]:
+    """Cached index for an assignment day, if built"""
+    return _store.get(assignment_date)
+
+
+def set_swap_index(assignment_date: date, packages: Sequence[Dict], version: int = 0) -> SwapIndex:
+    """Build and cache the index for an assignment day (older days are dropped)"""
+    return _store.set(assignment_date, packages, version)
+
+
+def drop_swap_index(assignment_date: date):
+    """Forget the index after assignments were regenerated or reoptimized"""
+    _store.drop(assignment_date)
+
+
+def _version_key(assignment_date: date) -> str:
+    return f"swap_index:{assignment_date.isoformat()}:version"
+
+
+async def get_swap_index_version(assignment_date: date) -> Optional[int]:
+    """
+    Shared owner-change counter of an assignment day
+
+    Returns:
+        Optional[int]: Counter value (0 before the first change), None if
+            Redis is unavailable
+    """
+    redis_client = await get_redis_client()
+    if redis_client is None:
+        return None
+
+    try:
+        value = await redis_client.get(_version_key(assignment_date))
+    except Exception as e:
+        logger.warning(f"Swap index version read failed: {str(e)}")
+        return None
+
+    return int(value) if value is not None else 0
+
+
+async def bump_swap_index_version(assignment_date: date) -> Optional[int]:
+    """
+    Record that package owners of the day changed (after the change committed)
+
+    Returns:
+        Optional[int]: New counter value, None if Redis is unavailable
+    """
+    redis_client = await get_redis_client()
+    if redis_client is None:
+        return None
+
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.incr(_version_key(assignment_date))
+            pipe.expire(_version_key(assignment_date), VERSION_TTL_SECONDS)
+            version, _ = await pipe.execute()
+    except Exception as e:
+        logger.warning(f"Swap index version bump failed: {str(e)}")
+        return None
+
+    return int(version)
@@ -3,13 +3,108 @@ Swap Matching Logic
 Finds compatible swap partners based on preferences
 """
 
+from math import radians, sin, cos, sqrt, atan2
 from typing import List, Dict, Tuple, Optional
 import numpy as np
 
+from app.config import settings
+from app.core.swap_index import SwapIndex
 from app.utils.helpers import setup_logger
 
 logger = setup_logger(__name__)
 
+EARTH_RADIUS_KM = 6371
+
+# A candidate is compatible when its score is above this
+COMPATIBILITY_THRESHOLD = 0.5
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """
+    Vectorized Haversine distance (same formula as SwapMatcher._haversine_distance)
+    
+    Args:
+        lat1, lon1, lat2, lon2: Degrees; arrays or scalars that broadcast
+    
+    Returns:
+        np.ndarray: Distance in kilometers
+    """
+    lat1, lon1, lat2, lon2 = (np.asarray(x, dtype=np.float64) for x in (lat1, lon1, lat2, lon2))
+    
+    dlat = np.radians(lat2 - lat1)
+    dlon = np.radians(lon2 - lon1)
+    
+    a = np.sin(dlat / 2) ** 2 + np.cos(np.radians(lat1)) * np.cos(np.radians(lat2)) * np.sin(dlon / 2) ** 2
+    return EARTH_RADIUS_KM * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def score_swap_candidates(
+    offered_location: Tuple,
+    offered_difficulty,
+    target_latitudes: np.ndarray,
+    target_longitudes: np.ndarray,
+    target_difficulties: np.ndarray,
+    driver_latitudes: np.ndarray,
+    driver_longitudes: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Score many swap candidates in one pass
+    
+    Element i is the candidate package i held by a driver at
+    (driver_latitudes[i], driver_longitudes[i]). The two Haversine
+    distances are computed once and shared by the score and the
+    distance saved. offered_location and offered_difficulty may also be
+    per-candidate arrays (market clearing scores many offers at once).
+    
+    Returns:
+        Tuple of (compatibility scores, distance saved km, difficulty difference)
+    """
+    current_distance = haversine_km(driver_latitudes, driver_longitudes, *offered_location)
+    swap_distance = haversine_km(driver_latitudes, driver_longitudes, target_latitudes, target_longitudes)
+    
+    # 1. Distance component (0-1, higher is better)
+    distance_saved = np.maximum(0.0, current_distance - swap_distance)
+    distance_improvement = np.divide(
+        distance_saved, current_distance,
+        out=np.zeros_like(distance_saved), where=current_distance > 0
+    )
+    distance_score = np.minimum(1.0, distance_improvement * 2)
+    
+    # 2. Difficulty balance component
+    difficulty_difference = np.asarray(target_difficulties, dtype=np.float64) - np.asarray(offered_difficulty, dtype=np.float64)
+    difficulty_score = np.minimum(1.0, np.abs(difficulty_difference) / 50)
+    
+    # 3. Overall benefit (combination)
+    scores = 0.4 * distance_score + 0.3 * difficulty_score + 0.3 * (distance_improvement > 0)
+    
+    return scores, distance_saved, difficulty_difference
+
+
+def select_top(
+    scores: np.ndarray,
+    threshold: float = COMPATIBILITY_THRESHOLD,
+    k: Optional[int] = None
+) -> np.ndarray:
+    """
+    Indices of scores above threshold, best first (at most k)
+    
+    argpartition picks the top k in O(n); only those k are sorted.
+    Ties keep their input order.
+    """
+    candidates = np.flatnonzero(scores > threshold)
+    
+    if k is not None and k < len(candidates):
+        candidate_scores = scores[candidates]
+        kth_score = candidate_scores[np.argpartition(-candidate_scores, k - 1)[k - 1]]
+        
+        # Everything above the k-th score, then the earliest ties with it
+        above = candidates[candidate_scores > kth_score]
+        ties = candidates[candidate_scores == kth_score][:k - len(above)]
+        candidates = np.sort(np.concatenate([above, ties]))
+    
+    order = np.argsort(-scores[candidates], kind='stable')
+    return candidates[order]
+
 
 class SwapMatcher:
     """
@@ -18,23 +113,57 @@ class SwapMatcher:
     """
     
     def __init__(self):
-        pass
+        self._driver_table = None
+    
+    def _drivers(self, all_drivers: List[Dict]) -> Tuple[Dict, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Driver lookup arrays (ids sorted, latitude, longitude) plus an id map
+        
+        Reused while the same driver list is passed again, so scoring every
+        package of the day builds them once.
+        """
+        if self._driver_table is None or self._driver_table[0] is not all_drivers:
+            located = sorted(
+                (driver['id'], driver['current_location'])
+                for driver in all_drivers
+                if driver.get('current_location') is not None
+            )
+            ids = np.array([driver_id for driver_id, _ in located], dtype=np.int64)
+            locations = np.array([location for _, location in located], dtype=np.float64).reshape(-1, 2)
+            self._driver_table = (
+                all_drivers,
+                ({driver['id']: driver for driver in all_drivers}, ids, locations[:, 0], locations[:, 1])
+            )
+        return self._driver_table[1]
     
     def find_compatible_swaps(
         self,
         driver_id: int,
         offered_package: Dict,
         all_drivers: List[Dict],
-        all_packages: List[Dict]
+        all_packages: Optional[List[Dict]] = None,
+        index: Optional[SwapIndex] = None,
+        radius_km: Optional[float] = None,
+        max_candidates: Optional[int] = None,
+        limit: Optional[int] = None
     ) -> List[Dict]:
         """
         Find compatible swap partners for a driver
         
+        Candidates come from a spatial query around the offered package
+        (SWAP_SEARCH_RADIUS_KM, at most SWAP_SEARCH_MAX_CANDIDATES nearest)
+        instead of a scan over every driver's packages, and are scored in
+        one vectorized pass (score_swap_candidates).
+        
         Args:
             driver_id: Driver proposing swap
             offered_package: Package being offered
             all_drivers: List of all active drivers
-            all_packages: List of all assigned packages
+            all_packages: List of all assigned packages (used if no index is given)
+            index: Prebuilt SwapIndex of the day's assigned packages
+            radius_km: Search radius around the offered package
+            max_candidates: Number of nearest packages to score
+            limit: Return only the best `limit` swaps
         
         Returns:
             List[Dict]: Compatible swap opportunities ranked by score
@@ -45,48 +174,54 @@ class SwapMatcher:
         3. Time window compatibility
         4. Vehicle type compatibility
         """
-        compatible_swaps = []
+        if index is None:
+            index = SwapIndex(all_packages or [])
+        if radius_km is None:
+            radius_km = settings.SWAP_SEARCH_RADIUS_KM
+        if max_candidates is None:
+            max_candidates = settings.SWAP_SEARCH_MAX_CANDIDATES
         
         offered_location = (offered_package['latitude'], offered_package['longitude'])
         offered_difficulty = offered_package['difficulty_score']
+        drivers_by_id, driver_ids, driver_latitudes, driver_longitudes = self._drivers(all_drivers)
+        
+        # Candidate packages held by another active driver with a known location
+        rows = index.query(offered_location, radius_km, k=max_candidates) if len(driver_ids) else []
+        if len(rows):
+            owners = index.owner[rows]
+            slots = np.minimum(np.searchsorted(driver_ids, owners), len(driver_ids) - 1)
+            keep = (owners != driver_id) & (driver_ids[slots] == owners)
+            rows, slots = rows[keep], slots[keep]
+        
+        if not len(rows):
+            logger.debug(f"Found 0 compatible swaps for driver {driver_id}")
+            return []
         
-        for driver in all_drivers:
-            if driver['id'] == driver_id:
-                continue
-            
-            # Get driver's assigned packages
-            driver_packages = [p for p in all_packages if p['driver_id'] == driver['id']]
-            
-            for package in driver_packages:
-                package_location = (package['latitude'], package['longitude'])
-                package_difficulty = package['difficulty_score']
-                
-                # Calculate compatibility score
-                score = self._calculate_swap_score(
-                    offered_location=offered_location,
-                    offered_difficulty=offered_difficulty,
-                    target_location=package_location,
-                    target_difficulty=package_difficulty,
-                    driver_location=driver['current_location']
-                )
-                
-                if score > 0.5:  # Threshold for compatibility
-                    compatible_swaps.append({
-                        'driver_id': driver['id'],
-                        'driver_name': driver['name'],
-                        'package_id': package['id'],
-                        'package_address': package['address'],
-                        'compatibility_score': score,
-                        'distance_saved': self._calculate_distance_saved(
-                            offered_location, package_location, driver['current_location']
-                        ),
-                        'difficulty_difference': package_difficulty - offered_difficulty
-                    })
-        
-        # Sort by compatibility score (highest first)
-        compatible_swaps.sort(key=lambda x: x['compatibility_score'], reverse=True)
-        
-        logger.info(f"Found {len(compatible_swaps)} compatible swaps for driver {driver_id}")
+        scores, distance_saved, difficulty_difference = score_swap_candidates(
+            offered_location=offered_location,
+            offered_difficulty=offered_difficulty,
+            target_latitudes=index.latitude[rows],
+            target_longitudes=index.longitude[rows],
+            target_difficulties=index.difficulty[rows],
+            driver_latitudes=driver_latitudes[slots],
+            driver_longitudes=driver_longitudes[slots]
+        )
+        
+        # Threshold and rank (highest score first)
+        compatible_swaps = []
+        for i in select_top(scores, COMPATIBILITY_THRESHOLD, k=limit).tolist():
+            owner = int(index.owner[rows[i]])
+            compatible_swaps.append({
+                'driver_id': owner,
+                'driver_name': drivers_by_id[owner]['name'],
+                'package_id': int(index.package_ids[rows[i]]),
+                'package_address': index.addresses[rows[i]],
+                'compatibility_score': float(scores[i]),
+                'distance_saved': float(distance_saved[i]),
+                'difficulty_difference': float(difficulty_difference[i])
+            })
+        
+        logger.debug(f"Found {len(compatible_swaps)} compatible swaps for driver {driver_id}")
         
         return compatible_swaps
     
@@ -156,8 +291,6 @@ class SwapMatcher:
         Returns:
             float: Distance in kilometers
         """
-        from math import radians, sin, cos, sqrt, atan2
-        
         lat1, lon1 = loc1
         lat2, lon2 = loc2
         
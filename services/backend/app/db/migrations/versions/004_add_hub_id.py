@@ -0,0 +1,20 @@
+"""
+Hub Sharding Migration (Innovation 4: Fair Assignment per hub)
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '004'
+down_revision = '003'
+
+def upgrade():
+    op.add_column('drivers', sa.Column('hub_id', sa.String(50), nullable=True))
+    op.add_column('packages', sa.Column('hub_id', sa.String(50), nullable=True))
+    op.create_index('ix_drivers_hub_id', 'drivers', ['hub_id'])
+    op.create_index('ix_packages_hub_id', 'packages', ['hub_id'])
+
+def downgrade():
+    op.drop_index('ix_packages_hub_id', table_name='packages')
+    op.drop_index('ix_drivers_hub_id', table_name='drivers')
+    op.drop_column('packages', 'hub_id')
+    op.drop_column('drivers', 'hub_id')
@@ -0,0 +1,29 @@
+"""
+Daily Package Volume Migration (Innovation 2: Predictive Workload Forecasting)
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '005'
+down_revision = '004'
+
+def upgrade():
+    op.create_index('ix_packages_created_at', 'packages', ['created_at'])
+    op.create_table('daily_package_volume',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('volume_date', sa.Date(), nullable=False),
+        sa.Column('volume', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), onupdate=sa.func.now(), nullable=False),
+    )
+    op.create_index('ix_daily_package_volume_volume_date', 'daily_package_volume', ['volume_date'], unique=True)
+
+    # Backfill the full history; the volume_rollup job keeps the tail current
+    op.execute(
+        "INSERT INTO daily_package_volume (volume_date, volume) "
+        "SELECT DATE(created_at), COUNT(id) FROM packages GROUP BY DATE(created_at)"
+    )
+
+def downgrade():
+    op.drop_table('daily_package_volume')
+    op.drop_index('ix_packages_created_at', table_name='packages')
@@ -8,8 +8,10 @@ from app.db.models.swap import Swap
 from app.db.models.insurance_payout import InsurancePayout
 from app.db.models.gps_log import GPSLog
 from app.db.models.admin import Admin
+from app.db.models.package_volume import DailyPackageVolume
 
 __all__ = [
     'Driver', 'Package', 'Assignment', 'Delivery',
-    'HealthEvent', 'Swap', 'InsurancePayout', 'GPSLog', 'Admin'
+    'HealthEvent', 'Swap', 'InsurancePayout', 'GPSLog', 'Admin',
+    'DailyPackageVolume'
 ]
@@ -40,6 +40,9 @@ class Driver(BaseModel):
     is_active = Column(Boolean, default=True)
     is_available = Column(Boolean, default=True)
     
+    # Dispatch hub (assignment shard); NULL = default hub
+    hub_id = Column(String(50), nullable=True, index=True)
+    
     # Experience metrics
     experience_days = Column(Integer, default=0)
     total_deliveries = Column(Integer, default=0)
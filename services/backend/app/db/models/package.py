@@ -3,7 +3,7 @@ Package Model
 Packages to be delivered
 """
 
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Enum
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Enum, Index
 from sqlalchemy.orm import relationship
 import enum
 
@@ -25,6 +25,9 @@ class Package(BaseModel):
     Package database model
     """
     __tablename__ = "packages"
+    __table_args__ = (
+        Index("ix_packages_created_at", "created_at"),  # Daily volume rollup range scans
+    )
     
     # Package details
     tracking_number = Column(String(100), unique=True, nullable=False, index=True)
@@ -55,6 +58,9 @@ class Package(BaseModel):
     # Distance from hub (calculated)
     distance_from_hub_km = Column(Float, nullable=True)
     
+    # Dispatch hub (assignment shard); NULL = default hub
+    hub_id = Column(String(50), nullable=True, index=True)
+    
     # Relationships
     assignments = relationship("Assignment", back_populates="package", cascade="all, delete-orphan")
     
@@ -0,0 +1,24 @@
+"""
+Daily Package Volume Model
+Per-day package counts feeding the LSTM forecasts (Innovation 2)
+"""
+
+from sqlalchemy import Column, Integer, Date
+
+from app.db.base import BaseModel
+
+
+class DailyPackageVolume(BaseModel):
+    """
+    Materialized rollup of packages created per day
+    
+    Maintained by the volume_rollup job, so forecasts read O(days) rows
+    instead of grouping the packages table.
+    """
+    __tablename__ = "daily_package_volume"
+    
+    volume_date = Column(Date, unique=True, nullable=False, index=True)
+    volume = Column(Integer, nullable=False)
+    
+    def __repr__(self):
+        return f"<DailyPackageVolume(date={self.volume_date}, volume={self.volume})>"
@@ -3,12 +3,14 @@ Assignment Repository
 Data access for assignments
 """
 
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import date, datetime
-from sqlalchemy import select, and_
+from sqlalchemy import select, insert, update, case, func, and_, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
 from app.db.models.assignment import Assignment
+from app.db.models.package import Package
 from app.db.repositories.base_repo import BaseRepository
 
 
@@ -39,6 +41,16 @@ class AssignmentRepository(BaseRepository[Assignment]):
         )
         return list(result.scalars().all())
     
+    async def get_by_date(self, assignment_date: date = None) -> List[Assignment]:
+        """Get all assignments for a date"""
+        if assignment_date is None:
+            assignment_date = date.today()
+        
+        result = await self.session.execute(
+            select(Assignment).where(Assignment.assignment_date == assignment_date)
+        )
+        return list(result.scalars().all())
+    
     async def get_by_package(
         self,
         package_id: int,
@@ -77,11 +89,138 @@ class AssignmentRepository(BaseRepository[Assignment]):
         )
         return list(result.scalars().all())
     
-    async def bulk_create(self, assignments: List[dict]) -> List[Assignment]:
-        """Bulk create assignments"""
-        instances = [Assignment(**data) for data in assignments]
-        self.db.add_all(instances)
-        await self.db.flush()
-        for instance in instances:
-            await self.db.refresh(instance)
-        return instances
+    async def get_swap_index_rows(self, assignment_date: date = None) -> List[dict]:
+        """
+        Assigned packages of a day with location and difficulty
+        (one joined query; input for the swap spatial index)
+        """
+        if assignment_date is None:
+            assignment_date = date.today()
+        
+        result = await self.session.execute(
+            select(
+                Assignment.package_id,
+                Assignment.driver_id,
+                Assignment.predicted_difficulty,
+                Package.delivery_latitude,
+                Package.delivery_longitude,
+                Package.delivery_address
+            )
+            .join(Package, Package.id == Assignment.package_id)
+            .where(
+                Assignment.assignment_date == assignment_date,
+                Assignment.is_completed == False
+            )
+        )
+        return [
+            {
+                'id': row.package_id,
+                'driver_id': row.driver_id,
+                'difficulty_score': row.predicted_difficulty,
+                'latitude': row.delivery_latitude,
+                'longitude': row.delivery_longitude,
+                'address': row.delivery_address
+            }
+            for row in result.all()
+        ]
+    
+    async def get_assignment_counts_by_driver(self) -> Dict[int, int]:
+        """
+        All-time assignment count of every driver in one GROUP BY
+        
+        Returns:
+            Dict: driver_id -> number of assignments
+        """
+        result = await self.session.execute(
+            select(Assignment.driver_id, func.count(Assignment.id))
+            .group_by(Assignment.driver_id)
+        )
+        return dict(result.all())
+    
+    async def reassign_packages(
+        self,
+        assignment_date: date,
+        new_drivers: Dict[int, int],
+        expected_owners: Optional[Dict[int, int]] = None
+    ) -> int:
+        """
+        Move packages to new drivers in one UPDATE (no commit)
+        
+        Args:
+            assignment_date: Day of the assignments
+            new_drivers: package_id -> new driver_id
+            expected_owners: package_id -> driver_id the row must still
+                have; rows owned by someone else are left unchanged
+        
+        Returns:
+            int: Number of assignment rows updated
+        """
+        if not new_drivers:
+            return 0
+        
+        conditions = [
+            Assignment.assignment_date == assignment_date,
+            Assignment.package_id.in_(list(new_drivers))
+        ]
+        if expected_owners is not None:
+            conditions.append(Assignment.driver_id == case(expected_owners, value=Assignment.package_id))
+        
+        result = await self.session.execute(
+            update(Assignment)
+            .where(*conditions)
+            .values(driver_id=case(new_drivers, value=Assignment.package_id))
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+    
+    async def exchange_drivers(
+        self,
+        assignment_date: date,
+        package_a: int,
+        driver_a: int,
+        package_b: int,
+        driver_b: int
+    ) -> bool:
+        """
+        Exchange the drivers of two packages in one UPDATE (no commit)
+        
+        Rows only change while package_a still belongs to driver_a and
+        package_b to driver_b, so a swap that lost a race updates fewer
+        than two rows and must be rolled back by the caller.
+        
+        Returns:
+            bool: True if both rows were exchanged
+        """
+        result = await self.session.execute(
+            update(Assignment)
+            .where(
+                Assignment.assignment_date == assignment_date,
+                or_(
+                    and_(Assignment.package_id == package_a, Assignment.driver_id == driver_a),
+                    and_(Assignment.package_id == package_b, Assignment.driver_id == driver_b)
+                )
+            )
+            .values(driver_id=case({package_a: driver_b, package_b: driver_a}, value=Assignment.package_id))
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount == 2
+    
+    async def bulk_create(self, assignments: List[dict]) -> List[int]:
+        """
+        Bulk create assignments with multi-row INSERT ... RETURNING id
+        
+        Rows are sent in chunks of DB_BULK_CHUNK_SIZE; no ORM objects are
+        built and nothing is refreshed per row. Does not commit.
+        
+        Returns:
+            List[int]: New assignment IDs, in input order
+        """
+        ids: List[int] = []
+        chunk_size = settings.DB_BULK_CHUNK_SIZE
+        statement = insert(Assignment).returning(Assignment.id, sort_by_parameter_order=True)
+        
+        for start in range(0, len(assignments), chunk_size):
+            result = await self.session.execute(statement, assignments[start:start + chunk_size])
+            ids.extend(result.scalars().all())
+        
+        return ids
@@ -3,7 +3,7 @@ Driver Repository
 Data access for drivers
 """
 
-from typing import Optional, List
+from typing import Optional, List, Sequence
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -47,6 +47,23 @@ class DriverRepository(BaseRepository[Driver]):
         )
         return list(result.scalars().all())
     
+    async def get_by_ids(self, driver_ids: Sequence[int]) -> List[Driver]:
+        """Get drivers by ID in one query"""
+        if not driver_ids:
+            return []
+        result = await self.session.execute(
+            select(Driver).where(Driver.id.in_(list(driver_ids)))
+        )
+        return list(result.scalars().all())
+    
+    async def get_active_drivers_by_hub(self, hub_id: Optional[str]) -> List[Driver]:
+        """Get active drivers of one hub (None = drivers without a hub)"""
+        hub_filter = Driver.hub_id.is_(None) if hub_id is None else Driver.hub_id == hub_id
+        result = await self.session.execute(
+            select(Driver).where(Driver.is_active == True, hub_filter)
+        )
+        return list(result.scalars().all())
+    
     async def update_location(
         self,
         driver_id: int,
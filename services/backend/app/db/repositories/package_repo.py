@@ -0,0 +1,64 @@
+"""
+Package Repository
+Data access for packages
+"""
+
+from typing import List, Optional, Sequence
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.db.models.package import Package, PackageStatus
+from app.db.repositories.base_repo import BaseRepository
+
+
+class PackageRepository(BaseRepository[Package]):
+    """
+    Package-specific repository
+    """
+    
+    def __init__(self, db: AsyncSession):
+        super().__init__(Package, db)
+    
+    async def get_pending(self) -> List[Package]:
+        """Get all packages waiting for assignment"""
+        result = await self.session.execute(
+            select(Package).where(Package.status == PackageStatus.PENDING)
+        )
+        return list(result.scalars().all())
+    
+    async def get_pending_by_hub(self, hub_id: Optional[str]) -> List[Package]:
+        """Get packages of one hub waiting for assignment (None = packages without a hub)"""
+        hub_filter = Package.hub_id.is_(None) if hub_id is None else Package.hub_id == hub_id
+        result = await self.session.execute(
+            select(Package).where(Package.status == PackageStatus.PENDING, hub_filter)
+        )
+        return list(result.scalars().all())
+    
+    async def get_pending_hub_ids(self) -> List[Optional[str]]:
+        """Distinct hubs that have packages waiting for assignment"""
+        result = await self.session.execute(
+            select(Package.hub_id).where(Package.status == PackageStatus.PENDING).distinct()
+        )
+        return list(result.scalars().all())
+    
+    async def mark_assigned(self, package_ids: Sequence[int]) -> int:
+        """
+        Flip packages to ASSIGNED in set-based UPDATEs (no commit)
+        
+        Returns:
+            int: Number of packages updated
+        """
+        updated = 0
+        chunk_size = settings.DB_BULK_CHUNK_SIZE
+        
+        for start in range(0, len(package_ids), chunk_size):
+            result = await self.session.execute(
+                update(Package)
+                .where(Package.id.in_(package_ids[start:start + chunk_size]))
+                .values(status=PackageStatus.ASSIGNED)
+                .execution_options(synchronize_session=False)
+            )
+            updated += result.rowcount
+        
+        return updated
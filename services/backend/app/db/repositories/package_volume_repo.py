@@ -0,0 +1,91 @@
+"""
+Package Volume Repository
+Data access for the daily package volume rollup
+"""
+
+from typing import List, Optional
+from datetime import date, timedelta
+from sqlalchemy import select, insert, delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models.package import Package
+from app.db.models.package_volume import DailyPackageVolume
+from app.db.repositories.base_repo import BaseRepository
+
+
+class PackageVolumeRepository(BaseRepository[DailyPackageVolume]):
+    """
+    Daily package volume rollup
+    
+    Package.created_at is set by the database on insert, so new packages
+    only ever land on the latest day: refresh() recounts from the last
+    stored day onward instead of the whole table.
+    """
+    
+    def __init__(self, db: AsyncSession):
+        super().__init__(DailyPackageVolume, db)
+    
+    async def get_history(self, days: int = 60) -> List[int]:
+        """
+        Daily volumes of the last `days` days, oldest first
+        
+        Days without packages have no row and are skipped, as in a
+        GROUP BY over the packages table.
+        """
+        start_date = date.today() - timedelta(days=days)
+        result = await self.session.execute(
+            select(DailyPackageVolume.volume)
+            .where(DailyPackageVolume.volume_date >= start_date)
+            .order_by(DailyPackageVolume.volume_date)
+        )
+        return list(result.scalars().all())
+    
+    async def get_latest_date(self) -> Optional[date]:
+        """Most recent day in the rollup (None if empty)"""
+        result = await self.session.execute(select(func.max(DailyPackageVolume.volume_date)))
+        return result.scalar()
+    
+    async def rebuild(self, since: Optional[date] = None) -> int:
+        """
+        Recount days from `since` onward from packages (no commit)
+        
+        Args:
+            since: First day to recount (None = full backfill)
+        
+        Returns:
+            int: Number of days written
+        """
+        day = func.date(Package.created_at)
+        query = select(day.label('day'), func.count(Package.id).label('volume')).group_by(day)
+        clear = delete(DailyPackageVolume)
+        
+        if since is not None:
+            query = query.where(Package.created_at >= since)
+            clear = clear.where(DailyPackageVolume.volume_date >= since)
+        
+        rows = [
+            {
+                # SQLite returns DATE() as text
+                'volume_date': row.day if isinstance(row.day, date) else date.fromisoformat(row.day),
+                'volume': row.volume
+            }
+            for row in (await self.session.execute(query)).all()
+        ]
+        
+        await self.session.execute(clear)
+        if rows:
+            await self.session.execute(insert(DailyPackageVolume), rows)
+        
+        return len(rows)
+    
+    async def refresh(self) -> int:
+        """
+        Bring the rollup up to date (no commit)
+        
+        Recounts the latest stored day (it may have been partial) and any
+        newer ones; an empty rollup is backfilled in full.
+        
+        Returns:
+            int: Number of days written
+        """
+        return await self.rebuild(since=await self.get_latest_date())
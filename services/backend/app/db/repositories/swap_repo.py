@@ -3,10 +3,12 @@ Swap Repository
 Data access for swap proposals
 """
 
-from typing import List
-from sqlalchemy import select, and_, or_
+from typing import Dict, List, Optional, Tuple
+from datetime import date, datetime, time
+from sqlalchemy import select, update, case, and_, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.db.models.assignment import Assignment
 from app.db.models.swap import Swap, SwapStatus
 from app.db.repositories.base_repo import BaseRepository
 
@@ -45,3 +47,108 @@ class SwapRepository(BaseRepository[Swap]):
             ).order_by(Swap.compatibility_score.desc())
         )
         return list(result.scalars().all())
+    
+    async def lock_for_accept(
+        self,
+        swap_id: int,
+        assignment_date: date
+    ) -> Tuple[Optional[Swap], Dict[int, Assignment]]:
+        """
+        Lock a swap and both of its assignment rows in one round trip
+        
+        SELECT ... FOR UPDATE SKIP LOCKED: if a concurrent transaction
+        already holds the swap or either package, those rows are skipped
+        instead of waiting, so a busy swap comes back incomplete.
+        
+        Returns:
+            Tuple of (swap or None, package_id -> locked assignment)
+        """
+        result = await self.session.execute(
+            select(Swap, Assignment)
+            .join(
+                Assignment,
+                and_(
+                    Assignment.assignment_date == assignment_date,
+                    or_(
+                        Assignment.package_id == Swap.offered_package_id,
+                        Assignment.package_id == Swap.requested_package_id
+                    )
+                )
+            )
+            .where(Swap.id == swap_id)
+            .with_for_update(skip_locked=True)
+        )
+        rows = result.all()
+        
+        if not rows:
+            return None, {}
+        return rows[0][0], {assignment.package_id: assignment for _, assignment in rows}
+    
+    async def lock_for_clearing(
+        self,
+        swap_ids: List[int],
+        assignment_date: date
+    ) -> Dict[int, Tuple[Swap, Assignment]]:
+        """
+        Lock pending swaps and the assignments of their offered packages
+        
+        One SELECT ... FOR UPDATE SKIP LOCKED: swaps that are no longer
+        pending, or whose rows a concurrent accept already holds, are
+        missing from the result.
+        
+        Returns:
+            Dict: swap_id -> (swap, assignment of its offered package)
+        """
+        if not swap_ids:
+            return {}
+        
+        result = await self.session.execute(
+            select(Swap, Assignment)
+            .join(
+                Assignment,
+                and_(
+                    Assignment.assignment_date == assignment_date,
+                    Assignment.package_id == Swap.offered_package_id
+                )
+            )
+            .where(Swap.id.in_(swap_ids), Swap.status == SwapStatus.PENDING)
+            .with_for_update(skip_locked=True)
+        )
+        return {swap.id: (swap, assignment) for swap, assignment in result.all()}
+    
+    async def get_open_intents(self, proposed_on: date) -> List[Swap]:
+        """Pending swap proposals made on a day (oldest first)"""
+        result = await self.session.execute(
+            select(Swap).where(
+                and_(
+                    Swap.status == SwapStatus.PENDING,
+                    Swap.proposed_at >= datetime.combine(proposed_on, time.min)
+                )
+            ).order_by(Swap.proposed_at, Swap.id)
+        )
+        return list(result.scalars().all())
+    
+    async def complete_many(
+        self,
+        swap_ids: List[int],
+        distance_saved_km: Dict[int, float],
+        compatibility_scores: Dict[int, float]
+    ) -> int:
+        """Mark swaps COMPLETED in one UPDATE (no commit)"""
+        if not swap_ids:
+            return 0
+        
+        now = datetime.utcnow()
+        result = await self.session.execute(
+            update(Swap)
+            .where(Swap.id.in_(swap_ids), Swap.status == SwapStatus.PENDING)
+            .values(
+                status=SwapStatus.COMPLETED,
+                responded_at=now,
+                completed_at=now,
+                distance_saved_km=case(distance_saved_km, value=Swap.id),
+                compatibility_score=case(compatibility_scores, value=Swap.id)
+            )
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
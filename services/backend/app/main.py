@@ -52,6 +52,10 @@ async def lifespan(app: FastAPI):
         app.state.scheduler = scheduler
         logger.info("✅ Background scheduler started")
         
+        # 4. Start notification outbox consumers
+        from app.core.notification_outbox import start_outbox_consumer
+        await start_outbox_consumer()
+        
         logger.info("✅ Application startup complete!")
         
     except Exception as e:
@@ -69,6 +73,18 @@ async def lifespan(app: FastAPI):
             app.state.scheduler.shutdown()
             logger.info("✅ Scheduler stopped")
         
+        # Stop notification outbox consumers (queued messages stay in the outbox)
+        from app.core.notification_outbox import stop_outbox_consumer
+        await stop_outbox_consumer()
+        
+        # Stop difficulty scoring workers
+        from app.ml.difficulty_pool import shutdown_scoring_pool
+        shutdown_scoring_pool()
+        
+        # Stop zone solver workers
+        from app.core.fairness import shutdown_zone_executors
+        shutdown_zone_executors()
+        
         # Dispose database connections
         await engine.dispose()
         logger.info("✅ Database connections closed")
@@ -193,6 +209,19 @@ async def health_check():
     }
 
 
+# Metrics endpoint
+@app.get("/metrics", tags=["Health"])
+async def metrics():
+    """
+    Background delivery metrics (notification outbox depth, latency, failures)
+    """
+    from app.core.notification_outbox import get_outbox_metrics
+    
+    return {
+        "notifications": await get_outbox_metrics()
+    }
+
+
 # Root endpoint
 @app.get("/", tags=["Root"])
 async def root():
@@ -0,0 +1,123 @@
+"""
+Difficulty Cache
+Persistent (driver, package, model version) -> difficulty store (Innovation 1)
+"""
+
+import json
+import hashlib
+import numpy as np
+from typing import Dict, Optional, Sequence
+
+from app.config import settings
+from app.utils.redis import get_redis_client
+from app.utils.helpers import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def feature_hash(features: Dict) -> str:
+    """Stable short hash of a driver or package feature dict"""
+    payload = json.dumps(features, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()[:16]
+
+
+class DifficultyCache:
+    """
+    Redis-backed cache of predicted difficulty scores
+
+    Each driver gets one Redis hash per model version
+    (difficulty:<model_version>:<driver feature hash>) whose fields are
+    package feature hashes. Driver features barely change from day to day
+    and undelivered packages carry over, so the next day's run reuses most
+    scores. Every read or write refreshes the key's TTL: drivers that stop
+    being scored (or whose features changed) expire on their own, and a
+    new model version simply writes new keys, so no explicit invalidation
+    is needed.
+    """
+
+    KEY_PREFIX = "difficulty"
+
+    def __init__(self, redis_client, model_version: str, ttl: Optional[int] = None):
+        self.redis = redis_client
+        self.model_version = model_version
+        self.ttl = settings.DIFFICULTY_CACHE_TTL_SECONDS if ttl is None else ttl
+        self.chunk_size = settings.DIFFICULTY_CACHE_CHUNK_SIZE
+
+    @classmethod
+    async def connect(cls, model_version: Optional[str]) -> Optional["DifficultyCache"]:
+        """
+        Cache for a model version, or None if caching is disabled,
+        Redis is unavailable or no trained model is loaded
+        """
+        if not settings.DIFFICULTY_CACHE_ENABLED or model_version is None:
+            return None
+
+        redis_client = await get_redis_client()
+        if redis_client is None:
+            return None
+
+        return cls(redis_client, model_version)
+
+    def driver_key(self, driver_hash: str) -> str:
+        return f"{self.KEY_PREFIX}:{self.model_version}:{driver_hash}"
+
+    def _drivers_per_batch(self, num_fields: int) -> int:
+        """Drivers per pipeline round trip, keeping about chunk_size fields in flight"""
+        return max(1, self.chunk_size // max(num_fields, 1))
+
+    async def get_many(
+        self,
+        driver_hashes: Sequence[str],
+        package_hashes: Sequence[str]
+    ) -> np.ndarray:
+        """
+        Bulk lookup of a [drivers x packages] block
+
+        One HMGET per driver, pipelined; each driver's TTL is refreshed.
+
+        Returns:
+            np.ndarray: Cached difficulty per cell, NaN where missing
+        """
+        matrix = np.full((len(driver_hashes), len(package_hashes)), np.nan, dtype=np.float64)
+        if not package_hashes:
+            return matrix
+
+        fields = list(package_hashes)
+        batch = self._drivers_per_batch(len(fields))
+
+        for start in range(0, len(driver_hashes), batch):
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for driver_hash in driver_hashes[start:start + batch]:
+                    key = self.driver_key(driver_hash)
+                    pipe.hmget(key, fields)
+                    pipe.expire(key, self.ttl)
+                rows = (await pipe.execute())[::2]
+
+            for offset, row in enumerate(rows):
+                matrix[start + offset] = [np.nan if v is None else float(v) for v in row]
+
+        return matrix
+
+    async def set_many(
+        self,
+        driver_hashes: Sequence[str],
+        package_hashes: Sequence[str],
+        driver_indices: np.ndarray,
+        package_indices: np.ndarray,
+        values: np.ndarray
+    ):
+        """Store difficulty for the given (driver index, package index) cells"""
+        by_driver: Dict[str, Dict[str, str]] = {}
+        for i, j, v in zip(driver_indices.tolist(), package_indices.tolist(), values.tolist()):
+            by_driver.setdefault(driver_hashes[i], {})[package_hashes[j]] = f"{v:.6g}"
+
+        items = list(by_driver.items())
+        batch = self._drivers_per_batch(len(package_hashes))
+
+        for start in range(0, len(items), batch):
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for driver_hash, mapping in items[start:start + batch]:
+                    key = self.driver_key(driver_hash)
+                    pipe.hset(key, mapping=mapping)
+                    pipe.expire(key, self.ttl)
+                await pipe.execute()
@@ -0,0 +1,201 @@
+"""
+Difficulty Scoring Pool
+Multi-process XGBoost scoring into a shared-memory matrix (Innovation 1)
+"""
+
+import os
+import asyncio
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from app.ml.model_loader import ModelLoader
+
+from app.config import settings
+from app.utils.helpers import setup_logger
+
+logger = setup_logger(__name__)
+
+# Per-worker scoring service, created once by the pool initializer
+_worker_service = None
+
+
+class _WorkerModels:
+    """Model-loader stand-in holding the artifacts shipped to a worker"""
+
+    def __init__(self, model, scaler, model_version: Optional[str]):
+        self.model = model
+        self.scaler = scaler
+        self.xgboost_version = model_version
+
+    def get_xgboost_model(self):
+        return self.model
+
+    def get_scaler(self):
+        return self.scaler
+
+
+def _pin_threads(model, threads: int):
+    """Cap XGBoost's own thread pool so workers do not oversubscribe the cores"""
+    if hasattr(model, "set_params"):  # scikit-learn wrapper (XGBRegressor)
+        model.set_params(n_jobs=threads)
+    elif hasattr(model, "set_param"):  # raw Booster
+        model.set_param({'nthread': threads})
+
+
+def _init_worker(model, scaler, model_version: Optional[str], threads: int):
+    """Pool initializer: pin the model's threads and build the worker's XGBoostService once"""
+    global _worker_service
+    from app.ml.xgboost_service import XGBoostService
+
+    _pin_threads(model, threads)
+    _worker_service = XGBoostService(_WorkerModels(model, scaler, model_version))
+
+
+def _score_block(job: Dict) -> Tuple[int, int]:
+    """
+    Score one driver block and write it straight into the shared matrix
+
+    Returns:
+        Tuple of (first driver index, end driver index)
+    """
+    start, end = job['start'], job['end']
+    block = shared_memory.SharedMemory(name=job['shm_name'])
+    try:
+        out = np.ndarray(job['shape'], dtype=np.float64, buffer=block.buf)
+
+        features = _worker_service._pair_features(job['drivers'], job['packages'])
+        features_scaled = _worker_service.scaler.transform(features)
+        del features
+
+        predictions = np.asarray(_worker_service.model.predict(features_scaled))
+        out[start:end] = np.clip(predictions.reshape(end - start, job['shape'][1]), 0, 100)
+        del out
+    finally:
+        block.close()
+
+    return start, end
+
+
+class DifficultyScoringPool:
+    """
+    Process pool that scores difficulty matrices off the event loop
+
+    Workers receive the XGBoost model and scaler once, at start-up. Each
+    task scores a block of drivers against every package and writes the
+    rows into a multiprocessing.shared_memory matrix, so only block
+    bounds travel back to the parent. Each worker's XGBoost is limited to
+    cores / workers threads (XGBOOST_THREADS_PER_WORKER overrides).
+    """
+
+    def __init__(self, model_loader: "ModelLoader", max_workers: Optional[int] = None):
+        self.model = model_loader.get_xgboost_model()
+        self.scaler = model_loader.get_scaler()
+        self.model_version = model_loader.xgboost_version
+        self.max_workers = max_workers or settings.XGBOOST_SCORING_WORKERS or os.cpu_count() or 1
+        self.threads_per_worker = (
+            settings.XGBOOST_THREADS_PER_WORKER or max(1, (os.cpu_count() or 1) // self.max_workers)
+        )
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            initializer=_init_worker,
+            initargs=(self.model, self.scaler, self.model_version, self.threads_per_worker)
+        )
+
+    async def predict_difficulty_batch(
+        self,
+        drivers: np.ndarray,
+        packages: np.ndarray,
+        chunk_rows: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        Awaitable batch scoring
+
+        Args:
+            drivers: [D x 4] driver attributes (XGBoostService._driver_attributes)
+            packages: [P x 5] package attributes (XGBoostService._package_attributes)
+            chunk_rows: Upper bound on feature rows per task (default XGBOOST_CHUNK_ROWS)
+
+        Returns:
+            np.ndarray: Difficulty matrix [drivers x packages]
+        """
+        if chunk_rows is None:
+            chunk_rows = settings.XGBOOST_CHUNK_ROWS
+
+        num_drivers, num_packages = len(drivers), len(packages)
+        if num_drivers == 0 or num_packages == 0:
+            return np.zeros((num_drivers, num_packages))
+
+        # At least a few tasks per worker for load balance, each within chunk_rows
+        drivers_per_block = max(1, min(
+            chunk_rows // num_packages,
+            -(-num_drivers // (self.max_workers * 4))
+        ))
+
+        shape = (num_drivers, num_packages)
+        block = shared_memory.SharedMemory(create=True, size=num_drivers * num_packages * 8)
+        try:
+            loop = asyncio.get_running_loop()
+            jobs = [
+                {
+                    'shm_name': block.name,
+                    'shape': shape,
+                    'start': start,
+                    'end': min(num_drivers, start + drivers_per_block),
+                    'drivers': drivers[start:start + drivers_per_block],
+                    'packages': packages
+                }
+                for start in range(0, num_drivers, drivers_per_block)
+            ]
+
+            await asyncio.gather(*[
+                loop.run_in_executor(self.executor, _score_block, job)
+                for job in jobs
+            ])
+
+            difficulty_matrix = np.ndarray(shape, dtype=np.float64, buffer=block.buf).copy()
+        finally:
+            block.close()
+            block.unlink()
+
+        logger.info(
+            f"Pool prediction completed: {num_drivers}x{num_packages} matrix, "
+            f"{len(jobs)} tasks on {self.max_workers} workers"
+        )
+
+        return difficulty_matrix
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+_pool: Optional[DifficultyScoringPool] = None
+
+
+def get_scoring_pool(model_loader: "ModelLoader") -> DifficultyScoringPool:
+    """
+    Shared scoring pool for the loaded model version
+    A model reload replaces the pool so workers never score with stale models
+    """
+    global _pool
+
+    if _pool is not None and _pool.model_version != model_loader.xgboost_version:
+        _pool.shutdown()
+        _pool = None
+
+    if _pool is None:
+        _pool = DifficultyScoringPool(model_loader)
+
+    return _pool
+
+
+def shutdown_scoring_pool():
+    """Stop the shared scoring pool (application shutdown)"""
+    global _pool
+
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
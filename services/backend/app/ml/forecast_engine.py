@@ -0,0 +1,78 @@
+"""
+Forecast Engine
+Whole-horizon LSTM inference in a single call (Innovation 2)
+"""
+
+import math
+import numpy as np
+
+try:
+    import tensorflow as tf
+    TENSORFLOW_AVAILABLE = True
+except ImportError:
+    TENSORFLOW_AVAILABLE = False
+
+from app.utils.helpers import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class KerasForecastEngine:
+    """
+    Multi-horizon forecasts from a Keras LSTM
+
+    A direct multi-output model (the last layer emits H days) answers the
+    whole horizon with one forward pass. A one-step model is unrolled
+    autoregressively inside the same tf.function: each step's prediction is
+    appended to the window in-graph, so a 30-day forecast is one compiled
+    call instead of 30 model.predict() round trips.
+    """
+
+    def __init__(self, model):
+        """
+        Args:
+            model: Keras model mapping (batch, sequence_length, 1) to
+                (batch, output_steps) scaled volumes
+        """
+        if not TENSORFLOW_AVAILABLE:
+            raise ImportError("TensorFlow is required for KerasForecastEngine")
+
+        self.model = model
+        self.sequence_length = int(model.input_shape[1])
+        self.output_steps = int(model.output_shape[-1])
+        self._rollout = tf.function(self._rollout_graph, reduce_retracing=True)
+
+    def _rollout_graph(self, window, calls):
+        shift = min(self.output_steps, self.sequence_length)
+        outputs = tf.TensorArray(tf.float32, size=calls)
+
+        for i in tf.range(calls):
+            prediction = self.model(window, training=False)
+            outputs = outputs.write(i, prediction)
+            window = tf.concat([window[:, shift:, :], prediction[:, -shift:, tf.newaxis]], axis=1)
+
+        # (calls, batch, output_steps) -> (batch, calls * output_steps)
+        stacked = tf.transpose(outputs.stack(), [1, 0, 2])
+        return tf.reshape(stacked, [tf.shape(window)[0], -1])
+
+    def forecast(self, window: np.ndarray, days: int) -> np.ndarray:
+        """
+        Forecast `days` scaled values after each input window
+
+        Args:
+            window: Scaled history, shape (sequence_length,) or (batch, sequence_length)
+            days: Forecast horizon
+
+        Returns:
+            np.ndarray: Scaled forecasts, shape (days,) or (batch, days)
+        """
+        window = np.asarray(window, dtype=np.float32)
+        batch = window.reshape(-1, self.sequence_length, 1)
+        calls = tf.constant(math.ceil(days / self.output_steps), dtype=tf.int32)
+
+        predictions = self._rollout(tf.constant(batch), calls).numpy()[:, :days]
+        return predictions[0] if window.ndim == 1 else predictions
+
+    def warmup(self, days: int = 30):
+        """Trace the rollout graph once so the first request does not pay for it"""
+        self.forecast(np.zeros(self.sequence_length, dtype=np.float32), days)
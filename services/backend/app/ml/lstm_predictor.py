@@ -22,7 +22,7 @@ class LSTMService:
     """
     
     def __init__(self, model_loader: "ModelLoader"):
-        self.model = model_loader.get_lstm_model()
+        self.engine = model_loader.get_forecast_engine()
         self.scaler = model_loader.get_scaler()
         self.sequence_length = 30  # 30 days of historical data
     
@@ -43,6 +43,9 @@ class LSTMService:
         Returns:
             List[Dict]: Daily forecasts with date and predicted volume
         """
+        if self.engine is None or self.scaler is None:
+            return self._generate_fallback_forecast(forecast_days)
+        
         try:
             # Prepare input sequence
             if len(historical_volumes) < self.sequence_length:
@@ -55,33 +58,22 @@ class LSTMService:
             input_sequence = historical_volumes[-self.sequence_length:]
             
             # Scale input
-            input_scaled = self.scaler.transform(np.array(input_sequence).reshape(-1, 1))
-            input_scaled = input_scaled.reshape(1, self.sequence_length, 1)
+            input_scaled = self.scaler.transform(np.array(input_sequence).reshape(-1, 1)).ravel()
             
-            # Generate forecasts
-            forecasts = []
-            current_sequence = input_scaled.copy()
+            # Whole horizon in one inference call
+            predictions = self.engine.forecast(input_scaled, forecast_days)
+            volumes = self.scaler.inverse_transform(predictions.reshape(-1, 1)).ravel()
             
-            for day in range(forecast_days):
-                # Predict next day
-                prediction = self.model.predict(current_sequence, verbose=0)
-                
-                # Inverse transform to get actual volume
-                predicted_volume = self.scaler.inverse_transform(prediction)[0][0]
-                predicted_volume = max(0, int(predicted_volume))  # Ensure non-negative integer
-                
-                # Store forecast
-                forecast_date = datetime.now().date() + timedelta(days=day + 1)
+            forecasts = []
+            today = datetime.now().date()
+            for day, predicted_volume in enumerate(volumes):
+                forecast_date = today + timedelta(days=day + 1)
                 forecasts.append({
                     'date': forecast_date.isoformat(),
-                    'predicted_volume': predicted_volume,
+                    'predicted_volume': max(0, int(predicted_volume)),  # Ensure non-negative integer
                     'day_of_week': forecast_date.strftime('%A'),
                     'confidence': self._calculate_confidence(day)
                 })
-                
-                # Update sequence for next prediction
-                current_sequence = np.roll(current_sequence, -1, axis=1)
-                current_sequence[0, -1, 0] = prediction[0][0]
             
             logger.info(f"Generated {forecast_days}-day volume forecast")
             
@@ -113,45 +105,145 @@ class LSTMService:
         Returns:
             Dict: Earnings forecast with daily breakdown
         """
+        return self.calculate_earnings_forecasts(
+            historical_volumes,
+            {0: driver_share},
+            payment_per_package,
+            forecast_days
+        )[0]
+    
+    def calculate_earnings_forecasts(
+        self,
+        historical_volumes: List[int],
+        driver_shares: Dict[int, float],
+        payment_per_package: float,
+        forecast_days: int = 30
+    ) -> Dict[int, Dict]:
+        """
+        Earnings forecasts for many drivers from one volume forecast
+        
+        The only per-driver input is the share of deliveries, so the LSTM
+        runs once and every driver's daily packages, earnings and weekly
+        totals come from one (drivers x days) array computation.
+        
+        Args:
+            historical_volumes: Historical daily volumes
+            driver_shares: driver_id -> share of total deliveries (0-1)
+            payment_per_package: Payment per package (₹)
+            forecast_days: Number of days to forecast
+        
+        Returns:
+            Dict: driver_id -> earnings forecast (see calculate_earnings_forecast)
+        """
         try:
-            # Get volume forecasts
             volume_forecasts = self.predict_volume_forecast(historical_volumes, forecast_days)
+            return self.earnings_from_volume_forecast(volume_forecasts, driver_shares, payment_per_package)
+        
+        except Exception as e:
+            logger.error(f"Earnings forecast failed: {str(e)}")
+            fallback = self._generate_fallback_earnings(forecast_days, payment_per_package)
+            return {driver_id: fallback for driver_id in driver_shares}
+    
+    def earnings_from_volume_forecast(
+        self,
+        volume_forecasts: List[Dict],
+        driver_shares: Dict[int, float],
+        payment_per_package: float
+    ) -> Dict[int, Dict]:
+        """
+        Vectorized earnings for every driver from an existing volume forecast
+        
+        Args:
+            volume_forecasts: Daily volume forecast (predict_volume_forecast)
+            driver_shares: driver_id -> share of total deliveries (0-1)
+            payment_per_package: Payment per package (₹)
+        
+        Returns:
+            Dict: driver_id -> earnings forecast
+        """
+        forecast_days = len(volume_forecasts)
+        driver_ids = list(driver_shares)
+        shares = np.array([driver_shares[d] for d in driver_ids], dtype=np.float64)
+        volumes = np.array([f['predicted_volume'] for f in volume_forecasts], dtype=np.float64)
+        
+        # (drivers, days); shares and volumes are non-negative, so floor == int()
+        packages = np.floor(np.outer(shares, volumes)).astype(np.int64)
+        earnings = packages * payment_per_package
+        totals = earnings.sum(axis=1)
+        
+        week_starts = np.arange(0, forecast_days, 7)
+        week_ends = np.minimum(week_starts + 6, forecast_days - 1)
+        weekly_earnings = np.add.reduceat(earnings, week_starts, axis=1)
+        weekly_packages = np.add.reduceat(packages, week_starts, axis=1)
+        
+        dates = [f['date'] for f in volume_forecasts]
+        confidences = [f['confidence'] for f in volume_forecasts]
+        
+        forecasts = {}
+        for row, driver_id in enumerate(driver_ids):
+            daily_earnings = [
+                {
+                    'date': day,
+                    'predicted_packages': count,
+                    'predicted_earnings': earning,
+                    'confidence': confidence
+                }
+                for day, count, earning, confidence in zip(
+                    dates, packages[row].tolist(), earnings[row].tolist(), confidences
+                )
+            ]
+            weekly = [
+                {
+                    'week_number': week + 1,
+                    'start_date': dates[start],
+                    'end_date': dates[end],
+                    'total_earnings': total,
+                    'total_packages': count,
+                    'days_in_week': end - start + 1
+                }
+                for week, (start, end, total, count) in enumerate(zip(
+                    week_starts.tolist(), week_ends.tolist(),
+                    weekly_earnings[row].tolist(), weekly_packages[row].tolist()
+                ))
+            ]
             
-            # Calculate earnings for each day
-            daily_earnings = []
-            total_earnings = 0
-            
-            for forecast in volume_forecasts:
-                predicted_volume = forecast['predicted_volume']
-                driver_packages = int(predicted_volume * driver_share)
-                daily_earning = driver_packages * payment_per_package
-                
-                daily_earnings.append({
-                    'date': forecast['date'],
-                    'predicted_packages': driver_packages,
-                    'predicted_earnings': daily_earning,
-                    'confidence': forecast['confidence']
-                })
-                
-                total_earnings += daily_earning
-            
-            # Calculate weekly breakdown
-            weekly_earnings = self._calculate_weekly_breakdown(daily_earnings)
-            
-            logger.info(f"Earnings forecast: ₹{total_earnings:.2f} over {forecast_days} days")
-            
-            return {
+            forecasts[driver_id] = {
                 'forecast_period_days': forecast_days,
-                'total_predicted_earnings': total_earnings,
-                'average_daily_earnings': total_earnings / forecast_days,
+                'total_predicted_earnings': float(totals[row]),
+                'average_daily_earnings': float(totals[row]) / forecast_days,
                 'daily_breakdown': daily_earnings,
-                'weekly_breakdown': weekly_earnings,
+                'weekly_breakdown': weekly,
                 'payment_per_package': payment_per_package
             }
         
-        except Exception as e:
-            logger.error(f"Earnings forecast failed: {str(e)}")
-            return self._generate_fallback_earnings(forecast_days, payment_per_package)
+        logger.info(f"Earnings forecasts for {len(forecasts)} drivers over {forecast_days} days")
+        
+        return forecasts
+    
+    def truncate_earnings_forecast(self, forecast: Dict, days: int) -> Dict:
+        """
+        First `days` of a longer earnings forecast
+        
+        Daily entries do not depend on the horizon, so shorter forecasts are
+        a prefix of the materialized one with totals and weeks recomputed.
+        """
+        if days >= forecast['forecast_period_days']:
+            return forecast
+        
+        daily = forecast['daily_breakdown'][:days]
+        if daily:
+            total = float(sum(d['predicted_earnings'] for d in daily))
+        else:
+            total = forecast['average_daily_earnings'] * days
+        
+        return {
+            **forecast,
+            'forecast_period_days': days,
+            'total_predicted_earnings': total,
+            'average_daily_earnings': total / days if days else 0.0,
+            'daily_breakdown': daily,
+            'weekly_breakdown': self._calculate_weekly_breakdown(daily)
+        }
     
     def _calculate_confidence(self, day_offset: int) -> float:
         """
@@ -4,6 +4,7 @@ Loads and manages all ML models as singletons
 """
 
 import pickle
+import hashlib
 import os
 from pathlib import Path
 from typing import Optional
@@ -42,9 +43,13 @@ class ModelLoader:
         # Models
         self.xgboost_model = None
         self.lstm_model = None
+        self.lstm_engine = None
         self.health_model = None
         self.shap_explainer = None
         self.scaler = None
+        
+        # Content hash of the XGBoost model + scaler (keys the difficulty cache)
+        self.xgboost_version = None
     
     async def load_all_models(self):
         """
@@ -83,18 +88,7 @@ class ModelLoader:
                 logger.warning(f"⚠️ XGBoost model not found: {xgboost_path}")
             
             # Load LSTM model
-            lstm_path = self.models_path / settings.LSTM_MODEL_PATH
-            if lstm_path.exists():
-                try:
-                    from tensorflow import keras
-                    self.lstm_model = keras.models.load_model(lstm_path)
-                    logger.info(f"✅ Loaded LSTM model from {lstm_path}")
-                except ImportError:
-                    logger.warning("⚠️ TensorFlow not installed, LSTM model skipped")
-                except Exception as e:
-                    logger.warning(f"⚠️ Failed to load LSTM model: {e}")
-            else:
-                logger.warning(f"⚠️ LSTM model not found: {lstm_path}")
+            self._load_lstm()
             
             # Load Health model
             health_path = self.models_path / settings.HEALTH_MODEL_PATH
@@ -123,10 +117,62 @@ class ModelLoader:
             else:
                 logger.warning(f"⚠️ Scaler not found: {scaler_path}")
             
+            self.xgboost_version = self._artifact_version(xgboost_path, scaler_path)
+            
         except Exception as e:
             logger.error(f"Error loading models: {str(e)}")
             raise
     
+    def _load_lstm(self):
+        """
+        Load the forecasting LSTM
+        
+        The exported .npz runs on the NumPy runtime without importing
+        TensorFlow; the Keras .h5 is used when no export exists (or when
+        LSTM_RUNTIME=keras).
+        """
+        runtime = settings.LSTM_RUNTIME
+        weights_path = self.models_path / settings.LSTM_WEIGHTS_PATH
+        lstm_path = self.models_path / settings.LSTM_MODEL_PATH
+        
+        if runtime in ("auto", "numpy") and weights_path.exists():
+            from app.ml.numpy_lstm import NumpyLSTMEngine
+            try:
+                self.lstm_engine = NumpyLSTMEngine.load(weights_path)
+                logger.info(f"✅ Loaded LSTM weights from {weights_path} (NumPy runtime)")
+                return
+            except Exception as e:
+                logger.warning(f"⚠️ Failed to load LSTM weights: {e}")
+        
+        if runtime == "numpy":
+            logger.warning(f"⚠️ LSTM weights not found: {weights_path}")
+            return
+        
+        if lstm_path.exists():
+            try:
+                from tensorflow import keras
+                from app.ml.forecast_engine import KerasForecastEngine
+                self.lstm_model = keras.models.load_model(lstm_path)
+                self.lstm_engine = KerasForecastEngine(self.lstm_model)
+                self.lstm_engine.warmup()
+                logger.info(f"✅ Loaded LSTM model from {lstm_path}")
+            except ImportError:
+                logger.warning("⚠️ TensorFlow not installed, LSTM model skipped")
+            except Exception as e:
+                logger.warning(f"⚠️ Failed to load LSTM model: {e}")
+        else:
+            logger.warning(f"⚠️ LSTM model not found: {lstm_path}")
+    
+    def _artifact_version(self, *paths: Path) -> Optional[str]:
+        """Short content hash of the given model files (None if any is missing)"""
+        digest = hashlib.sha256()
+        for path in paths:
+            if not path.exists():
+                return None
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+        return digest.hexdigest()[:12]
+    
     def get_xgboost_model(self):
         """Get XGBoost model"""
         if self.xgboost_model is None:
@@ -139,6 +185,12 @@ class ModelLoader:
             logger.warning("LSTM model not loaded, using fallback")
         return self.lstm_model
     
+    def get_forecast_engine(self):
+        """Get whole-horizon LSTM forecast engine"""
+        if self.lstm_engine is None:
+            logger.warning("LSTM forecast engine not loaded, using fallback")
+        return self.lstm_engine
+    
     def get_health_model(self):
         """Get Health prediction model"""
         if self.health_model is None:
@@ -0,0 +1,200 @@
+"""
+NumPy LSTM Runtime
+TensorFlow-free inference for the forecasting LSTM (Innovation 2)
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, List, Union
+import numpy as np
+
+from app.utils.helpers import setup_logger
+
+logger = setup_logger(__name__)
+
+FORMAT_VERSION = 1
+
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0),
+    'tanh': np.tanh,
+    'sigmoid': lambda x: 0.5 * (np.tanh(0.5 * x) + 1)  # overflow-free logistic
+}
+
+SKIPPED_LAYERS = {'InputLayer', 'Dropout'}
+
+
+def export_keras_lstm(model, path: Union[str, Path]) -> Dict:
+    """
+    Write a Keras LSTM/Dense stack to a compact .npz
+
+    Supports Sequential stacks of LSTM (optionally return_sequences) and
+    Dense layers; Dropout and input layers are dropped.
+
+    Args:
+        model: Loaded Keras model
+        path: Output .npz path
+
+    Returns:
+        Dict: The layer spec stored next to the weights
+
+    Raises:
+        ValueError: If the model has a layer or option the runtime cannot run
+    """
+    layers, arrays = [], {}
+
+    for layer in model.layers:
+        kind = type(layer).__name__
+        if kind in SKIPPED_LAYERS:
+            continue
+
+        config = layer.get_config()
+        weights = layer.get_weights()
+        prefix = str(len(layers))
+
+        if kind == 'LSTM':
+            if config.get('go_backwards') or config.get('stateful'):
+                raise ValueError(f"Unsupported LSTM option in layer {layer.name}")
+            spec = {
+                'type': 'lstm',
+                'units': int(config['units']),
+                'activation': config['activation'],
+                'recurrent_activation': config['recurrent_activation'],
+                'return_sequences': bool(config.get('return_sequences', False))
+            }
+            kernel, recurrent_kernel = weights[0], weights[1]
+            bias = weights[2] if len(weights) > 2 else np.zeros(kernel.shape[1], dtype=kernel.dtype)
+            arrays.update({
+                f"{prefix}/kernel": kernel,
+                f"{prefix}/recurrent_kernel": recurrent_kernel,
+                f"{prefix}/bias": bias
+            })
+        elif kind == 'Dense':
+            spec = {'type': 'dense', 'activation': config['activation']}
+            kernel = weights[0]
+            bias = weights[1] if len(weights) > 1 else np.zeros(kernel.shape[1], dtype=kernel.dtype)
+            arrays.update({f"{prefix}/kernel": kernel, f"{prefix}/bias": bias})
+        else:
+            raise ValueError(f"Unsupported layer type: {kind}")
+
+        for name in ('activation', 'recurrent_activation'):
+            if name in spec and spec[name] not in ACTIVATIONS:
+                raise ValueError(f"Unsupported {name} '{spec[name]}' in layer {layer.name}")
+
+        layers.append(spec)
+
+    spec = {
+        'format': FORMAT_VERSION,
+        'sequence_length': int(model.input_shape[1]),
+        'layers': layers
+    }
+    np.savez_compressed(path, spec=np.array(json.dumps(spec)), **arrays)
+
+    return spec
+
+
+class NumpyLSTMEngine:
+    """
+    Pure-NumPy forward pass of an exported LSTM
+
+    Same forecasting interface as KerasForecastEngine, so API workers can
+    serve forecasts without importing TensorFlow. Gates follow the Keras
+    layout (input, forget, cell, output); the input projection of every
+    timestep is one matrix product, leaving only the recurrent product
+    inside the time loop.
+    """
+
+    def __init__(self, spec: Dict, weights: Dict[str, np.ndarray]):
+        if spec.get('format') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported LSTM export format: {spec.get('format')}")
+
+        self.spec = spec
+        self.sequence_length = int(spec['sequence_length'])
+        self.layers: List[Dict] = []
+
+        for i, layer in enumerate(spec['layers']):
+            params = {
+                name.split('/', 1)[1]: weights[name].astype(np.float32)
+                for name in weights if name.startswith(f"{i}/")
+            }
+            self.layers.append({**layer, **params})
+
+        self.output_steps = int(self.layers[-1]['kernel'].shape[1])
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "NumpyLSTMEngine":
+        """Load an .npz written by export_keras_lstm"""
+        with np.load(path, allow_pickle=False) as data:
+            spec = json.loads(str(data['spec']))
+            weights = {name: data[name] for name in data.files if name != 'spec'}
+        return cls(spec, weights)
+
+    def predict(self, inputs: np.ndarray) -> np.ndarray:
+        """
+        Forward pass
+
+        Args:
+            inputs: (batch, timesteps, features)
+
+        Returns:
+            np.ndarray: (batch, output_steps)
+        """
+        x = np.asarray(inputs, dtype=np.float32)
+
+        for layer in self.layers:
+            if layer['type'] == 'lstm':
+                x = self._lstm(x, layer)
+            else:
+                x = ACTIVATIONS[layer['activation']](x @ layer['kernel'] + layer['bias'])
+
+        return x
+
+    def _lstm(self, x: np.ndarray, layer: Dict) -> np.ndarray:
+        batch, timesteps, _ = x.shape
+        units = layer['units']
+        activation = ACTIVATIONS[layer['activation']]
+        recurrent_activation = ACTIVATIONS[layer['recurrent_activation']]
+
+        projected = x @ layer['kernel'] + layer['bias']  # (batch, timesteps, 4 * units)
+        h = np.zeros((batch, units), dtype=np.float32)
+        c = np.zeros((batch, units), dtype=np.float32)
+        sequence = np.empty((batch, timesteps, units), dtype=np.float32) if layer['return_sequences'] else None
+
+        recurrent_kernel = layer['recurrent_kernel']
+        for t in range(timesteps):
+            z = projected[:, t] + h @ recurrent_kernel
+            gates = recurrent_activation(z)  # i, f, o (the cell slice is recomputed below)
+            c = gates[:, units:2 * units] * c + gates[:, :units] * activation(z[:, 2 * units:3 * units])
+            h = gates[:, 3 * units:] * activation(c)
+            if sequence is not None:
+                sequence[:, t] = h
+
+        return sequence if sequence is not None else h
+
+    def forecast(self, window: np.ndarray, days: int) -> np.ndarray:
+        """
+        Forecast `days` scaled values after each input window
+
+        Args:
+            window: Scaled history, shape (sequence_length,) or (batch, sequence_length)
+            days: Forecast horizon
+
+        Returns:
+            np.ndarray: Scaled forecasts, shape (days,) or (batch, days)
+        """
+        window = np.asarray(window, dtype=np.float32)
+        sequence = window.reshape(-1, self.sequence_length, 1)
+        shift = min(self.output_steps, self.sequence_length)
+
+        outputs = []
+        while len(outputs) * self.output_steps < days:
+            prediction = self.predict(sequence)
+            outputs.append(prediction)
+            sequence = np.concatenate([sequence[:, shift:], prediction[:, -shift:, np.newaxis]], axis=1)
+
+        predictions = np.concatenate(outputs, axis=1)[:, :days]
+        return predictions[0] if window.ndim == 1 else predictions
+
+    def warmup(self, days: int = 30):
+        """Nothing to compile; kept for interface parity with KerasForecastEngine"""
+        self.forecast(np.zeros(self.sequence_length, dtype=np.float32), days)
@@ -3,13 +3,18 @@ XGBoost Service - Innovation 1
 Personalized Difficulty Scoring
 """
 
+import time
+import asyncio
+import tempfile
 import numpy as np
-from typing import Dict, List, TYPE_CHECKING
+from typing import Dict, Iterator, List, Optional, Tuple, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from app.ml.model_loader import ModelLoader
 
-from app.utils.helpers import setup_logger
+from app.config import settings
+from app.ml.difficulty_cache import DifficultyCache, feature_hash
+from app.utils.helpers import setup_logger, current_memory_mb
 
 logger = setup_logger(__name__)
 
@@ -21,8 +26,11 @@ class XGBoostService:
     """
     
     def __init__(self, model_loader: "ModelLoader"):
+        self.model_loader = model_loader
         self.model = model_loader.get_xgboost_model()
         self.scaler = model_loader.get_scaler()
+        self.model_version = model_loader.xgboost_version
+        self.last_run_stats = {}
     
     def predict_difficulty(
         self,
@@ -87,37 +95,254 @@ class XGBoostService:
             np.ndarray: Difficulty matrix [drivers x packages]
         """
         try:
-            num_drivers = len(driver_features_list)
-            num_packages = len(package_features_list)
-            
-            difficulty_matrix = np.zeros((num_drivers, num_packages))
-            
-            # Build all feature vectors
-            all_features = []
-            for driver_features in driver_features_list:
-                for package_features in package_features_list:
-                    features = self._build_feature_vector(driver_features, package_features)
-                    all_features.append(features)
-            
-            # Scale and predict in batch
-            all_features_scaled = self.scaler.transform(all_features)
-            predictions = self.model.predict(all_features_scaled)
-            
-            # Reshape to matrix
-            difficulty_matrix = predictions.reshape(num_drivers, num_packages)
-            
-            # Clamp values
-            difficulty_matrix = np.clip(difficulty_matrix, 0, 100)
-            
-            logger.info(f"Batch prediction completed: {num_drivers}x{num_packages} matrix")
-            
-            return difficulty_matrix
+            return self._predict_matrix(driver_features_list, package_features_list)
         
         except Exception as e:
             logger.error(f"Batch prediction failed: {str(e)}")
             # Return neutral difficulty matrix
             return np.ones((len(driver_features_list), len(package_features_list))) * 50.0
     
+    async def predict_difficulty_batch_async(
+        self,
+        driver_features_list: List[Dict],
+        package_features_list: List[Dict]
+    ) -> np.ndarray:
+        """
+        Awaitable predict_difficulty_batch that never blocks the event loop
+        
+        Scoring runs in the shared process pool (see difficulty_pool), or in
+        a thread when the pool is disabled or the matrix needs a memmap.
+        
+        Returns:
+            np.ndarray: Difficulty matrix [drivers x packages]
+        """
+        try:
+            return await self._predict_matrix_async(driver_features_list, package_features_list)
+        
+        except Exception as e:
+            logger.error(f"Batch prediction failed: {str(e)}")
+            # Return neutral difficulty matrix
+            return np.ones((len(driver_features_list), len(package_features_list))) * 50.0
+    
+    async def _predict_matrix_async(
+        self,
+        driver_features_list: List[Dict],
+        package_features_list: List[Dict]
+    ) -> np.ndarray:
+        """Off-loop _predict_matrix; raises if the model is unavailable"""
+        if self.model is None or self.scaler is None:
+            raise ValueError("XGBoost model or scaler not loaded")
+        
+        size_mb = len(driver_features_list) * len(package_features_list) * 8 / (1024 * 1024)
+        
+        if settings.XGBOOST_SCORING_WORKERS == 0 or size_mb > settings.XGBOOST_MEMMAP_THRESHOLD_MB:
+            return await asyncio.to_thread(self._predict_matrix, driver_features_list, package_features_list)
+        
+        from app.ml.difficulty_pool import get_scoring_pool
+        
+        pool = get_scoring_pool(self.model_loader)
+        return await pool.predict_difficulty_batch(
+            self._driver_attributes(driver_features_list),
+            self._package_attributes(package_features_list)
+        )
+    
+    async def predict_difficulty_batch_cached(
+        self,
+        driver_features_list: List[Dict],
+        package_features_list: List[Dict],
+        cache: Optional[DifficultyCache] = None
+    ) -> np.ndarray:
+        """
+        Batch prediction that only scores cells missing from the difficulty cache
+        
+        Cells are keyed by (driver feature hash, package feature hash, model
+        version). Missing cells are scored in one batch over the rows and
+        columns that contain them, and written back. Neutral fallback scores
+        are never cached.
+        
+        Args:
+            driver_features_list: List of driver feature dicts
+            package_features_list: List of package feature dicts
+            cache: Difficulty cache (connected for this model version if omitted)
+        
+        Returns:
+            np.ndarray: Difficulty matrix [drivers x packages]
+        """
+        if cache is None:
+            cache = await DifficultyCache.connect(self.model_version)
+        
+        if cache is None:
+            return await self.predict_difficulty_batch_async(driver_features_list, package_features_list)
+        
+        driver_hashes = [feature_hash(f) for f in driver_features_list]
+        package_hashes = [feature_hash(f) for f in package_features_list]
+        
+        try:
+            difficulty_matrix = await cache.get_many(driver_hashes, package_hashes)
+        except Exception as e:
+            logger.warning(f"Difficulty cache lookup failed: {str(e)}")
+            return await self.predict_difficulty_batch_async(driver_features_list, package_features_list)
+        
+        missing = np.isnan(difficulty_matrix)
+        hits = difficulty_matrix.size - int(missing.sum())
+        logger.info(f"Difficulty cache: {hits}/{difficulty_matrix.size} cells hit")
+        
+        if not missing.any():
+            return difficulty_matrix
+        
+        rows = np.flatnonzero(missing.any(axis=1))
+        cols = np.flatnonzero(missing.any(axis=0))
+        
+        try:
+            block = await self._predict_matrix_async(
+                [driver_features_list[i] for i in rows],
+                [package_features_list[j] for j in cols]
+            )
+        except Exception as e:
+            logger.error(f"Batch prediction failed: {str(e)}")
+            difficulty_matrix[missing] = 50.0
+            return difficulty_matrix
+        
+        difficulty_matrix[np.ix_(rows, cols)] = block
+        
+        try:
+            driver_indices, package_indices = np.nonzero(missing)
+            await cache.set_many(
+                driver_hashes,
+                package_hashes,
+                driver_indices,
+                package_indices,
+                difficulty_matrix[driver_indices, package_indices]
+            )
+        except Exception as e:
+            logger.warning(f"Difficulty cache write failed: {str(e)}")
+        
+        return difficulty_matrix
+    
+    def _predict_matrix(
+        self,
+        driver_features_list: List[Dict],
+        package_features_list: List[Dict]
+    ) -> np.ndarray:
+        """Score every driver-package pair; raises if the model is unavailable"""
+        return self.predict_difficulty_streaming(driver_features_list, package_features_list)
+    
+    def iter_difficulty_blocks(
+        self,
+        driver_features_list: List[Dict],
+        package_features_list: List[Dict],
+        chunk_rows: Optional[int] = None
+    ) -> Iterator[Tuple[int, int, np.ndarray]]:
+        """
+        Generator over the difficulty matrix in fixed-size row blocks
+        
+        Each block covers as many whole drivers as fit in chunk_rows
+        feature rows, so only one block of features (and its scaled copy)
+        is alive at a time.
+        
+        Args:
+            driver_features_list: List of driver feature dicts
+            package_features_list: List of package feature dicts
+            chunk_rows: Feature rows per block (default XGBOOST_CHUNK_ROWS)
+        
+        Yields:
+            Tuple of (first driver index, end driver index, clipped difficulty block [k x P])
+        """
+        if chunk_rows is None:
+            chunk_rows = settings.XGBOOST_CHUNK_ROWS
+        
+        drivers = self._driver_attributes(driver_features_list)
+        packages = self._package_attributes(package_features_list)
+        num_drivers, num_packages = len(drivers), len(packages)
+        
+        drivers_per_block = max(1, chunk_rows // max(num_packages, 1))
+        
+        for start in range(0, num_drivers, drivers_per_block):
+            end = min(num_drivers, start + drivers_per_block)
+            
+            features = self._pair_features(drivers[start:end], packages)
+            features_scaled = self.scaler.transform(features)
+            del features
+            
+            predictions = np.asarray(self.model.predict(features_scaled)).reshape(end - start, num_packages)
+            yield start, end, np.clip(predictions, 0, 100)
+    
+    def predict_difficulty_streaming(
+        self,
+        driver_features_list: List[Dict],
+        package_features_list: List[Dict],
+        chunk_rows: Optional[int] = None,
+        out: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Memory-bounded batch prediction into a preallocated matrix
+        
+        The output is allocated once (a disk-backed np.memmap when it would
+        exceed XGBOOST_MEMMAP_THRESHOLD_MB) and filled block by block from
+        iter_difficulty_blocks. Run statistics, including the resident
+        memory sampled after every block and its growth over this call, are
+        kept in last_run_stats.
+        
+        Args:
+            driver_features_list: List of driver feature dicts
+            package_features_list: List of package feature dicts
+            chunk_rows: Feature rows per block (default XGBOOST_CHUNK_ROWS)
+            out: Preallocated [drivers x packages] output, optional
+        
+        Returns:
+            np.ndarray: Difficulty matrix [drivers x packages] (possibly a memmap)
+        """
+        started = time.perf_counter()
+        memory_before = current_memory_mb()
+        memory_peak = memory_before
+        
+        num_drivers = len(driver_features_list)
+        num_packages = len(package_features_list)
+        
+        if out is None:
+            out = self._allocate_output(num_drivers, num_packages)
+        
+        blocks = 0
+        for start, end, block in self.iter_difficulty_blocks(
+            driver_features_list, package_features_list, chunk_rows
+        ):
+            out[start:end] = block
+            blocks += 1
+            memory_peak = max(memory_peak, current_memory_mb())
+        
+        if isinstance(out, np.memmap):
+            out.flush()
+        
+        self.last_run_stats = {
+            'drivers': num_drivers,
+            'packages': num_packages,
+            'blocks': blocks,
+            'memmap': isinstance(out, np.memmap),
+            'seconds': time.perf_counter() - started,
+            'peak_memory_mb': memory_peak,
+            'memory_growth_mb': memory_peak - memory_before
+        }
+        
+        logger.info(
+            f"Batch prediction completed: {num_drivers}x{num_packages} matrix in {blocks} blocks, "
+            f"{self.last_run_stats['seconds']:.2f}s, peak memory {memory_peak:.0f} MB (+{memory_peak - memory_before:.0f} MB)"
+            + (" (memmap)" if self.last_run_stats['memmap'] else "")
+        )
+        
+        return out
+    
+    def _allocate_output(self, num_drivers: int, num_packages: int) -> np.ndarray:
+        """In-memory matrix, or an anonymous disk-backed memmap above the RAM threshold"""
+        size_mb = num_drivers * num_packages * np.dtype(np.float64).itemsize / (1024 * 1024)
+        
+        if size_mb <= settings.XGBOOST_MEMMAP_THRESHOLD_MB or num_drivers * num_packages == 0:
+            return np.empty((num_drivers, num_packages), dtype=np.float64)
+        
+        logger.info(f"Difficulty matrix needs {size_mb:.0f} MB - writing to memmap")
+        # The file is unlinked on creation; the mapping keeps it alive until released
+        backing = tempfile.TemporaryFile(dir=settings.XGBOOST_MEMMAP_DIR)
+        return np.memmap(backing, dtype=np.float64, mode="w+", shape=(num_drivers, num_packages))
+    
     def _build_feature_vector(
         self,
         driver_features: Dict,
@@ -182,3 +407,97 @@ class XGBoostService:
         ]
         
         return features
+    
+    def _build_feature_matrix(
+        self,
+        driver_features_list: List[Dict],
+        package_features_list: List[Dict]
+    ) -> np.ndarray:
+        """
+        Vectorized _build_feature_vector for every driver-package pair
+        
+        Returns:
+            np.ndarray: C-contiguous float32 matrix [D*P x 15], driver-major
+                (row i*P + j is driver i with package j)
+        """
+        return self._pair_features(
+            self._driver_attributes(driver_features_list),
+            self._package_attributes(package_features_list)
+        )
+    
+    def _driver_attributes(self, driver_features_list: List[Dict]) -> np.ndarray:
+        """[D x 4] experience, avg time, success rate, capacity (scalar-path defaults)"""
+        return np.array(
+            [
+                [
+                    _value(d, 'experience_days', 0),
+                    _value(d, 'avg_delivery_time', 30),
+                    _value(d, 'success_rate', 0.9),
+                    _value(d, 'vehicle_capacity', 50)
+                ]
+                for d in driver_features_list
+            ],
+            dtype=np.float64
+        ).reshape(-1, 4)
+    
+    def _package_attributes(self, package_features_list: List[Dict]) -> np.ndarray:
+        """[P x 5] weight, distance, floor, fragile, time window (scalar-path defaults)"""
+        return np.array(
+            [
+                [
+                    _value(p, 'weight', 5),
+                    _value(p, 'distance', 10),
+                    _value(p, 'floor_number', 0),
+                    1 if p.get('is_fragile', False) else 0,
+                    _value(p, 'time_window_hours', 4)
+                ]
+                for p in package_features_list
+            ],
+            dtype=np.float64
+        ).reshape(-1, 5)
+    
+    def _pair_features(self, drivers: np.ndarray, packages: np.ndarray) -> np.ndarray:
+        """
+        Build the 15 features for every (driver row, package row) pair by broadcasting
+        
+        Args:
+            drivers: [D x 4] from _driver_attributes
+            packages: [P x 5] from _package_attributes
+        
+        Returns:
+            np.ndarray: C-contiguous float32 matrix [D*P x 15], driver-major
+        """
+        num_drivers, num_packages = len(drivers), len(packages)
+        
+        # Driver attributes [D x 1], package attributes [1 x P]
+        experience, avg_time, success_rate, capacity = (drivers[:, k, np.newaxis] for k in range(4))
+        weight, distance, floor, fragile, time_window = (packages[np.newaxis, :, k] for k in range(5))
+        
+        floor_factor = np.maximum(floor, 1)
+        
+        features = np.empty((num_drivers, num_packages, 15), dtype=np.float32)
+        features[:, :, 0] = experience
+        features[:, :, 1] = avg_time
+        features[:, :, 2] = success_rate
+        features[:, :, 3] = capacity
+        features[:, :, 4] = weight
+        features[:, :, 5] = distance
+        features[:, :, 6] = floor
+        features[:, :, 7] = fragile
+        features[:, :, 8] = time_window
+        
+        # Derived features
+        features[:, :, 9] = weight / np.maximum(capacity, 1)
+        features[:, :, 10] = experience / np.maximum(distance, 1)
+        features[:, :, 11] = success_rate * weight
+        features[:, :, 12] = distance * floor_factor
+        features[:, :, 13] = 1 / np.maximum(time_window, 1)
+        features[:, :, 14] = (weight * distance * floor_factor) / (experience + 1)
+        
+        return features.reshape(num_drivers * num_packages, 15)
+
+
+def _value(features: Dict, key: str, default: float) -> float:
+    """Feature value, or the default when missing or None"""
+    value = features.get(key)
+    return default if value is None else value
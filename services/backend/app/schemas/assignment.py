@@ -48,3 +48,21 @@ class SHAPExplanationResponse(BaseModel):
     top_positive_factors: List[Dict]
     top_negative_factors: List[Dict]
     explanation_text: str
+
+
+class ReoptimizeRequest(BaseModel):
+    """Mid-day re-optimization request (Innovation 4)"""
+    new_package_ids: Optional[List[int]] = None  # None = pending packages not yet assigned today
+    removed_driver_ids: List[int] = Field(default_factory=list)
+    neighborhood_size: Optional[int] = Field(default=None, ge=1)
+
+
+class ReoptimizeResponse(BaseModel):
+    """Mid-day re-optimization result"""
+    neighborhood_drivers: int
+    neighborhood_packages: int
+    moved_packages: int
+    created_assignments: int
+    solver: str
+    status: str
+    solve_seconds: float
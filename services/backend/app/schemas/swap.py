@@ -33,3 +33,15 @@ class SwapResponse(BaseModel):
 class SwapAcceptRequest(BaseModel):
     """Swap accept request"""
     notes: Optional[str] = Field(None, max_length=200)
+
+
+class SwapCandidateResponse(BaseModel):
+    """Compatible swap opportunity for an offered package"""
+    offered_package_id: Optional[int] = None
+    driver_id: int
+    driver_name: str
+    package_id: int
+    package_address: Optional[str]
+    compatibility_score: float
+    distance_saved: float
+    difficulty_difference: float
@@ -3,8 +3,8 @@ Assignment Service
 Business logic for assignments (Innovations 1, 4, 5)
 """
 
-from typing import List, Dict
-from datetime import date
+from typing import List, Dict, Optional, Sequence
+from datetime import date, datetime
 from sqlalchemy.ext.asyncio import AsyncSession
 import json
 
@@ -13,6 +13,9 @@ from app.db.models.assignment import Assignment
 from app.ml.model_loader import ModelLoader
 from app.ml.xgboost_service import XGBoostService
 from app.ml.shap_explainer import SHAPService
+from app.core.fairness import FairnessOptimizer
+from app.core.swap_index import drop_swap_index, bump_swap_index_version
+from app.core.swap_candidates import drop_candidate_cache
 from app.utils.helpers import setup_logger
 
 logger = setup_logger(__name__)
@@ -143,3 +146,160 @@ class AssignmentService:
     ) -> List[Assignment]:
         """Get assignment history"""
         return await self.assignment_repo.get_history(driver_id, days)
+    
+    async def reoptimize_assignments(
+        self,
+        model_loader: ModelLoader,
+        new_package_ids: Optional[List[int]] = None,
+        removed_driver_ids: Sequence[int] = (),
+        neighborhood_size: Optional[int] = None
+    ) -> Dict:
+        """
+        **INNOVATION 4: Incremental mid-day re-optimization**
+        
+        Inserts late and orphaned packages into the least loaded drivers'
+        neighborhood and evens it out with a capped number of exchanges
+        (FairnessOptimizer.reoptimize_assignments); every other assignment
+        row is left untouched.
+        
+        Args:
+            model_loader: ML model loader
+            new_package_ids: Late packages (default: pending packages not assigned today)
+            removed_driver_ids: Drivers that dropped out (inactive drivers are added)
+            neighborhood_size: Minimum number of drivers in the neighborhood
+        
+        Returns:
+            Dict: Re-optimization summary
+        """
+        from app.db.repositories.driver_repo import DriverRepository
+        from app.db.repositories.package_repo import PackageRepository
+        from app.db.models.package import Package, PackageStatus
+        from sqlalchemy import select
+        
+        today = date.today()
+        rows = await self.assignment_repo.get_by_date(today)
+        rows_by_package = {row.package_id: row for row in rows}
+        
+        current_assignments: Dict[int, List[int]] = {}
+        package_difficulty = {}
+        for row in rows:
+            current_assignments.setdefault(row.driver_id, []).append(row.package_id)
+            package_difficulty[row.package_id] = row.predicted_difficulty
+        
+        driver_repo = DriverRepository(self.db)
+        drivers = await driver_repo.get_active_drivers()
+        drivers_by_id = {driver.id: driver for driver in drivers}
+        
+        removed = set(removed_driver_ids) | {
+            driver_id for driver_id in current_assignments if driver_id not in drivers_by_id
+        }
+        
+        if new_package_ids is None:
+            result = await self.db.execute(
+                select(Package.id).where(Package.status == PackageStatus.PENDING)
+            )
+            new_package_ids = [
+                package_id for package_id in result.scalars().all()
+                if package_id not in rows_by_package
+            ]
+        
+        optimizer = FairnessOptimizer()
+        neighborhood_drivers, neighborhood_packages = optimizer.select_reoptimization_neighborhood(
+            current_assignments=current_assignments,
+            package_difficulty=package_difficulty,
+            active_drivers=list(drivers_by_id),
+            new_packages=new_package_ids,
+            removed_drivers=list(removed),
+            neighborhood_size=neighborhood_size
+        )
+        
+        result = await self.db.execute(
+            select(Package).where(Package.id.in_(neighborhood_packages))
+        )
+        packages_by_id = {package.id: package for package in result.scalars().all()}
+        neighborhood_packages = [p for p in neighborhood_packages if p in packages_by_id]
+        
+        driver_features_list = [
+            {
+                'experience_days': drivers_by_id[driver_id].experience_days,
+                'avg_delivery_time': drivers_by_id[driver_id].avg_delivery_time_minutes,
+                'success_rate': drivers_by_id[driver_id].success_rate,
+                'vehicle_capacity': drivers_by_id[driver_id].vehicle_capacity_kg
+            }
+            for driver_id in neighborhood_drivers
+        ]
+        package_features_list = [
+            {
+                'weight': packages_by_id[package_id].weight_kg,
+                'distance': packages_by_id[package_id].distance_from_hub_km or 10.0,
+                'floor_number': packages_by_id[package_id].floor_number,
+                'is_fragile': packages_by_id[package_id].is_fragile,
+                'time_window_hours': 4
+            }
+            for package_id in neighborhood_packages
+        ]
+        
+        xgboost_service = XGBoostService(model_loader)
+        difficulty_matrix = await xgboost_service.predict_difficulty_batch_cached(
+            driver_features_list,
+            package_features_list
+        )
+        
+        assignments = optimizer.reoptimize_assignments(
+            current_assignments=current_assignments,
+            neighborhood_drivers=neighborhood_drivers,
+            neighborhood_packages=neighborhood_packages,
+            difficulty_matrix=difficulty_matrix,
+            removed_drivers=list(removed),
+            driver_capacities=[drivers_by_id[d].vehicle_capacity_kg or 50.0 for d in neighborhood_drivers],
+            package_weights=[packages_by_id[p].weight_kg for p in neighborhood_packages]
+        )
+        
+        # Persist only the neighborhood
+        driver_index = {driver_id: i for i, driver_id in enumerate(neighborhood_drivers)}
+        package_index = {package_id: j for j, package_id in enumerate(neighborhood_packages)}
+        now = datetime.utcnow()
+        created = 0
+        
+        for driver_id in neighborhood_drivers:
+            for package_id in assignments.get(driver_id, []):
+                difficulty = float(difficulty_matrix[driver_index[driver_id]][package_index[package_id]])
+                row = rows_by_package.get(package_id)
+                
+                if row is None:
+                    self.db.add(Assignment(
+                        driver_id=driver_id,
+                        package_id=package_id,
+                        assignment_date=today,
+                        predicted_difficulty=difficulty,
+                        assigned_at=now
+                    ))
+                    created += 1
+                elif row.driver_id != driver_id:
+                    row.driver_id = driver_id
+                    row.predicted_difficulty = difficulty
+                    row.assigned_at = now
+                    row.is_accepted = False
+                    row.accepted_at = None
+                    row.shap_explanation_json = None
+        
+        await self.db.flush()
+        await PackageRepository(self.db).mark_assigned(new_package_ids)
+        await self.db.commit()
+        
+        # Other processes rebuild their swap index from the committed owners
+        drop_swap_index(today)
+        await bump_swap_index_version(today)
+        await drop_candidate_cache(today)
+        
+        logger.info(f"Mid-day re-optimization: {optimizer.solve_info}")
+        
+        return {
+            'neighborhood_drivers': len(neighborhood_drivers),
+            'neighborhood_packages': len(neighborhood_packages),
+            'moved_packages': optimizer.solve_info.get('moved_packages', 0),
+            'created_assignments': created,
+            'solver': optimizer.solve_info.get('solver', 'greedy'),
+            'status': optimizer.solve_info.get('status', 'Fallback'),
+            'solve_seconds': optimizer.solve_info.get('solve_seconds', 0.0)
+        }
@@ -3,11 +3,15 @@ Forecast Service
 Business logic for volume and earnings forecasting (Innovations 2, 7)
 """
 
-from typing import List, Dict
+from typing import List, Dict, Optional
 from datetime import date
 from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
 import json
 
+from app.core.forecast_cache import ForecastCache, single_flight
+from app.db.repositories.assignment_repo import AssignmentRepository
+from app.db.repositories.package_volume_repo import PackageVolumeRepository
 from app.ml.model_loader import ModelLoader
 from app.ml.lstm_predictor import LSTMService
 from app.services.weather_service import WeatherService
@@ -16,6 +20,14 @@ from app.utils.helpers import setup_logger
 
 logger = setup_logger(__name__)
 
+EARNINGS_CACHE_TTL_SECONDS = 2 * 86400  # Survives until the next midnight refresh
+FORECAST_HORIZONS_KEY = "volume_forecast:horizons"  # Cached horizons beyond FORECAST_HORIZON_DAYS
+DEFAULT_EARNINGS_FIELD = "default"  # Drivers with no assignment history (zero share)
+
+
+def volume_cache_key(days: int) -> str:
+    return f"volume_forecast:{days}_days"
+
 
 class ForecastService:
     """Forecast service"""
@@ -24,30 +36,69 @@ class ForecastService:
         self.db = db
         self.redis = redis_client
     
-    async def get_cached_forecast(self, days: int) -> List[Dict]:
-        """Get cached forecast from Redis"""
-        if not self.redis:
-            return None
+    def _volume_cache(self) -> ForecastCache:
+        return ForecastCache(
+            self.redis,
+            fresh_ttl=settings.FORECAST_CACHE_TTL_SECONDS,
+            stale_ttl=settings.FORECAST_CACHE_STALE_SECONDS,
+            lock_ttl=settings.FORECAST_CACHE_LOCK_SECONDS
+        )
+    
+    async def get_volume_forecast(
+        self,
+        days: int,
+        model_loader: ModelLoader
+    ) -> List[Dict]:
+        """
+        **INNOVATION 2: Cached volume forecast**
         
-        cache_key = f"volume_forecast:{days}_days"
-        cached = await self.redis.get(cache_key)
+        Any horizon up to FORECAST_HORIZON_DAYS is a prefix of the one
+        cached forecast. Longer horizons get their own entry, which the
+        midnight refresh then keeps current too.
+        """
+        horizon = max(days, settings.FORECAST_HORIZON_DAYS)
+        if self.redis and horizon > settings.FORECAST_HORIZON_DAYS:
+            # Horizons nobody asked for within an entry's lifetime drop out of the refresh
+            await self.redis.sadd(FORECAST_HORIZONS_KEY, horizon)
+            await self.redis.expire(
+                FORECAST_HORIZONS_KEY,
+                settings.FORECAST_CACHE_TTL_SECONDS + settings.FORECAST_CACHE_STALE_SECONDS
+            )
+        
+        forecast = await self._volume_cache().get(
+            volume_cache_key(horizon),
+            lambda: self._load_volume_forecast(horizon, model_loader)
+        )
+        return forecast[:days]
+    
+    async def get_forecast_horizons(self) -> List[int]:
+        """Horizons with a cached volume forecast, longest last"""
+        horizons = {settings.FORECAST_HORIZON_DAYS}
+        if self.redis:
+            horizons.update(int(h) for h in await self.redis.smembers(FORECAST_HORIZONS_KEY))
+        return sorted(horizons)
+    
+    async def refresh_volume_forecasts(self, forecast: List[Dict], horizons: List[int]):
+        """
+        Store a fresh forecast for every cached horizon
         
-        if cached:
-            return json.loads(cached)
+        Args:
+            forecast: Unadjusted LSTM forecast covering the longest horizon
+            horizons: Horizons to store (get_forecast_horizons)
+        """
+        forecast = await self.apply_weather_impact(forecast)
+        cache = self._volume_cache()
         
-        return None
+        for horizon in horizons:
+            if horizon <= len(forecast):
+                await cache.put(volume_cache_key(horizon), forecast[:horizon])
     
-    async def cache_forecast(self, forecast: List[Dict], days: int):
-        """Cache forecast in Redis"""
-        if not self.redis:
-            return
-        
-        cache_key = f"volume_forecast:{days}_days"
-        await self.redis.set(
-            cache_key,
-            json.dumps(forecast, default=str),
-            ex=86400  # 24 hours
-        )
+    async def _load_volume_forecast(self, days: int, model_loader: ModelLoader) -> List[Dict]:
+        """Cache loader: runs detached from the request, so it opens its own session"""
+        from app.db.session import async_session_maker
+        
+        async with async_session_maker() as db:
+            return await ForecastService(db, self.redis).generate_volume_forecast(days, model_loader)
     
     async def generate_volume_forecast(
         self,
@@ -57,51 +108,111 @@ class ForecastService:
         """
         **INNOVATION 2: Generate volume forecast**
         """
-        from sqlalchemy import select, func
-        from app.db.models.package import Package
-        from datetime import timedelta
-        
-        # Get historical volumes
-        start_date = date.today() - timedelta(days=60)
-        
-        result = await self.db.execute(
-            select(
-                func.date(Package.created_at).label('date'),
-                func.count(Package.id).label('volume')
-            ).where(
-                Package.created_at >= start_date
-            ).group_by(
-                func.date(Package.created_at)
-            ).order_by('date')
-        )
+        historical_volumes = await self.get_historical_volumes()
         
-        historical_data = result.all()
-        historical_volumes = [row.volume for row in historical_data]
+        # Generate forecast
+        lstm_service = LSTMService(model_loader)
+        forecast = await asyncio.to_thread(
+            lstm_service.predict_volume_forecast,
+            historical_volumes,
+            days
+        )
         
-        # Get weather data to adjust forecast
+        return await self.apply_weather_impact(forecast)
+    
+    async def apply_weather_impact(self, forecast: List[Dict]) -> List[Dict]:
+        """Scale a forecast by the current weather (returns adjusted copies)"""
         weather_service = WeatherService()
         weather_data = await weather_service.get_current_weather()
         weather_impact = weather_service.get_weather_impact_factor(weather_data)
         
-        # Generate forecast
+        if weather_impact == 1.0:
+            return forecast
+        
+        logger.info(f"Applying weather impact factor: {weather_impact:.2f}")
+        adjusted = []
+        for day_forecast in forecast:
+            day_forecast = {
+                **day_forecast,
+                "predicted_volume": int(day_forecast.get("predicted_volume", 0) * weather_impact),
+                "weather_adjusted": True
+            }
+            if weather_data:
+                day_forecast["weather_condition"] = weather_data.get("description")
+            adjusted.append(day_forecast)
+        
+        return adjusted
+    
+    async def get_historical_volumes(self) -> List[int]:
+        """Daily package volumes of the last 60 days (from the rollup table)"""
+        return await PackageVolumeRepository(self.db).get_history(days=60)
+    
+    async def get_driver_shares(self) -> Dict[int, float]:
+        """Every driver's share of all assignments (one GROUP BY)"""
+        counts = await AssignmentRepository(self.db).get_assignment_counts_by_driver()
+        total = max(sum(counts.values()), 1)
+        return {driver_id: count / total for driver_id, count in counts.items()}
+    
+    async def materialize_earnings_forecasts(
+        self,
+        model_loader: ModelLoader,
+        volume_forecast: Optional[List[Dict]] = None
+    ) -> Dict:
+        """
+        **INNOVATION 7: Earnings forecasts for every driver**
+        
+        One volume forecast and one share query feed a single vectorized
+        pass; the results are stored in the Redis hash
+        earnings_forecast:{date} keyed by driver id.
+        
+        Args:
+            model_loader: ML model loader
+            volume_forecast: Today's FORECAST_HORIZON_DAYS volume forecast,
+                if the caller already has it
+        
+        Returns:
+            Dict: driver_id (or DEFAULT_EARNINGS_FIELD) -> earnings forecast
+        """
         lstm_service = LSTMService(model_loader)
-        forecast = lstm_service.predict_volume_forecast(
-            historical_volumes=historical_volumes,
-            forecast_days=days
+        shares = await self.get_driver_shares()
+        shares[DEFAULT_EARNINGS_FIELD] = 0.0
+        
+        if volume_forecast is None:
+            historical_volumes = await self.get_historical_volumes()
+            volume_forecast = await asyncio.to_thread(
+                lstm_service.predict_volume_forecast,
+                historical_volumes,
+                settings.FORECAST_HORIZON_DAYS
+            )
+        
+        forecasts = await asyncio.to_thread(
+            lstm_service.earnings_from_volume_forecast,
+            volume_forecast,
+            shares,
+            settings.PAYMENT_PER_PACKAGE
         )
         
-        # Apply weather impact to forecast
-        if weather_impact != 1.0:
-            logger.info(f"Applying weather impact factor: {weather_impact:.2f}")
-            for day_forecast in forecast:
-                day_forecast["predicted_volume"] = int(
-                    day_forecast.get("predicted_volume", 0) * weather_impact
+        if self.redis:
+            cache_key = f"earnings_forecast:{date.today().isoformat()}"
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.delete(cache_key)
+                pipe.hset(
+                    cache_key,
+                    mapping={str(key): json.dumps(value, default=str) for key, value in forecasts.items()}
                 )
-                day_forecast["weather_adjusted"] = True
-                if weather_data:
-                    day_forecast["weather_condition"] = weather_data.get("description")
+                pipe.expire(cache_key, EARNINGS_CACHE_TTL_SECONDS)
+                await pipe.execute()
+        
+        logger.info(f"Earnings forecasts materialized for {len(shares) - 1} drivers")
         
-        return forecast
+        return forecasts
+    
+    async def _load_earnings_forecasts(self, model_loader: ModelLoader) -> Dict:
+        """Coalesced materialization: runs detached from the request, so it opens its own session"""
+        from app.db.session import async_session_maker
+        
+        async with async_session_maker() as db:
+            return await ForecastService(db, self.redis).materialize_earnings_forecasts(model_loader)
     
     async def calculate_earnings_forecast(
         self,
@@ -111,54 +222,39 @@ class ForecastService:
     ) -> Dict:
         """
         **INNOVATION 7: Calculate earnings forecast**
-        """
-        from sqlalchemy import select, func
-        from app.db.models.package import Package
-        from app.db.models.assignment import Assignment
-        from datetime import timedelta
-        
-        # Get historical volumes
-        start_date = date.today() - timedelta(days=60)
-        
-        result = await self.db.execute(
-            select(
-                func.date(Package.created_at).label('date'),
-                func.count(Package.id).label('volume')
-            ).where(
-                Package.created_at >= start_date
-            ).group_by(
-                func.date(Package.created_at)
-            ).order_by('date')
-        )
         
-        historical_data = result.all()
-        historical_volumes = [row.volume for row in historical_data]
-        
-        # Calculate driver's historical share
-        result = await self.db.execute(
-            select(func.count(Assignment.id)).where(
-                Assignment.driver_id == driver_id
-            )
-        )
-        driver_assignments = result.scalar()
+        A lookup in today's materialized forecasts; the first request of the
+        day (or after a Redis flush) materializes them for every driver,
+        and requests arriving meanwhile wait for that one computation.
+        Horizons beyond FORECAST_HORIZON_DAYS, or no Redis, compute only
+        this driver.
+        """
+        lstm_service = LSTMService(model_loader)
         
-        result = await self.db.execute(
-            select(func.count(Assignment.id))
-        )
-        total_assignments = result.scalar()
+        if self.redis and days <= settings.FORECAST_HORIZON_DAYS:
+            cache_key = f"earnings_forecast:{date.today().isoformat()}"
+            own, default = await self.redis.hmget(cache_key, [str(driver_id), DEFAULT_EARNINGS_FIELD])
+            
+            if own or default:
+                forecast = json.loads(own or default)
+            else:
+                forecasts = await asyncio.shield(
+                    single_flight(cache_key, lambda: self._load_earnings_forecasts(model_loader))
+                )
+                forecast = forecasts.get(driver_id, forecasts[DEFAULT_EARNINGS_FIELD])
+            
+            return lstm_service.truncate_earnings_forecast(forecast, days)
         
-        driver_share = driver_assignments / max(total_assignments, 1)
+        historical_volumes = await self.get_historical_volumes()
+        shares = await self.get_driver_shares()
         
-        # Generate earnings forecast
-        lstm_service = LSTMService(model_loader)
-        earnings = lstm_service.calculate_earnings_forecast(
-            historical_volumes=historical_volumes,
-            driver_share=driver_share,
-            payment_per_package=settings.PAYMENT_PER_PACKAGE,
-            forecast_days=days
+        return await asyncio.to_thread(
+            lstm_service.calculate_earnings_forecast,
+            historical_volumes,
+            shares.get(driver_id, 0.0),
+            settings.PAYMENT_PER_PACKAGE,
+            days
         )
-        
-        return earnings
     
     async def generate_demand_heatmap(
         self,
@@ -3,28 +3,373 @@ Swap Service
 Business logic for swap marketplace
 """
 
-from typing import List
-from datetime import datetime
+import asyncio
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import date, datetime
+import numpy as np
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.db.session import async_session_maker
 from app.db.repositories.swap_repo import SwapRepository
+from app.db.repositories.assignment_repo import AssignmentRepository
+from app.db.repositories.driver_repo import DriverRepository
 from app.db.models.swap import Swap, SwapStatus
+from app.core.swap_index import (
+    SwapIndex, SwapIndexStore, get_swap_index_store, get_swap_index_version, bump_swap_index_version
+)
+from app.core.swap_candidates import compute_driver_candidates, get_candidate_cache
+from app.core.swap_matching import SwapMatcher, score_swap_candidates
+from app.core.swap_clearing import clear_swap_market
+from app.core.notifications import NotificationService
+from app.config import settings
 from app.utils.helpers import setup_logger
 
 logger = setup_logger(__name__)
 
+# In-flight background refreshes per (assignment day, driver), this process only
+_refreshing: Dict[Tuple[date, int], asyncio.Task] = {}
+
+
+async def _refresh_driver_candidates(assignment_date: date, driver_id: int):
+    """Recompute one driver's list on its own session (outlives the request)"""
+    try:
+        async with async_session_maker() as db:
+            await SwapService(db).refresh_swap_candidates([driver_id], assignment_date)
+    except Exception as e:
+        logger.error(f"Swap candidate refresh for driver {driver_id} failed: {str(e)}")
+
+
+def _schedule_refresh(assignment_date: date, driver_id: int):
+    """Start a background refresh unless one is already running for the driver"""
+    key = (assignment_date, driver_id)
+    if key in _refreshing:
+        return
+    
+    task = asyncio.ensure_future(_refresh_driver_candidates(assignment_date, driver_id))
+    _refreshing[key] = task
+    task.add_done_callback(lambda done: _refreshing.pop(key, None))
+
 
 class SwapService:
     """Swap marketplace service"""
     
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, index_store: Optional[SwapIndexStore] = None):
         self.db = db
         self.swap_repo = SwapRepository(db)
+        self.index_store = index_store or get_swap_index_store()
     
     async def get_available_swaps(self, driver_id: int) -> List[Swap]:
         """Get available swaps for driver"""
         return await self.swap_repo.get_available_for_driver(driver_id)
     
+    async def get_top_swaps(self, driver_id: int) -> List[Dict]:
+        """
+        Best swap opportunities across the driver's packages
+        
+        Served from the precomputed candidate cache, shared through Redis
+        by the precompute job and every worker (see RedisSwapCandidateCache).
+        A driver whose list was never computed or was invalidated by a swap
+        gets their last list (or an empty one) while a background refresh
+        runs; scoring never happens inline. A stale list may offer packages
+        that have moved since, which accept_swap rejects.
+        """
+        today = date.today()
+        cache = await get_candidate_cache(today)
+        cached = await cache.get(driver_id)
+        if cached is not None:
+            return cached
+        
+        _schedule_refresh(today, driver_id)
+        return await cache.get_stale(driver_id) or []
+    
+    async def refresh_swap_candidates(
+        self,
+        driver_ids: Optional[Iterable[int]] = None,
+        assignment_date: date = None
+    ) -> int:
+        """
+        Recompute and cache the top swaps per driver
+        
+        Args:
+            driver_ids: Drivers to refresh (None = every driver with packages)
+            assignment_date: Assignment day (default today)
+        
+        Returns:
+            int: Number of driver lists stored
+        """
+        assignment_date = assignment_date or date.today()
+        candidates, as_of = await self._compute_candidates(assignment_date, driver_ids)
+        cache = await get_candidate_cache(assignment_date)
+        
+        return await cache.put(candidates, as_of)
+    
+    async def _compute_candidates(self, assignment_date: date, driver_ids: Optional[Iterable[int]]):
+        """Score candidate lists off the event loop; returns (lists, cache version at start)"""
+        index = await self.get_swap_index(assignment_date)
+        all_drivers = await self._matching_drivers()
+        cache = await get_candidate_cache(assignment_date)
+        as_of = await cache.current_version()
+        
+        candidates = await asyncio.to_thread(
+            compute_driver_candidates,
+            SwapMatcher(),
+            index,
+            all_drivers,
+            driver_ids,
+            settings.SWAP_CANDIDATES_PER_DRIVER
+        )
+        
+        return candidates, as_of
+    
+    async def get_swap_index(self, assignment_date: date = None) -> SwapIndex:
+        """
+        Spatial index of the day's assigned packages
+        
+        Built once per day and process, and rebuilt when the shared version
+        counter shows owners changed in another process (a swap accepted
+        by another worker, or the clearing job). Without Redis the index
+        only follows this process's own swaps.
+        """
+        assignment_date = assignment_date or date.today()
+        # Read the version before the rows, so a change in between leaves the index behind
+        version = await get_swap_index_version(assignment_date)
+        index = self.index_store.get(assignment_date)
+        
+        if index is None or (version is not None and index.version != version):
+            rows = await AssignmentRepository(self.db).get_swap_index_rows(assignment_date)
+            index = self.index_store.set(assignment_date, rows, version or 0)
+        
+        return index
+    
+    async def _record_owner_changes(self, assignment_date: date, moves: Dict[int, int]):
+        """
+        Publish committed owner changes to the other processes, apply them
+        to this process's index and invalidate the candidate lists of the
+        new owners and of drivers listing a moved package
+        
+        Args:
+            assignment_date: Assignment day
+            moves: package_id -> new driver_id
+        """
+        try:
+            cache = await get_candidate_cache(assignment_date)
+            await cache.invalidate(driver_ids=set(moves.values()), package_ids=list(moves))
+        except Exception as e:
+            # The swap is committed; a stale list only offers packages accept_swap rejects
+            logger.error(f"Swap candidate invalidation failed: {str(e)}")
+        
+        version = await bump_swap_index_version(assignment_date)
+        index = self.index_store.get(assignment_date)
+        if index is None:
+            return
+        
+        for package_id, driver_id in moves.items():
+            index.move(package_id, driver_id)
+        
+        # Caught up only if no other process changed owners in between
+        if version is not None and index.version == version - 1:
+            index.version = version
+    
+    async def find_compatible_swaps(self, driver_id: int, package_id: int) -> List[Dict]:
+        """
+        Ranked swap opportunities for one of the driver's packages
+        
+        Raises:
+            ValueError: If the package is not assigned to the driver today
+        """
+        today = date.today()
+        index = await self.get_swap_index(today)
+        row = index.position.get(package_id)
+        
+        if row is None or int(index.owner[row]) != driver_id:
+            # Confirm against the database before rejecting: without Redis
+            # the index can miss a swap made by another process
+            assignment = await AssignmentRepository(self.db).get_by_package(package_id, today)
+            if not assignment or assignment.driver_id != driver_id:
+                raise ValueError("Package not assigned to driver")
+            
+            self.index_store.drop(today)
+            index = await self.get_swap_index(today)
+            row = index.position.get(package_id)
+            if row is None:
+                raise ValueError("Package not assigned to driver")
+        
+        return SwapMatcher().find_compatible_swaps(
+            driver_id=driver_id,
+            offered_package=index.package(row),
+            all_drivers=await self._matching_drivers(),
+            index=index
+        )
+    
+    async def _matching_drivers(self) -> List[Dict]:
+        """Active drivers in the shape SwapMatcher expects"""
+        drivers = await DriverRepository(self.db).get_active_drivers()
+        return [
+            {
+                'id': d.id,
+                'name': d.name,
+                'current_location': (
+                    (d.current_latitude, d.current_longitude)
+                    if d.current_latitude is not None and d.current_longitude is not None
+                    else None
+                )
+            }
+            for d in drivers
+        ]
+    
+    async def clear_market(self, assignment_date: date = None) -> Dict:
+        """
+        Execute every mutually compatible set of today's open swap intents
+        
+        Each pending proposal is an intent: its proposer gives the offered
+        package and wants the requested one. Intents that close a 2- or
+        3-way cycle are executed together, choosing the cycles that
+        maximize total distance saved (SwapMatcher scoring). Cycles are
+        picked from the in-memory index and then re-checked against the
+        database under row locks before anything is written.
+        
+        Returns:
+            Dict: Clearing summary
+        """
+        assignment_date = assignment_date or date.today()
+        index = await self.get_swap_index(assignment_date)
+        
+        # Intents still consistent with the current owners
+        intents = []
+        for swap in await self.swap_repo.get_open_intents(assignment_date):
+            offered = index.position.get(swap.offered_package_id)
+            requested = index.position.get(swap.requested_package_id)
+            if offered is None or requested is None:
+                continue
+            if int(index.owner[offered]) != swap.proposer_id or int(index.owner[requested]) == swap.proposer_id:
+                continue
+            intents.append({
+                'swap_id': swap.id,
+                'proposer_id': swap.proposer_id,
+                'offered_package_id': swap.offered_package_id,
+                'requested_package_id': swap.requested_package_id,
+                'offered_row': offered,
+                'requested_row': requested
+            })
+        
+        if not intents:
+            return {'intents': 0, 'cycles_selected': 0, 'swaps_completed': 0}
+        
+        drivers = {
+            d.id: d for d in await DriverRepository(self.db).get_by_ids({i['proposer_id'] for i in intents})
+        }
+        
+        # Distance each proposer saves by trading (SwapMatcher scoring, one pass)
+        offered_rows = np.array([i['offered_row'] for i in intents])
+        requested_rows = np.array([i['requested_row'] for i in intents])
+        driver_locations = np.array([
+            (drivers[i['proposer_id']].current_latitude, drivers[i['proposer_id']].current_longitude)
+            if i['proposer_id'] in drivers and drivers[i['proposer_id']].current_latitude is not None
+            else (index.latitude[i['offered_row']], index.longitude[i['offered_row']])  # unknown: no saving
+            for i in intents
+        ], dtype=np.float64)
+        
+        scores, distance_saved, _ = score_swap_candidates(
+            offered_location=(index.latitude[offered_rows], index.longitude[offered_rows]),
+            offered_difficulty=index.difficulty[offered_rows],
+            target_latitudes=index.latitude[requested_rows],
+            target_longitudes=index.longitude[requested_rows],
+            target_difficulties=index.difficulty[requested_rows],
+            driver_latitudes=driver_locations[:, 0],
+            driver_longitudes=driver_locations[:, 1]
+        )
+        
+        cycles, info = await asyncio.to_thread(
+            clear_swap_market, intents, distance_saved, settings.SWAP_CLEARING_MAX_CYCLE_LENGTH
+        )
+        executed = await self._execute_cycles(
+            assignment_date, intents, cycles, scores, distance_saved
+        ) if cycles else []
+        
+        if executed:
+            await self._record_owner_changes(
+                assignment_date, {i['requested_package_id']: i['proposer_id'] for i in executed}
+            )
+            
+            await NotificationService().enqueue_many([
+                (None, NotificationService.swap_completed_message(
+                    fcm_token=drivers[i['proposer_id']].fcm_token,
+                    driver_name=drivers[i['proposer_id']].name,
+                    received_package_id=i['requested_package_id'],
+                    given_package_id=i['offered_package_id']
+                ))
+                for i in executed
+                if i['proposer_id'] in drivers and drivers[i['proposer_id']].fcm_token
+            ])
+        
+        summary = {
+            **info,
+            'swaps_completed': len(executed),
+            'distance_saved_km': float(sum(distance_saved[i['index']] for i in executed))
+        }
+        logger.info(f"Swap market clearing: {summary}")
+        
+        return summary
+    
+    async def _execute_cycles(
+        self,
+        assignment_date: date,
+        intents: List[Dict],
+        cycles: List[tuple],
+        scores: np.ndarray,
+        distance_saved: np.ndarray
+    ) -> List[Dict]:
+        """
+        Write the selected cycles, each one all-or-nothing
+        
+        The swaps and their offered packages' assignments are locked with
+        one SELECT ... FOR UPDATE SKIP LOCKED (as in accept_swap); a cycle
+        with a row that is locked, no longer pending or no longer held by
+        its proposer is skipped. Each remaining cycle runs in a savepoint
+        with an owner-guarded UPDATE and is rolled back if any rowcount
+        falls short, so a concurrent accept is never overwritten.
+        
+        Returns:
+            List[Dict]: Executed intents (with their 'index' into intents)
+        """
+        assignment_repo = AssignmentRepository(self.db)
+        locked = await self.swap_repo.lock_for_clearing(
+            [intents[i]['swap_id'] for cycle in cycles for i in cycle],
+            assignment_date
+        )
+        
+        executed = []
+        for cycle in cycles:
+            members = [intents[i] | {'index': i} for i in cycle]
+            if any(
+                m['swap_id'] not in locked or locked[m['swap_id']][1].driver_id != m['proposer_id']
+                for m in members
+            ):
+                continue
+            
+            savepoint = await self.db.begin_nested()
+            moved = await assignment_repo.reassign_packages(
+                assignment_date,
+                {m['requested_package_id']: m['proposer_id'] for m in members},
+                expected_owners={m['offered_package_id']: m['proposer_id'] for m in members}
+            )
+            completed = await self.swap_repo.complete_many(
+                [m['swap_id'] for m in members],
+                distance_saved_km={m['swap_id']: float(distance_saved[m['index']]) for m in members},
+                compatibility_scores={m['swap_id']: float(scores[m['index']]) for m in members}
+            )
+            
+            if moved == len(members) and completed == len(members):
+                await savepoint.commit()
+                executed.extend(members)
+            else:
+                await savepoint.rollback()
+                logger.info(f"Swap cycle {[m['swap_id'] for m in members]} changed during clearing; skipped")
+        
+        await self.db.commit()
+        
+        return executed
+    
     async def propose_swap(
         self,
         proposer_id: int,
@@ -34,9 +379,6 @@ class SwapService:
     ) -> Swap:
         """Propose a package swap"""
         # Validate packages belong to correct drivers
-        from app.db.repositories.assignment_repo import AssignmentRepository
-        from datetime import date
-        
         assignment_repo = AssignmentRepository(self.db)
         
         # Check offered package belongs to proposer
@@ -78,57 +420,60 @@ class SwapService:
         return swap
     
     async def accept_swap(self, swap_id: int, acceptor_id: int) -> Swap:
-        """Accept a swap proposal"""
-        swap = await self.swap_repo.get_by_id(swap_id)
+        """
+        Accept a swap proposal
         
-        if not swap:
-            raise ValueError("Swap not found")
+        Runs as one transaction: the swap and both assignment rows are
+        locked with a single SELECT ... FOR UPDATE SKIP LOCKED, the drivers
+        are exchanged with one UPDATE and the swap is completed. Concurrent
+        accepts touching the same swap or packages fail fast instead of
+        double-swapping.
         
-        if swap.acceptor_id != acceptor_id:
-            raise ValueError("Not authorized to accept this swap")
-        
-        if swap.status != SwapStatus.PENDING:
-            raise ValueError("Swap is not pending")
+        Raises:
+            ValueError: If the swap cannot be accepted
+        """
+        today = date.today()
+        swap, assignments = await self.swap_repo.lock_for_accept(swap_id, today)
         
-        # Update swap status
-        swap = await self.swap_repo.update(
-            swap_id,
-            status=SwapStatus.ACCEPTED,
-            responded_at=datetime.utcnow()
-        )
+        try:
+            if swap is None:
+                # Nothing lockable: explain why (only on the failure path)
+                swap = await self.swap_repo.get_by_id(swap_id)
+                if not swap:
+                    raise ValueError("Swap not found")
+            
+            if swap.acceptor_id != acceptor_id:
+                raise ValueError("Not authorized to accept this swap")
+            
+            if swap.status != SwapStatus.PENDING:
+                raise ValueError("Swap is not pending")
+            
+            if len(assignments) < 2:
+                raise ValueError("Swap is already being processed")
+            
+            exchanged = await AssignmentRepository(self.db).exchange_drivers(
+                today,
+                swap.offered_package_id, swap.proposer_id,
+                swap.requested_package_id, swap.acceptor_id
+            )
+            if not exchanged:
+                raise ValueError("Swap packages are no longer held by the drivers")
         
-        # Swap the assignments
-        from app.db.repositories.assignment_repo import AssignmentRepository
-        from datetime import date
+        except ValueError:
+            await self.db.rollback()
+            raise
         
-        assignment_repo = AssignmentRepository(self.db)
+        now = datetime.utcnow()
+        swap.status = SwapStatus.COMPLETED
+        swap.responded_at = now
+        swap.completed_at = now
+        await self.db.commit()
         
-        # Get both assignments
-        assignment1 = await assignment_repo.get_by_package(
-            swap.offered_package_id,
-            date.today()
-        )
-        assignment2 = await assignment_repo.get_by_package(
-            swap.requested_package_id,
-            date.today()
-        )
-        
-        # Swap driver IDs
-        await assignment_repo.update(
-            assignment1.id,
-            driver_id=assignment2.driver_id
-        )
-        await assignment_repo.update(
-            assignment2.id,
-            driver_id=assignment1.driver_id
-        )
-        
-        # Mark swap as completed
-        await self.swap_repo.update(
-            swap_id,
-            status=SwapStatus.COMPLETED,
-            completed_at=datetime.utcnow()
-        )
+        # Keep the day's swap index and candidate lists in step with the new owners
+        await self._record_owner_changes(today, {
+            swap.offered_package_id: swap.acceptor_id,
+            swap.requested_package_id: swap.proposer_id
+        })
         
         logger.info(f"Swap completed: {swap_id}")
         
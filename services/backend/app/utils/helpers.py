@@ -4,6 +4,7 @@ General-purpose helper functions
 """
 
 import logging
+import sys
 from functools import lru_cache
 
 
@@ -41,3 +42,34 @@ def setup_logger(name: str) -> logging.Logger:
         logger.addHandler(handler)
     
     return logger
+
+
+def current_memory_mb() -> float:
+    """
+    Resident memory of this process in MB
+    (read from /proc on Linux, the process peak elsewhere)
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    
+    return peak_memory_mb()
+
+
+def peak_memory_mb() -> float:
+    """
+    Peak resident memory of this process in MB since it started
+    (0.0 on Windows, where the resource module does not exist)
+    """
+    if sys.platform == "win32":
+        return 0.0
+    
+    import resource
+    
+    # ru_maxrss is in bytes on macOS, KB on Linux
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
@@ -26,19 +26,20 @@ async def get_redis_client() -> redis.Redis:
     
     if _redis_client is None:
         try:
-            _redis_client = redis.from_url(
+            client = redis.from_url(
                 settings.REDIS_URL,
                 encoding="utf-8",
                 decode_responses=True
             )
             
-            # Test connection
-            await _redis_client.ping()
+            # Test connection before publishing the client, so concurrent
+            # callers never get one that failed to connect
+            await client.ping()
+            _redis_client = client
             logger.info("✅ Redis connected successfully")
         
         except Exception as e:
             logger.error(f"❌ Redis connection failed: {str(e)}")
-            _redis_client = None
     
     return _redis_client
 
@@ -3,148 +3,416 @@ Daily Assignment Generator Worker
 Runs at 6:00 AM daily to generate fair assignments using PuLP
 """
 
-from datetime import date
-from typing import List, Dict
+import json
+import time
+import asyncio
+from datetime import date, datetime
+from pathlib import Path
+from typing import List, Dict, Optional
 import numpy as np
 
 from app.db.session import async_session_maker
 from app.db.repositories.driver_repo import DriverRepository
 from app.db.repositories.assignment_repo import AssignmentRepository
-from app.db.models.package import Package, PackageStatus
+from app.db.repositories.package_repo import PackageRepository
 from app.ml.model_loader import ModelLoader
 from app.ml.xgboost_service import XGBoostService
 from app.core.fairness import FairnessOptimizer
 from app.core.notifications import NotificationService
+from app.core.swap_index import drop_swap_index, bump_swap_index_version
+from app.core.swap_candidates import drop_candidate_cache
+from app.workers.pipeline import PipelineRun
+from app.workers.swap_candidates import precompute_swap_candidates
+from app.config import settings
 from app.utils.helpers import setup_logger
-from sqlalchemy import select
 
 logger = setup_logger(__name__)
 
+# Checkpoint directory of drivers and packages without a hub; the leading
+# underscore keeps it apart from real hub ids
+NO_HUB_SHARD = "_no_hub"
 
-async def generate_daily_assignments():
+
+async def generate_daily_assignments(run_date: Optional[date] = None, force: bool = False) -> Dict[str, Dict]:
     """
     **INNOVATION 4: Fair Package Assignment using PuLP**
     
     Generate daily assignments for all drivers
     Runs at 6:00 AM every day
+    
+    Drivers and packages are sharded by hub. Every hub is an independent
+    assignment problem with its own optimizer and its own run record, and
+    up to ASSIGNMENT_SHARD_CONCURRENCY hubs run at once, so the job takes
+    roughly as long as its largest hub. A slow, infeasible or failing hub
+    only affects its own shard.
+    
+    Args:
+        run_date: Assignment date (default today)
+        force: Discard existing checkpoints and start from the first stage
+    
+    Returns:
+        Dict: Run record per shard name
+    """
+    run_date = run_date or date.today()
+    started = time.perf_counter()
+    
+    async with async_session_maker() as db:
+        hub_ids = set(await PackageRepository(db).get_pending_hub_ids())
+    
+    # Shards interrupted after persisting still have stages to finish
+    hub_ids.update(_unfinished_hubs(run_date))
+    
+    if not hub_ids:
+        logger.warning("No pending packages found")
+        return {}
+    
+    # Load once up front rather than racing from every shard
+    model_loader = ModelLoader()
+    if not model_loader.is_loaded:
+        await model_loader.load_all_models()
+    
+    hubs = sorted(hub_ids, key=lambda hub_id: hub_id or "")
+    limit = asyncio.Semaphore(max(1, settings.ASSIGNMENT_SHARD_CONCURRENCY))
+    
+    async def run_shard(hub_id: Optional[str]) -> Dict:
+        async with limit:
+            return await generate_hub_assignments(hub_id, run_date, force)
+    
+    logger.info(
+        f"🚀 Starting daily assignment generation for {len(hubs)} hub(s), "
+        f"{settings.ASSIGNMENT_SHARD_CONCURRENCY} at a time..."
+    )
+    records = await asyncio.gather(*[run_shard(hub_id) for hub_id in hubs], return_exceptions=True)
+    
+    results = {}
+    for hub_id, record in zip(hubs, records):
+        if isinstance(record, BaseException):
+            logger.error(f"❌ Shard {_shard_name(hub_id)} crashed: {record}")
+            record = {'status': 'failed', 'error': str(record), 'stages': {}}
+        results[_shard_name(hub_id)] = record
+    
+    for name, record in results.items():
+        seconds = sum(stage.get('seconds') or 0 for stage in record['stages'].values())
+        logger.info(f"  hub {name}: {record['status']} ({seconds:.2f}s of stage time)")
+    
+    failed = [name for name, record in results.items() if record['status'] == 'failed']
+    logger.info(
+        f"Daily assignment generation finished in {time.perf_counter() - started:.2f}s - "
+        f"{len(results) - len(failed)}/{len(results)} hubs ok"
+        + (f", failed: {', '.join(failed)}" if failed else "")
+    )
+    
+    if len(failed) < len(results):
+        await precompute_swap_candidates(run_date)
+    
+    return results
+
+
+async def generate_hub_assignments(hub_id: Optional[str], run_date: date, force: bool = False) -> Dict:
     """
+    Generate assignments for one hub (shard)
+    
+    The shard runs as checkpointed stages (load, featurize, score, solve,
+    persist, notify). A rerun for the same date resumes after the last
+    completed stage. Per-stage durations are kept in the run record
+    (<PIPELINE_CHECKPOINT_DIR>/daily_assignments/<date>/<hub>/record.json).
+    
+    Args:
+        hub_id: Hub to assign (None = drivers and packages without a hub)
+        run_date: Assignment date
+        force: Discard existing checkpoints and start from the first stage
+    
+    Returns:
+        Dict: The shard's run record
+    """
+    run = PipelineRun("daily_assignments", f"{run_date.isoformat()}/{_shard_name(hub_id)}")
+    
+    if force or run.record['status'] == 'skipped':
+        run.reset()
+    
+    if run.is_completed:
+        logger.info(f"Assignments for hub {_shard_name(hub_id)} on {run_date} already generated - nothing to do")
+        return run.record
+    
     try:
-        logger.info("🚀 Starting daily assignment generation...")
+        logger.info(f"Starting assignment generation for hub {_shard_name(hub_id)}...")
+        run.record['hub_id'] = hub_id
+        run.start()
+        
+        # 1. Load active drivers and pending packages of the hub
+        loaded = await run.stage(
+            "load",
+            lambda: _load_stage(hub_id),
+            summary=lambda out: {'drivers': len(out['drivers']), 'packages': len(out['packages'])}
+        )
+        
+        if not loaded['drivers'] or not loaded['packages']:
+            logger.warning(f"Hub {_shard_name(hub_id)}: no active drivers or no pending packages found")
+            run.finish(status='skipped')
+            return run.record
         
-        async with async_session_maker() as db:
-            # 1. Get all active drivers
-            driver_repo = DriverRepository(db)
-            drivers = await driver_repo.get_active_drivers()
-            
-            if not drivers:
-                logger.warning("No active drivers found")
-                return
-            
-            driver_ids = [d.id for d in drivers]
-            logger.info(f"Found {len(drivers)} active drivers")
-            
-            # 2. Get all pending packages
-            result = await db.execute(
-                select(Package).where(Package.status == PackageStatus.PENDING)
-            )
-            packages = list(result.scalars().all())
-            
-            if not packages:
-                logger.warning("No pending packages found")
-                return
-            
-            package_ids = [p.id for p in packages]
-            logger.info(f"Found {len(packages)} pending packages")
-            
-            # 3. Build difficulty matrix using XGBoost
-            logger.info("Building difficulty matrix with XGBoost...")
-            model_loader = ModelLoader()
-            if not model_loader.is_loaded:
-                await model_loader.load_all_models()
-            
-            xgboost_service = XGBoostService(model_loader)
-            
-            # Prepare driver features
-            driver_features_list = []
-            for driver in drivers:
-                driver_features_list.append({
-                    'experience_days': driver.experience_days,
-                    'avg_delivery_time': driver.avg_delivery_time_minutes,
-                    'success_rate': driver.success_rate,
-                    'vehicle_capacity': driver.vehicle_capacity_kg
-                })
-            
-            # Prepare package features
-            package_features_list = []
-            for package in packages:
-                package_features_list.append({
-                    'weight': package.weight_kg,
-                    'distance': package.distance_from_hub_km or 10.0,
-                    'floor_number': package.floor_number,
-                    'is_fragile': package.is_fragile,
-                    'time_window_hours': 4  # Default
-                })
-            
-            # Predict difficulty matrix
-            difficulty_matrix = xgboost_service.predict_difficulty_batch(
-                driver_features_list,
-                package_features_list
-            )
-            
-            logger.info(f"Difficulty matrix shape: {difficulty_matrix.shape}")
-            
-            # 4. Run PuLP optimization
-            logger.info("Running PuLP fairness optimizer...")
-            optimizer = FairnessOptimizer()
-            
-            assignments = optimizer.optimize_assignments(
-                drivers=driver_ids,
-                packages=package_ids,
-                difficulty_matrix=difficulty_matrix
-            )
-            
-            # 5. Save assignments to database
-            logger.info("Saving assignments to database...")
-            assignment_repo = AssignmentRepository(db)
-            
-            assignment_data = []
-            today = date.today()
-            
-            from datetime import datetime
-            for driver_id, assigned_packages in assignments.items():
-                for package_id in assigned_packages:
-                    # Get difficulty score from matrix
-                    driver_idx = driver_ids.index(driver_id)
-                    package_idx = package_ids.index(package_id)
-                    difficulty = float(difficulty_matrix[driver_idx][package_idx])
-                    
-                    assignment_data.append({
-                        'driver_id': driver_id,
-                        'package_id': package_id,
-                        'assignment_date': today,
-                        'predicted_difficulty': difficulty,
-                        'assigned_at': datetime.utcnow()
-                    })
-            
-            created_assignments = await assignment_repo.bulk_create(assignment_data)
-            await db.commit()
-            
-            logger.info(f"✅ Created {len(created_assignments)} assignments")
-            
-            # 6. Send push notifications to drivers
-            logger.info("Sending notifications to drivers...")
-            notification_service = NotificationService()
-            
-            for driver_id, assigned_packages in assignments.items():
-                driver = next((d for d in drivers if d.id == driver_id), None)
-                if driver and driver.fcm_token:
-                    await notification_service.send_assignment_notification(
-                        fcm_token=driver.fcm_token,
-                        driver_name=driver.name,
-                        package_count=len(assigned_packages)
-                    )
-            
-            logger.info("✅ Daily assignment generation completed successfully!")
+        # 2. Build model features
+        features = await run.stage("featurize", lambda: _featurize_stage(loaded))
+        
+        # 3. Build difficulty matrix using XGBoost
+        scored = await run.stage(
+            "score",
+            lambda: _score_stage(features),
+            summary=lambda out: {'shape': list(out['difficulty_matrix'].shape)}
+        )
+        
+        # 4. Run PuLP optimization (off the event loop so shards overlap)
+        solved = await run.stage(
+            "solve",
+            lambda: asyncio.to_thread(_solve_stage, loaded, scored['difficulty_matrix']),
+            summary=lambda out: {
+                key: out['solve_info'].get(key) for key in ('solver', 'status', 'objective', 'gap')
+            }
+        )
+        
+        # 5. Save assignments and flip packages to ASSIGNED in one transaction
+        await run.stage(
+            "persist",
+            lambda: _persist_stage(loaded, scored['difficulty_matrix'], solved['assignments'], run_date),
+            summary=lambda out: out
+        )
+        
+        # 6. Send push notifications to drivers
+        await run.stage(
+            "notify",
+            lambda: _notify_stage(loaded, solved['assignments']),
+            summary=lambda out: out
+        )
+        
+        run.finish()
+        logger.info(f"✅ Assignment generation for hub {_shard_name(hub_id)} completed successfully!")
     
     except Exception as e:
-        logger.error(f"❌ Assignment generation failed: {str(e)}", exc_info=True)
+        logger.error(f"❌ Assignment generation for hub {_shard_name(hub_id)} failed: {str(e)}", exc_info=True)
+        run.finish(status='failed')
+    
+    return run.record
+
+
+def _shard_name(hub_id: Optional[str]) -> str:
+    """Checkpoint directory / log name of a hub shard"""
+    return hub_id if hub_id is not None else NO_HUB_SHARD
+
+
+def _unfinished_hubs(run_date: date) -> List[Optional[str]]:
+    """Hubs with a started but not completed run for the date"""
+    runs_dir = Path(settings.PIPELINE_CHECKPOINT_DIR) / "daily_assignments" / run_date.isoformat()
+    if not runs_dir.is_dir():
+        return []
+    
+    hubs = []
+    for shard_dir in runs_dir.iterdir():
+        record_path = shard_dir / "record.json"
+        if not record_path.is_file():
+            continue
+        with open(record_path) as f:
+            record = json.load(f)
+        if record.get('status') in ('running', 'failed'):
+            # The record carries the hub id; the directory name is only a fallback
+            # for records written before it did
+            if 'hub_id' in record:
+                hubs.append(record['hub_id'])
+            else:
+                hubs.append(None if shard_dir.name == NO_HUB_SHARD else shard_dir.name)
+    
+    return hubs
+
+
+async def _load_stage(hub_id: Optional[str]) -> Dict:
+    """Snapshot of active drivers and pending packages of one hub"""
+    async with async_session_maker() as db:
+        driver_repo = DriverRepository(db)
+        drivers = await driver_repo.get_active_drivers_by_hub(hub_id)
+        logger.info(f"Hub {_shard_name(hub_id)}: found {len(drivers)} active drivers")
+        
+        package_repo = PackageRepository(db)
+        packages = await package_repo.get_pending_by_hub(hub_id)
+        logger.info(f"Hub {_shard_name(hub_id)}: found {len(packages)} pending packages")
+    
+    return {
+        'drivers': [
+            {
+                'id': d.id,
+                'name': d.name,
+                'fcm_token': d.fcm_token,
+                'experience_days': d.experience_days,
+                'avg_delivery_time_minutes': d.avg_delivery_time_minutes,
+                'success_rate': d.success_rate,
+                'vehicle_capacity_kg': d.vehicle_capacity_kg,
+                'latitude': d.current_latitude,
+                'longitude': d.current_longitude
+            }
+            for d in drivers
+        ],
+        'packages': [
+            {
+                'id': p.id,
+                'weight_kg': p.weight_kg,
+                'distance_from_hub_km': p.distance_from_hub_km,
+                'floor_number': p.floor_number,
+                'is_fragile': p.is_fragile,
+                'latitude': p.delivery_latitude,
+                'longitude': p.delivery_longitude
+            }
+            for p in packages
+        ]
+    }
+
+
+async def _featurize_stage(loaded: Dict) -> Dict:
+    """Driver and package feature dicts for XGBoost"""
+    driver_features_list = [
+        {
+            'experience_days': d['experience_days'],
+            'avg_delivery_time': d['avg_delivery_time_minutes'],
+            'success_rate': d['success_rate'],
+            'vehicle_capacity': d['vehicle_capacity_kg']
+        }
+        for d in loaded['drivers']
+    ]
+    
+    package_features_list = [
+        {
+            'weight': p['weight_kg'],
+            'distance': p['distance_from_hub_km'] or 10.0,
+            'floor_number': p['floor_number'],
+            'is_fragile': p['is_fragile'],
+            'time_window_hours': 4  # Default
+        }
+        for p in loaded['packages']
+    ]
+    
+    return {
+        'driver_features': driver_features_list,
+        'package_features': package_features_list
+    }
+
+
+async def _score_stage(features: Dict) -> Dict:
+    """Difficulty matrix [drivers x packages]"""
+    logger.info("Building difficulty matrix with XGBoost...")
+    model_loader = ModelLoader()
+    if not model_loader.is_loaded:
+        await model_loader.load_all_models()
+    
+    xgboost_service = XGBoostService(model_loader)
+    
+    difficulty_matrix = await xgboost_service.predict_difficulty_batch_cached(
+        features['driver_features'],
+        features['package_features']
+    )
+    
+    logger.info(f"Difficulty matrix shape: {difficulty_matrix.shape}")
+    
+    return {'difficulty_matrix': np.asarray(difficulty_matrix)}
+
+
+def _solve_stage(loaded: Dict, difficulty_matrix: np.ndarray) -> Dict:
+    """Fair assignment as [driver_id, [package_ids]] pairs"""
+    logger.info("Running PuLP fairness optimizer...")
+    drivers, packages = loaded['drivers'], loaded['packages']
+    driver_ids = [d['id'] for d in drivers]
+    package_ids = [p['id'] for p in packages]
+    
+    optimizer = FairnessOptimizer()
+    
+    if settings.FAIRNESS_ZONE_COUNT > 1:
+        assignments = optimizer.optimize_assignments_by_zone(
+            drivers=driver_ids,
+            packages=package_ids,
+            difficulty_matrix=difficulty_matrix,
+            driver_locations=[(d['latitude'], d['longitude']) for d in drivers],
+            package_locations=[(p['latitude'], p['longitude']) for p in packages],
+            driver_capacities=[d['vehicle_capacity_kg'] or 50.0 for d in drivers],
+            package_weights=[p['weight_kg'] for p in packages]
+        )
+    else:
+        assignments = optimizer.optimize_assignments(
+            drivers=driver_ids,
+            packages=package_ids,
+            difficulty_matrix=difficulty_matrix,
+            driver_capacities=[d['vehicle_capacity_kg'] or 50.0 for d in drivers],
+            package_weights=[p['weight_kg'] for p in packages]
+        )
+    
+    logger.info(f"Solver summary: {optimizer.solve_info}")
+    
+    return {
+        'assignments': [[driver_id, package_list] for driver_id, package_list in assignments.items()],
+        'solve_info': optimizer.solve_info
+    }
+
+
+async def _persist_stage(
+    loaded: Dict,
+    difficulty_matrix: np.ndarray,
+    assignments: List,
+    run_date: date
+) -> Dict:
+    """Bulk insert assignments and mark packages ASSIGNED in one transaction"""
+    logger.info("Saving assignments to database...")
+    save_started = time.perf_counter()
+    
+    driver_index = {d['id']: i for i, d in enumerate(loaded['drivers'])}
+    package_index = {p['id']: j for j, p in enumerate(loaded['packages'])}
+    assigned_at = datetime.utcnow()
+    
+    async with async_session_maker() as db:
+        assignment_repo = AssignmentRepository(db)
+        package_repo = PackageRepository(db)
+        
+        # Idempotent if an earlier attempt committed but was not checkpointed
+        existing = {a.package_id for a in await assignment_repo.get_by_date(run_date)}
+        existing.intersection_update(package_index)
+        
+        assignment_data = [
+            {
+                'driver_id': driver_id,
+                'package_id': package_id,
+                'assignment_date': run_date,
+                'predicted_difficulty': float(difficulty_matrix[driver_index[driver_id], package_index[package_id]]),
+                'assigned_at': assigned_at
+            }
+            for driver_id, assigned_packages in assignments
+            for package_id in assigned_packages
+            if package_id not in existing
+        ]
+        
+        created_ids = await assignment_repo.bulk_create(assignment_data)
+        await package_repo.mark_assigned([row['package_id'] for row in assignment_data])
+        await db.commit()
+    
+    # The day's swap index and candidate lists are rebuilt from the new assignments
+    drop_swap_index(run_date)
+    await bump_swap_index_version(run_date)
+    await drop_candidate_cache(run_date)
+    
+    save_seconds = time.perf_counter() - save_started
+    rows_per_second = len(created_ids) / max(save_seconds, 1e-9)
+    logger.info(f"✅ Created {len(created_ids)} assignments in {save_seconds:.2f}s ({rows_per_second:.0f} rows/sec)")
+    
+    return {'created': len(created_ids), 'skipped_existing': len(existing), 'rows_per_second': rows_per_second}
+
+
+async def _notify_stage(loaded: Dict, assignments: List) -> Dict:
+    """Queue a push notification per driver with packages"""
+    logger.info("Queueing notifications to drivers...")
+    notification_service = NotificationService()
+    
+    drivers_by_id = {d['id']: d for d in loaded['drivers']}
+    messages = [
+        (driver_id, NotificationService.assignment_message(
+            fcm_token=drivers_by_id[driver_id]['fcm_token'],
+            driver_name=drivers_by_id[driver_id]['name'],
+            package_count=len(assigned_packages)
+        ))
+        for driver_id, assigned_packages in assignments
+        if driver_id in drivers_by_id and drivers_by_id[driver_id]['fcm_token']
+    ]
+    
+    return await notification_service.enqueue_many(messages)
@@ -3,13 +3,12 @@ Forecast Updater Worker
 Updates LSTM volume forecasts at midnight daily
 """
 
-from datetime import date, timedelta
-from sqlalchemy import select, func
-
 from app.db.session import async_session_maker
-from app.db.models.package import Package
+from app.db.repositories.package_volume_repo import PackageVolumeRepository
 from app.ml.model_loader import ModelLoader
 from app.ml.lstm_predictor import LSTMService
+from app.services.forecast_service import ForecastService
+from app.config import settings
 from app.utils.redis import get_redis_client
 from app.utils.helpers import setup_logger
 
@@ -27,22 +26,13 @@ async def update_forecasts():
         logger.info("🔮 Starting forecast update...")
         
         async with async_session_maker() as db:
-            # 1. Get historical volume data (last 60 days)
-            start_date = date.today() - timedelta(days=60)
-            
-            result = await db.execute(
-                select(
-                    func.date(Package.created_at).label('date'),
-                    func.count(Package.id).label('volume')
-                ).where(
-                    Package.created_at >= start_date
-                ).group_by(
-                    func.date(Package.created_at)
-                ).order_by('date')
-            )
+            # 1. Bring the daily volume rollup up to date and read the last 60 days
+            await PackageVolumeRepository(db).refresh()
+            await db.commit()
             
-            historical_data = result.all()
-            historical_volumes = [row.volume for row in historical_data]
+            redis_client = await get_redis_client()
+            forecast_service = ForecastService(db, redis_client)
+            historical_volumes = await forecast_service.get_historical_volumes()
             
             logger.info(f"Loaded {len(historical_volumes)} days of historical data")
             
@@ -53,32 +43,31 @@ async def update_forecasts():
             
             lstm_service = LSTMService(model_loader)
             
+            # Longest horizon any cached entry serves; shorter ones are its prefix
+            horizons = await forecast_service.get_forecast_horizons()
+            
             forecast = lstm_service.predict_volume_forecast(
                 historical_volumes=historical_volumes,
-                forecast_days=30
+                forecast_days=horizons[-1]
             )
             
             logger.info(f"Generated {len(forecast)} days of forecast")
             
-            # 3. Cache forecast in Redis
-            redis_client = get_redis_client()
+            # 3. Refresh the cached forecasts before they go stale
+            await forecast_service.refresh_volume_forecasts(forecast, horizons)
             
-            import json
-            cache_key = "volume_forecast:30_days"
-            await redis_client.set(
-                cache_key,
-                json.dumps(forecast, default=str),
-                ex=86400  # 24 hour expiration
-            )
+            logger.info(f"✅ Forecast cache refreshed for horizons {horizons}")
             
-            logger.info(f"✅ Forecast cached in Redis with key: {cache_key}")
+            # 4. Materialize every driver's earnings from the same forecast
+            forecast = forecast[:settings.FORECAST_HORIZON_DAYS]
+            await forecast_service.materialize_earnings_forecasts(model_loader, volume_forecast=forecast)
             
-            # 4. Log summary statistics
+            # 5. Log summary statistics
             total_predicted = sum(f['predicted_volume'] for f in forecast)
             avg_daily = total_predicted / len(forecast)
             
             logger.info(f"Forecast Summary:")
-            logger.info(f"  Total predicted packages (30 days): {total_predicted}")
+            logger.info(f"  Total predicted packages ({len(forecast)} days): {total_predicted}")
             logger.info(f"  Average daily volume: {avg_daily:.1f}")
             
             logger.info("✅ Forecast update completed successfully!")
@@ -45,7 +45,7 @@ async def monitor_driver_health():
             health_repo = HealthRepository(db)
             
             # 3. Check each driver
-            alerts_sent = 0
+            alerts = []
             
             for driver in drivers:
                 # Get latest health event
@@ -92,23 +92,23 @@ async def monitor_driver_health():
                     )
                     
                     if recommendation['should_break'] and driver.fcm_token:
-                        # Send push notification
-                        await notification_service.send_health_alert(
+                        # Queue push notification (enqueued on the outbox below)
+                        alerts.append((driver.id, NotificationService.health_alert_message(
                             fcm_token=driver.fcm_token,
                             driver_name=driver.name,
                             risk_score=risk_score,
                             break_duration=recommendation['duration_minutes']
-                        )
-                        
-                        alerts_sent += 1
+                        )))
                         
                         logger.info(
-                            f"⚠️  Health alert sent to driver {driver.id}: "
+                            f"⚠️  Health alert for driver {driver.id}: "
                             f"risk={risk_score:.1f}, break={recommendation['duration_minutes']}min"
                         )
             
-            if alerts_sent > 0:
-                logger.info(f"✅ Sent {alerts_sent} health alerts")
+            # 4. Hand alerts to the outbox; delivery happens in the consumer pool
+            if alerts:
+                stats = await notification_service.enqueue_many(alerts)
+                logger.info(f"✅ Queued {stats['queued']} health alerts ({stats['deduplicated']} duplicates dropped)")
     
     except Exception as e:
         logger.error(f"❌ Health monitoring failed: {str(e)}")
@@ -0,0 +1,162 @@
+"""
+Staged Job Pipeline
+Durable per-stage checkpoints and timing for long-running workers
+"""
+
+import os
+import json
+import time
+import numpy as np
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.config import settings
+from app.utils.helpers import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class PipelineRun:
+    """
+    One run of a staged job, checkpointed under
+    <PIPELINE_CHECKPOINT_DIR>/<job>/<run_id>/
+
+    - record.json: run status plus status, duration and summary per stage
+    - <stage>.json / <stage>.npz: stage output (NumPy arrays go to .npz)
+
+    A stage that already completed is not executed again; its output is
+    loaded from the checkpoint, so a rerun resumes after the last completed
+    stage.
+    """
+
+    def __init__(self, job: str, run_id: str, root: Optional[str] = None):
+        self.job = job
+        self.run_id = run_id
+        self.path = Path(root or settings.PIPELINE_CHECKPOINT_DIR) / job / run_id
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.record = self._load_record()
+
+    def _load_record(self) -> Dict:
+        record_path = self.path / "record.json"
+        if record_path.exists():
+            with open(record_path) as f:
+                return json.load(f)
+
+        return {
+            'job': self.job,
+            'run_id': self.run_id,
+            'status': 'pending',
+            'started_at': None,
+            'finished_at': None,
+            'stages': {}
+        }
+
+    def _save_record(self):
+        # Write-then-rename so a crash never leaves a truncated record
+        tmp_path = self.path / "record.json.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.record, f, indent=2, default=str)
+        os.replace(tmp_path, self.path / "record.json")
+
+    @property
+    def is_completed(self) -> bool:
+        return self.record['status'] == 'completed'
+
+    def stage_completed(self, name: str) -> bool:
+        return self.record['stages'].get(name, {}).get('status') == 'completed'
+
+    def reset(self):
+        """Discard every checkpoint so the next run starts from the first stage"""
+        for path in self.path.iterdir():
+            path.unlink()
+        self.record = self._load_record()
+
+    def start(self):
+        """Mark the run as (re)started"""
+        if self.record['started_at'] is None:
+            self.record['started_at'] = datetime.utcnow().isoformat()
+        self.record['status'] = 'running'
+        self._save_record()
+
+    def finish(self, status: str = 'completed'):
+        """Mark the run as finished and log the per-stage timing"""
+        self.record['status'] = status
+        self.record['finished_at'] = datetime.utcnow().isoformat()
+        self._save_record()
+
+        for name, stage in self.record['stages'].items():
+            logger.info(f"  {self.job}/{self.run_id} {name}: {stage['status']} in {stage.get('seconds') or 0:.2f}s")
+
+    async def stage(
+        self,
+        name: str,
+        func: Callable[[], Awaitable[Dict[str, Any]]],
+        summary: Optional[Callable[[Dict[str, Any]], Dict]] = None
+    ) -> Dict[str, Any]:
+        """
+        Run a stage once, or load its checkpoint if it already completed
+
+        Args:
+            name: Stage name (also the checkpoint file name)
+            func: Coroutine function returning the stage output dict
+                (JSON-serializable values and NumPy arrays)
+            summary: Optional function of the output giving a small dict
+                stored in the run record
+
+        Returns:
+            Dict: Stage output
+        """
+        if self.stage_completed(name):
+            logger.info(f"Stage '{name}' already completed - loading checkpoint")
+            return self._load_output(name)
+
+        stage_record = {'status': 'running', 'started_at': datetime.utcnow().isoformat()}
+        self.record['stages'][name] = stage_record
+        self._save_record()
+
+        started = time.perf_counter()
+        try:
+            output = await func()
+        except Exception as e:
+            stage_record.update(status='failed', error=str(e), seconds=time.perf_counter() - started)
+            self.record['status'] = 'failed'
+            self._save_record()
+            raise
+
+        self._save_output(name, output)
+        stage_record.update(
+            status='completed',
+            seconds=time.perf_counter() - started,
+            completed_at=datetime.utcnow().isoformat(),
+            summary=summary(output) if summary else None
+        )
+        self._save_record()
+
+        logger.info(f"Stage '{name}' completed in {stage_record['seconds']:.2f}s")
+        return output
+
+    def _save_output(self, name: str, output: Dict[str, Any]):
+        arrays = {key: value for key, value in output.items() if isinstance(value, np.ndarray)}
+        values = {key: value for key, value in output.items() if key not in arrays}
+
+        if arrays:
+            tmp_path = self.path / f"{name}.tmp.npz"
+            np.savez(tmp_path, **{key: np.asarray(value) for key, value in arrays.items()})
+            os.replace(tmp_path, self.path / f"{name}.npz")
+
+        tmp_path = self.path / f"{name}.json.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(values, f, default=str)
+        os.replace(tmp_path, self.path / f"{name}.json")
+
+    def _load_output(self, name: str) -> Dict[str, Any]:
+        with open(self.path / f"{name}.json") as f:
+            output = json.load(f)
+
+        npz_path = self.path / f"{name}.npz"
+        if npz_path.exists():
+            with np.load(npz_path) as arrays:
+                output.update({key: arrays[key] for key in arrays.files})
+
+        return output
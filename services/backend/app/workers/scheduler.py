@@ -49,6 +49,9 @@ class BackgroundScheduler:
         from app.workers.health_monitor import monitor_driver_health
         from app.workers.learning_worker import export_learning_data
         from app.workers.cleanup_worker import cleanup_old_data
+        from app.workers.swap_clearing import clear_swap_market
+        from app.workers.swap_candidates import refresh_stale_swap_candidates
+        from app.workers.volume_rollup import refresh_package_volume
         
         # Job 1: Daily Assignment Generation (6:00 AM)
         self.scheduler.add_job(
@@ -99,6 +102,36 @@ class BackgroundScheduler:
             replace_existing=True
         )
         logger.info("✅ Registered: Data Cleanup (3:00 AM daily)")
+        
+        # Job 6: Swap Market Clearing (every few minutes)
+        self.scheduler.add_job(
+            clear_swap_market,
+            trigger=IntervalTrigger(seconds=settings.SWAP_CLEARING_INTERVAL_SECONDS),
+            id='swap_clearing',
+            name='Clear Swap Market',
+            replace_existing=True
+        )
+        logger.info(f"✅ Registered: Swap Market Clearing (every {settings.SWAP_CLEARING_INTERVAL_SECONDS}s)")
+        
+        # Job 7: Swap Candidate Refresh (lists invalidated by swaps)
+        self.scheduler.add_job(
+            refresh_stale_swap_candidates,
+            trigger=IntervalTrigger(seconds=settings.SWAP_CANDIDATES_REFRESH_SECONDS),
+            id='swap_candidates',
+            name='Refresh Swap Candidates',
+            replace_existing=True
+        )
+        logger.info(f"✅ Registered: Swap Candidate Refresh (every {settings.SWAP_CANDIDATES_REFRESH_SECONDS}s)")
+        
+        # Job 8: Daily Package Volume Rollup (forecast history)
+        self.scheduler.add_job(
+            refresh_package_volume,
+            trigger=IntervalTrigger(seconds=settings.VOLUME_ROLLUP_INTERVAL_SECONDS),
+            id='forecast_volume_rollup',
+            name='Refresh Daily Package Volume',
+            replace_existing=True
+        )
+        logger.info(f"✅ Registered: Package Volume Rollup (every {settings.VOLUME_ROLLUP_INTERVAL_SECONDS}s)")
     
     def get_jobs(self):
         """
@@ -129,6 +162,8 @@ class BackgroundScheduler:
                 job_info["innovation"] = "Innovation 5 (Health Guardian)"
             elif "learning" in job.id:
                 job_info["innovation"] = "Innovation 2 (XGBoost Shadow)"
+            elif "swap" in job.id:
+                job_info["innovation"] = "Innovation 6 (Swap Marketplace)"
             else:
                 job_info["innovation"] = "Core"
             
@@ -0,0 +1,50 @@
+"""
+Swap Candidate Worker
+Keeps the per-driver swap opportunity lists warm
+"""
+
+from datetime import date
+from typing import Optional
+
+from app.db.session import async_session_maker
+from app.services.swap_service import SwapService
+from app.core.swap_candidates import get_candidate_cache
+from app.utils.helpers import setup_logger
+
+logger = setup_logger(__name__)
+
+
+async def precompute_swap_candidates(run_date: Optional[date] = None):
+    """
+    **INNOVATION 6: P2P Swap Marketplace (candidate lists)**
+    
+    Compute the top swaps of every assigned driver
+    Runs after daily assignment generation
+    """
+    try:
+        async with async_session_maker() as db:
+            stored = await SwapService(db).refresh_swap_candidates(assignment_date=run_date)
+        
+        logger.info(f"✅ Swap candidates precomputed for {stored} drivers")
+    
+    except Exception as e:
+        logger.error(f"❌ Swap candidate precompute failed: {str(e)}", exc_info=True)
+
+
+async def refresh_stale_swap_candidates():
+    """
+    Recompute only the lists invalidated by completed swaps
+    Runs after swaps and every SWAP_CANDIDATES_REFRESH_SECONDS
+    """
+    stale = await (await get_candidate_cache(date.today())).stale_drivers()
+    if not stale:
+        return
+    
+    try:
+        async with async_session_maker() as db:
+            stored = await SwapService(db).refresh_swap_candidates(stale)
+        
+        logger.info(f"Swap candidates refreshed for {stored}/{len(stale)} drivers")
+    
+    except Exception as e:
+        logger.error(f"❌ Swap candidate refresh failed: {str(e)}", exc_info=True)
@@ -0,0 +1,34 @@
+"""
+Swap Market Clearing Worker
+Executes compatible swap intents in batch every few minutes
+"""
+
+from app.db.session import async_session_maker
+from app.services.swap_service import SwapService
+from app.workers.swap_candidates import refresh_stale_swap_candidates
+from app.utils.helpers import setup_logger
+
+logger = setup_logger(__name__)
+
+
+async def clear_swap_market():
+    """
+    **INNOVATION 6: P2P Swap Marketplace (market clearing)**
+    
+    Collect today's open swap intents and execute the 2- and 3-way
+    exchange cycles that maximize total distance saved
+    Runs every SWAP_CLEARING_INTERVAL_SECONDS
+    """
+    try:
+        async with async_session_maker() as db:
+            summary = await SwapService(db).clear_market()
+        
+        if summary.get('swaps_completed'):
+            logger.info(
+                f"✅ Swap market cleared: {summary['swaps_completed']} swaps in "
+                f"{summary['cycles_selected']} cycles, {summary['distance_saved_km']:.1f} km saved"
+            )
+            await refresh_stale_swap_candidates()
+    
+    except Exception as e:
+        logger.error(f"❌ Swap market clearing failed: {str(e)}", exc_info=True)
@@ -0,0 +1,28 @@
+"""
+Package Volume Rollup Worker
+Keeps the daily package volume table current for forecasting
+"""
+
+from app.db.session import async_session_maker
+from app.db.repositories.package_volume_repo import PackageVolumeRepository
+from app.utils.helpers import setup_logger
+
+logger = setup_logger(__name__)
+
+
+async def refresh_package_volume():
+    """
+    **INNOVATION 2: Predictive Workload Forecasting (history rollup)**
+    
+    Recount today's (and any unrecorded) package volume
+    Runs every VOLUME_ROLLUP_INTERVAL_SECONDS
+    """
+    try:
+        async with async_session_maker() as db:
+            days = await PackageVolumeRepository(db).refresh()
+            await db.commit()
+        
+        logger.debug(f"Package volume rollup refreshed: {days} days")
+    
+    except Exception as e:
+        logger.error(f"❌ Package volume rollup failed: {str(e)}", exc_info=True)
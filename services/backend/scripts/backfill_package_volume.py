@@ -0,0 +1,41 @@
+"""
+Backfill Daily Package Volume
+Rebuilds the daily_package_volume rollup from the packages table
+
+Usage:
+    python scripts/backfill_package_volume.py
+    python scripts/backfill_package_volume.py --since 2024-01-01
+"""
+import sys
+import argparse
+import asyncio
+from datetime import date
+from pathlib import Path
+
+# Add app to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.db.session import async_session_maker
+from app.db.repositories.package_volume_repo import PackageVolumeRepository
+
+
+async def backfill(since):
+    async with async_session_maker() as db:
+        days = await PackageVolumeRepository(db).rebuild(since=since)
+        await db.commit()
+
+    scope = f"since {since}" if since else "full history"
+    print(f" Rebuilt {days} days of package volume ({scope})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--since", type=date.fromisoformat, default=None,
+                        help="First day to rebuild, YYYY-MM-DD (default: all history)")
+    args = parser.parse_args()
+
+    asyncio.run(backfill(args.since))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Benchmark Difficulty Pool
+Throughput of the shared-memory scoring pool against in-process scoring
+
+A CPU-bound stand-in model (one dense layer per feature row) replaces
+XGBoost so the numbers reflect pool overhead and scaling, not the model.
+
+Usage:
+    python scripts/benchmark_difficulty_pool.py
+    python scripts/benchmark_difficulty_pool.py --drivers 128 --packages 4000 --workers 1 2 4 8
+"""
+import sys
+import os
+import argparse
+import asyncio
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add app to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.ml.difficulty_pool import DifficultyScoringPool
+from app.ml.xgboost_service import XGBoostService
+
+
+class BusyModel:
+    """CPU-bound stand-in: a fixed dense layer per feature row"""
+
+    def __init__(self, width=2048):
+        self.weights = np.random.default_rng(0).normal(size=(15, width)).astype(np.float32)
+
+    def predict(self, features):
+        hidden = np.tanh(np.asarray(features, dtype=np.float32) @ self.weights)
+        return hidden.mean(axis=1) * 50 + 50
+
+
+class IdentityScaler:
+    def transform(self, features):
+        return features
+
+
+class BenchmarkModels:
+    """Model-loader stand-in for the pool and XGBoostService"""
+
+    xgboost_version = "benchmark"
+
+    def __init__(self):
+        self.model = BusyModel()
+
+    def get_xgboost_model(self):
+        return self.model
+
+    def get_scaler(self):
+        return IdentityScaler()
+
+
+def attributes(service, num_drivers, num_packages, seed=0):
+    rng = np.random.default_rng(seed)
+    drivers = [
+        {'experience_days': int(rng.integers(0, 2000)), 'avg_delivery_time': 30,
+         'success_rate': float(rng.uniform(0.7, 1.0)), 'vehicle_capacity': 50}
+        for _ in range(num_drivers)
+    ]
+    packages = [
+        {'weight': float(rng.uniform(0.5, 30)), 'distance': float(rng.uniform(1, 40)),
+         'floor_number': int(rng.integers(0, 10)), 'is_fragile': bool(rng.integers(0, 2)),
+         'time_window_hours': 4}
+        for _ in range(num_packages)
+    ]
+    return service._driver_attributes(drivers), service._package_attributes(packages)
+
+
+async def pool_throughput(loader, workers, drivers, packages):
+    """Cells per second of a warm pool (worker start-up is not timed)"""
+    pool = DifficultyScoringPool(loader, max_workers=workers)
+    try:
+        await pool.predict_difficulty_batch(drivers[:1], packages)
+        started = time.perf_counter()
+        await pool.predict_difficulty_batch(drivers, packages)
+        return len(drivers) * len(packages) / (time.perf_counter() - started)
+    finally:
+        pool.shutdown()
+
+
+async def run(num_drivers, num_packages, worker_counts):
+    loader = BenchmarkModels()
+    service = XGBoostService(loader)
+    drivers, packages = attributes(service, num_drivers, num_packages)
+    cells = num_drivers * num_packages
+
+    started = time.perf_counter()
+    loader.model.predict(service._pair_features(drivers, packages))
+    serial = cells / (time.perf_counter() - started)
+
+    print(f"{num_drivers}x{num_packages} matrix, {os.cpu_count()} cores")
+    print(f"{'workers':>8} {'cells/s':>12} {'vs in-process':>14} {'vs 1 worker':>12}")
+    print(f"{'-':>8} {serial:>12.0f} {1.0:>13.2f}x {'':>12}")
+
+    single = None
+    for workers in worker_counts:
+        throughput = await pool_throughput(loader, workers, drivers, packages)
+        single = single or throughput
+        print(f"{workers:>8} {throughput:>12.0f} {throughput / serial:>13.2f}x {throughput / single:>11.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--drivers", type=int, default=64, help="Drivers (matrix rows)")
+    parser.add_argument("--packages", type=int, default=2000, help="Packages (matrix columns)")
+    parser.add_argument(
+        "--workers", type=int, nargs="+",
+        default=sorted({1, 2, os.cpu_count() or 1}), help="Pool sizes to time"
+    )
+    args = parser.parse_args()
+
+    asyncio.run(run(args.drivers, args.packages, args.workers))
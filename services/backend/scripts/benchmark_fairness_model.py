@@ -0,0 +1,79 @@
+"""
+Benchmark Fairness Model Construction
+Measures sparse model build time and peak memory as the fleet grows
+
+Usage:
+    python scripts/benchmark_fairness_model.py
+    python scripts/benchmark_fairness_model.py --sizes 50x500 200x2000 --cutoff 70
+"""
+import sys
+import argparse
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+# Add app to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.core.fairness_model import build_assignment_model
+
+
+DEFAULT_SIZES = ["25x250", "50x500", "100x1000", "200x2000"]
+
+
+def measure(func):
+    """Run func and return (result, seconds, peak MB)"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / (1024 * 1024)
+
+
+def run(sizes, cutoff, emit_pulp):
+    rng = np.random.default_rng(42)
+
+    header = f"{'drivers':>8} {'packages':>9} {'pairs':>10} {'build s':>9} {'build MB':>9}"
+    if emit_pulp:
+        header += f" {'pulp s':>9} {'pulp MB':>9}"
+    print(header)
+
+    for size in sizes:
+        num_drivers, num_packages = (int(x) for x in size.lower().split("x"))
+
+        difficulty = rng.uniform(0, 100, size=(num_drivers, num_packages))
+        capacities = rng.uniform(20, 200, size=num_drivers)
+        weights = rng.uniform(0.5, 30, size=num_packages)
+
+        model, build_s, build_mb = measure(lambda: build_assignment_model(
+            difficulty,
+            difficulty_cutoff=cutoff,
+            driver_capacities=capacities,
+            package_weights=weights
+        ))
+
+        line = f"{num_drivers:>8} {num_packages:>9} {model.num_pairs:>10} {build_s:>9.3f} {build_mb:>9.1f}"
+
+        if emit_pulp:
+            drivers = list(range(num_drivers))
+            packages = list(range(num_packages))
+            _, pulp_s, pulp_mb = measure(lambda: model.to_pulp(
+                drivers, packages, min_packages=1, max_packages=num_packages
+            ))
+            line += f" {pulp_s:>9.3f} {pulp_mb:>9.1f}"
+
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", default=DEFAULT_SIZES, help="DRIVERSxPACKAGES pairs")
+    parser.add_argument("--cutoff", type=float, default=100.0, help="Difficulty cutoff for pair pruning")
+    parser.add_argument("--no-pulp", action="store_true", help="Only time the sparse matrix build")
+    args = parser.parse_args()
+
+    run(args.sizes, args.cutoff, emit_pulp=not args.no_pulp)
@@ -0,0 +1,84 @@
+"""
+Benchmark LSTM Forecast
+Compares the per-day model.predict() loop with the single-call forecast engine
+
+Usage:
+    python scripts/benchmark_lstm_forecast.py
+    python scripts/benchmark_lstm_forecast.py --units 64 --days 30 --repeats 20
+"""
+import sys
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add app to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.ml.forecast_engine import KerasForecastEngine
+
+
+def build_model(units, output_steps, sequence_length=30):
+    from tensorflow import keras
+
+    return keras.Sequential([
+        keras.Input(shape=(sequence_length, 1)),
+        keras.layers.LSTM(units),
+        keras.layers.Dense(output_steps)
+    ])
+
+
+def predict_loop(model, window, days):
+    """Previous implementation: one model.predict() per day plus np.roll"""
+    forecasts = []
+    current_sequence = window.reshape(1, -1, 1).copy()
+    for _ in range(days):
+        prediction = model.predict(current_sequence, verbose=0)
+        forecasts.append(prediction[0][0])
+        current_sequence = np.roll(current_sequence, -1, axis=1)
+        current_sequence[0, -1, 0] = prediction[0][0]
+    return np.array(forecasts)
+
+
+def timed(func, repeats):
+    """Median milliseconds over `repeats` runs"""
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return float(np.median(samples))
+
+
+def run(units, days, repeats):
+    window = np.random.default_rng(0).uniform(0, 1, 30).astype(np.float32)
+
+    one_step = build_model(units, 1)
+    started = time.perf_counter()
+    engine = KerasForecastEngine(one_step)
+    engine.warmup(days)
+    warmup_ms = (time.perf_counter() - started) * 1000
+
+    loop_ms = timed(lambda: predict_loop(one_step, window, days), max(1, repeats // 5))
+    rollout_ms = timed(lambda: engine.forecast(window, days), repeats)
+    max_diff = float(np.max(np.abs(predict_loop(one_step, window, days) - engine.forecast(window, days))))
+
+    direct = KerasForecastEngine(build_model(units, days))
+    direct.warmup(days)
+    direct_ms = timed(lambda: direct.forecast(window, days), repeats)
+
+    print(f"LSTM({units}), {days}-day horizon")
+    print(f"  predict() loop        {loop_ms:>9.1f} ms")
+    print(f"  compiled rollout      {rollout_ms:>9.1f} ms  (one-time trace {warmup_ms:.0f} ms, max |diff| {max_diff:.1e})")
+    print(f"  direct {days}-day head  {direct_ms:>9.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--units", type=int, default=64, help="LSTM units")
+    parser.add_argument("--days", type=int, default=30, help="Forecast horizon")
+    parser.add_argument("--repeats", type=int, default=20, help="Timing repeats (median is reported)")
+    args = parser.parse_args()
+
+    run(args.units, args.days, args.repeats)
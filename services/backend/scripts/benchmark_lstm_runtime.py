@@ -0,0 +1,109 @@
+"""
+Benchmark LSTM Runtime
+Startup time, peak RSS and forecast latency: Keras (.h5) vs NumPy (.npz)
+
+Each runtime is measured in a fresh interpreter. Without --model a small
+LSTM is built and exported to a temporary directory first (needs TensorFlow).
+
+Usage:
+    python scripts/benchmark_lstm_runtime.py
+    python scripts/benchmark_lstm_runtime.py --model ../../ml/models/lstm_model.h5 --weights ../../ml/models/lstm_model.npz
+"""
+import sys
+import argparse
+import json
+import subprocess
+import tempfile
+from pathlib import Path
+
+# Add app to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+BACKEND_DIR = Path(__file__).parent.parent
+
+PROBE = """
+import json, resource, sys, time
+
+def peak_rss_mb():
+    # ru_maxrss survives exec (it would include this script's TensorFlow); VmHWM does not
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+started = time.perf_counter()
+sys.path.insert(0, {backend!r})
+if {runtime!r} == "keras":
+    from tensorflow import keras
+    from app.ml.forecast_engine import KerasForecastEngine
+    engine = KerasForecastEngine(keras.models.load_model({path!r}, compile=False))
+else:
+    from app.ml.numpy_lstm import NumpyLSTMEngine
+    engine = NumpyLSTMEngine.load({path!r})
+import numpy as np
+window = np.linspace(0.2, 0.8, engine.sequence_length)
+engine.forecast(window, 30)
+startup = time.perf_counter() - started
+samples = []
+for _ in range(20):
+    t = time.perf_counter()
+    engine.forecast(window, 30)
+    samples.append(time.perf_counter() - t)
+print(json.dumps({{
+    "startup_s": startup,
+    "forecast_ms": 1000 * sorted(samples)[len(samples) // 2],
+    "rss_mb": peak_rss_mb(),
+    "tensorflow_imported": "tensorflow" in sys.modules
+}}))
+"""
+
+
+def build_model(directory: Path, units: int):
+    from tensorflow import keras
+    from app.ml.numpy_lstm import export_keras_lstm
+
+    model = keras.Sequential([
+        keras.Input(shape=(30, 1)),
+        keras.layers.LSTM(units),
+        keras.layers.Dense(1)
+    ])
+    model_path, weights_path = directory / "lstm_model.h5", directory / "lstm_model.npz"
+    model.save(model_path)
+    export_keras_lstm(model, weights_path)
+    return model_path, weights_path
+
+
+def probe(runtime: str, path: Path) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE.format(backend=str(BACKEND_DIR), runtime=runtime, path=str(path))],
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run(model_path, weights_path, units):
+    with tempfile.TemporaryDirectory() as tmp:
+        if model_path is None or weights_path is None:
+            model_path, weights_path = build_model(Path(tmp), units)
+
+        print(f"{'runtime':>8} {'startup s':>10} {'peak RSS MB':>12} {'forecast ms':>12} {'TF imported':>12}")
+        for runtime, path in (("keras", model_path), ("numpy", weights_path)):
+            stats = probe(runtime, path)
+            print(
+                f"{runtime:>8} {stats['startup_s']:>10.2f} {stats['rss_mb']:>12.0f} "
+                f"{stats['forecast_ms']:>12.2f} {str(stats['tensorflow_imported']):>12}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", type=Path, help="Keras .h5 model")
+    parser.add_argument("--weights", type=Path, help="Exported .npz")
+    parser.add_argument("--units", type=int, default=64, help="LSTM units of the generated model")
+    args = parser.parse_args()
+
+    run(args.model, args.weights, args.units)
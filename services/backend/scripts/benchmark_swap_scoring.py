@@ -0,0 +1,89 @@
+"""
+Benchmark Swap Scoring
+Compares the scalar per-candidate scorer with the vectorized kernel
+
+Usage:
+    python scripts/benchmark_swap_scoring.py
+    python scripts/benchmark_swap_scoring.py --sizes 1000 100000 --top 20
+"""
+import sys
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add app to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.core.swap_matching import SwapMatcher, score_swap_candidates, select_top
+
+
+DEFAULT_SIZES = ["500", "5000", "50000"]
+
+
+def best_of(func, repeats):
+    """Run func `repeats` times and return (last result, best seconds)"""
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return result, best
+
+
+def run(sizes, top, repeats):
+    rng = np.random.default_rng(42)
+    matcher = SwapMatcher()
+    offered = (12.97, 77.59)
+
+    print(f"{'candidates':>10} {'scalar ms':>10} {'kernel ms':>10} {'speedup':>8} {'max |diff|':>11}")
+
+    for size in sizes:
+        n = int(size)
+        targets = np.column_stack([12.9 + rng.uniform(0, 0.3, n), 77.5 + rng.uniform(0, 0.3, n)])
+        drivers = np.column_stack([12.9 + rng.uniform(0, 0.3, n), 77.5 + rng.uniform(0, 0.3, n)])
+        difficulty = rng.uniform(0, 100, n)
+
+        target_points = [tuple(t) for t in targets]
+        driver_points = [tuple(d) for d in drivers]
+
+        def scalar():
+            scored = []
+            for i in range(n):
+                score = matcher._calculate_swap_score(
+                    offered, 50.0, target_points[i], difficulty[i], driver_points[i]
+                )
+                if score > 0.5:
+                    scored.append((score, matcher._calculate_distance_saved(
+                        offered, target_points[i], driver_points[i]
+                    ), i))
+            scored.sort(key=lambda x: x[0], reverse=True)
+            return np.array([s for s, _, _ in scored[:top]])
+
+        def kernel():
+            scores, _, _ = score_swap_candidates(
+                offered, 50.0,
+                targets[:, 0], targets[:, 1], difficulty,
+                drivers[:, 0], drivers[:, 1]
+            )
+            return scores[select_top(scores, 0.5, k=top)]
+
+        expected, scalar_s = best_of(scalar, max(1, repeats // 3))
+        result, kernel_s = best_of(kernel, repeats)
+        max_diff = float(np.max(np.abs(expected - result))) if len(result) else 0.0
+
+        print(
+            f"{n:>10} {scalar_s * 1000:>10.2f} {kernel_s * 1000:>10.3f} "
+            f"{scalar_s / kernel_s:>7.0f}x {max_diff:>11.2e}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", default=DEFAULT_SIZES, help="Candidate counts")
+    parser.add_argument("--top", type=int, default=20, help="Swaps kept per lookup")
+    parser.add_argument("--repeats", type=int, default=9, help="Timing repeats (best is reported)")
+    args = parser.parse_args()
+
+    run(args.sizes, args.top, args.repeats)
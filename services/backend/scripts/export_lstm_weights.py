@@ -0,0 +1,54 @@
+"""
+Export LSTM Weights
+Writes the Keras LSTM (.h5) as a NumPy .npz for the TensorFlow-free runtime
+
+Run once per trained model, where TensorFlow is installed
+(pip install -r requirements-training.txt); API workers then load the .npz
+(LSTM_WEIGHTS_PATH) without importing TensorFlow.
+
+Usage:
+    python scripts/export_lstm_weights.py
+    python scripts/export_lstm_weights.py --model ../../ml/models/lstm_model.h5 --out ../../ml/models/lstm_model.npz
+"""
+import sys
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+# Add app to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.config import settings
+from app.ml.numpy_lstm import NumpyLSTMEngine, export_keras_lstm
+
+
+def export(model_path: Path, out_path: Path, check: bool):
+    from tensorflow import keras
+
+    model = keras.models.load_model(model_path, compile=False)
+    spec = export_keras_lstm(model, out_path)
+
+    print(f"Exported {model_path} -> {out_path} ({out_path.stat().st_size / 1024:.1f} KB)")
+    for layer in spec['layers']:
+        print(f"  {layer}")
+
+    if check:
+        engine = NumpyLSTMEngine.load(out_path)
+        inputs = np.random.default_rng(0).uniform(0, 1, (64, spec['sequence_length'], 1)).astype(np.float32)
+        max_diff = float(np.max(np.abs(model.predict(inputs, verbose=0) - engine.predict(inputs))))
+        print(f"Parity on 64 random windows: max |diff| = {max_diff:.2e}")
+        if max_diff > 1e-4:
+            raise SystemExit("NumPy runtime does not match the Keras model")
+
+
+if __name__ == "__main__":
+    models_path = Path(settings.ML_MODELS_PATH)
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", type=Path, default=models_path / settings.LSTM_MODEL_PATH, help="Keras .h5 model")
+    parser.add_argument("--out", type=Path, default=models_path / settings.LSTM_WEIGHTS_PATH, help="Output .npz")
+    parser.add_argument("--no-check", action="store_true", help="Skip the parity check")
+    args = parser.parse_args()
+
+    export(args.model, args.out, check=not args.no_check)
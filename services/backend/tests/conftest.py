@@ -6,7 +6,7 @@ Fixtures and test configuration
 import pytest
 import asyncio
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import StaticPool
 
 from app.db.base import Base
 from app.config import settings
@@ -26,7 +26,7 @@ async def db_session():
     # Use in-memory SQLite for tests
     engine = create_async_engine(
         "sqlite+aiosqlite:///:memory:",
-        poolclass=NullPool,
+        poolclass=StaticPool,  # one connection, so the in-memory tables persist
         echo=False
     )
     
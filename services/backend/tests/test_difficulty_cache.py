@@ -0,0 +1,119 @@
+"""
+Difficulty Cache Tests
+"""
+
+import numpy as np
+
+from app.ml.difficulty_cache import DifficultyCache, feature_hash
+from app.ml.xgboost_service import XGBoostService
+from tests.xgboost_fakes import CountingModel, StaticModelLoader, sample_features
+
+
+class InMemoryPipeline:
+    """Queues commands and runs them against InMemoryRedis on execute()"""
+
+    def __init__(self, redis_client):
+        self.redis = redis_client
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self):
+        results = [await getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+        self.commands = []
+        return results
+
+
+class InMemoryRedis:
+    """Minimal hash-command subset of redis.asyncio.Redis"""
+
+    def __init__(self):
+        self.hashes = {}
+        self.ttls = {}
+        self.round_trips = 0
+
+    def pipeline(self, transaction=True):
+        self.round_trips += 1
+        return InMemoryPipeline(self)
+
+    async def hmget(self, key, fields):
+        stored = self.hashes.get(key, {})
+        return [stored.get(field) for field in fields]
+
+    async def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update(mapping)
+
+    async def expire(self, key, ttl):
+        self.ttls[key] = ttl
+        return True
+
+
+def test_feature_hash_is_order_independent():
+    """Same features in a different key order hash the same"""
+    assert feature_hash({'a': 1, 'b': 2}) == feature_hash({'b': 2, 'a': 1})
+    assert feature_hash({'a': 1}) != feature_hash({'a': 2})
+
+
+async def test_cached_batch_only_scores_missing_cells(monkeypatch):
+    """Re-runs hit the cache; new packages are the only cells scored"""
+    from app.config import settings
+    monkeypatch.setattr(settings, "XGBOOST_SCORING_WORKERS", 0)  # score in-process so rows are counted
+
+    model = CountingModel()
+    service = XGBoostService(StaticModelLoader(model))
+    cache = DifficultyCache(InMemoryRedis(), model_version="test-v1")
+    drivers, packages = sample_features()
+
+    expected = service.predict_difficulty_batch(drivers, packages)
+    model.rows_scored = 0
+
+    first = await service.predict_difficulty_batch_cached(drivers, packages, cache=cache)
+    assert model.rows_scored == 4 * 6
+    np.testing.assert_allclose(first, expected, rtol=1e-5)
+
+    second = await service.predict_difficulty_batch_cached(drivers, packages, cache=cache)
+    assert model.rows_scored == 4 * 6
+    np.testing.assert_allclose(second, expected, rtol=1e-5)
+
+    new_package = {'weight': 9, 'distance': 2.0, 'floor_number': 4, 'is_fragile': True, 'time_window_hours': 2}
+    third = await service.predict_difficulty_batch_cached(drivers, packages + [new_package], cache=cache)
+    assert model.rows_scored == 4 * 6 + 4
+    assert third.shape == (4, 7)
+
+
+async def test_cache_keys_are_per_driver_and_outlive_the_day():
+    """One expiring hash per (model version, driver); reads refresh the TTL; a new model misses"""
+    redis_client = InMemoryRedis()
+    cache = DifficultyCache(redis_client, model_version="test-v1", ttl=60)
+    cache.chunk_size = 4  # two drivers of two packages per round trip
+
+    await cache.set_many(
+        ["d1", "d2", "d3"], ["p1", "p2"],
+        np.array([0, 0, 1, 2]), np.array([0, 1, 1, 0]), np.array([10.0, 20.0, 30.0, 40.0])
+    )
+
+    assert sorted(redis_client.hashes) == ["difficulty:test-v1:d1", "difficulty:test-v1:d2", "difficulty:test-v1:d3"]
+    assert set(redis_client.ttls.values()) == {60}
+    assert redis_client.round_trips == 2
+
+    # The next day's run (a new cache object) still hits, and keeps the keys alive
+    redis_client.ttls.clear()
+    next_run = DifficultyCache(redis_client, model_version="test-v1", ttl=60)
+    np.testing.assert_allclose(
+        await next_run.get_many(["d1", "d2", "d3"], ["p1", "p2"]),
+        [[10.0, 20.0], [np.nan, 30.0], [40.0, np.nan]]
+    )
+    assert set(redis_client.ttls) == set(redis_client.hashes)
+
+    new_model = DifficultyCache(redis_client, model_version="test-v2")
+    assert np.isnan(await new_model.get_many(["d1"], ["p1", "p2"])).all()
@@ -0,0 +1,66 @@
+"""
+Difficulty Scoring Pool Tests
+Shared-memory process pool: correctness and thread pinning
+(throughput: scripts/benchmark_difficulty_pool.py)
+"""
+
+import os
+
+import numpy as np
+
+from app.ml.difficulty_pool import DifficultyScoringPool, _pin_threads
+from app.ml.xgboost_service import XGBoostService
+from tests.xgboost_fakes import CountingModel, StaticModelLoader, sample_features
+
+
+class SklearnStyleModel:
+    def __init__(self):
+        self.params = {}
+
+    def set_params(self, **params):
+        self.params.update(params)
+
+
+class BoosterStyleModel:
+    def __init__(self):
+        self.params = {}
+
+    def set_param(self, params):
+        self.params.update(params)
+
+
+async def test_scoring_pool_matches_serial_prediction():
+    """Process-pool scoring into shared memory equals the in-process matrix"""
+    loader = StaticModelLoader(CountingModel())
+    service = XGBoostService(loader)
+    drivers, packages = sample_features()
+    expected = service.predict_difficulty_batch(drivers, packages)
+
+    pool = DifficultyScoringPool(loader, max_workers=2)
+    try:
+        result = await pool.predict_difficulty_batch(
+            service._driver_attributes(drivers),
+            service._package_attributes(packages),
+            chunk_rows=6
+        )
+    finally:
+        pool.shutdown()
+
+    np.testing.assert_array_equal(result, expected)
+
+
+def test_workers_pin_xgboost_threads():
+    """Both the scikit-learn wrapper and a raw Booster get their thread count capped"""
+    sklearn_model, booster = SklearnStyleModel(), BoosterStyleModel()
+    _pin_threads(sklearn_model, 2)
+    _pin_threads(booster, 3)
+    _pin_threads(CountingModel(), 1)  # neither API: left alone
+
+    assert sklearn_model.params == {'n_jobs': 2}
+    assert booster.params == {'nthread': 3}
+
+    pool = DifficultyScoringPool(StaticModelLoader(CountingModel()), max_workers=os.cpu_count() or 1)
+    try:
+        assert pool.threads_per_worker == 1
+    finally:
+        pool.shutdown()
@@ -37,3 +37,517 @@ def test_fairness_optimizer():
     # Verify package count constraints
     for driver_id, driver_packages in assignments.items():
         assert 1 <= len(driver_packages) <= 3
+
+
+def test_sparse_model_prunes_pairs():
+    """Pairs above the difficulty cutoff or over vehicle capacity are skipped"""
+    from app.core.fairness_model import build_assignment_model
+    
+    difficulty_matrix = np.array([
+        [10.0, 90.0, 40.0],
+        [20.0, 30.0, 95.0],
+    ])
+    
+    model = build_assignment_model(
+        difficulty_matrix,
+        difficulty_cutoff=80.0,
+        driver_capacities=np.array([50.0, 5.0]),
+        package_weights=np.array([3.0, 4.0, 10.0])
+    )
+    
+    pairs = set(zip(model.pair_drivers.tolist(), model.pair_packages.tolist()))
+    assert pairs == {(0, 0), (0, 2), (1, 0), (1, 1)}
+    assert model.costs.tolist() == [10.0, 40.0, 20.0, 30.0]
+    
+    matrix, lower, upper = model.constraint_matrix(min_packages=1, max_packages=2)
+    assert matrix.format == "csr"
+    assert matrix.shape == (3 + 3 * 2, 4)
+    assert len(lower) == len(upper) == matrix.shape[0]
+    # Every package row has at least one candidate driver
+    assert (np.diff(model.package_rows.indptr) > 0).all()
+
+
+def test_sparse_model_restores_orphaned_packages():
+    """A package pruned for every driver keeps its capacity-feasible pairs"""
+    from app.core.fairness_model import build_assignment_model
+    
+    difficulty_matrix = np.array([
+        [99.0, 10.0],
+        [98.0, 20.0],
+    ])
+    
+    model = build_assignment_model(
+        difficulty_matrix,
+        difficulty_cutoff=50.0,
+        driver_capacities=np.array([10.0, 1.0]),
+        package_weights=np.array([5.0, 0.5])
+    )
+    
+    pairs = set(zip(model.pair_drivers.tolist(), model.pair_packages.tolist()))
+    assert pairs == {(0, 0), (0, 1), (1, 1)}
+
+
+def test_fairness_optimizer_accepts_dict_matrix():
+    """Legacy {(driver_id, package_id): score} input gives the same result"""
+    drivers = [1, 2]
+    packages = [101, 102, 103, 104]
+    difficulty_matrix = np.array([
+        [40.0, 60.0, 45.0, 55.0],
+        [55.0, 45.0, 60.0, 40.0],
+    ])
+    as_dict = {
+        (d, p): difficulty_matrix[i, j]
+        for i, d in enumerate(drivers)
+        for j, p in enumerate(packages)
+    }
+    
+    from_array = FairnessOptimizer().optimize_assignments(
+        drivers, packages, difficulty_matrix,
+        max_packages_per_driver=2, min_packages_per_driver=2
+    )
+    from_dict = FairnessOptimizer().optimize_assignments(
+        drivers, packages, as_dict,
+        max_packages_per_driver=2, min_packages_per_driver=2
+    )
+    
+    assert {d: sorted(p) for d, p in from_array.items()} == {d: sorted(p) for d, p in from_dict.items()}
+    assert sorted(from_array[1]) == [101, 103]
+    assert sorted(from_array[2]) == [102, 104]
+
+
+def test_flow_matches_milp_without_band(monkeypatch):
+    """Transportation fast path reaches the MILP optimum when the band is slack"""
+    from app.config import settings
+    monkeypatch.setattr(settings, "FAIRNESS_VARIANCE_THRESHOLD", 1000.0)
+    
+    rng = np.random.default_rng(7)
+    drivers = list(range(1, 6))
+    packages = list(range(100, 123))
+    difficulty_matrix = rng.uniform(10, 90, size=(5, 23))
+    
+    milp = FairnessOptimizer()
+    milp.optimize_assignments(
+        drivers, packages, difficulty_matrix,
+        max_packages_per_driver=5, min_packages_per_driver=4, mode="milp"
+    )
+    flow = FairnessOptimizer()
+    assignments = flow.optimize_assignments(
+        drivers, packages, difficulty_matrix,
+        max_packages_per_driver=5, min_packages_per_driver=4, mode="flow"
+    )
+    
+    assert flow.solve_info['solver'] == 'flow'
+    assert flow.solve_info['objective'] == pytest.approx(milp.solve_info['objective'])
+    assert flow.solve_info['gap'] == pytest.approx(0.0)
+    assert sorted(p for ps in assignments.values() for p in ps) == packages
+    assert all(4 <= len(ps) <= 5 for ps in assignments.values())
+
+
+def test_transportation_scales_to_fleet_size():
+    """Min-cost flow at 500 drivers x 5200 packages with dense candidate pairs"""
+    import time
+    from app.core.fairness_flow import solve_transportation
+    from app.core.fairness_model import build_assignment_model
+    
+    rng = np.random.default_rng(11)
+    difficulty = rng.uniform(10, 90, size=(500, 5200))
+    model = build_assignment_model(difficulty, difficulty_cutoff=100.0)
+    assert model.num_pairs == difficulty.size
+    
+    started = time.perf_counter()
+    owner = solve_transportation(model, min_packages=10, max_packages=11)
+    elapsed = time.perf_counter() - started
+    
+    assert elapsed < 2.0
+    loads = np.bincount(owner, minlength=500)
+    assert loads.min() >= 10 and loads.max() <= 11
+    # No package moves from an 11-package driver to a 10-package one at lower cost
+    change = difficulty - difficulty[owner, np.arange(5200)]
+    assert change[loads == 10][:, loads[owner] == 11].min() >= -1e-9
+
+
+def test_transportation_relaxes_minimum_and_rejects_overload():
+    """Too few packages fill minimums as far as possible; too many is infeasible"""
+    from app.core.fairness_flow import solve_transportation
+    from app.core.fairness_model import build_assignment_model
+    
+    rng = np.random.default_rng(3)
+    # Driver 0 is cheapest everywhere but only 10 packages for 4 x 3 minimum slots
+    difficulty = rng.uniform(40, 60, size=(4, 10))
+    difficulty[0] -= 30.0
+    model = build_assignment_model(difficulty, difficulty_cutoff=100.0)
+    
+    owner = solve_transportation(model, min_packages=3, max_packages=5)
+    loads = np.bincount(owner, minlength=4)
+    assert np.minimum(loads, 3).sum() == 10
+    assert loads.max() <= 5
+    
+    assert solve_transportation(model, min_packages=1, max_packages=2) is None
+
+
+def test_flow_repairs_difficulty_band():
+    """Local search brings every driver's mean difficulty into the band"""
+    from app.core.fairness_flow import repair_difficulty_band
+    
+    # Driver 0 is much better at the first half, driver 1 at the second
+    difficulty = np.array([
+        [10.0, 12.0, 14.0, 16.0, 60.0, 62.0, 64.0, 66.0],
+        [60.0, 62.0, 64.0, 66.0, 10.0, 12.0, 14.0, 16.0],
+    ])
+    owner = np.array([0, 0, 0, 0, 1, 1, 1, 1])
+    center = float(difficulty.mean())
+    
+    stats = repair_difficulty_band(
+        owner, difficulty, np.ones_like(difficulty, dtype=bool),
+        band_center=center, band_tolerance=5.0
+    )
+    
+    assert stats['remaining_violations'] == 0
+    assert stats['exchanges'] > 0
+    assert np.bincount(owner).tolist() == [4, 4]
+    for i in range(2):
+        assert abs(difficulty[i, owner == i].mean() - center) <= 5.0 + 1e-9
+
+
+def test_zone_partition_respects_driver_capacity():
+    """Every zone gets enough drivers for its packages"""
+    from app.core.fairness_zones import partition_zones
+    
+    rng = np.random.default_rng(3)
+    # Two clusters of packages, one twice as dense
+    package_coords = np.vstack([
+        rng.normal([12.97, 77.59], 0.01, size=(40, 2)),
+        rng.normal([13.05, 77.70], 0.01, size=(20, 2)),
+    ])
+    driver_coords = rng.normal([13.0, 77.64], 0.05, size=(12, 2))
+    driver_coords[0] = np.nan  # driver without a GPS fix
+    
+    driver_zone, package_zone = partition_zones(
+        driver_coords, package_coords, num_zones=2, min_packages=4, max_packages=6
+    )
+    
+    assert (driver_zone >= 0).all()
+    for zone in range(2):
+        drivers_in_zone = int((driver_zone == zone).sum())
+        packages_in_zone = int((package_zone == zone).sum())
+        assert 4 * drivers_in_zone <= packages_in_zone <= 6 * drivers_in_zone
+
+
+def test_optimize_assignments_by_zone(monkeypatch):
+    """Zone-parallel solve assigns every package and reports per-zone timings"""
+    from app.config import settings
+    monkeypatch.setattr(settings, "FAIRNESS_VARIANCE_THRESHOLD", 1000.0)
+    
+    rng = np.random.default_rng(5)
+    drivers = list(range(1, 9))
+    packages = list(range(100, 132))
+    package_locations = np.vstack([
+        rng.normal([12.97, 77.59], 0.01, size=(16, 2)),
+        rng.normal([13.05, 77.70], 0.01, size=(16, 2)),
+    ])
+    driver_locations = [(12.97, 77.59)] * 4 + [(13.05, 77.70)] * 4
+    difficulty_matrix = rng.uniform(30, 70, size=(8, 32))
+    
+    optimizer = FairnessOptimizer()
+    assignments = optimizer.optimize_assignments_by_zone(
+        drivers, packages, difficulty_matrix,
+        driver_locations=driver_locations,
+        package_locations=package_locations,
+        num_zones=2,
+        max_workers=2,
+        max_packages_per_driver=5,
+        min_packages_per_driver=3,
+        mode="flow"
+    )
+    
+    assert sorted(p for ps in assignments.values() for p in ps) == packages
+    assert all(3 <= len(ps) <= 5 for ps in assignments.values())
+    assert len(optimizer.solve_info['zones']) == 2
+    assert all(z['seconds'] >= 0 for z in optimizer.solve_info['zones'])
+    assert optimizer.solve_info['gini'] <= optimizer.solve_info['balancing']['gini_before'] + 1e-12
+
+
+def test_concurrent_zone_solves_share_one_pool(monkeypatch):
+    """Hub shards solving at once reuse the same zone pool"""
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    from app.core import fairness
+    
+    created = []
+    
+    class RecordingExecutor:
+        def __init__(self, max_workers=None):
+            created.append(max_workers)
+    
+    monkeypatch.setattr(fairness, "ProcessPoolExecutor", RecordingExecutor)
+    monkeypatch.setattr(fairness, "_zone_executors", {})
+    
+    barrier = threading.Barrier(4)
+    
+    def get_executor(_):
+        barrier.wait()
+        return fairness.get_zone_executor(3)
+    
+    with ThreadPoolExecutor(max_workers=4) as threads:
+        executors = list(threads.map(get_executor, range(4)))
+    
+    assert created == [3]
+    assert all(executor is executors[0] for executor in executors)
+
+
+def test_milp_respects_time_limit_and_reports_gap(monkeypatch):
+    """A time-limited CBC solve keeps its incumbent and reports the gap"""
+    import time
+    from app.config import settings
+    monkeypatch.setattr(settings, "FAIRNESS_VARIANCE_THRESHOLD", 2.0)
+    
+    rng = np.random.default_rng(0)
+    drivers = list(range(5))
+    packages = list(range(50))
+    difficulty_matrix = rng.uniform(30, 70, size=(5, 50))
+    
+    optimizer = FairnessOptimizer()
+    started = time.perf_counter()
+    assignments = optimizer.optimize_assignments(
+        drivers, packages, difficulty_matrix,
+        max_packages_per_driver=11, min_packages_per_driver=9,
+        mode="milp", time_limit=2
+    )
+    elapsed = time.perf_counter() - started
+    
+    assert elapsed < 2.5
+    assert optimizer.solve_info['status'] in ("Optimal", "Feasible")
+    assert optimizer.solve_info['gap'] is not None
+    assert 0 <= optimizer.solve_info['gap'] < 1
+    assert sorted(p for ps in assignments.values() for p in ps) == packages
+
+
+def test_milp_keeps_mip_start_when_budget_is_spent(monkeypatch):
+    """No time left after the MIP start: CBC is skipped, not given a floor"""
+    import time
+    import app.core.fairness as fairness
+    
+    def no_cbc(*args, **kwargs):
+        raise AssertionError("CBC should not run without budget")
+    
+    monkeypatch.setattr(fairness, "PULP_CBC_CMD", no_cbc)
+    
+    rng = np.random.default_rng(0)
+    drivers = list(range(5))
+    packages = list(range(50))
+    difficulty_matrix = rng.uniform(30, 70, size=(5, 50))
+    
+    optimizer = FairnessOptimizer()
+    started = time.perf_counter()
+    assignments = optimizer.optimize_assignments(
+        drivers, packages, difficulty_matrix,
+        max_packages_per_driver=11, min_packages_per_driver=9,
+        mode="milp", time_limit=0
+    )
+    
+    assert time.perf_counter() - started < 0.5
+    assert optimizer.solve_info['gap'] is None
+    assert sorted(p for ps in assignments.values() for p in ps) == packages
+    assert all(9 <= len(ps) <= 11 for ps in assignments.values())
+
+
+def test_milp_keeps_mip_start_when_cbc_finds_no_incumbent(monkeypatch):
+    """CBC stopping without a solution returns the repaired MIP start, not a fresh greedy"""
+    import app.core.fairness as fairness
+    from pulp import LpStatusNotSolved
+    
+    class NoIncumbentSolver:
+        def __init__(self, logPath=None, **kwargs):
+            self.log_path = logPath
+        
+        def actualSolve(self, problem, **kwargs):
+            open(self.log_path, "w").close()
+            problem.status = LpStatusNotSolved
+            return LpStatusNotSolved
+    
+    def no_greedy_fallback(*args, **kwargs):
+        raise AssertionError("the MIP start should be reused")
+    
+    monkeypatch.setattr(fairness, "PULP_CBC_CMD", NoIncumbentSolver)
+    
+    rng = np.random.default_rng(0)
+    drivers = list(range(5))
+    packages = list(range(50))
+    difficulty_matrix = rng.uniform(30, 70, size=(5, 50))
+    
+    optimizer = FairnessOptimizer()
+    monkeypatch.setattr(optimizer, "_greedy_fallback", no_greedy_fallback)
+    assignments = optimizer.optimize_assignments(
+        drivers, packages, difficulty_matrix,
+        max_packages_per_driver=11, min_packages_per_driver=9,
+        mode="milp", time_limit=5
+    )
+    
+    assert optimizer.solve_info['cbc_status'] == "Not Solved"
+    assert optimizer.solve_info['objective'] is not None
+    assert sorted(p for ps in assignments.values() for p in ps) == packages
+    assert all(9 <= len(ps) <= 11 for ps in assignments.values())
+
+
+def test_parse_cbc_lower_bound():
+    """Best bound is read from CBC's final report"""
+    from app.core.fairness import _parse_cbc_lower_bound
+    
+    log = (
+        "Result - Stopped on time limit\n\n"
+        "Objective value:                2480.93815182\n"
+        "Lower bound:                    2471.188\n"
+        "Gap:                            0.00\n"
+    )
+    
+    assert _parse_cbc_lower_bound(log) == pytest.approx(2471.188)
+    assert _parse_cbc_lower_bound("Result - Optimal solution found") is None
+
+
+def test_incremental_reoptimization_keeps_other_drivers_fixed():
+    """Only the neighborhood is re-solved after a driver drops and packages arrive"""
+    import time
+    from app.config import settings
+    
+    rng = np.random.default_rng(3)
+    drivers = list(range(1, 21))
+    current = {d: [d * 100 + k for k in range(8)] for d in drivers}
+    package_difficulty = {p: float(rng.uniform(30, 70)) for ps in current.values() for p in ps}
+    new_packages = [9001, 9002, 9003]
+    
+    optimizer = FairnessOptimizer()
+    neighborhood_drivers, neighborhood_packages = optimizer.select_reoptimization_neighborhood(
+        current_assignments=current,
+        package_difficulty=package_difficulty,
+        active_drivers=[d for d in drivers if d != 7],
+        new_packages=new_packages,
+        removed_drivers=[7],
+        neighborhood_size=3,
+        max_packages_per_driver=11
+    )
+    
+    assert 7 not in neighborhood_drivers
+    assert len(neighborhood_drivers) >= 4  # 11 freed packages need room on 4 drivers
+    assert set(new_packages) | set(current[7]) <= set(neighborhood_packages)
+    
+    difficulty = rng.uniform(30, 70, size=(len(neighborhood_drivers), len(neighborhood_packages)))
+    started = time.perf_counter()
+    assignments = optimizer.reoptimize_assignments(
+        current_assignments=current,
+        neighborhood_drivers=neighborhood_drivers,
+        neighborhood_packages=neighborhood_packages,
+        difficulty_matrix=difficulty,
+        removed_drivers=[7],
+        max_packages_per_driver=11,
+        min_packages_per_driver=8
+    )
+    
+    assert time.perf_counter() - started < 0.5
+    assert 7 not in assignments
+    for driver_id in drivers:
+        if driver_id != 7 and driver_id not in neighborhood_drivers:
+            assert assignments[driver_id] == current[driver_id]
+    
+    assigned = sorted(p for ps in assignments.values() for p in ps)
+    expected = sorted([p for d, ps in current.items() if d != 7 for p in ps] + current[7] + new_packages)
+    assert assigned == expected
+    assert optimizer.solve_info['neighborhood_drivers'] == len(neighborhood_drivers)
+    assert optimizer.solve_info['moved_packages'] <= 11 + 2 * settings.FAIRNESS_REOPT_MAX_EXCHANGES
+
+
+def test_reoptimization_moves_few_packages_within_budget():
+    """A large neighborhood is repaired in place, not re-solved from scratch"""
+    import time
+    
+    rng = np.random.default_rng(5)
+    drivers = list(range(1, 101))
+    current = {d: [d * 100 + k for k in range(10)] for d in drivers}
+    package_difficulty = {p: float(rng.uniform(30, 70)) for ps in current.values() for p in ps}
+    new_packages = list(range(90001, 90004))
+    
+    optimizer = FairnessOptimizer()
+    neighborhood_drivers, neighborhood_packages = optimizer.select_reoptimization_neighborhood(
+        current_assignments=current,
+        package_difficulty=package_difficulty,
+        active_drivers=[d for d in drivers if d != 50],
+        new_packages=new_packages,
+        removed_drivers=[50],
+        neighborhood_size=25,
+        max_packages_per_driver=11
+    )
+    assert len(neighborhood_packages) == 263
+    
+    difficulty = rng.uniform(30, 70, size=(len(neighborhood_drivers), len(neighborhood_packages)))
+    started = time.perf_counter()
+    assignments = optimizer.reoptimize_assignments(
+        current_assignments=current,
+        neighborhood_drivers=neighborhood_drivers,
+        neighborhood_packages=neighborhood_packages,
+        difficulty_matrix=difficulty,
+        removed_drivers=[50],
+        time_limit=0.5,
+        max_exchanges=5,
+        max_packages_per_driver=11,
+        min_packages_per_driver=10
+    )
+    
+    assert time.perf_counter() - started < 0.5
+    assert optimizer.solve_info['moved_packages'] <= 13 + 2 * 5
+    assert all(10 <= len(assignments[d]) <= 11 for d in neighborhood_drivers)
+    assert sorted(p for ps in assignments.values() for p in ps) == sorted(
+        [p for ps in current.values() for p in ps] + new_packages
+    )
+
+
+def test_greedy_respects_package_bounds_and_capacity():
+    """Heap-based greedy keeps every driver within [min, max] and vehicle capacity"""
+    import time
+    
+    rng = np.random.default_rng(4)
+    num_drivers, num_packages = 300, 3000
+    difficulty_matrix = rng.uniform(30, 70, size=(num_drivers, num_packages))
+    capacities = np.where(np.arange(num_drivers) % 2 == 0, 20.0, 200.0)
+    weights = rng.uniform(1, 40, size=num_packages)
+    
+    optimizer = FairnessOptimizer()
+    started = time.perf_counter()
+    assignments = optimizer.optimize_assignments(
+        drivers=list(range(num_drivers)),
+        packages=list(range(num_packages)),
+        difficulty_matrix=difficulty_matrix,
+        max_packages_per_driver=11,
+        min_packages_per_driver=9,
+        driver_capacities=capacities,
+        package_weights=weights,
+        mode="greedy"
+    )
+    
+    assert time.perf_counter() - started < 1.0
+    assert sorted(p for ps in assignments.values() for p in ps) == list(range(num_packages))
+    for driver_id, package_ids in assignments.items():
+        assert 9 <= len(package_ids) <= 11
+        assert all(weights[p] <= capacities[driver_id] for p in package_ids)
+    
+    assert optimizer.solve_info['solver'] == 'greedy'
+    assert optimizer.solve_info['gini'] < 0.05
+
+
+def test_greedy_construction_scales_with_capacity_classes():
+    """1000 drivers x 10000 packages with a vehicle-capacity mask in well under a second"""
+    import time
+    from app.core.fairness_model import candidate_pairs
+    
+    rng = np.random.default_rng(6)
+    num_drivers, num_packages = 1000, 10000
+    difficulty = rng.uniform(30, 70, size=(num_drivers, num_packages))
+    capacities = np.where(np.arange(num_drivers) % 2 == 0, 20.0, 200.0)
+    weights = rng.uniform(1, 40, size=num_packages)
+    allowed = candidate_pairs(difficulty, None, capacities, weights)
+    
+    started = time.perf_counter()
+    owner = FairnessOptimizer()._greedy_owner(difficulty, 9, 11, allowed)
+    assert time.perf_counter() - started < 1.0
+    
+    loads = np.bincount(owner, minlength=num_drivers)
+    assert loads.min() >= 9 and loads.max() <= 11
+    assert allowed[owner, np.arange(num_packages)].all()
@@ -0,0 +1,137 @@
+"""
+Forecast Cache Tests
+Single-flight misses and stale-while-revalidate
+"""
+
+import asyncio
+import json
+import time
+
+from redis.exceptions import LockError
+
+from app.core.forecast_cache import ForecastCache
+from app.services.forecast_service import ForecastService
+
+
+class FakeLock:
+    def __init__(self, redis, name, timeout):
+        self.redis, self.name, self.timeout = redis, name, timeout
+        self.token = object()
+
+    async def acquire(self):
+        if self.name in self.redis.data:
+            return False
+        self.redis.data[self.name] = self.token
+        return True
+
+    async def release(self):
+        if self.redis.data.get(self.name) is not self.token:
+            raise LockError("Cannot release a lock that's no longer owned")
+        del self.redis.data[self.name]
+
+
+class FakeRedis:
+    """The handful of async Redis commands the forecast cache uses"""
+
+    def __init__(self):
+        self.data, self.sets = {}, {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    async def sadd(self, key, *values):
+        self.sets.setdefault(key, set()).update(str(v) for v in values)
+
+    async def smembers(self, key):
+        return self.sets.get(key, set())
+
+    async def expire(self, key, seconds):
+        pass
+
+    def lock(self, name, timeout=None, blocking=True):
+        return FakeLock(self, name, timeout)
+
+
+def _forecast(days):
+    return [{'date': f"2024-01-{d + 1:02d}", 'predicted_volume': 100 + d, 'confidence': 0.9} for d in range(days)]
+
+
+def _cache(redis, fresh_ttl=3600):
+    return ForecastCache(redis, fresh_ttl=fresh_ttl, stale_ttl=3600, lock_ttl=5)
+
+
+async def test_concurrent_misses_compute_once():
+    """A cold key under 50 simultaneous requests runs the loader once"""
+    redis = FakeRedis()
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return _forecast(30)
+
+    results = await asyncio.gather(*[_cache(redis).get("volume_forecast:30_days", loader) for _ in range(50)])
+
+    assert len(calls) == 1
+    assert all(result == _forecast(30) for result in results)
+    assert json.loads(redis.data["volume_forecast:30_days"])['forecast'] == _forecast(30)
+    assert "volume_forecast:30_days:lock" not in redis.data
+
+
+async def test_stale_entry_is_served_while_one_refresh_runs():
+    redis = FakeRedis()
+    redis.data["volume_forecast:30_days"] = json.dumps({'generated_at': time.time() - 7200, 'forecast': _forecast(3)})
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return _forecast(30)
+
+    results = await asyncio.gather(*[_cache(redis).get("volume_forecast:30_days", loader) for _ in range(20)])
+    assert all(result == _forecast(3) for result in results)
+
+    await asyncio.sleep(0.1)
+    assert len(calls) == 1
+    assert await _cache(redis).get("volume_forecast:30_days", loader) == _forecast(30)
+    assert len(calls) == 1
+
+
+async def test_waits_for_the_worker_holding_the_lock():
+    """Another process is already computing: reuse its result instead of recomputing"""
+    redis = FakeRedis()
+    redis.data["volume_forecast:30_days:lock"] = "other-worker"
+
+    async def other_worker():
+        await asyncio.sleep(0.1)
+        await _cache(redis).put("volume_forecast:30_days", _forecast(30))
+        del redis.data["volume_forecast:30_days:lock"]
+
+    async def loader():
+        raise AssertionError("should not compute while another worker holds the lock")
+
+    result, _ = await asyncio.gather(_cache(redis).get("volume_forecast:30_days", loader), other_worker())
+
+    assert result == _forecast(30)
+
+
+async def test_shorter_horizons_share_the_default_entry(monkeypatch):
+    redis = FakeRedis()
+    service = ForecastService(db=None, redis_client=redis)
+    loads = []
+
+    async def fake_load(days, model_loader):
+        loads.append(days)
+        return _forecast(days)
+
+    monkeypatch.setattr(service, "_load_volume_forecast", fake_load)
+
+    assert await service.get_volume_forecast(7, model_loader=None) == _forecast(7)
+    assert await service.get_volume_forecast(30, model_loader=None) == _forecast(30)
+    assert await service.get_volume_forecast(45, model_loader=None) == _forecast(45)
+
+    assert loads == [30, 45]
+    assert await service.get_forecast_horizons() == [30, 45]
@@ -0,0 +1,197 @@
+"""
+Forecast Engine Tests
+Whole-horizon LSTM inference
+"""
+
+import numpy as np
+import pytest
+
+from app.ml.lstm_predictor import LSTMService
+from app.ml.numpy_lstm import NumpyLSTMEngine
+
+
+class MinMaxScaler:
+    """Volume scaler with the sklearn transform/inverse_transform interface"""
+
+    def __init__(self, low=0.0, high=256.0):
+        self.low, self.high = low, high
+
+    def transform(self, values):
+        return (np.asarray(values, dtype=np.float64) - self.low) / (self.high - self.low)
+
+    def inverse_transform(self, values):
+        return np.asarray(values, dtype=np.float64) * (self.high - self.low) + self.low
+
+
+class RecordingEngine:
+    """Forecast engine double: tomorrow repeats the last scaled value, plus a trend"""
+
+    sequence_length = 30
+
+    def __init__(self):
+        self.calls = []
+
+    def forecast(self, window, days):
+        self.calls.append((np.asarray(window).copy(), days))
+        return window[-1] + 0.0625 * np.arange(1, days + 1)
+
+
+class StubLoader:
+    def __init__(self, engine, scaler):
+        self.engine, self.scaler = engine, scaler
+
+    def get_forecast_engine(self):
+        return self.engine
+
+    def get_scaler(self):
+        return self.scaler
+
+
+def test_volume_forecast_is_one_engine_call():
+    """The whole horizon comes from a single forecast() and one inverse transform"""
+    engine = RecordingEngine()
+    service = LSTMService(StubLoader(engine, MinMaxScaler()))
+
+    forecast = service.predict_volume_forecast(list(range(100, 160)), forecast_days=30)
+
+    assert len(engine.calls) == 1
+    window, days = engine.calls[0]
+    assert days == 30
+    np.testing.assert_allclose(window, np.arange(130, 160) / 256.0)
+    assert [f['predicted_volume'] for f in forecast] == [159 + 16 * (d + 1) for d in range(30)]
+    assert forecast[0]['confidence'] == 0.95
+
+
+def test_missing_model_uses_fallback():
+    service = LSTMService(StubLoader(None, MinMaxScaler()))
+
+    forecast = service.predict_volume_forecast([120] * 40, forecast_days=7)
+
+    assert len(forecast) == 7
+    assert {f['confidence'] for f in forecast} == {0.5}
+
+
+def test_batch_earnings_match_per_driver_loop():
+    """One vectorized pass reproduces the per-driver package/earnings arithmetic"""
+    engine = RecordingEngine()
+    service = LSTMService(StubLoader(engine, MinMaxScaler()))
+    shares = {1: 0.5, 2: 0.123, 3: 0.0, 4: 1 / 3}
+
+    forecasts = service.calculate_earnings_forecasts(list(range(100, 160)), shares, 40.0, forecast_days=17)
+
+    assert len(engine.calls) == 1
+    volumes = service.predict_volume_forecast(list(range(100, 160)), forecast_days=17)
+    for driver_id, share in shares.items():
+        daily = [
+            {
+                'date': f['date'],
+                'predicted_packages': int(f['predicted_volume'] * share),
+                'predicted_earnings': int(f['predicted_volume'] * share) * 40.0,
+                'confidence': f['confidence']
+            }
+            for f in volumes
+        ]
+        total = sum(d['predicted_earnings'] for d in daily)
+
+        assert forecasts[driver_id]['daily_breakdown'] == daily
+        assert forecasts[driver_id]['weekly_breakdown'] == service._calculate_weekly_breakdown(daily)
+        assert forecasts[driver_id]['total_predicted_earnings'] == total
+        assert forecasts[driver_id]['average_daily_earnings'] == total / 17
+
+
+def test_truncated_earnings_equal_shorter_horizon():
+    """Shorter horizons are served from the materialized 30-day forecast"""
+    service = LSTMService(StubLoader(RecordingEngine(), MinMaxScaler()))
+    history = list(range(100, 160))
+
+    full = service.calculate_earnings_forecast(history, 0.25, 40.0, forecast_days=30)
+
+    for days in (1, 7, 10, 30):
+        assert service.truncate_earnings_forecast(full, days) == \
+            service.calculate_earnings_forecast(history, 0.25, 40.0, forecast_days=days)
+
+
+@pytest.mark.parametrize("output_steps", [1, 7])
+def test_keras_rollout_matches_predict_loop(output_steps):
+    """One compiled rollout reproduces the per-day model.predict() loop"""
+    tf = pytest.importorskip("tensorflow")
+    from app.ml.forecast_engine import KerasForecastEngine
+
+    tf.random.set_seed(0)
+    model = tf.keras.Sequential([
+        tf.keras.Input(shape=(30, 1)),
+        tf.keras.layers.LSTM(16),
+        tf.keras.layers.Dense(output_steps)
+    ])
+    window = np.random.default_rng(1).uniform(0, 1, 30).astype(np.float32)
+
+    expected, sequence = [], window.reshape(1, 30, 1).copy()
+    while len(expected) < 30:
+        prediction = model.predict(sequence, verbose=0)[0]
+        expected.extend(prediction.tolist())
+        sequence = np.concatenate([sequence[:, output_steps:, :], prediction.reshape(1, -1, 1)], axis=1)
+
+    engine = KerasForecastEngine(model)
+    np.testing.assert_allclose(engine.forecast(window, 30), expected[:30], rtol=1e-4, atol=1e-5)
+    np.testing.assert_allclose(engine.forecast(window, 5), expected[:5], rtol=1e-4, atol=1e-5)
+
+
+def test_numpy_rollout_feeds_predictions_back():
+    """forecast() equals a manual predict-and-shift loop (no TensorFlow needed)"""
+    rng = np.random.default_rng(4)
+    spec = {
+        'format': 1,
+        'sequence_length': 30,
+        'layers': [
+            {'type': 'lstm', 'units': 8, 'activation': 'tanh', 'recurrent_activation': 'sigmoid', 'return_sequences': False},
+            {'type': 'dense', 'activation': 'linear'}
+        ]
+    }
+    weights = {
+        '0/kernel': rng.normal(0, 0.5, (1, 32)),
+        '0/recurrent_kernel': rng.normal(0, 0.5, (8, 32)),
+        '0/bias': rng.normal(0, 0.1, 32),
+        '1/kernel': rng.normal(0, 0.5, (8, 1)),
+        '1/bias': np.array([0.3])
+    }
+    engine = NumpyLSTMEngine(spec, weights)
+    window = rng.uniform(0, 1, 30).astype(np.float32)
+
+    expected, sequence = [], window.reshape(1, 30, 1)
+    for _ in range(12):
+        prediction = engine.predict(sequence)
+        expected.append(prediction[0, 0])
+        sequence = np.concatenate([sequence[:, 1:], prediction.reshape(1, 1, 1)], axis=1)
+
+    np.testing.assert_allclose(engine.forecast(window, 12), expected, rtol=1e-6)
+    assert engine.forecast(np.stack([window, window]), 12).shape == (2, 12)
+
+
+@pytest.mark.parametrize("output_steps", [1, 7])
+def test_numpy_runtime_matches_keras(tmp_path, output_steps):
+    """Exported .npz reproduces model.predict and the Keras rollout"""
+    tf = pytest.importorskip("tensorflow")
+    from app.ml.forecast_engine import KerasForecastEngine
+    from app.ml.numpy_lstm import export_keras_lstm
+
+    tf.random.set_seed(1)
+    model = tf.keras.Sequential([
+        tf.keras.Input(shape=(30, 1)),
+        tf.keras.layers.LSTM(16, return_sequences=True),
+        tf.keras.layers.Dropout(0.2),
+        tf.keras.layers.LSTM(8),
+        tf.keras.layers.Dense(4, activation='relu'),
+        tf.keras.layers.Dense(output_steps)
+    ])
+    model.save(tmp_path / "lstm_model.h5")
+    export_keras_lstm(tf.keras.models.load_model(tmp_path / "lstm_model.h5", compile=False), tmp_path / "lstm_model.npz")
+
+    engine = NumpyLSTMEngine.load(tmp_path / "lstm_model.npz")
+    inputs = np.random.default_rng(2).uniform(0, 1, (64, 30, 1)).astype(np.float32)
+
+    np.testing.assert_allclose(engine.predict(inputs), model.predict(inputs, verbose=0), rtol=1e-4, atol=1e-5)
+    np.testing.assert_allclose(
+        engine.forecast(inputs[:4, :, 0], 30),
+        KerasForecastEngine(model).forecast(inputs[:4, :, 0], 30),
+        rtol=1e-4, atol=1e-5
+    )
@@ -0,0 +1,161 @@
+"""
+Notification Dispatcher Tests
+"""
+
+import time
+import asyncio
+import pytest
+
+from app.core.notification_dispatcher import DeliveryError, LocalTransport, NotificationDispatcher
+from app.core.notification_outbox import LocalOutbox, OutboxConsumer, OutboxMetrics, RedisStreamOutbox
+from app.core.notifications import NotificationService
+
+
+def _messages(count):
+    return [
+        NotificationService.assignment_message(f"token-{i}", f"Driver {i}", package_count=i % 40)
+        for i in range(count)
+    ]
+
+
+async def test_fan_out_uses_batches_of_at_most_500():
+    """1,201 messages go out as 500 + 500 + 201"""
+    transport = LocalTransport()
+    service = NotificationService(NotificationDispatcher(transport, batch_size=1000))
+
+    stats = await service.send_many(_messages(1201))
+
+    assert stats['success'] == 1201
+    assert stats['failure'] == 0
+    assert sorted(transport.batches) == [201, 500, 500]
+    assert {m['token'] for m in transport.sent} == {f"token-{i}" for i in range(1201)}
+
+
+async def test_transient_failures_are_retried_permanent_ones_are_not():
+    """Unavailable errors are resent with backoff; unregistered tokens are dropped"""
+    attempts = {}
+
+    def fail(message):
+        token = message['token']
+        attempts[token] = attempts.get(token, 0) + 1
+        if token == "token-1":
+            return DeliveryError("Requested entity was not found", retryable=False)
+        if token == "token-2" and attempts[token] < 3:
+            return DeliveryError("Service unavailable", retryable=True)
+        return None
+
+    transport = LocalTransport(fail=fail)
+    dispatcher = NotificationDispatcher(transport, max_retries=3, backoff_seconds=0)
+
+    stats = await dispatcher.send_many(_messages(4))
+
+    assert stats == {**stats, 'success': 3, 'failure': 1, 'retried': 2, 'batches': 3}
+    assert attempts == {'token-0': 1, 'token-1': 1, 'token-2': 3, 'token-3': 1}
+
+
+async def test_single_send_and_unconfigured_transport():
+    """send_notification delivers one message; no transport means nothing is sent"""
+    transport = LocalTransport()
+    service = NotificationService(NotificationDispatcher(transport))
+
+    assert await service.send_health_alert("token-x", "Asha", risk_score=72.5, break_duration=15)
+    assert transport.sent[0]['data'] == {'type': 'health_alert', 'risk_score': '72.5', 'break_duration': '15'}
+
+    disabled = NotificationService(NotificationDispatcher(None))
+    assert not disabled.initialized
+    assert await disabled.send_notification("token-y", "title", "body") is False
+
+
+async def test_outbox_dedups_per_driver_and_type_and_reports_metrics():
+    """Repeat alerts are dropped at enqueue; the consumer delivers the rest"""
+    outbox = LocalOutbox()
+    transport = LocalTransport()
+    metrics = OutboxMetrics()
+    consumer = OutboxConsumer(outbox, NotificationDispatcher(transport), rate_per_second=0, metrics=metrics)
+
+    alert = NotificationService.health_alert_message("token-1", "Asha", risk_score=80.0, break_duration=20)
+    assignment = NotificationService.assignment_message("token-1", "Asha", package_count=12)
+
+    assert await outbox.enqueue(alert, dedup_key="1:health_alert")
+    assert not await outbox.enqueue(alert, dedup_key="1:health_alert")
+    assert await outbox.enqueue(assignment, dedup_key="1:new_assignment")
+    assert await outbox.enqueue(alert, dedup_key="2:health_alert")
+    assert await outbox.depth() == 3
+
+    assert await consumer.drain_once(block_ms=10) == 3
+    assert await consumer.drain_once(block_ms=10) == 0
+
+    snapshot = metrics.snapshot(await outbox.depth())
+    assert snapshot['depth'] == 0
+    assert snapshot['sent'] == 3
+    assert snapshot['failed'] == 0
+    assert snapshot['latency_ms']['p95'] is not None
+    assert [m['data']['type'] for m in transport.sent] == ['health_alert', 'new_assignment', 'health_alert']
+
+
+async def test_redis_outbox_dedup_key_is_only_set_when_xadd_succeeds():
+    """Dedup check, XADD and dedup key are one script: a failed XADD keeps the message retryable"""
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    redis_client = fakeredis.FakeAsyncRedis(decode_responses=True)
+
+    outbox = RedisStreamOutbox(redis_client, stream="outbox-test")
+    alert = NotificationService.health_alert_message("token-1", "Asha", risk_score=80.0, break_duration=20)
+
+    assert await outbox.enqueue(alert, dedup_key="1:health_alert")
+    assert not await outbox.enqueue(alert, dedup_key="1:health_alert")
+    assert await outbox.enqueue(alert)
+    assert await outbox.depth() == 2
+    assert await redis_client.ttl("outbox-test:dedup:1:health_alert") > 0
+
+    await redis_client.set("broken-stream", "not a stream")
+    broken = RedisStreamOutbox(redis_client, stream="broken-stream")
+    with pytest.raises(Exception):
+        await broken.enqueue(alert, dedup_key="1:health_alert")
+    assert not await redis_client.exists("broken-stream:dedup:1:health_alert")
+
+
+async def test_redis_outbox_enqueue_many_pipelines_and_dedups(monkeypatch):
+    """Batched enqueue dedups within and across chunks like single enqueues"""
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    from app.config import settings
+    monkeypatch.setattr(settings, "NOTIFICATION_ENQUEUE_CHUNK_SIZE", 2)
+    redis_client = fakeredis.FakeAsyncRedis(decode_responses=True)
+
+    outbox = RedisStreamOutbox(redis_client, stream="outbox-many")
+    alert = NotificationService.health_alert_message("token-1", "Asha", risk_score=80.0, break_duration=20)
+    assignment = NotificationService.assignment_message("token-1", "Asha", package_count=12)
+
+    queued = await outbox.enqueue_many([
+        (alert, "1:health_alert"),
+        (alert, "1:health_alert"),
+        (assignment, "1:new_assignment"),
+        (alert, None),
+        (alert, "1:health_alert")
+    ])
+
+    assert queued == [True, False, True, True, False]
+    assert await outbox.depth() == 3
+    assert await redis_client.ttl("outbox-many:dedup:1:new_assignment") > 0
+
+
+async def test_outbox_consumer_pool_respects_rate_limit():
+    """Four workers still deliver no faster than the shared token bucket"""
+    outbox = LocalOutbox()
+    transport = LocalTransport()
+    consumer = OutboxConsumer(outbox, NotificationDispatcher(transport), workers=4, rate_per_second=20)
+
+    for message in _messages(30):
+        await outbox.enqueue(message)
+
+    started = time.perf_counter()
+    consumer.start()
+    while len(transport.sent) < 30:
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - started
+    await consumer.stop()
+
+    # 20 tokens of burst, the remaining 10 at 20/s
+    assert elapsed >= 0.45
+    assert max(transport.batches) <= 20
@@ -0,0 +1,155 @@
+"""
+Pipeline Checkpoint Tests
+"""
+
+import json
+from datetime import date
+import pytest
+import numpy as np
+
+from app.workers.pipeline import PipelineRun
+
+
+async def test_rerun_resumes_after_last_completed_stage(tmp_path):
+    """A failed stage is retried; completed stages load from their checkpoint"""
+    calls = []
+
+    async def score():
+        calls.append("score")
+        return {'matrix': np.arange(6.0).reshape(2, 3), 'shape': [2, 3]}
+
+    async def notify():
+        calls.append("notify")
+        raise RuntimeError("FCM unavailable")
+
+    run = PipelineRun("job", "2026-01-01", root=str(tmp_path))
+    run.start()
+    await run.stage("score", score, summary=lambda out: {'shape': out['shape']})
+    with pytest.raises(RuntimeError):
+        await run.stage("notify", notify)
+
+    record = json.loads((tmp_path / "job" / "2026-01-01" / "record.json").read_text())
+    assert record['status'] == 'failed'
+    assert record['stages']['score']['status'] == 'completed'
+    assert record['stages']['score']['seconds'] >= 0
+    assert record['stages']['notify']['error'] == "FCM unavailable"
+
+    async def notify_ok():
+        calls.append("notify")
+        return {'notified': 3}
+
+    rerun = PipelineRun("job", "2026-01-01", root=str(tmp_path))
+    rerun.start()
+    scored = await rerun.stage("score", score)
+    await rerun.stage("notify", notify_ok)
+    rerun.finish()
+
+    assert calls == ["score", "notify", "notify"]
+    np.testing.assert_array_equal(scored['matrix'], np.arange(6.0).reshape(2, 3))
+    assert scored['shape'] == [2, 3]
+    assert rerun.is_completed
+
+
+def test_reset_discards_checkpoints(tmp_path):
+    """reset() starts the run over"""
+    run = PipelineRun("job", "2026-01-02", root=str(tmp_path))
+    run.start()
+    run.finish()
+    assert run.is_completed
+
+    run.reset()
+    assert run.record['status'] == 'pending'
+    assert list((tmp_path / "job" / "2026-01-02").iterdir()) == []
+
+
+async def test_hub_shards_run_concurrently_and_fail_independently(tmp_path, monkeypatch):
+    """A slow hub and a failing hub do not hold up or break the others"""
+    import time
+    from app.config import settings
+    from app.workers import assignment_generator as generator
+
+    monkeypatch.setattr(settings, "PIPELINE_CHECKPOINT_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "ASSIGNMENT_SHARD_CONCURRENCY", 3)
+
+    class LoadedModels:
+        is_loaded = True
+
+    class NoSession:
+        async def __aenter__(self):
+            return None
+
+        async def __aexit__(self, *exc):
+            return False
+
+    async def get_pending_hub_ids(self):
+        return ["slow", "broken", None]
+
+    async def load(hub_id):
+        return {
+            'drivers': [{'id': 1, 'hub': hub_id}],
+            'packages': [{'id': 10}]
+        }
+
+    async def featurize(loaded):
+        return {}
+
+    async def score(features):
+        return {'difficulty_matrix': np.zeros((1, 1))}
+
+    def solve(loaded, difficulty_matrix):
+        hub_id = loaded['drivers'][0]['hub']
+        if hub_id == "broken":
+            raise RuntimeError("infeasible")
+        if hub_id == "slow":
+            time.sleep(0.3)
+        return {'assignments': [[1, [10]]], 'solve_info': {'solver': 'test'}}
+
+    async def done(*args):
+        return {}
+
+    precomputed = []
+
+    async def precompute_swap_candidates(run_date):
+        precomputed.append(run_date)
+
+    monkeypatch.setattr(generator, "async_session_maker", NoSession)
+    monkeypatch.setattr(generator.PackageRepository, "get_pending_hub_ids", get_pending_hub_ids)
+    monkeypatch.setattr(generator, "ModelLoader", LoadedModels)
+    monkeypatch.setattr(generator, "_load_stage", load)
+    monkeypatch.setattr(generator, "_featurize_stage", featurize)
+    monkeypatch.setattr(generator, "_score_stage", score)
+    monkeypatch.setattr(generator, "_solve_stage", solve)
+    monkeypatch.setattr(generator, "_persist_stage", done)
+    monkeypatch.setattr(generator, "_notify_stage", done)
+    monkeypatch.setattr(generator, "precompute_swap_candidates", precompute_swap_candidates)
+
+    results = await generator.generate_daily_assignments(date(2026, 1, 3))
+
+    assert {name: record['status'] for name, record in results.items()} == {
+        'slow': 'completed',
+        'broken': 'failed',
+        '_no_hub': 'completed'
+    }
+    assert results['broken']['stages']['solve']['error'] == "infeasible"
+    assert (tmp_path / "daily_assignments" / "2026-01-03" / "_no_hub" / "record.json").exists()
+    assert precomputed == [date(2026, 1, 3)]
+
+    # Only the failed shard is picked up again
+    assert generator._unfinished_hubs(date(2026, 1, 3)) == ["broken"]
+
+
+def test_unfinished_hubs_keep_hub_named_default(tmp_path, monkeypatch):
+    """A real hub called "default" is not confused with the no-hub shard"""
+    from app.config import settings
+    from app.workers import assignment_generator as generator
+
+    monkeypatch.setattr(settings, "PIPELINE_CHECKPOINT_DIR", str(tmp_path))
+
+    for hub_id in ("default", None):
+        run = PipelineRun("daily_assignments", f"2026-01-04/{generator._shard_name(hub_id)}")
+        run.record['hub_id'] = hub_id
+        run.start()
+        run.finish(status='failed')
+
+    unfinished = generator._unfinished_hubs(date(2026, 1, 4))
+    assert sorted(unfinished, key=str) == [None, "default"]
@@ -0,0 +1,144 @@
+"""
+Repository Tests
+Bulk persistence used by the assignment generator
+"""
+
+import pytest
+from datetime import date, datetime, timedelta
+from sqlalchemy import select
+
+import app.db.models  # noqa: F401 - register every table on Base.metadata
+from app.db.models.driver import Driver, VehicleType
+from app.db.models.package import Package, PackageStatus
+from app.db.models.assignment import Assignment
+from app.db.repositories.assignment_repo import AssignmentRepository
+from app.db.repositories.package_repo import PackageRepository
+from app.db.repositories.package_volume_repo import PackageVolumeRepository
+
+
+@pytest.fixture
+async def drivers_and_packages(db_session):
+    """Two drivers and five pending packages"""
+    drivers = [
+        Driver(
+            user_id=3000 + i,
+            name=f"Bulk Driver {i}",
+            email=f"bulk{i}@test.com",
+            phone=f"+1555200{i:04d}",
+            password_hash="hashed_password",
+            vehicle_type=VehicleType.BIKE
+        )
+        for i in range(2)
+    ]
+    packages = [
+        Package(
+            tracking_number=f"BULK-{i:04d}",
+            weight_kg=2.0 + i,
+            delivery_address="Test Address",
+            delivery_latitude=12.97,
+            delivery_longitude=77.59,
+            customer_name=f"Customer {i}",
+            customer_phone=f"+1555300{i:04d}"
+        )
+        for i in range(5)
+    ]
+    db_session.add_all(drivers + packages)
+    await db_session.commit()
+    return drivers, packages
+
+
+async def test_bulk_create_returns_ids_and_flips_package_status(db_session, drivers_and_packages, monkeypatch):
+    """Multi-row INSERT returns ids in input order; packages become ASSIGNED"""
+    from app.config import settings
+    monkeypatch.setattr(settings, "DB_BULK_CHUNK_SIZE", 2)  # exercise chunking
+
+    drivers, packages = drivers_and_packages
+    rows = [
+        {
+            'driver_id': drivers[j % 2].id,
+            'package_id': package.id,
+            'assignment_date': date.today(),
+            'predicted_difficulty': 40.0 + j,
+            'assigned_at': datetime.utcnow()
+        }
+        for j, package in enumerate(packages)
+    ]
+
+    ids = await AssignmentRepository(db_session).bulk_create(rows)
+    updated = await PackageRepository(db_session).mark_assigned([p.id for p in packages])
+    await db_session.commit()
+
+    assert len(ids) == 5
+    assert updated == 5
+
+    result = await db_session.execute(select(Assignment).order_by(Assignment.id))
+    saved = result.scalars().all()
+    assert [a.id for a in saved] == sorted(ids)
+    by_id = {a.id: a for a in saved}
+    assert [by_id[i].package_id for i in ids] == [p.id for p in packages]
+    assert all(a.is_accepted is False for a in saved)
+
+    result = await db_session.execute(select(Package.status))
+    assert set(result.scalars().all()) == {PackageStatus.ASSIGNED}
+
+
+async def test_pending_packages_are_sharded_by_hub(db_session, drivers_and_packages):
+    """Hub filters split drivers and packages; NULL hub is its own shard"""
+    from app.db.repositories.driver_repo import DriverRepository
+
+    drivers, packages = drivers_and_packages
+    drivers[0].hub_id = "BLR-1"
+    for package in packages[:3]:
+        package.hub_id = "BLR-1"
+    await db_session.commit()
+
+    package_repo = PackageRepository(db_session)
+    assert set(await package_repo.get_pending_hub_ids()) == {"BLR-1", None}
+    assert len(await package_repo.get_pending_by_hub("BLR-1")) == 3
+    assert len(await package_repo.get_pending_by_hub(None)) == 2
+
+    driver_repo = DriverRepository(db_session)
+    assert [d.id for d in await driver_repo.get_active_drivers_by_hub("BLR-1")] == [drivers[0].id]
+    assert [d.id for d in await driver_repo.get_active_drivers_by_hub(None)] == [drivers[1].id]
+
+
+def _packages_created(day_offsets, prefix):
+    """One package per offset, created that many days ago"""
+    now = datetime.utcnow()
+    return [
+        Package(
+            tracking_number=f"{prefix}-{i:04d}",
+            weight_kg=1.0,
+            delivery_address="Test Address",
+            delivery_latitude=12.97,
+            delivery_longitude=77.59,
+            customer_name=f"Customer {i}",
+            customer_phone=f"+1555600{i:04d}",
+            created_at=now - timedelta(days=offset)
+        )
+        for i, offset in enumerate(day_offsets)
+    ]
+
+
+async def test_volume_rollup_backfills_and_refreshes_latest_day(db_session):
+    """Rollup matches the per-day package counts; refresh only recounts the tail"""
+    db_session.add_all(_packages_created([90, 5, 5, 3, 3, 3, 0], "VOL"))
+    await db_session.commit()
+
+    repo = PackageVolumeRepository(db_session)
+    assert await repo.refresh() == 4  # empty rollup: full backfill
+    await db_session.commit()
+    assert await repo.get_history(days=60) == [2, 3, 1]
+    assert await repo.get_latest_date() == datetime.utcnow().date()
+
+    db_session.add_all(_packages_created([0, 0], "VOL-NEW"))
+    await db_session.commit()
+
+    assert await repo.refresh() == 1  # only today is recounted
+    await db_session.commit()
+    assert await repo.get_history(days=60) == [2, 3, 3]
+    assert await repo.get_history(days=100) == [1, 2, 3, 3]
+
+    assert await repo.rebuild(since=date.today() - timedelta(days=4)) == 2
+    await db_session.commit()
+    assert await repo.get_history(days=100) == [1, 2, 3, 3]
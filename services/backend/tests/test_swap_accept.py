@@ -0,0 +1,323 @@
+"""
+Swap Accept Tests
+Atomic swap execution under concurrent accepts
+
+The concurrency tests run on SQLite, which serializes writers with a file
+lock and ignores FOR UPDATE, so there they only check that the accept and
+clearing paths stay consistent. Row locking with SKIP LOCKED is exercised
+against PostgreSQL when TEST_POSTGRES_URL (an asyncpg URL to a disposable
+database) is set; test_locking_selects_skip_locked checks the emitted SQL
+either way.
+"""
+
+import asyncio
+import os
+import random
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import event, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+import app.db.models  # noqa: F401 - register every table on Base.metadata
+from app.db.base import Base
+from app.db.models.assignment import Assignment
+from app.db.models.driver import Driver, VehicleType
+from app.db.models.package import Package
+from app.db.models.swap import Swap, SwapStatus
+from app.db.repositories.swap_repo import SwapRepository
+from app.core.swap_candidates import drop_candidate_cache
+from app.core import swap_index
+from app.core.swap_index import SwapIndexStore, drop_swap_index
+from app.services.swap_service import SwapService
+
+POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+
+@pytest.fixture(params=[
+    "sqlite",
+    pytest.param("postgres", marks=[
+        pytest.mark.integration,
+        pytest.mark.skipif(not POSTGRES_URL, reason="TEST_POSTGRES_URL not set")
+    ])
+])
+async def session_factory(request, tmp_path):
+    """File-backed SQLite or a real PostgreSQL; every request gets its own connection"""
+    if request.param == "postgres":
+        engine = create_async_engine(POSTGRES_URL)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+    else:
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{tmp_path / 'swaps.db'}",
+            connect_args={'timeout': 30}
+        )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    yield async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    if request.param == "postgres":
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+
+
+async def _market(factory, num_drivers, num_swaps, seed=11):
+    """One package per driver and random, heavily overlapping swap proposals"""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+
+    async with factory() as db:
+        db.add_all([
+            Driver(
+                id=d, user_id=5000 + d, name=f"Driver {d}", email=f"swap{d}@test.com",
+                phone=f"+1555400{d:04d}", password_hash="hashed_password", vehicle_type=VehicleType.BIKE
+            )
+            for d in range(1, num_drivers + 1)
+        ])
+        db.add_all([
+            Package(
+                id=d, tracking_number=f"ACC-{d:04d}", weight_kg=2.0, delivery_address="Test Address",
+                delivery_latitude=12.97, delivery_longitude=77.59,
+                customer_name=f"Customer {d}", customer_phone=f"+1555500{d:04d}"
+            )
+            for d in range(1, num_drivers + 1)
+        ])
+        db.add_all([
+            Assignment(driver_id=d, package_id=d, assignment_date=date.today(), predicted_difficulty=50.0, assigned_at=now)
+            for d in range(1, num_drivers + 1)
+        ])
+
+        swaps = []
+        for _ in range(num_swaps):
+            proposer, acceptor = rng.sample(range(1, num_drivers + 1), 2)
+            swaps.append(Swap(
+                proposer_id=proposer, acceptor_id=acceptor,
+                offered_package_id=proposer, requested_package_id=acceptor,
+                status=SwapStatus.PENDING, proposed_at=now
+            ))
+        db.add_all(swaps)
+        await db.commit()
+
+        return [(s.id, s.acceptor_id) for s in swaps]
+
+
+async def _accept(factory, swap_id, acceptor_id):
+    async with factory() as db:
+        try:
+            await SwapService(db).accept_swap(swap_id, acceptor_id)
+            return True
+        except ValueError:
+            return False
+
+
+async def test_concurrent_accepts_never_double_swap(session_factory):
+    """Every swap accepted twice at once; each package moves at most once"""
+    num_drivers = 20
+    swaps = await _market(session_factory, num_drivers, num_swaps=40)
+
+    attempts = swaps + swaps
+    random.Random(3).shuffle(attempts)
+    outcomes = await asyncio.gather(*[_accept(session_factory, s, a) for s, a in attempts])
+
+    async with session_factory() as db:
+        completed = (await db.execute(select(Swap).where(Swap.status == SwapStatus.COMPLETED))).scalars().all()
+        owners = dict((await db.execute(select(Assignment.package_id, Assignment.driver_id))).all())
+
+    assert sum(outcomes) == len(completed) > 0
+
+    moved = [p for s in completed for p in (s.offered_package_id, s.requested_package_id)]
+    assert len(moved) == len(set(moved))
+
+    expected = {d: d for d in range(1, num_drivers + 1)}
+    for s in completed:
+        expected[s.offered_package_id] = s.acceptor_id
+        expected[s.requested_package_id] = s.proposer_id
+    assert owners == expected
+
+
+async def test_accept_is_three_statements(session_factory):
+    """Lock, exchange and complete: no per-row re-selects"""
+    swaps = await _market(session_factory, num_drivers=2, num_swaps=1)
+    swap_id, acceptor_id = swaps[0]
+
+    async with session_factory() as db:
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)  # noqa: E731
+        event.listen(db.bind.sync_engine, "before_cursor_execute", listener)
+        try:
+            swap = await SwapService(db).accept_swap(swap_id, acceptor_id)
+        finally:
+            event.remove(db.bind.sync_engine, "before_cursor_execute", listener)
+
+    assert swap.status == SwapStatus.COMPLETED
+    assert [s.split()[0] for s in statements] == ["SELECT", "UPDATE", "UPDATE"]
+
+    async with session_factory() as db:
+        with pytest.raises(ValueError, match="not pending"):
+            await SwapService(db).accept_swap(swap_id, acceptor_id)
+        with pytest.raises(ValueError, match="not found"):
+            await SwapService(db).accept_swap(swap_id + 100, acceptor_id)
+
+
+async def _clear(factory):
+    async with factory() as db:
+        return (await SwapService(db).clear_market())['swaps_completed']
+
+
+async def test_clearing_concurrent_with_accepts_never_double_moves(session_factory):
+    """A clearing pass racing accepts on the same packages moves each package at most once"""
+    drop_swap_index(date.today())
+    await drop_candidate_cache(date.today())
+
+    num_drivers = 16
+    swaps = await _market(session_factory, num_drivers, num_swaps=24, seed=5)
+    async with session_factory() as db:
+        # Reverse proposals close 2-cycles the clearing pass can execute
+        originals = (await db.execute(select(Swap))).scalars().all()
+        db.add_all([
+            Swap(
+                proposer_id=s.acceptor_id, acceptor_id=s.proposer_id,
+                offered_package_id=s.requested_package_id, requested_package_id=s.offered_package_id,
+                status=SwapStatus.PENDING, proposed_at=s.proposed_at
+            )
+            for s in originals[::2]
+        ])
+        await db.commit()
+
+    attempts = list(swaps)
+    random.Random(9).shuffle(attempts)
+    cleared, *outcomes = await asyncio.gather(
+        _clear(session_factory),
+        *[_accept(session_factory, s, a) for s, a in attempts]
+    )
+
+    async with session_factory() as db:
+        completed = (await db.execute(select(Swap).where(Swap.status == SwapStatus.COMPLETED))).scalars().all()
+        owners = dict((await db.execute(select(Assignment.package_id, Assignment.driver_id))).all())
+
+    assert cleared + sum(outcomes) == len(completed) > 0
+
+    offered = [s.offered_package_id for s in completed]
+    requested = [s.requested_package_id for s in completed]
+    assert len(offered) == len(set(offered))
+    assert len(requested) == len(set(requested))
+    assert all(owners[s.requested_package_id] == s.proposer_id for s in completed)
+    assert sorted(owners.values()) == list(range(1, num_drivers + 1))  # still one package each
+
+    drop_swap_index(date.today())
+    await drop_candidate_cache(date.today())
+
+
+async def test_locking_selects_skip_locked(session_factory, monkeypatch):
+    """Accept and clearing lock their rows with FOR UPDATE SKIP LOCKED on PostgreSQL"""
+    swaps = await _market(session_factory, num_drivers=2, num_swaps=1)
+    swap_id, _ = swaps[0]
+
+    async with session_factory() as db:
+        statements = []
+        execute = db.execute
+
+        async def recording_execute(statement, *args, **kwargs):
+            statements.append(statement)
+            return await execute(statement, *args, **kwargs)
+
+        monkeypatch.setattr(db, "execute", recording_execute)
+        repo = SwapRepository(db)
+        await repo.lock_for_accept(swap_id, date.today())
+        await repo.lock_for_clearing([swap_id], date.today())
+
+    compiled = [str(statement.compile(dialect=postgresql.dialect())) for statement in statements]
+    assert len(compiled) == 2
+    assert all(sql.rstrip().endswith("FOR UPDATE SKIP LOCKED") for sql in compiled)
+
+
+class SharedRedis:
+    """The slice of Redis the swap index version counter uses, shared by "processes" """
+
+    def __init__(self):
+        self.values = {}
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    def pipeline(self, transaction=True):
+        return SharedRedisPipeline(self)
+
+
+class SharedRedisPipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def incr(self, key):
+        self.commands.append(("incr", key))
+
+    def expire(self, key, seconds):
+        self.commands.append(("expire", key))
+
+    async def execute(self):
+        results = []
+        for command, key in self.commands:
+            if command == "incr":
+                self.redis.values[key] = str(int(self.redis.values.get(key, 0)) + 1)
+                results.append(int(self.redis.values[key]))
+            else:
+                results.append(True)
+        return results
+
+
+async def _swap_seen_by_other_worker(factory):
+    """Worker B accepts a swap; worker A, with its own index, is asked about the moved package"""
+    swaps = await _market(factory, num_drivers=2, num_swaps=1)
+    swap_id, acceptor_id = swaps[0]
+    proposer_id = 3 - acceptor_id
+
+    async with factory() as db_a, factory() as db_b:
+        worker_a = SwapService(db_a, index_store=SwapIndexStore())
+        worker_b = SwapService(db_b, index_store=SwapIndexStore())
+        await worker_a.get_swap_index()
+        await worker_b.get_swap_index()
+
+        await worker_b.accept_swap(swap_id, acceptor_id)
+
+        # The proposer's package now belongs to the acceptor
+        await worker_a.find_compatible_swaps(acceptor_id, proposer_id)
+        with pytest.raises(ValueError, match="not assigned"):
+            await worker_a.find_compatible_swaps(proposer_id, proposer_id)
+
+        index_a = await worker_a.get_swap_index()
+        index_b = await worker_b.get_swap_index()
+        assert int(index_a.owner[index_a.position[proposer_id]]) == acceptor_id
+        return index_a, index_b
+
+
+async def test_swap_in_one_worker_reaches_the_others(session_factory, monkeypatch):
+    """The shared version counter makes other processes rebuild their index"""
+    redis = SharedRedis()
+
+    async def get_redis_client():
+        return redis
+
+    monkeypatch.setattr(swap_index, "get_redis_client", get_redis_client)
+
+    index_a, index_b = await _swap_seen_by_other_worker(session_factory)
+    assert index_a.version == index_b.version == 1
+
+
+async def test_swap_index_falls_back_to_database_without_redis(session_factory, monkeypatch):
+    """Without Redis a stale index is corrected by the ownership check"""
+    async def get_redis_client():
+        return None
+
+    monkeypatch.setattr(swap_index, "get_redis_client", get_redis_client)
+
+    await _swap_seen_by_other_worker(session_factory)
@@ -0,0 +1,326 @@
+"""
+Swap Matching Tests
+Spatial candidate search for the swap marketplace
+"""
+
+import asyncio
+from datetime import date
+
+import numpy as np
+import pytest
+
+from app.core.swap_candidates import (
+    RedisSwapCandidateCache,
+    SwapCandidateCache,
+    compute_driver_candidates,
+    drop_candidate_cache,
+    get_candidate_cache,
+)
+from app.core.swap_clearing import clear_swap_market, find_exchange_cycles
+from app.core.swap_index import SwapIndex
+from app.core.swap_matching import SwapMatcher, score_swap_candidates, select_top
+
+
+def _city(num_drivers=60, packages_per_driver=20, seed=7):
+    """Drivers and assigned packages scattered over a ~30 km city"""
+    rng = np.random.default_rng(seed)
+    drivers = [
+        {
+            'id': d,
+            'name': f"Driver {d}",
+            'current_location': (12.9 + rng.uniform(0, 0.27), 77.5 + rng.uniform(0, 0.27))
+        }
+        for d in range(num_drivers)
+    ]
+    packages = [
+        {
+            'id': 1000 + d * packages_per_driver + j,
+            'driver_id': d,
+            'latitude': 12.9 + rng.uniform(0, 0.27),
+            'longitude': 77.5 + rng.uniform(0, 0.27),
+            'difficulty_score': float(rng.uniform(0, 100)),
+            'address': f"Street {d}-{j}"
+        }
+        for d in range(num_drivers)
+        for j in range(packages_per_driver)
+    ]
+    return drivers, packages
+
+
+def test_radius_query_matches_haversine_scan():
+    """KD-tree radius and k-nearest queries agree with a brute-force haversine scan"""
+    matcher = SwapMatcher()
+    _, packages = _city()
+    index = SwapIndex(packages)
+    center = (13.0, 77.6)
+
+    distances = np.array([matcher._haversine_distance(center, (p['latitude'], p['longitude'])) for p in packages])
+
+    rows = index.query(center, radius_km=5.0)
+    assert set(rows.tolist()) == set(np.flatnonzero(distances <= 5.0).tolist())
+
+    nearest = index.query(center, radius_km=5.0, k=10)
+    assert nearest.tolist() == np.argsort(distances)[:10].tolist()
+
+
+def test_index_search_matches_full_scan_within_radius():
+    """Indexed search returns what the old all-drivers scan returns inside the radius"""
+    matcher = SwapMatcher()
+    drivers, packages = _city()
+    offered = packages[0]
+    offered_location = (offered['latitude'], offered['longitude'])
+
+    expected = set()
+    for driver in drivers[1:]:
+        for package in [p for p in packages if p['driver_id'] == driver['id']]:
+            location = (package['latitude'], package['longitude'])
+            if matcher._haversine_distance(offered_location, location) > 8.0:
+                continue
+            score = matcher._calculate_swap_score(
+                offered_location, offered['difficulty_score'],
+                location, package['difficulty_score'],
+                driver['current_location']
+            )
+            if score > 0.5:
+                expected.add((driver['id'], package['id'], round(score, 9)))
+
+    swaps = matcher.find_compatible_swaps(
+        driver_id=0,
+        offered_package=offered,
+        all_drivers=drivers,
+        all_packages=packages,
+        radius_km=8.0,
+        max_candidates=len(packages)
+    )
+
+    assert expected
+    assert {(s['driver_id'], s['package_id'], round(s['compatibility_score'], 9)) for s in swaps} == expected
+    scores = [s['compatibility_score'] for s in swaps]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_completed_swap_updates_owners_in_place():
+    """A swap exchanges owners without rebuilding the tree"""
+    _, packages = _city(num_drivers=3, packages_per_driver=2)
+    index = SwapIndex(packages)
+    tree = index.tree
+
+    index.swap_owners(packages[0]['id'], packages[2]['id'])
+
+    assert index.package(index.position[packages[0]['id']])['driver_id'] == 1
+    assert index.package(index.position[packages[2]['id']])['driver_id'] == 0
+    assert index.tree is tree
+
+
+def test_vectorized_scoring_matches_scalar_scoring():
+    """Kernel scores, distance saved and difficulty deltas equal the scalar methods"""
+    matcher = SwapMatcher()
+    rng = np.random.default_rng(3)
+    n = 2000
+    offered = (12.97, 77.59)
+    targets = np.column_stack([12.9 + rng.uniform(0, 0.3, n), 77.5 + rng.uniform(0, 0.3, n)])
+    drivers = np.column_stack([12.9 + rng.uniform(0, 0.3, n), 77.5 + rng.uniform(0, 0.3, n)])
+    difficulty = rng.uniform(0, 100, n)
+
+    scores, distance_saved, difficulty_difference = score_swap_candidates(
+        offered, 40.0,
+        targets[:, 0], targets[:, 1], difficulty,
+        drivers[:, 0], drivers[:, 1]
+    )
+
+    expected_scores = [
+        matcher._calculate_swap_score(offered, 40.0, tuple(targets[i]), difficulty[i], tuple(drivers[i]))
+        for i in range(n)
+    ]
+    expected_saved = [
+        matcher._calculate_distance_saved(offered, tuple(targets[i]), tuple(drivers[i]))
+        for i in range(n)
+    ]
+
+    np.testing.assert_allclose(scores, expected_scores, rtol=1e-12, atol=1e-12)
+    np.testing.assert_allclose(distance_saved, expected_saved, rtol=1e-12, atol=1e-12)
+    np.testing.assert_allclose(difficulty_difference, difficulty - 40.0)
+
+
+def test_select_top_matches_filter_and_sort():
+    """argpartition top-k equals threshold + full sort"""
+    rng = np.random.default_rng(5)
+    scores = np.round(rng.uniform(0, 1, 5000), 3)  # plenty of ties
+
+    expected = sorted(np.flatnonzero(scores > 0.5).tolist(), key=lambda i: -scores[i])
+
+    assert select_top(scores, 0.5).tolist() == expected
+    assert select_top(scores, 0.5, k=25).tolist() == expected[:25]
+    assert select_top(scores, 0.99, k=10 ** 6).tolist() == [i for i in expected if scores[i] > 0.99]
+
+
+def _intent(proposer_id, offered_package_id, requested_package_id):
+    return {
+        'proposer_id': proposer_id,
+        'offered_package_id': offered_package_id,
+        'requested_package_id': requested_package_id
+    }
+
+
+def test_exchange_cycles_include_three_way_trades():
+    """Mutual pairs and 3-way rings are found; a driver never trades with themselves"""
+    intents = [
+        _intent(1, 10, 20),  # 0 <-> 1
+        _intent(2, 20, 10),
+        _intent(3, 30, 40),  # 2 -> 3 -> 4 -> 2
+        _intent(4, 40, 50),
+        _intent(5, 50, 30),
+        _intent(6, 60, 61),  # same driver owns both ends
+        _intent(6, 61, 60),
+        _intent(7, 70, 80)   # nobody offers 80
+    ]
+
+    assert find_exchange_cycles(intents) == [(0, 1), (2, 3, 4)]
+    assert find_exchange_cycles(intents, max_length=2) == [(0, 1)]
+
+
+def test_clearing_picks_disjoint_cycles_with_most_distance_saved():
+    """Package 30 can move once: the 3-way ring beats the pair that shares it"""
+    intents = [
+        _intent(1, 10, 20),  # pair A: 0 <-> 1
+        _intent(2, 20, 10),
+        _intent(3, 30, 40),  # ring: 2 -> 3 -> 4 -> 2
+        _intent(4, 40, 50),
+        _intent(5, 50, 30),
+        _intent(6, 60, 30),  # pair B: 5 <-> 6, also moves package 30
+        _intent(3, 30, 60)
+    ]
+    weights = [1.0, 1.0, 2.0, 2.0, 2.0, 3.0, 2.5]
+
+    cycles, info = clear_swap_market(intents, weights)
+
+    assert sorted(cycles) == [(0, 1), (2, 3, 4)]
+    assert info['cycles_found'] == 3
+    assert info['three_way'] == 1
+    assert info['objective'] == pytest.approx(8.0, abs=0.1)
+
+    # Without 3-way trades the best option is the heavier pair
+    cycles, info = clear_swap_market(intents, weights, max_cycle_length=2)
+    assert sorted(cycles) == [(0, 1), (5, 6)]
+
+
+def test_precomputed_lists_merge_each_drivers_packages():
+    """A driver's list is the best swaps over all of their packages"""
+    matcher = SwapMatcher()
+    drivers, packages = _city(num_drivers=30, packages_per_driver=5)
+    index = SwapIndex(packages)
+
+    candidates = compute_driver_candidates(matcher, index, drivers, limit=10)
+    assert set(candidates) == {d['id'] for d in drivers}
+
+    expected = []
+    for package in [p for p in packages if p['driver_id'] == 4]:
+        for swap in matcher.find_compatible_swaps(4, package, drivers, index=index):
+            expected.append((swap['compatibility_score'], package['id'], swap['package_id']))
+    expected = sorted(expected, key=lambda e: -e[0])[:10]  # stable on ties
+
+    assert [(s['compatibility_score'], s['offered_package_id'], s['package_id']) for s in candidates[4]] == expected
+
+
+@pytest.fixture(params=["local", "redis"])
+def candidate_cache(request):
+    """In-process cache, and the Redis one on fakeredis when it is installed"""
+    if request.param == "local":
+        return SwapCandidateCache()
+
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    return RedisSwapCandidateCache(fakeredis.FakeAsyncRedis(decode_responses=True), date(2026, 1, 5))
+
+
+async def test_swap_invalidates_only_touched_drivers(candidate_cache):
+    """The two parties and drivers listing a moved package go stale; nobody else"""
+    cache = candidate_cache
+    drivers, packages = _city(num_drivers=30, packages_per_driver=5)
+    index = SwapIndex(packages)
+    candidates = compute_driver_candidates(SwapMatcher(), index, drivers, limit=10)
+    assert await cache.put(candidates, await cache.current_version()) == len(candidates)
+    assert await cache.get(3) == candidates[3]
+
+    moved = [packages[0]['id'], packages[7]['id']]  # drivers 0 and 1
+    listing = {d for d, swaps in candidates.items() if {s['package_id'] for s in swaps} & set(moved)}
+
+    as_of = await cache.current_version()
+    touched = await cache.invalidate(driver_ids=[0, 1], package_ids=moved)
+
+    assert touched == {0, 1} | listing
+    assert len(touched) < len(drivers)
+    assert await cache.stale_drivers() == touched
+    assert all([await cache.get(d) is None for d in touched])
+    assert all([await cache.get_stale(d) is not None for d in touched])
+    assert all([await cache.get(d) is not None for d in range(30) if d not in touched])
+
+    # A refresh that started before the swap must not store pre-swap lists
+    assert await cache.put({0: [], 2: []}, as_of) == (0 if 2 in touched else 1)
+    assert await cache.put({0: []}, await cache.current_version()) == 1
+    assert 0 not in await cache.stale_drivers()
+    assert await cache.get_stale(0) is None
+
+
+async def test_redis_candidate_lists_are_shared_between_workers():
+    """Lists stored by the precompute job and invalidations by any worker are seen by all"""
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    redis_client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    day = date(2026, 1, 6)
+    precompute, worker_a, worker_b = (RedisSwapCandidateCache(redis_client, day) for _ in range(3))
+
+    swaps = [{'package_id': 11, 'compatibility_score': 0.9}]
+    await precompute.put({1: swaps, 2: []}, await precompute.current_version())
+    assert await worker_a.get(1) == swaps
+
+    as_of = await precompute.current_version()
+    assert await worker_b.invalidate(driver_ids=[2], package_ids=[11]) == {1, 2}
+    assert await worker_a.get(1) is None
+    assert await worker_a.get_stale(1) == swaps
+    assert await precompute.put({1: []}, as_of) == 0
+    assert await redis_client.ttl(worker_a.stale_key) > 0
+
+
+async def test_cache_miss_serves_stale_list_while_refreshing(monkeypatch):
+    """An invalidated driver gets the old list at once; one background refresh replaces it"""
+    from app.config import settings
+    from app.services import swap_service
+
+    monkeypatch.setattr(settings, "SWAP_CANDIDATES_STORE", "local")
+    today = date.today()
+    await drop_candidate_cache(today)
+    cache = await get_candidate_cache(today)
+    old_list, new_list = [{'package_id': 1, 'compatibility_score': 0.9}], [{'package_id': 2, 'compatibility_score': 0.8}]
+    await cache.put({7: old_list}, cache.version)
+    await cache.invalidate(driver_ids=[7])
+
+    class NoSession:
+        async def __aenter__(self):
+            return None
+
+        async def __aexit__(self, *exc):
+            return False
+
+    refreshed = []
+
+    async def refresh_swap_candidates(self, driver_ids=None, assignment_date=None):
+        refreshed.append(list(driver_ids))
+        cache = await get_candidate_cache(assignment_date)
+        as_of = await cache.current_version()
+        await asyncio.sleep(0.05)
+        return await cache.put({7: new_list}, as_of)
+
+    monkeypatch.setattr(swap_service, "async_session_maker", NoSession)
+    monkeypatch.setattr(swap_service.SwapService, "refresh_swap_candidates", refresh_swap_candidates)
+    service = swap_service.SwapService(db=None)
+
+    served = await asyncio.gather(*[service.get_top_swaps(7) for _ in range(5)])
+    assert served == [old_list] * 5
+    assert await service.get_top_swaps(8) == []  # never computed: empty, not scored inline
+
+    await asyncio.sleep(0.1)
+    assert refreshed == [[7], [8]]
+    assert await service.get_top_swaps(7) == new_list
+
+    await drop_candidate_cache(today)
@@ -0,0 +1,50 @@
+"""
+XGBoost Service Tests
+Vectorized feature construction and memory-bounded streaming prediction
+"""
+
+import numpy as np
+
+from app.ml.xgboost_service import XGBoostService
+from tests.xgboost_fakes import CountingModel, StaticModelLoader, sample_features
+
+
+def test_feature_matrix_matches_scalar_path():
+    """Broadcast feature construction equals _build_feature_vector per pair"""
+    service = XGBoostService(StaticModelLoader(CountingModel()))
+    drivers, packages = sample_features()
+    drivers.append({'experience_days': 0, 'success_rate': 0.75})  # defaults for missing keys
+    packages.append({'weight': 12.5, 'distance': 0.4, 'is_fragile': True})
+
+    matrix = service._build_feature_matrix(drivers, packages)
+
+    assert matrix.dtype == np.float32
+    assert matrix.flags['C_CONTIGUOUS']
+    assert matrix.shape == (len(drivers) * len(packages), 15)
+
+    expected = np.array([
+        service._build_feature_vector(d, p) for d in drivers for p in packages
+    ], dtype=np.float32)
+    np.testing.assert_allclose(matrix, expected, rtol=1e-6)
+
+
+def test_streaming_blocks_match_single_batch(monkeypatch):
+    """Chunked prediction (in memory or memmap) equals the one-shot matrix"""
+    from app.config import settings
+
+    service = XGBoostService(StaticModelLoader(CountingModel()))
+    drivers, packages = sample_features()
+    expected = service.predict_difficulty_streaming(drivers, packages, chunk_rows=10 ** 6)
+    assert service.last_run_stats['blocks'] == 1
+
+    chunked = service.predict_difficulty_streaming(drivers, packages, chunk_rows=7)
+    assert service.last_run_stats['blocks'] == 4  # one driver (6 rows) per block
+    np.testing.assert_array_equal(chunked, expected)
+
+    monkeypatch.setattr(settings, "XGBOOST_MEMMAP_THRESHOLD_MB", 0)
+    mapped = service.predict_difficulty_streaming(drivers, packages, chunk_rows=12)
+    assert isinstance(mapped, np.memmap)
+    assert service.last_run_stats['memmap']
+    assert service.last_run_stats['peak_memory_mb'] > 0
+    assert service.last_run_stats['memory_growth_mb'] >= 0
+    np.testing.assert_array_equal(mapped, expected)
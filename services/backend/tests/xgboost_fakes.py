@@ -0,0 +1,47 @@
+"""
+XGBoost Test Fakes
+Cheap stand-ins for the difficulty model, scaler and model loader
+"""
+
+import numpy as np
+
+
+class CountingModel:
+    """Difficulty = sum of scaled features; counts scored rows"""
+
+    def __init__(self):
+        self.rows_scored = 0
+
+    def predict(self, features):
+        features = np.asarray(features, dtype=np.float64)
+        self.rows_scored += len(features)
+        return features[:, :5].sum(axis=1) % 100
+
+
+class IdentityScaler:
+    def transform(self, features):
+        return features
+
+
+class StaticModelLoader:
+    def __init__(self, model):
+        self.model = model
+        self.xgboost_version = "test-v1"
+
+    def get_xgboost_model(self):
+        return self.model
+
+    def get_scaler(self):
+        return IdentityScaler()
+
+
+def sample_features():
+    drivers = [
+        {'experience_days': 100 + i, 'avg_delivery_time': 30, 'success_rate': 0.9, 'vehicle_capacity': 50}
+        for i in range(4)
+    ]
+    packages = [
+        {'weight': 1 + j, 'distance': 5.0, 'floor_number': j % 3, 'is_fragile': False, 'time_window_hours': 4}
+        for j in range(6)
+    ]
+    return drivers, packages